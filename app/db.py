@@ -3,13 +3,86 @@ import os
 import sys
 import tempfile
 import shutil
+import threading
+import time
+import weakref
 from pathlib import Path
 from contextlib import contextmanager
 from typing import Optional
 from app.utils.resource_path import get_app_root, get_resource_path
+from app.utils import perf, sql_trace
 import atexit
 
 
+# 每个连接建立后执行的 PRAGMA：WAL 日志 + NORMAL 同步（WAL 下掉电只可能丢失最近的提交，不会损坏），
+# cache_size 为负数时单位为 KiB
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+# 连接上直接执行语句的原始实现：app.db 的查询函数已自行跟踪/计数（含取回的行数），经此调用以免重复记录
+_raw_execute = sqlite3.Connection.execute
+_raw_executemany = sqlite3.Connection.executemany
+
+
+class _TracedConnection(sqlite3.Connection):
+    """
+    连接级跟踪：服务层在 get_conn()/transaction() 块内直接调用的 conn.execute/executemany
+    同样计入 SQL 跟踪与 perf 埋点的语句数；跟踪与埋点都关闭时只做两次布尔判断。
+    直接执行的查询在执行时尚未取回结果，返回行数按 0 计
+    """
+
+    def execute(self, sql, parameters=()):
+        if not (sql_trace.enabled() or perf.profiling_enabled()):
+            return _raw_execute(self, sql, parameters)
+        start = time.perf_counter()
+        cursor = _raw_execute(self, sql, parameters)
+        self._note(sql, parameters, start, cursor.rowcount)
+        return cursor
+
+    def executemany(self, sql, seq_of_parameters):
+        if not (sql_trace.enabled() or perf.profiling_enabled()):
+            return _raw_executemany(self, sql, seq_of_parameters)
+        # 参数可能是生成器，先物化以便统计批次数和取首组参数生成执行计划
+        params_list = list(seq_of_parameters)
+        start = time.perf_counter()
+        cursor = _raw_executemany(self, sql, params_list)
+        self._note(sql, params_list[0] if params_list else None, start, cursor.rowcount,
+                   batch=len(params_list))
+        return cursor
+
+    def _note(self, sql, params, start: float, rowcount: int, batch: Optional[int] = None):
+        rows = max(rowcount, 0)
+        if sql_trace.enabled():
+            explain = None
+            if params is not None:
+                explain = lambda: DatabaseManager._explain(self, sql, params)
+            sql_trace.record(sql, params, time.perf_counter() - start, rows, explain=explain, batch=batch)
+        if perf.profiling_enabled():
+            perf.note_query(rows)
+
+
+class _PooledConnection:
+    """线程持有的长连接及其嵌套深度"""
+
+    def __init__(self, conn: sqlite3.Connection, generation: int):
+        self.conn = conn
+        self.generation = generation
+        self.depth = 0      # get_conn 嵌套层数
+        self.tx_depth = 0   # transaction 嵌套层数
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
+
+
 class DatabaseManager:
     """数据库管理器"""
     
@@ -23,6 +96,15 @@ class DatabaseManager:
         self.use_embedded_db = use_embedded_db
         self.db_path = None
         
+        # 连接池：每个线程一个长连接（QThread 工作线程各自持有），关闭全部连接时递增 generation
+        self._local = threading.local()
+        self._pool_lock = threading.Lock()
+        self._pool = weakref.WeakSet()
+        self._pool_generation = 0
+        
+        # 数据整体变更（恢复/导入数据库、数据库管理界面直接修改表）后调用的回调，各服务借此清空进程内缓存
+        self._reset_listeners = []
+        
         if use_embedded_db:
             # 使用内置数据库
             self._init_embedded_db()
@@ -39,11 +121,12 @@ class DatabaseManager:
             # 获取应用程序根目录
             app_root = get_app_root()
             
-            # 直接使用exe文件同目录下的数据库文件
-            self.db_path = app_root / "mes.db"
+            # 直接使用exe文件同目录下的数据库文件；NDKJ_DB_PATH 可指定其它数据库（基准测试等）
+            env_path = os.environ.get("NDKJ_DB_PATH")
+            self.db_path = Path(env_path) if env_path else app_root / "mes.db"
             
             # 确保目录存在
-            app_root.mkdir(parents=True, exist_ok=True)
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
             
             print(f"使用内置数据库: {self.db_path}")
             
@@ -72,18 +155,7 @@ class DatabaseManager:
             
             # 连接数据库并创建表
             with self.get_conn() as conn:
-                # 读取schema.sql文件
-                schema_file = get_resource_path("app/schema.sql")
-                
-                if os.path.exists(schema_file):
-                    with open(schema_file, 'r', encoding='utf-8') as f:
-                        schema_sql = f.read()
-                    
-                    # 执行schema
-                    conn.executescript(schema_sql)
-                    print("数据库表结构创建完成")
-                else:
-                    print(f"警告: 找不到schema文件 {schema_file}")
+                self._apply_schema(conn)
                 
                 # 检查并更新数据库版本
                 self._check_and_update_schema(conn)
@@ -92,6 +164,21 @@ class DatabaseManager:
             print(f"数据库初始化失败: {e}")
             raise
     
+    def _apply_schema(self, conn):
+        """执行 schema.sql（建表、索引、触发器均为 IF NOT EXISTS，可重复执行），补齐缺少的表结构"""
+        # 读取schema.sql文件
+        schema_file = get_resource_path("app/schema.sql")
+        
+        if os.path.exists(schema_file):
+            with open(schema_file, 'r', encoding='utf-8') as f:
+                schema_sql = f.read()
+            
+            # 执行schema
+            conn.executescript(schema_sql)
+            print("数据库表结构创建完成")
+        else:
+            print(f"警告: 找不到schema文件 {schema_file}")
+    
     def _check_and_update_schema(self, conn):
         """检查并更新数据库结构"""
         try:
@@ -138,9 +225,8 @@ class DatabaseManager:
             print(f"数据库初始化错误: {e}")
             # 如果出错，尝试删除数据库文件重新创建
             try:
-                conn.close()
-                if self.db_path.exists():
-                    self.db_path.unlink()
+                self.close_all_connections()
+                self._remove_db_files()
                 print("数据库文件已删除，将重新创建")
                 # 重新初始化
                 self._init_db()
@@ -276,32 +362,134 @@ class DatabaseManager:
             except Exception as e:
                 print(f"创建表 {table_name} 失败: {e}")
     
+    # ---------------- 连接池 ----------------
+    def _connect(self) -> sqlite3.Connection:
+        """建立一个新连接并应用连接参数"""
+        # check_same_thread=False 仅用于在恢复/退出时由主线程统一关闭，平时每个连接只在所属线程使用
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, factory=_TracedConnection)
+        conn.row_factory = sqlite3.Row  # 使查询结果支持列名访问
+        for pragma in _CONNECTION_PRAGMAS:
+            _raw_execute(conn, pragma)
+        return conn
+
+    def _thread_connection(self) -> _PooledConnection:
+        """获取当前线程的长连接，不存在或已失效时重新建立"""
+        pooled = getattr(self._local, "pooled", None)
+        if pooled is None or pooled.generation != self._pool_generation:
+            pooled = _PooledConnection(self._connect(), self._pool_generation)
+            self._local.pooled = pooled
+            with self._pool_lock:
+                self._pool.add(pooled)
+        return pooled
+
+    def close_all_connections(self):
+        """关闭所有线程的连接（恢复/替换数据库文件前调用），各线程下次访问时自动重连"""
+        with self._pool_lock:
+            self._pool_generation += 1
+            pooled_list = list(self._pool)
+            self._pool.clear()
+        for pooled in pooled_list:
+            pooled.close()
+        self._local.pooled = None
+
+    def add_reset_listener(self, callback):
+        """注册数据整体变更后的回调（同一回调只注册一次）"""
+        if callback not in self._reset_listeners:
+            self._reset_listeners.append(callback)
+
+    def notify_reset(self):
+        """数据未经服务层修改（恢复数据库、直接编辑表）后调用，通知各服务丢弃进程内缓存"""
+        for callback in list(self._reset_listeners):
+            try:
+                callback()
+            except Exception as e:
+                print(f"清空缓存失败: {e}")
+
+    def in_transaction(self) -> bool:
+        """当前线程是否处于 transaction() 中"""
+        pooled = getattr(self._local, "pooled", None)
+        return pooled is not None and pooled.tx_depth > 0
+
     @contextmanager
     def get_conn(self):
-        """获取数据库连接的上下文管理器"""
-        db_path_str = str(self.db_path)
-        conn = sqlite3.connect(db_path_str)
-        conn.row_factory = sqlite3.Row  # 使查询结果支持列名访问
+        """
+        获取数据库连接的上下文管理器
+        返回当前线程的长连接；最外层退出时未提交的修改会被回滚（与关闭连接的效果一致）
+        """
+        pooled = self._thread_connection()
+        conn = pooled.conn
+        pooled.depth += 1
         
         try:
             yield conn
         except Exception as e:
-            conn.rollback()
+            if pooled.tx_depth == 0:
+                conn.rollback()
             raise e
         finally:
-            conn.close()
+            pooled.depth -= 1
+            if pooled.depth == 0 and pooled.tx_depth == 0:
+                try:
+                    if conn.in_transaction:
+                        conn.rollback()
+                except sqlite3.ProgrammingError:
+                    pass  # 连接已被 close_all_connections 关闭
+
+    @contextmanager
+    def transaction(self):
+        """
+        事务上下文管理器：块内的 execute/execute_many 不再逐条提交，
+        正常退出时统一提交一次，异常时整体回滚；支持嵌套，以最外层为准
+        """
+        with self.get_conn() as conn:
+            pooled = self._local.pooled
+            if pooled.tx_depth == 0 and not conn.in_transaction:
+                _raw_execute(conn, "BEGIN IMMEDIATE")
+            pooled.tx_depth += 1
+            try:
+                yield conn
+            except BaseException:
+                pooled.tx_depth -= 1
+                if pooled.tx_depth == 0:
+                    conn.rollback()
+                raise
+            pooled.tx_depth -= 1
+            if pooled.tx_depth == 0:
+                conn.commit()
     
+    # ---------------- SQL 跟踪 ----------------
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, sql: str, params) -> list:
+        """EXPLAIN QUERY PLAN（只生成执行计划，不执行语句）→ [(id, parent, detail)]"""
+        return [(row[0], row[1], row[3]) for row in _raw_execute(conn, "EXPLAIN QUERY PLAN " + sql, params)]
+
+    def trace(self, conn: sqlite3.Connection, sql: str, params, start: float, rows: int,
+              batch: Optional[int] = None):
+        """记录一次语句执行到 sql_trace（调用方已确认跟踪开启并在执行前取得 start）"""
+        explain = None
+        if params is not None:
+            explain = lambda: self._explain(conn, sql, params)
+        sql_trace.record(sql, params, time.perf_counter() - start, rows, explain=explain, batch=batch)
+
     def execute_query(self, sql: str, params: tuple = ()) -> list:
         """执行查询语句"""
         with self.get_conn() as conn:
-            cursor = conn.execute(sql, params)
-            return cursor.fetchall()
+            start = time.perf_counter() if sql_trace.enabled() else None
+            cursor = _raw_execute(conn, sql, params)
+            rows = cursor.fetchall()
+            if start is not None:
+                self.trace(conn, sql, params, start, len(rows))
+            return rows
     
     def execute_update(self, sql: str, params: tuple = ()) -> int:
-        """执行更新语句，返回最后插入行的ID或影响的行数"""
+        """执行更新语句，返回最后插入行的ID或影响的行数；在 transaction() 中时不单独提交"""
         with self.get_conn() as conn:
-            cursor = conn.execute(sql, params)
-            conn.commit()
+            start = time.perf_counter() if sql_trace.enabled() else None
+            cursor = _raw_execute(conn, sql, params)
+            if start is not None:
+                self.trace(conn, sql, params, start, cursor.rowcount)
+            if not self.in_transaction():
+                conn.commit()
             # 如果是INSERT语句，返回lastrowid；否则返回影响的行数
             if sql.strip().upper().startswith('INSERT'):
                 return cursor.lastrowid
@@ -309,10 +497,19 @@ class DatabaseManager:
                 return cursor.rowcount
     
     def execute_many(self, sql: str, params_list: list) -> int:
-        """批量执行语句"""
+        """批量执行语句；在 transaction() 中时不单独提交"""
         with self.get_conn() as conn:
-            cursor = conn.executemany(sql, params_list)
-            conn.commit()
+            start = None
+            if sql_trace.enabled():
+                # 参数可能是生成器，跟踪时先物化以便统计批次数和取首组参数生成执行计划
+                params_list = list(params_list)
+                start = time.perf_counter()
+            cursor = _raw_executemany(conn, sql, params_list)
+            if start is not None:
+                self.trace(conn, sql, params_list[0] if params_list else None, start,
+                           cursor.rowcount, batch=len(params_list))
+            if not self.in_transaction():
+                conn.commit()
             return cursor.rowcount
     
     def get_last_rowid(self) -> int:
@@ -321,11 +518,22 @@ class DatabaseManager:
             cursor = conn.cursor()
             return cursor.lastrowid
     
+    def _remove_db_files(self):
+        """删除数据库文件及 WAL 附属文件"""
+        for path in (self.db_path, Path(f"{self.db_path}-wal"), Path(f"{self.db_path}-shm")):
+            if path.exists():
+                path.unlink()
+    
     def backup_database(self, backup_path: str) -> bool:
-        """备份数据库"""
+        """备份数据库（使用 SQLite 在线备份，包含 WAL 中尚未回写的数据）"""
         try:
             if self.db_path.exists():
-                shutil.copy2(self.db_path, backup_path)
+                with self.get_conn() as conn:
+                    target = sqlite3.connect(str(backup_path))
+                    try:
+                        conn.backup(target)
+                    finally:
+                        target.close()
                 print(f"数据库已备份到: {backup_path}")
                 return True
             else:
@@ -339,7 +547,18 @@ class DatabaseManager:
         """恢复数据库"""
         try:
             if os.path.exists(backup_path):
+                # 先关闭全部连接并删除旧的 WAL 文件，避免旧日志被回放到新数据库上
+                self.close_all_connections()
+                self._remove_db_files()
                 shutil.copy2(backup_path, self.db_path)
+                # 备份可能来自旧版本（缺少后来新增的表、触发器，如 MrpChangeLog），恢复后补齐；
+                # 补齐失败时保留恢复的数据，只提示
+                try:
+                    with self.get_conn() as conn:
+                        self._apply_schema(conn)
+                except Exception as e:
+                    print(f"补齐恢复数据库的表结构失败: {e}")
+                self.notify_reset()
                 print(f"数据库已从 {backup_path} 恢复")
                 return True
             else:
@@ -369,7 +588,7 @@ class DatabaseManager:
     
     def cleanup(self):
         """清理资源"""
-        # 对于文件数据库，不需要特殊清理
+        self.close_all_connections()
         print("数据库连接已关闭")
 
 
@@ -382,6 +601,11 @@ def get_conn():
     return db_manager.get_conn()
 
 
+def transaction():
+    """批量写入的事务上下文管理器，块内的 execute/execute_many 统一提交一次"""
+    return db_manager.transaction()
+
+
 def init_db():
     """初始化数据库"""
     db_manager._init_db()
@@ -391,18 +615,31 @@ def init_db():
 def query_one(sql: str, params: tuple = ()) -> Optional[sqlite3.Row]:
     """查询单条记录"""
     with get_conn() as conn:
-        cursor = conn.execute(sql, params)
-        return cursor.fetchone()
+        start = time.perf_counter() if sql_trace.enabled() else None
+        cursor = _raw_execute(conn, sql, params)
+        row = cursor.fetchone()
+        cursor.close()
+        if start is not None:
+            db_manager.trace(conn, sql, params, start, 0 if row is None else 1)
+        if perf.profiling_enabled():
+            perf.note_query(0 if row is None else 1)
+        return row
 
 
 def query_all(sql: str, params: tuple = ()) -> list:
     """查询多条记录"""
-    return db_manager.execute_query(sql, params)
+    rows = db_manager.execute_query(sql, params)
+    if perf.profiling_enabled():
+        perf.note_query(len(rows))
+    return rows
 
 
 def execute(sql: str, params: tuple = ()) -> int:
     """执行SQL语句"""
-    return db_manager.execute_update(sql, params)
+    result = db_manager.execute_update(sql, params)
+    if perf.profiling_enabled():
+        perf.note_query()
+    return result
 
 
 def get_last_id() -> int:
@@ -412,7 +649,10 @@ def get_last_id() -> int:
 
 def execute_many(sql: str, params_list: list) -> int:
     """批量执行SQL语句"""
-    return db_manager.execute_many(sql, params_list)
+    result = db_manager.execute_many(sql, params_list)
+    if perf.profiling_enabled():
+        perf.note_query()
+    return result
 
 # 数据库备份和恢复功能
 def backup_database(backup_path: str) -> bool:
@@ -435,6 +675,28 @@ def get_database_info() -> dict:
     """获取数据库信息"""
     return db_manager.get_database_info()
 
+def add_reset_listener(callback):
+    """注册数据整体变更（恢复/导入数据库、直接编辑表）后清空进程内缓存的回调"""
+    db_manager.add_reset_listener(callback)
+
+def notify_data_reset():
+    """通知数据已在服务层之外被修改"""
+    db_manager.notify_reset()
+
+def set_sql_trace(enabled: bool, slow_ms: Optional[float] = None):
+    """开关 SQL 跟踪，可同时设置慢查询阈值（毫秒）"""
+    sql_trace.set_enabled(enabled)
+    if slow_ms is not None:
+        sql_trace.set_slow_threshold_ms(slow_ms)
+
+def get_sql_stats(top_n: Optional[int] = None) -> list:
+    """SQL 跟踪统计（按总耗时降序）"""
+    return sql_trace.stats(top_n)
+
+def reset_sql_stats():
+    """清空 SQL 跟踪统计"""
+    sql_trace.reset()
+
 def cleanup_database():
     """清理数据库资源"""
     db_manager.cleanup()
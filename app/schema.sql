@@ -535,6 +535,7 @@ CREATE TABLE IF NOT EXISTS ProjectMappings (
     CreatedBy TEXT,                              -- 创建人
     UpdatedBy TEXT,                              -- 更新人
     Remark TEXT,                                 -- 备注
+    DisplayOrder INTEGER DEFAULT 0,              -- 看板显示顺序
     UNIQUE (ProjectCode, ItemId),                -- 项目代码和物料ID的组合唯一
     FOREIGN KEY (ItemId) REFERENCES Items(ItemId)
 );
@@ -619,4 +620,243 @@ CREATE INDEX IF NOT EXISTS idx_scheduling_order_lines_date ON SchedulingOrderLin
 CREATE INDEX IF NOT EXISTS idx_scheduling_order_mrp_order ON SchedulingOrderMRP(OrderId);
 CREATE INDEX IF NOT EXISTS idx_scheduling_order_mrp_item_date ON SchedulingOrderMRP(ItemId, ProductionDate);
 
+-- ============ 生产排产计划 ============
 
+-- 生产排产计划主表
+CREATE TABLE IF NOT EXISTS ProductionSchedules (
+    ScheduleId INTEGER PRIMARY KEY AUTOINCREMENT,
+    ScheduleName TEXT NOT NULL,                    -- 排产计划名称
+    StartDate DATE NOT NULL,                       -- 开始日期
+    EndDate DATE NOT NULL,                         -- 结束日期
+    Status TEXT DEFAULT 'Draft',                   -- 状态：Draft/Active/Completed/Cancelled
+    CreatedBy TEXT,                                -- 创建人
+    CreatedDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UpdatedBy TEXT,                                -- 更新人
+    UpdatedDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Remark TEXT                                    -- 备注
+);
+
+-- 生产排产计划明细表（按天排产数量）
+CREATE TABLE IF NOT EXISTS ProductionScheduleLines (
+    LineId INTEGER PRIMARY KEY AUTOINCREMENT,
+    ScheduleId INTEGER NOT NULL,                   -- 关联排产计划
+    ItemId INTEGER NOT NULL,                      -- 成品物料ID
+    ProductionDate DATE NOT NULL,                 -- 生产日期
+    PlannedQty REAL NOT NULL DEFAULT 0,           -- 计划生产数量
+    ActualQty REAL DEFAULT 0,                     -- 实际生产数量
+    Status TEXT DEFAULT 'Planned',                -- 状态：Planned/InProgress/Completed/Cancelled
+    Priority INTEGER DEFAULT 5,                   -- 优先级(1-10)
+    WorkCenterId INTEGER,                         -- 工作中心ID
+    Remark TEXT,                                  -- 备注
+    CreatedDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UpdatedDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (ScheduleId) REFERENCES ProductionSchedules(ScheduleId) ON DELETE CASCADE,
+    FOREIGN KEY (ItemId) REFERENCES Items(ItemId) ON DELETE CASCADE,
+    FOREIGN KEY (WorkCenterId) REFERENCES WorkCenters(WorkCenterId) ON DELETE SET NULL,
+    UNIQUE(ScheduleId, ItemId, ProductionDate)    -- 同一计划下，同一物料同一日期只能有一条记录
+);
+
+-- 生产排产MRP计算结果表
+CREATE TABLE IF NOT EXISTS ProductionScheduleMRP (
+    MRPId INTEGER PRIMARY KEY AUTOINCREMENT,
+    ScheduleId INTEGER NOT NULL,                  -- 关联排产计划
+    ItemId INTEGER NOT NULL,                      -- 物料ID
+    ProductionDate DATE NOT NULL,                 -- 生产日期
+    RequiredQty REAL NOT NULL DEFAULT 0,          -- 需求数量
+    OnHandQty REAL DEFAULT 0,                     -- 在手库存
+    NetQty REAL DEFAULT 0,                        -- 净需求
+    Status TEXT DEFAULT 'Calculated',             -- 状态：Calculated/Confirmed/Cancelled
+    CreatedDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UpdatedDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (ScheduleId) REFERENCES ProductionSchedules(ScheduleId) ON DELETE CASCADE,
+    FOREIGN KEY (ItemId) REFERENCES Items(ItemId) ON DELETE CASCADE,
+    UNIQUE(ScheduleId, ItemId, ProductionDate)    -- 同一计划下，同一物料同一日期只能有一条MRP记录
+);
+
+CREATE INDEX IF NOT EXISTS idx_production_schedules_status ON ProductionSchedules(Status);
+CREATE INDEX IF NOT EXISTS idx_production_schedules_date_range ON ProductionSchedules(StartDate, EndDate);
+CREATE INDEX IF NOT EXISTS idx_production_schedule_lines_schedule ON ProductionScheduleLines(ScheduleId);
+CREATE INDEX IF NOT EXISTS idx_production_schedule_lines_item_date ON ProductionScheduleLines(ItemId, ProductionDate);
+CREATE INDEX IF NOT EXISTS idx_production_schedule_lines_date ON ProductionScheduleLines(ProductionDate);
+CREATE INDEX IF NOT EXISTS idx_production_schedule_mrp_schedule ON ProductionScheduleMRP(ScheduleId);
+CREATE INDEX IF NOT EXISTS idx_production_schedule_mrp_item_date ON ProductionScheduleMRP(ItemId, ProductionDate);
+
+-- MRP 数据变更日志（增量MRP计算使用）
+-- 由下方触发器写入：同一表同一变更键只保留最新一条记录，ChangeId 单调递增
+CREATE TABLE IF NOT EXISTS MrpChangeLog (
+    ChangeId INTEGER PRIMARY KEY AUTOINCREMENT,
+    TableName TEXT NOT NULL,                     -- 变更的表
+    ChangeKey TEXT NOT NULL,                     -- 变更键：客户订单行为ItemNumber，库存/物料为ItemId，BOM为BomId
+    ChangedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(TableName, ChangeKey)
+);
+
+-- 按表取最新变更号（MRP结果缓存的数据版本）
+CREATE INDEX IF NOT EXISTS idx_mrp_changelog_table ON MrpChangeLog(TableName, ChangeId);
+
+-- 变更日志触发器：先删除同键旧记录再插入，避免受外层语句 OR IGNORE/OR REPLACE 冲突处理的影响
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_customerorderlines_insert
+    AFTER INSERT ON CustomerOrderLines
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'CustomerOrderLines' AND ChangeKey = IFNULL(NEW.ItemNumber, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('CustomerOrderLines', IFNULL(NEW.ItemNumber, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_customerorderlines_update
+    AFTER UPDATE OF OrderId, ItemNumber, DeliveryDate, RequiredQty, LineStatus ON CustomerOrderLines
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'CustomerOrderLines' AND ChangeKey = IFNULL(OLD.ItemNumber, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('CustomerOrderLines', IFNULL(OLD.ItemNumber, ''));
+    DELETE FROM MrpChangeLog WHERE TableName = 'CustomerOrderLines' AND ChangeKey = IFNULL(NEW.ItemNumber, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('CustomerOrderLines', IFNULL(NEW.ItemNumber, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_customerorderlines_delete
+    AFTER DELETE ON CustomerOrderLines
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'CustomerOrderLines' AND ChangeKey = IFNULL(OLD.ItemNumber, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('CustomerOrderLines', IFNULL(OLD.ItemNumber, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_customerorders_update
+    AFTER UPDATE OF ImportId ON CustomerOrders
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'CustomerOrders' AND ChangeKey = IFNULL(OLD.OrderId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('CustomerOrders', IFNULL(OLD.OrderId, ''));
+    DELETE FROM MrpChangeLog WHERE TableName = 'CustomerOrders' AND ChangeKey = IFNULL(NEW.OrderId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('CustomerOrders', IFNULL(NEW.OrderId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_customerorders_delete
+    AFTER DELETE ON CustomerOrders
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'CustomerOrders' AND ChangeKey = IFNULL(OLD.OrderId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('CustomerOrders', IFNULL(OLD.OrderId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_inventorybalance_insert
+    AFTER INSERT ON InventoryBalance
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'InventoryBalance' AND ChangeKey = IFNULL(NEW.ItemId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('InventoryBalance', IFNULL(NEW.ItemId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_inventorybalance_update
+    AFTER UPDATE OF ItemId, QtyOnHand ON InventoryBalance
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'InventoryBalance' AND ChangeKey = IFNULL(OLD.ItemId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('InventoryBalance', IFNULL(OLD.ItemId, ''));
+    DELETE FROM MrpChangeLog WHERE TableName = 'InventoryBalance' AND ChangeKey = IFNULL(NEW.ItemId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('InventoryBalance', IFNULL(NEW.ItemId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_inventorybalance_delete
+    AFTER DELETE ON InventoryBalance
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'InventoryBalance' AND ChangeKey = IFNULL(OLD.ItemId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('InventoryBalance', IFNULL(OLD.ItemId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_bomheaders_insert
+    AFTER INSERT ON BomHeaders
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'BomHeaders' AND ChangeKey = IFNULL(NEW.BomId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('BomHeaders', IFNULL(NEW.BomId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_bomheaders_update
+    AFTER UPDATE OF BomName, ParentItemId, Rev, IsActive ON BomHeaders
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'BomHeaders' AND ChangeKey = IFNULL(OLD.BomId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('BomHeaders', IFNULL(OLD.BomId, ''));
+    DELETE FROM MrpChangeLog WHERE TableName = 'BomHeaders' AND ChangeKey = IFNULL(NEW.BomId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('BomHeaders', IFNULL(NEW.BomId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_bomheaders_delete
+    AFTER DELETE ON BomHeaders
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'BomHeaders' AND ChangeKey = IFNULL(OLD.BomId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('BomHeaders', IFNULL(OLD.BomId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_bomlines_insert
+    AFTER INSERT ON BomLines
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'BomLines' AND ChangeKey = IFNULL(NEW.BomId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('BomLines', IFNULL(NEW.BomId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_bomlines_update
+    AFTER UPDATE OF BomId, ChildItemId, QtyPer, ScrapFactor ON BomLines
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'BomLines' AND ChangeKey = IFNULL(OLD.BomId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('BomLines', IFNULL(OLD.BomId, ''));
+    DELETE FROM MrpChangeLog WHERE TableName = 'BomLines' AND ChangeKey = IFNULL(NEW.BomId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('BomLines', IFNULL(NEW.BomId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_bomlines_delete
+    AFTER DELETE ON BomLines
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'BomLines' AND ChangeKey = IFNULL(OLD.BomId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('BomLines', IFNULL(OLD.BomId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_items_insert
+    AFTER INSERT ON Items
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'Items' AND ChangeKey = IFNULL(NEW.ItemId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('Items', IFNULL(NEW.ItemId, ''));
+END;
+
+-- 监视看板读取的全部物料列；旧版数据库中监视列较少的同名触发器先删除，再按本定义重建
+DROP TRIGGER IF EXISTS mrp_changelog_items_update;
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_items_update
+    AFTER UPDATE OF ItemCode, CnName, ItemSpec, ItemType, Unit, SafetyStock, Brand, IsActive ON Items
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'Items' AND ChangeKey = IFNULL(OLD.ItemId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('Items', IFNULL(OLD.ItemId, ''));
+    DELETE FROM MrpChangeLog WHERE TableName = 'Items' AND ChangeKey = IFNULL(NEW.ItemId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('Items', IFNULL(NEW.ItemId, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS mrp_changelog_items_delete
+    AFTER DELETE ON Items
+    FOR EACH ROW
+BEGIN
+    DELETE FROM MrpChangeLog WHERE TableName = 'Items' AND ChangeKey = IFNULL(OLD.ItemId, '');
+    INSERT INTO MrpChangeLog (TableName, ChangeKey) VALUES ('Items', IFNULL(OLD.ItemId, ''));
+END;
+
+-- MRP 计算结果快照（重新打开未变更的计划时直接载入）
+-- 同一来源+来源键+输入指纹只保留一份；Payload 为压缩的列式数据（见 MRPSnapshotService）
+CREATE TABLE IF NOT EXISTS MrpSnapshots (
+    SnapshotId INTEGER PRIMARY KEY AUTOINCREMENT,
+    Source TEXT NOT NULL,                        -- 来源：kanban_child/kanban_parent/kanban_comprehensive/scheduling_order/production_schedule
+    SourceKey TEXT NOT NULL DEFAULT '',          -- 来源键：客户订单版本ImportId/排产订单OrderId/排产计划ScheduleId
+    Fingerprint TEXT NOT NULL,                   -- 输入指纹（计算参数 + 数据版本）
+    RowCount INTEGER NOT NULL DEFAULT 0,         -- 结果行数
+    ColCount INTEGER NOT NULL DEFAULT 0,         -- 日期列数
+    Payload BLOB NOT NULL,                       -- 压缩的结果数据
+    CreatedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(Source, SourceKey, Fingerprint)
+);
+
+CREATE INDEX IF NOT EXISTS idx_mrp_snapshots_created ON MrpSnapshots(CreatedAt);
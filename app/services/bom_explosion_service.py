@@ -0,0 +1,267 @@
+# app/services/bom_explosion_service.py
+# -*- coding: utf-8 -*-
+"""
+BOM展开引擎（集合式）
+- 按层批量加载有效 BomHeaders/BomLines/Items，每层一次查询，不再逐行访问数据库
+- 在内存中完成多级展开，计算每个(父件, 子件)的实际用量（含损耗）
+- 输出记录格式与 BomService.expand_bom 保持一致
+- 提供按父物料缓存的扁平化BOM（子件 -> 累计单位用量），展开与数量成线性关系，
+  MRP只需对每个日期做乘加即可；BOM/物料/项目映射变更时由对应服务调用 invalidate_cache，
+  恢复数据库或直接编辑表时经 app.db 的重置回调清空
+- 未缓存的父物料较多时，扁平化分发到进程池并行计算（进程数见 EXPLODE_WORKERS，
+  由环境变量 NDKJ_EXPLODE_WORKERS 设置）
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Iterable
+
+from app.db import add_reset_listener, query_all, query_one
+from app.services.bom_graph import BomStructure, flatten_parallel
+from app.utils.perf import get_logger, profiled
+
+logger = get_logger(__name__)
+
+# SQLite 单条语句的参数个数上限较保守的取值
+_IN_CHUNK = 500
+
+
+def _env_workers() -> Optional[int]:
+    """
+    NDKJ_EXPLODE_WORKERS：扁平化进程数
+    未设置时使用全部CPU核心；0 或 1 在当前进程计算；无法识别或为负数时按单进程计算并警告
+    """
+    value = os.environ.get("NDKJ_EXPLODE_WORKERS", "").strip()
+    if not value:
+        return None
+    try:
+        workers = int(value)
+    except ValueError:
+        logger.warning("NDKJ_EXPLODE_WORKERS=%r 不是整数，按单进程展开", value)
+        return 1
+    if workers < 0:
+        logger.warning("NDKJ_EXPLODE_WORKERS=%d 不能为负数，按单进程展开", workers)
+        return 1
+    return max(workers, 1)
+
+
+class BomGraph(BomStructure):
+    """从数据库加载的有效BOM结构快照（展开/扁平化见 BomStructure）"""
+
+    # ---------------- 加载 ----------------
+    @classmethod
+    def load(cls, root_item_ids: Optional[Iterable[int]] = None,
+             root_bom_ids: Optional[Iterable[int]] = None) -> "BomGraph":
+        """
+        加载BOM结构快照
+        - root_item_ids/root_bom_ids 都为空时加载全部有效BOM（一次查询）
+        - 否则从根出发逐层加载可达的BOM，查询次数等于BOM层数
+        """
+        graph = cls()
+        graph._load_headers()
+
+        if root_item_ids is None and root_bom_ids is None:
+            graph._load_lines(None)
+            return graph
+
+        pending = set(root_bom_ids or [])
+        for item_id in root_item_ids or []:
+            bom_id = graph.bom_by_parent.get(item_id)
+            if bom_id is not None:
+                pending.add(bom_id)
+
+        loaded = set()
+        while pending:
+            graph._load_lines(sorted(pending))
+            loaded |= pending
+            next_level = set()
+            for bom_id in pending:
+                for line in graph.lines_by_bom.get(bom_id, []):
+                    child_bom = graph.bom_by_parent.get(line["ChildItemId"])
+                    if child_bom is not None and child_bom not in loaded:
+                        next_level.add(child_bom)
+            pending = next_level
+        return graph
+
+    def _load_headers(self):
+        """加载有效BOM主表，每个父物料取版本号最大的一个（同 get_bom_by_parent_item）"""
+        rows = query_all("""
+            SELECT bh.BomId, bh.ParentItemId, bh.Rev
+            FROM BomHeaders bh
+            JOIN Items i ON bh.ParentItemId = i.ItemId
+            WHERE bh.IsActive = 1
+            ORDER BY bh.BomId
+        """)
+        best_rev: Dict[int, str] = {}
+        for r in rows:
+            parent_id = r["ParentItemId"]
+            rev = str(r["Rev"])
+            if parent_id not in best_rev or rev > best_rev[parent_id]:
+                best_rev[parent_id] = rev
+                self.bom_by_parent[parent_id] = r["BomId"]
+
+    def _load_lines(self, bom_ids: Optional[List[int]]):
+        """加载BOM明细（含子件信息和项目名称）"""
+        base_sql = """
+            SELECT bl.LineId, bl.BomId, bl.ChildItemId, bl.QtyPer, bl.ScrapFactor,
+                   i.ItemCode as ChildItemCode, i.CnName as ChildItemName,
+                   i.ItemType as ChildItemType, i.ItemSpec as ChildItemSpec,
+                   i.Brand as ChildItemBrand,
+                   COALESCE(pm.ProjectName, '') as ChildItemProjectName
+            FROM BomLines bl
+            JOIN Items i ON bl.ChildItemId = i.ItemId
+            LEFT JOIN ProjectMappings pm ON i.ItemId = pm.ItemId AND pm.IsActive = 1
+        """
+        if bom_ids is None:
+            batches = [(base_sql + """
+                JOIN BomHeaders bh ON bl.BomId = bh.BomId
+                WHERE bh.IsActive = 1
+                ORDER BY bl.BomId, bl.LineId
+            """, ())]
+        else:
+            batches = []
+            for i in range(0, len(bom_ids), _IN_CHUNK):
+                chunk = bom_ids[i:i + _IN_CHUNK]
+                placeholders = ",".join(["?"] * len(chunk))
+                batches.append((base_sql + f"""
+                    WHERE bl.BomId IN ({placeholders})
+                    ORDER BY bl.BomId, bl.LineId
+                """, tuple(chunk)))
+
+        for sql, params in batches:
+            for row in query_all(sql, params):
+                self.lines_by_bom[row["BomId"]].append(dict(row))
+
+    def _project_name_by_brand(self, brand: str) -> str:
+        """
+        商品品牌 -> 项目名称，与 ProjectService.get_project_by_item_brand +
+        get_project_mappings_by_project_code 的取值规则一致，全部映射只查询一次
+        """
+        self.load_project_names()
+        return self._brand_project_names.get(brand, "")
+
+    def load_project_names(self):
+        """加载全部 品牌 -> 项目名称 映射（只查询一次）"""
+        if self._brand_project_names is None:
+            self._brand_project_names = {}
+            try:
+                rows = query_all("""
+                    SELECT MappingId, ProjectCode, ProjectName, ItemCode, Brand, DisplayOrder
+                    FROM ProjectMappings
+                    WHERE IsActive = 1
+                """)
+            except Exception as e:
+                logger.error("获取项目名称失败: %s", e)
+                rows = []
+
+            def order_key(r):
+                display_order = r["DisplayOrder"]
+                return (display_order is not None, display_order or 0)
+
+            code_by_brand: Dict[str, str] = {}
+            for r in sorted(rows, key=lambda r: (order_key(r), r["MappingId"])):
+                if r["Brand"] and r["Brand"] not in code_by_brand:
+                    code_by_brand[r["Brand"]] = r["ProjectCode"]
+
+            name_by_code: Dict[str, str] = {}
+            for r in sorted(rows, key=lambda r: (order_key(r), r["ItemCode"] or "")):
+                if r["ProjectCode"] not in name_by_code:
+                    name_by_code[r["ProjectCode"]] = r["ProjectName"] or r["ProjectCode"]
+
+            for brand_value, project_code in code_by_brand.items():
+                if project_code in name_by_code:
+                    self._brand_project_names[brand_value] = name_by_code[project_code]
+
+    def to_structure(self) -> BomStructure:
+        """不含数据库访问的结构快照（项目名称映射预先载入），用于传给进程池"""
+        self.load_project_names()
+        structure = BomStructure()
+        structure.bom_by_parent = self.bom_by_parent
+        structure.lines_by_bom = self.lines_by_bom
+        structure._brand_project_names = self._brand_project_names
+        return structure
+
+
+class BomExplosionService:
+    """BOM展开服务"""
+
+    # 首次展开的进程数：None 使用全部CPU核心，1 为单进程（环境变量 NDKJ_EXPLODE_WORKERS）
+    EXPLODE_WORKERS: Optional[int] = _env_workers()
+
+    # 扁平化BOM缓存：ParentItemId -> flatten() 结果
+    _flat_cache: Dict[int, Dict[int, Dict]] = {}
+    _cache_lock = threading.Lock()
+    _cache_generation = 0
+
+    @staticmethod
+    def find_bom_id(parent_item_id: int, rev: str) -> Optional[int]:
+        """按父物料和指定版本查找有效BOM"""
+        row = query_one("""
+            SELECT bh.BomId
+            FROM BomHeaders bh
+            JOIN Items i ON bh.ParentItemId = i.ItemId
+            WHERE bh.ParentItemId = ? AND bh.Rev = ? AND bh.IsActive = 1
+        """, (parent_item_id, rev))
+        return row["BomId"] if row else None
+
+    @staticmethod
+    def expand(parent_item_id: int, qty: float, rev: str = None) -> List[Dict]:
+        """展开单个父物料的BOM（仅加载从该父物料可达的BOM）"""
+        if rev:
+            bom_id = BomExplosionService.find_bom_id(parent_item_id, rev)
+            if bom_id is None:
+                return []
+            graph = BomGraph.load(root_bom_ids=[bom_id])
+            return graph.explode(parent_item_id, qty, bom_id)
+
+        graph = BomGraph.load(root_item_ids=[parent_item_id])
+        return graph.explode(parent_item_id, qty)
+
+    # ---------------- 扁平化BOM缓存 ----------------
+    @staticmethod
+    def invalidate_cache():
+        """BOM结构或物料信息变更后清空扁平化BOM缓存"""
+        with BomExplosionService._cache_lock:
+            BomExplosionService._flat_cache.clear()
+            BomExplosionService._cache_generation += 1
+
+    @staticmethod
+    @profiled()
+    def get_flat_boms(parent_item_ids: Iterable[int]) -> Dict[int, Dict[int, Dict]]:
+        """批量获取扁平化BOM，未缓存的父物料一次性加载后写入缓存"""
+        parent_item_ids = list(dict.fromkeys(parent_item_ids))
+        with BomExplosionService._cache_lock:
+            cached = {p: BomExplosionService._flat_cache[p]
+                      for p in parent_item_ids if p in BomExplosionService._flat_cache}
+            generation = BomExplosionService._cache_generation
+
+        missing = [p for p in parent_item_ids if p not in cached]
+        if missing:
+            graph = BomGraph.load(root_item_ids=missing)
+            # 各父物料相互独立，数量较多时分发到进程池并行扁平化
+            loaded = flatten_parallel(graph.to_structure(), missing,
+                                      BomExplosionService.EXPLODE_WORKERS)
+            with BomExplosionService._cache_lock:
+                # 加载期间缓存被清空过则不回写，避免写入过期结构
+                if generation == BomExplosionService._cache_generation:
+                    BomExplosionService._flat_cache.update(loaded)
+            cached.update(loaded)
+        return cached
+
+    @staticmethod
+    def get_flat_bom(parent_item_id: int) -> Dict[int, Dict]:
+        """获取单个父物料的扁平化BOM"""
+        return BomExplosionService.get_flat_boms([parent_item_id])[parent_item_id]
+
+    @staticmethod
+    def explode_flat(parent_item_id: int, qty: float) -> List[Dict]:
+        """
+        基于扁平化BOM展开：每个子件一条记录，ActualQty = 累计单位用量 × qty
+        适用于只关心子件总需求的MRP计算
+        """
+        return [dict(entry, ActualQty=entry["CumQtyPer"] * qty)
+                for entry in BomExplosionService.get_flat_bom(parent_item_id).values()]
+
+
+# 恢复数据库或直接编辑表后BOM结构可能已变，清空扁平化BOM缓存
+add_reset_listener(BomExplosionService.invalidate_cache)
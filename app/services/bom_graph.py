@@ -0,0 +1,202 @@
+# app/services/bom_graph.py
+# -*- coding: utf-8 -*-
+"""
+BOM结构的内存展开（不访问数据库）
+- BomStructure 保存有效BOM结构快照，提供多级展开与扁平化
+- flatten_parallel 把多个父物料的扁平化分发到进程池，结果按输入顺序合并
+本模块不导入 app.db，进程池子进程只需导入本模块，不会初始化数据库连接
+"""
+
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 待扁平化的父物料少于该数量时直接在当前进程计算（进程启动与传输BOM快照的开销大于计算本身）
+_POOL_MIN_PARENTS = 500
+# 每个进程分到的任务块数，块越多负载越均衡
+_CHUNKS_PER_WORKER = 4
+
+
+class BomStructure:
+    """有效BOM结构的内存快照（可在进程间传递）"""
+
+    def __init__(self):
+        self.bom_by_parent: Dict[int, int] = {}          # ParentItemId -> 最新有效版本 BomId
+        self.lines_by_bom: Dict[int, List[Dict]] = defaultdict(list)
+        self._brand_project_names: Optional[Dict[str, str]] = None
+
+    def _project_name_by_brand(self, brand: str) -> str:
+        """商品品牌 -> 项目名称（映射由加载方预先填入）"""
+        return (self._brand_project_names or {}).get(brand, "")
+
+    def quantities_only(self) -> "BomStructure":
+        """只保留 flatten_refs 所需字段的精简副本（传给进程池，减少序列化开销）"""
+        compact = BomStructure()
+        compact.bom_by_parent = dict(self.bom_by_parent)
+        for bom_id, lines in self.lines_by_bom.items():
+            compact.lines_by_bom[bom_id] = [
+                {"ChildItemId": line["ChildItemId"], "QtyPer": line["QtyPer"],
+                 "ScrapFactor": line["ScrapFactor"], "ChildItemCode": line["ChildItemCode"]}
+                for line in lines
+            ]
+        return compact
+
+    # ---------------- 展开 ----------------
+    def explode(self, parent_item_id: int, qty: float, bom_id: Optional[int] = None) -> List[Dict]:
+        """
+        多级展开，返回与 BomService.expand_bom 相同的记录（深度优先、按 LineId 排序）
+        bom_id 为空时使用父物料最新的有效BOM
+        """
+        if bom_id is None:
+            bom_id = self.bom_by_parent.get(parent_item_id)
+        if bom_id is None:
+            return []
+
+        expanded_items: List[Dict] = []
+        self._explode_into(expanded_items, bom_id, parent_item_id, qty, 1, {parent_item_id})
+        return expanded_items
+
+    def _explode_into(self, out: List[Dict], bom_id: int, parent_item_id: int,
+                      qty: float, level: int, path: set):
+        for line in self.lines_by_bom.get(bom_id, []):
+            child_id = line["ChildItemId"]
+            # 计算实际用量（考虑损耗）
+            actual_qty = line["QtyPer"] * qty * (1 + (line["ScrapFactor"] or 0))
+
+            brand_value = line.get("ChildItemBrand", "")
+            project_name_value = line.get("ChildItemProjectName", "")
+            # 如果ProjectName为空，根据商品品牌字段从项目映射表获取
+            if not project_name_value and brand_value:
+                project_name_value = self._project_name_by_brand(brand_value)
+
+            out.append({
+                "ItemId": child_id,
+                "ItemCode": line["ChildItemCode"],
+                "ItemName": line["ChildItemName"],
+                "ItemSpec": line["ChildItemSpec"],
+                "ItemType": line["ChildItemType"],
+                "Brand": brand_value,
+                "ProjectName": project_name_value,
+                "QtyPer": line["QtyPer"],
+                "ActualQty": actual_qty,
+                "ScrapFactor": line["ScrapFactor"],
+                "Level": level,
+                "ParentItemId": parent_item_id,
+            })
+
+            # 递归展开子物料的BOM
+            child_bom = self.bom_by_parent.get(child_id)
+            if child_bom is not None:
+                if child_id in path:
+                    raise ValueError(f"检测到循环引用: {line['ChildItemCode']}")
+                path.add(child_id)
+                self._explode_into(out, child_bom, child_id, actual_qty, level + 1, path)
+                path.remove(child_id)
+
+    def flatten(self, parent_item_id: int) -> Dict[int, Dict]:
+        """
+        扁平化BOM：单位父件对各子件的累计用量（含各层损耗，多路径累加）
+        返回 {ChildItemId: {ItemId, ItemCode, ItemName, ItemSpec, ItemType, Brand, ProjectName, CumQtyPer}}
+        子件顺序与展开记录中首次出现的顺序一致
+        """
+        return self.expand_flat_refs(self.flatten_refs(parent_item_id))
+
+    def flatten_refs(self, parent_item_id: int) -> List[Tuple[int, float, int, int]]:
+        """
+        扁平化的紧凑形式：[(子件ID, 累计单位用量, 首次出现的BomId, 该BOM内行序号)]
+        用量按与 explode 相同的顺序和算式累加，进程池只回传该形式
+        """
+        bom_id = self.bom_by_parent.get(parent_item_id)
+        if bom_id is None:
+            return []
+        acc: Dict[int, list] = {}
+        self._flatten_into(acc, bom_id, 1.0, {parent_item_id})
+        return [(cid, v[0], v[1], v[2]) for cid, v in acc.items()]
+
+    def _flatten_into(self, acc: Dict[int, list], bom_id: int, qty: float, path: set):
+        for index, line in enumerate(self.lines_by_bom.get(bom_id, [])):
+            child_id = line["ChildItemId"]
+            actual_qty = line["QtyPer"] * qty * (1 + (line["ScrapFactor"] or 0))
+
+            cid = int(child_id)
+            if cid not in acc:
+                acc[cid] = [0.0, bom_id, index]
+            acc[cid][0] += float(actual_qty or 0.0)
+
+            child_bom = self.bom_by_parent.get(child_id)
+            if child_bom is not None:
+                if child_id in path:
+                    raise ValueError(f"检测到循环引用: {line['ChildItemCode']}")
+                path.add(child_id)
+                self._flatten_into(acc, child_bom, actual_qty, path)
+                path.remove(child_id)
+
+    def expand_flat_refs(self, refs: List[Tuple[int, float, int, int]]) -> Dict[int, Dict]:
+        """紧凑形式 → flatten() 的返回格式（子件信息取首次出现的BOM行）"""
+        flat: Dict[int, Dict] = {}
+        for cid, cum_qty, bom_id, index in refs:
+            line = self.lines_by_bom[bom_id][index]
+            brand_value = line.get("ChildItemBrand", "")
+            project_name_value = line.get("ChildItemProjectName", "")
+            if not project_name_value and brand_value:
+                project_name_value = self._project_name_by_brand(brand_value)
+            flat[cid] = {
+                "ItemId": cid,
+                "ItemCode": line["ChildItemCode"],
+                "ItemName": line["ChildItemName"],
+                "ItemSpec": line["ChildItemSpec"],
+                "ItemType": line["ChildItemType"],
+                "Brand": brand_value,
+                "ProjectName": project_name_value,
+                "CumQtyPer": cum_qty,
+            }
+        return flat
+
+
+# ---------------- 进程池扁平化 ----------------
+_worker_structure: Optional[BomStructure] = None
+
+
+def _init_worker(structure: BomStructure):
+    """子进程初始化：每个进程只接收一次BOM结构快照"""
+    global _worker_structure
+    _worker_structure = structure
+
+
+def _flatten_chunk(parent_item_ids: List[int]) -> List:
+    return [(p, _worker_structure.flatten_refs(p)) for p in parent_item_ids]
+
+
+def resolve_workers(max_workers: Optional[int]) -> int:
+    """进程数设置：None 或 <= 0 表示使用全部CPU核心"""
+    if max_workers is None or max_workers <= 0:
+        return os.cpu_count() or 1
+    return max_workers
+
+
+def flatten_parallel(structure: BomStructure, parent_item_ids: Iterable[int],
+                     max_workers: Optional[int] = None) -> Dict[int, Dict[int, Dict]]:
+    """
+    批量扁平化：{ParentItemId: flatten() 结果}，键顺序与 parent_item_ids 一致
+    - 进程数为 1 或父物料较少时在当前进程逐个计算
+    - 否则按块分发到进程池，子进程只回传紧凑的 (子件, 累计用量, 行位置)，
+      在当前进程按输入顺序还原并合并，结果与逐个计算相同
+    """
+    parent_item_ids = list(dict.fromkeys(parent_item_ids))
+    workers = min(resolve_workers(max_workers), len(parent_item_ids))
+    if workers <= 1 or len(parent_item_ids) < _POOL_MIN_PARENTS:
+        return {p: structure.flatten(p) for p in parent_item_ids}
+
+    size = max(1, -(-len(parent_item_ids) // (workers * _CHUNKS_PER_WORKER)))
+    chunks = [parent_item_ids[i:i + size] for i in range(0, len(parent_item_ids), size)]
+    flats: Dict[int, Dict[int, Dict]] = {}
+    # GUI 进程含多个线程，子进程统一用 spawn 方式启动，避免 fork 继承锁状态
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(structure.quantities_only(),)) as pool:
+        # map 按提交顺序返回，合并结果与并行调度无关
+        for part in pool.map(_flatten_chunk, chunks):
+            for p, refs in part:
+                flats[p] = structure.expand_flat_refs(refs)
+    return flats
@@ -5,6 +5,9 @@ import json
 from typing import List, Dict, Optional
 from datetime import datetime
 from app.db import query_all, query_one, execute, get_last_id
+from app.utils.perf import get_logger
+
+logger = get_logger(__name__)
 
 
 class BomHistoryService:
@@ -56,11 +59,11 @@ class BomHistoryService:
                 old_data_json, new_data_json, operation_user, operation_source, remark
             ))
             
-            print(f"记录BOM操作历史: BOM {bom_id}, {operation_type} {operation_target}")
+            logger.debug("记录BOM操作历史: BOM %s, %s %s", bom_id, operation_type, operation_target)
             return history_id
             
         except Exception as e:
-            print(f"记录BOM操作历史失败: {str(e)}")
+            logger.error("记录BOM操作历史失败: %s", str(e))
             return 0
     
     @staticmethod
@@ -106,7 +109,7 @@ class BomHistoryService:
             return processed_records
             
         except Exception as e:
-            print(f"获取BOM历史失败: {str(e)}")
+            logger.error("获取BOM历史失败: %s", str(e))
             return []
     
     @staticmethod
@@ -153,7 +156,7 @@ class BomHistoryService:
             return processed_records
             
         except Exception as e:
-            print(f"获取所有BOM历史失败: {str(e)}")
+            logger.error("获取所有BOM历史失败: %s", str(e))
             return []
     
     @staticmethod
@@ -194,7 +197,7 @@ class BomHistoryService:
             return result
             
         except Exception as e:
-            print(f"获取操作统计失败: {str(e)}")
+            logger.error("获取操作统计失败: %s", str(e))
             return {'total': 0, 'by_type': {}}
     
     @staticmethod
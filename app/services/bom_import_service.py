@@ -7,6 +7,10 @@ from datetime import datetime
 from app.db import query_one, query_all, execute, get_last_id
 from app.services.bom_service import BomService
 from app.services.item_service import ItemService
+from app.utils.excel_reader import cell_text, is_blank, iter_sheet_rows
+from app.utils.perf import get_logger, profiled
+
+logger = get_logger(__name__)
 
 
 class BomImportService:
@@ -24,69 +28,62 @@ class BomImportService:
             Tuple[List[Dict], List[str]]: (BOM数据列表, 错误信息列表)
         """
         try:
-            print(f"开始解析BOM文件: {file_path}")
+            logger.debug("开始解析BOM文件: %s", file_path)
             
-            # 根据文件扩展名选择读取方式
+            # 根据文件扩展名选择读取方式，统一为逐行的单元格值
             if file_path.lower().endswith('.csv'):
                 df = pd.read_csv(file_path, header=None)
+                rows = (tuple(None if is_blank(v) else v for v in values)
+                        for values in df.itertuples(index=False, name=None))
             elif file_path.lower().endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(file_path, header=None)
+                rows = iter_sheet_rows(file_path)
             else:
                 return [], ["不支持的文件格式，请使用CSV或Excel文件"]
-            print(f"文件形状: {df.shape}")
-            print(f"文件内容预览:")
-            print(df.head())
-            
-            if df.empty:
-                return [], ["文件为空"]
-            
-            # 验证文件格式
-            if df.shape[0] < 3:
-                return [], ["文件格式错误：至少需要3行数据"]
-            
-            # 第一行：成品商品品牌（从第2列开始）
-            product_brands = df.iloc[0, 1:].tolist()
-            product_brands = [str(brand).strip() for brand in product_brands if pd.notna(brand) and str(brand).strip()]
-            
-            # 第二行：成品规格型号（从第2列开始）
-            product_specs = df.iloc[1, 1:].tolist()
-            product_specs = [str(spec).strip() for spec in product_specs if pd.notna(spec) and str(spec).strip()]
-            
-            # 第一列：零部件规格（从第3行开始）
-            component_specs = df.iloc[2:, 0].tolist()
-            component_specs = [str(spec).strip() for spec in component_specs if pd.notna(spec) and str(spec).strip()]
             
-            print(f"成品商品品牌: {product_brands}")
-            print(f"成品规格型号: {product_specs}")
-            print(f"零部件规格: {component_specs}")
-            
-            # 验证数据完整性
-            if len(product_brands) != len(product_specs):
-                return [], [f"成品数据不匹配：品牌数量({len(product_brands)}) != 规格数量({len(product_specs)})"]
-            
-            if len(product_brands) == 0:
-                return [], ["没有找到成品数据"]
-            
-            if len(component_specs) == 0:
-                return [], ["没有找到零部件数据"]
-            
-            # 解析BOM关系数据（从第3行第2列开始）
+            row_count = 0
+            header_rows = []
+            products = []  # [(列号, 品牌, 规格)]
+            component_specs = []
             bom_data_list = []
             
-            for i, component_spec in enumerate(component_specs):
-                if not component_spec:
+            for row_index, row in enumerate(rows):
+                row_count += 1
+                
+                # 第一行：成品商品品牌；第二行：成品规格型号（均从第2列开始）
+                if row_index < 2:
+                    header_rows.append(row)
                     continue
+                
+                if row_index == 2:
+                    brand_row, spec_row = header_rows
+                    product_brands = [(j, cell_text(v)) for j, v in enumerate(brand_row) if j > 0 and cell_text(v)]
+                    product_specs = [cell_text(v) for j, v in enumerate(spec_row) if j > 0 and cell_text(v)]
                     
-                # 获取该零部件的用量数据
-                quantities = df.iloc[i + 2, 1:].tolist()
+                    logger.debug("成品商品品牌: %s", [brand for _, brand in product_brands])
+                    logger.debug("成品规格型号: %s", product_specs)
+                    
+                    # 验证数据完整性
+                    if len(product_brands) != len(product_specs):
+                        return [], [f"成品数据不匹配：品牌数量({len(product_brands)}) != 规格数量({len(product_specs)})"]
+                    
+                    if len(product_brands) == 0:
+                        return [], ["没有找到成品数据"]
+                    
+                    products = [(j, brand, spec) for (j, brand), spec in zip(product_brands, product_specs)]
                 
-                for j, (brand, spec, qty) in enumerate(zip(product_brands, product_specs, quantities)):
-                    if not brand or not spec:
-                        continue
-                        
+                # 第一列：零部件规格（从第3行开始）
+                component_spec = cell_text(row[0]) if row else ""
+                if not component_spec:
+                    continue
+                component_specs.append(component_spec)
+                
+                # 解析BOM关系数据（从第3行第2列开始）
+                for j, brand, spec in products:
+                    qty = row[j] if j < len(row) else None
+                    
                     # 转换数量
                     try:
-                        quantity = float(qty) if pd.notna(qty) and str(qty).strip() != '' else 0
+                        quantity = float(qty) if not is_blank(qty) else 0
                     except (ValueError, TypeError):
                         quantity = 0
                     
@@ -96,13 +93,27 @@ class BomImportService:
                             'product_spec': spec,
                             'component_spec': component_spec,
                             'quantity': quantity,
-                            'row_index': i + 2,
-                            'col_index': j + 1
+                            'row_index': row_index,
+                            'col_index': j
                         }
                         bom_data_list.append(bom_data)
-                        print(f"BOM关系: {brand}({spec}) -> {component_spec} = {quantity}")
+                        logger.debug("BOM关系: %s(%s) -> %s = %s", brand, spec, component_spec, quantity)
+            
+            logger.debug("文件行数: %s", row_count)
+            
+            if row_count == 0:
+                return [], ["文件为空"]
+            
+            # 验证文件格式
+            if row_count < 3:
+                return [], ["文件格式错误：至少需要3行数据"]
+            
+            logger.debug("零部件规格: %s", component_specs)
+            
+            if len(component_specs) == 0:
+                return [], ["没有找到零部件数据"]
             
-            print(f"解析完成，共找到 {len(bom_data_list)} 个BOM关系")
+            logger.debug("解析完成，共找到 %s 个BOM关系", len(bom_data_list))
             return bom_data_list, []
             
         except Exception as e:
@@ -166,7 +177,7 @@ class BomImportService:
                 
                 # 比较标准化后的规格
                 if db_normalized_spec == normalized_spec:
-                    print(f"找到成品物料: {brand}({spec}) -> ID: {item['ItemId']} (匹配: {db_spec})")
+                    logger.debug("找到成品物料: %s(%s) -> ID: %s (匹配: %s)", brand, spec, item['ItemId'], db_spec)
                     return item['ItemId'], []
             
             # 如果还是没找到，返回错误信息
@@ -204,7 +215,7 @@ class BomImportService:
                 
                 # 比较标准化后的规格
                 if db_normalized_spec == normalized_spec:
-                    print(f"找到零部件物料: {spec} -> ID: {item['ItemId']} (匹配: {db_spec})")
+                    logger.debug("找到零部件物料: %s -> ID: %s (匹配: %s)", spec, item['ItemId'], db_spec)
                     return item['ItemId'], []
             
             # 如果还是没找到，返回错误信息
@@ -214,6 +225,7 @@ class BomImportService:
             return None, [f"查找零部件物料失败 {spec}: {str(e)}"]
     
     @staticmethod
+    @profiled()
     def import_bom_from_file(file_path: str) -> Tuple[int, List[str], List[str]]:
         """
         从文件导入BOM数据（支持CSV和Excel格式）
@@ -225,7 +237,7 @@ class BomImportService:
             Tuple[int, List[str], List[str]]: (成功数量, 错误信息列表, 警告信息列表)
         """
         try:
-            print("=== 开始导入BOM数据 ===")
+            logger.debug("=== 开始导入BOM数据 ===")
             
             # 解析文件
             bom_data_list, parse_errors = BomImportService.parse_bom_file(file_path)
@@ -248,21 +260,21 @@ class BomImportService:
                     product_groups[brand] = []
                 product_groups[brand].append(bom_data)
             
-            print(f"按成品品牌分组: {list(product_groups.keys())}")
+            logger.debug("按成品品牌分组: %s", list(product_groups.keys()))
             
             # 处理每个成品品牌
             for brand, bom_items in product_groups.items():
                 try:
-                    print(f"\n处理成品品牌: {brand}")
+                    logger.debug("\n处理成品品牌: %s", brand)
                     
                     # 获取该品牌下的所有规格
                     specs = list(set([item['product_spec'] for item in bom_items]))
-                    print(f"该品牌下的规格: {specs}")
+                    logger.debug("该品牌下的规格: %s", specs)
                     
                     # 为每个规格创建BOM
                     for spec in specs:
                         try:
-                            print(f"  处理规格: {spec}")
+                            logger.debug("处理规格: %s", spec)
                             
                             # 查找成品物料
                             product_id, product_errors = BomImportService.find_product_item(brand, spec)
@@ -297,7 +309,7 @@ class BomImportService:
                                 'Remark': f"从CSV导入的BOM - {brand}({spec})"
                             })
                             
-                            print(f"    创建BOM主表: {bom_name} -> ID: {bom_id}")
+                            logger.debug("创建BOM主表: %s -> ID: %s", bom_name, bom_id)
                             
                             # 创建BOM明细
                             spec_bom_items = [item for item in bom_items if item['product_spec'] == spec]
@@ -323,28 +335,28 @@ class BomImportService:
                                         'ScrapFactor': 0
                                     })
                                     
-                                    print(f"      创建BOM明细: {bom_item['component_spec']} -> {bom_item['quantity']}")
+                                    logger.debug("创建BOM明细: %s -> %s", bom_item['component_spec'], bom_item['quantity'])
                                     success_count += 1
                                     
                                 except Exception as e:
                                     error_msg = f"创建BOM明细失败 {bom_item['component_spec']}: {str(e)}"
                                     errors.append(error_msg)
-                                    print(f"      错误: {error_msg}")
+                                    logger.error("错误: %s", error_msg)
                             
                         except Exception as e:
                             error_msg = f"处理规格失败 {spec}: {str(e)}"
                             errors.append(error_msg)
-                            print(f"  错误: {error_msg}")
+                            logger.error("错误: %s", error_msg)
                 
                 except Exception as e:
                     error_msg = f"处理成品品牌失败 {brand}: {str(e)}"
                     errors.append(error_msg)
-                    print(f"错误: {error_msg}")
+                    logger.error("错误: %s", error_msg)
             
-            print(f"\n=== 导入完成 ===")
-            print(f"成功导入: {success_count} 个BOM关系")
-            print(f"错误数量: {len(errors)}")
-            print(f"警告数量: {len(warnings)}")
+            logger.debug("\n=== 导入完成 ===")
+            logger.debug("成功导入: %s 个BOM关系", success_count)
+            logger.info("错误数量: %s", len(errors))
+            logger.info("警告数量: %s", len(warnings))
             
             return success_count, errors, warnings
             
@@ -0,0 +1,161 @@
+# app/services/bom_matrix_export_service.py
+# -*- coding: utf-8 -*-
+"""
+BOM矩阵导出服务（集合式）
+- BomMatrixImportService 的逆过程：第1-4行为成品编码/名称/规格/品牌（D列起），第5行起为零部件（A-C列）及各成品用量
+- BomHeaders、BomLines、Items 一次联表查询取出，在内存中透视为 零部件 × 成品 的用量矩阵，
+  不再逐个BOM查询明细、逐行查询物料
+- 经 excel_writer 流式写出，整表单元格不驻留内存
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from openpyxl.styles import Font
+
+from app.db import query_all
+from app.utils.excel_writer import CENTER, THIN_BORDER, Progress, StreamingWorkbook, report_rows
+from app.utils.perf import get_logger, profiled
+
+logger = get_logger(__name__)
+
+
+class BomMatrixExportService:
+    """BOM矩阵导出服务 - 生成可由 BomMatrixImportService 导入的矩阵格式Excel"""
+
+    @staticmethod
+    @profiled()
+    def build_matrix(bom_ids: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+        """
+        一次查询构建BOM用量矩阵
+
+        Args:
+            bom_ids: 只导出这些BOM（None 为全部）
+
+        Returns:
+            Dict: {
+                'products': 成品列（每个BOM一列，按名称、规格排序）[{ItemId, ItemCode, CnName, ItemSpec, Brand, BomId}],
+                'components': 零部件行（按名称、规格排序）[{ItemId, ItemCode, CnName, ItemSpec}],
+                'quantities': {零部件ItemId: {成品ItemId: 用量}}
+            }
+            同一成品有多个BOM时各占一列，用量以最后处理的BOM明细为准；零部件与成品排序相同时保持BOM顺序
+        """
+        try:
+            # BOM 按 BomName、Rev 排序（与 BOM 列表一致），明细按 LineId；缺少父物料的BOM与缺少物料的明细不导出
+            rows = query_all("""
+                SELECT bh.BomId, bh.ParentItemId,
+                       p.ItemCode AS ParentItemCode, p.CnName AS ParentItemName,
+                       p.ItemSpec AS ParentItemSpec, p.Brand AS ParentItemBrand,
+                       c.ItemId AS ChildItemId, bl.QtyPer,
+                       c.ItemCode AS ChildItemCode, c.CnName AS ChildItemName, c.ItemSpec AS ChildItemSpec
+                FROM BomHeaders bh
+                JOIN Items p ON p.ItemId = bh.ParentItemId
+                LEFT JOIN BomLines bl ON bl.BomId = bh.BomId
+                LEFT JOIN Items c ON c.ItemId = bl.ChildItemId
+                ORDER BY bh.BomName, bh.Rev, bh.BomId, bl.LineId
+            """)
+
+            wanted = set(bom_ids) if bom_ids is not None else None
+            products: Dict[int, Dict] = {}       # BomId → 成品列
+            components: Dict[int, Dict] = {}     # 零部件ItemId → 零部件行
+            quantities: Dict[int, Dict[int, Any]] = {}
+            for row in rows:
+                bom_id = row['BomId']
+                if wanted is not None and bom_id not in wanted:
+                    continue
+                parent_id = row['ParentItemId']
+                if bom_id not in products:
+                    products[bom_id] = {
+                        'ItemId': parent_id,
+                        'ItemCode': row['ParentItemCode'],
+                        'CnName': row['ParentItemName'],
+                        'ItemSpec': row['ParentItemSpec'],
+                        'Brand': row['ParentItemBrand'],
+                        'BomId': bom_id
+                    }
+
+                # 没有明细的BOM、物料已不存在的明细：ChildItemId 为 NULL
+                child_id = row['ChildItemId']
+                if not child_id:
+                    continue
+                if child_id not in components:
+                    components[child_id] = {
+                        'ItemId': child_id,
+                        'ItemCode': row['ChildItemCode'],
+                        'CnName': row['ChildItemName'],
+                        'ItemSpec': row['ChildItemSpec']
+                    }
+                quantities.setdefault(child_id, {})[parent_id] = row['QtyPer']
+
+            # 成品、零部件按名称、规格排序（稳定排序）
+            sort_key = lambda x: (x.get('CnName', ''), x.get('ItemSpec', ''))
+            return {
+                'products': sorted(products.values(), key=sort_key),
+                'components': sorted(components.values(), key=sort_key),
+                'quantities': quantities
+            }
+        except Exception as e:
+            logger.error("构建BOM矩阵失败: %s", e)
+            raise Exception(f"构建BOM矩阵失败: {str(e)}")
+
+    @staticmethod
+    @profiled()
+    def export_matrix_excel(file_path: str, bom_ids: Optional[Iterable[int]] = None,
+                            progress: Optional[Progress] = None) -> Tuple[int, int]:
+        """
+        导出BOM矩阵Excel
+
+        Args:
+            file_path: 保存路径
+            bom_ids: 只导出这些BOM（None 为全部）
+            progress: 进度回调 progress(已写出零部件行数, 零部件总数)；其抛出的异常（如导出取消）原样抛出
+
+        Returns:
+            Tuple[int, int]: (成品列数, 零部件行数)
+        """
+        progress_errors: List[Exception] = []
+
+        def report(done: int, total: int):
+            try:
+                progress(done, total)
+            except Exception as e:
+                progress_errors.append(e)
+                raise
+
+        try:
+            matrix = BomMatrixExportService.build_matrix(bom_ids)
+            products: List[Dict] = matrix['products']
+            components: List[Dict] = matrix['components']
+            quantities = matrix['quantities']
+            product_ids = [product['ItemId'] for product in products]
+
+            # 列宽：零部件编码 15、名称 20、规格 15，成品列 12
+            widths = {1: 15, 2: 20, 3: 15}
+            widths.update({4 + i: 12 for i in range(len(products))})
+
+            with StreamingWorkbook() as book:
+                book.add_style("bom_cell", font=Font(name='宋体', size=10), border=THIN_BORDER, alignment=CENTER)
+                sheet = book.create_sheet("BOM矩阵", column_widths=widths)
+
+                # 第1-4行：成品编码、名称、规格、品牌（A-C列保持空白，从D列开始）
+                header_styles = [None] * 3 + ["bom_cell"] * len(products)
+                for key in ('ItemCode', 'CnName', 'ItemSpec', 'Brand'):
+                    sheet.append([None] * 3 + [product[key] for product in products], header_styles)
+
+                # 从第5行开始：零部件信息 + 各成品用量（无用量为 0）；
+                # 每行单元格数随成品数量增加，进度按较小的行数间隔报告
+                for component in report_rows(components, len(components),
+                                             report if progress else None, step=20):
+                    row_quantities = quantities.get(component['ItemId'], {})
+                    sheet.append([component['ItemCode'], component['CnName'], component['ItemSpec']] +
+                                 [row_quantities.get(item_id, 0) for item_id in product_ids],
+                                 "bom_cell")
+
+                book.save(file_path)
+
+            logger.info("BOM矩阵导出完成: %d 个成品, %d 个零部件 -> %s", len(products), len(components), file_path)
+            return len(products), len(components)
+        except Exception as e:
+            if e in progress_errors:
+                raise
+            logger.error("导出BOM矩阵失败: %s", e)
+            raise Exception(f"导出BOM矩阵失败: {str(e)}")
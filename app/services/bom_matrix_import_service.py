@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import json
+import sqlite3
 import pandas as pd
 import openpyxl
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime
-from app.db import query_one, query_all, execute, get_last_id
+from app.db import query_one, query_all, execute, get_last_id, transaction
 from app.services.bom_service import BomService
 from app.services.item_service import ItemService
 from app.services.bom_history_service import BomHistoryService
+from app.services.bom_explosion_service import BomExplosionService
+from app.utils.excel_reader import iter_sheet_rows
+from app.utils.perf import get_logger, profiled
+
+logger = get_logger(__name__)
 
 
 class BomMatrixImportService:
@@ -50,6 +57,7 @@ class BomMatrixImportService:
     def parse_matrix_excel(file_path: str) -> Tuple[Dict, List[str]]:
         """
         解析矩阵格式的Excel文件
+        流式读取，一次遍历完成：第1-4行为成品信息（D列起），第5行起为零部件及数量矩阵
         
         Args:
             file_path: Excel文件路径
@@ -58,78 +66,63 @@ class BomMatrixImportService:
             Tuple[Dict, List[str]]: (解析结果, 错误信息列表)
         """
         try:
-            print(f"开始解析矩阵Excel文件: {file_path}")
-            
-            # 使用openpyxl读取Excel文件
-            wb = openpyxl.load_workbook(file_path, data_only=True)
-            ws = wb.active
-            
-            # 获取数据范围
-            max_row = ws.max_row
-            max_col = ws.max_column
+            logger.debug("开始解析矩阵Excel文件: %s", file_path)
             
-            print(f"Excel文件尺寸: {max_row}行 x {max_col}列")
-            
-            if max_row < 5 or max_col < 4:
-                return {}, ["文件格式错误：至少需要5行4列数据"]
-            
-            # 解析成品信息（第1-4行，从D列开始）
             products = []
+            components = []
+            quantity_matrix = {}
+            header_rows = []
+            max_row = 0
+            max_col = 0
             product_start_col = 4  # D列
             
-            for col in range(product_start_col, max_col + 1):
-                col_letter = openpyxl.utils.get_column_letter(col)
+            for row_no, row in enumerate(iter_sheet_rows(file_path), start=1):
+                max_row = row_no
+                max_col = max(max_col, len(row))
+                cell = lambda col: row[col - 1] if col <= len(row) else None
                 
-                # 检查是否有成品数据
-                code = ws[f'{col_letter}1'].value
-                name = ws[f'{col_letter}2'].value
-                spec = ws[f'{col_letter}3'].value
-                brand = ws[f'{col_letter}4'].value
+                if row_no <= 4:
+                    header_rows.append(row)
+                    if row_no < 4:
+                        continue
+                    
+                    # 解析成品信息（第1-4行，从D列开始）
+                    width = max(len(r) for r in header_rows)
+                    for col in range(product_start_col, width + 1):
+                        code, name, spec, brand = (
+                            r[col - 1] if col <= len(r) else None for r in header_rows
+                        )
+                        
+                        if code and name and spec and brand:
+                            product = {
+                                'ItemCode': str(code).strip(),
+                                'CnName': str(name).strip(),
+                                'ItemSpec': str(spec).strip(),
+                                'Brand': str(brand).strip(),
+                                'Column': col,
+                                'ColumnLetter': openpyxl.utils.get_column_letter(col)
+                            }
+                            products.append(product)
+                            logger.debug("成品: %s - %s (%s)", product['Brand'], product['CnName'], product['ItemCode'])
+                    continue
                 
-                if code and name and spec and brand:
-                    product = {
-                        'ItemCode': str(code).strip(),
-                        'CnName': str(name).strip(),
-                        'ItemSpec': str(spec).strip(),
-                        'Brand': str(brand).strip(),
-                        'Column': col,
-                        'ColumnLetter': col_letter
-                    }
-                    products.append(product)
-                    print(f"成品: {product['Brand']} - {product['CnName']} ({product['ItemCode']})")
-            
-            if not products:
-                return {}, ["没有找到有效的成品数据"]
-            
-            # 解析零部件信息（第5行开始，A-C列）
-            components = []
-            
-            for row in range(5, max_row + 1):
-                code = ws[f'A{row}'].value
-                name = ws[f'B{row}'].value
-                spec = ws[f'C{row}'].value
+                # 解析零部件信息（第5行开始，A-C列）
+                code, name, spec = cell(1), cell(2), cell(3)
+                if not (code and name and spec):
+                    continue
                 
-                if code and name and spec:
-                    component = {
-                        'ItemCode': str(code).strip(),
-                        'CnName': str(name).strip(),
-                        'ItemSpec': str(spec).strip(),
-                        'Row': row
-                    }
-                    components.append(component)
-                    print(f"零部件: {component['CnName']} ({component['ItemCode']})")
-            
-            if not components:
-                return {}, ["没有找到有效的零部件数据"]
-            
-            # 解析数量矩阵（包括0值）
-            quantity_matrix = {}
-            
-            for component in components:
-                component_quantities = {}
+                component = {
+                    'ItemCode': str(code).strip(),
+                    'CnName': str(name).strip(),
+                    'ItemSpec': str(spec).strip(),
+                    'Row': row_no
+                }
+                components.append(component)
                 
+                # 解析数量矩阵（包括0值）
+                component_quantities = {}
                 for product in products:
-                    quantity_cell = ws[f"{product['ColumnLetter']}{component['Row']}"].value
+                    quantity_cell = cell(product['Column'])
                     
                     try:
                         quantity = float(quantity_cell) if quantity_cell is not None else 0
@@ -145,20 +138,51 @@ class BomMatrixImportService:
                     'quantities': component_quantities
                 }
             
+            logger.debug("Excel文件尺寸: %s行 x %s列", max_row, max_col)
+            
+            if max_row < 5 or max_col < 4:
+                return {}, ["文件格式错误：至少需要5行4列数据"]
+            
+            if not products:
+                return {}, ["没有找到有效的成品数据"]
+            
+            if not components:
+                return {}, ["没有找到有效的零部件数据"]
+            
             result = {
                 'products': products,
                 'components': components,
                 'quantity_matrix': quantity_matrix
             }
             
-            print(f"解析完成: {len(products)}个成品, {len(components)}个零部件")
+            logger.debug("解析完成: %s个成品, %s个零部件", len(products), len(components))
             return result, []
             
         except Exception as e:
             return {}, [f"解析Excel文件失败: {str(e)}"]
     
     @staticmethod
-    def find_product_by_brand_and_info(brand: str, code: str, name: str, spec: str) -> Tuple[Optional[int], List[str]]:
+    def build_product_index() -> Dict[str, List[Dict]]:
+        """
+        一次读取全部成品，按品牌分组（组内按 ItemId 顺序，与逐个查询的结果顺序一致）
+        
+        Returns:
+            Dict[str, List[Dict]]: {品牌: [成品, ...]}
+        """
+        sql = """
+            SELECT ItemId, ItemCode, CnName, ItemSpec, Brand FROM Items 
+            WHERE ItemType = 'FG'
+            ORDER BY ItemId
+        """
+        product_index = {}
+        for row in query_all(sql):
+            item = dict(row)
+            product_index.setdefault(item['Brand'], []).append(item)
+        return product_index
+    
+    @staticmethod
+    def find_product_by_brand_and_info(brand: str, code: str, name: str, spec: str,
+                                       product_index: Dict[str, List[Dict]] = None) -> Tuple[Optional[int], List[str]]:
         """
         通过品牌和其他信息查找成品
         
@@ -167,17 +191,21 @@ class BomMatrixImportService:
             code: 编码
             name: 名称
             spec: 规格
+            product_index: build_product_index() 的结果，批量导入时复用
             
         Returns:
             Tuple[Optional[int], List[str]]: (物料ID, 错误信息列表)
         """
         try:
             # 首先尝试通过品牌精确匹配
-            sql = """
-                SELECT ItemId, ItemCode, CnName, ItemSpec, Brand FROM Items 
-                WHERE Brand = ? AND ItemType = 'FG'
-            """
-            items = query_all(sql, (brand,))
+            if product_index is None:
+                sql = """
+                    SELECT ItemId, ItemCode, CnName, ItemSpec, Brand FROM Items 
+                    WHERE Brand = ? AND ItemType = 'FG'
+                """
+                items = query_all(sql, (brand,))
+            else:
+                items = product_index.get(brand, [])
             
             if not items:
                 return None, [f"未找到品牌为 '{brand}' 的成品"]
@@ -185,7 +213,7 @@ class BomMatrixImportService:
             # 如果有多个匹配，尝试通过其他字段进一步匹配
             if len(items) == 1:
                 item = items[0]
-                print(f"找到唯一成品: {item['Brand']} - {item['CnName']} ({item['ItemCode']})")
+                logger.debug("找到唯一成品: %s - %s (%s)", item['Brand'], item['CnName'], item['ItemCode'])
                 return item['ItemId'], []
             
             # 多个匹配时，尝试通过编码、名称、规格进一步匹配
@@ -216,63 +244,72 @@ class BomMatrixImportService:
                     best_match = item
             
             if best_match and best_score > 0:
-                print(f"找到最佳匹配成品: {best_match['Brand']} - {best_match['CnName']} ({best_match['ItemCode']}) 得分: {best_score}")
+                logger.debug("找到最佳匹配成品: %s - %s (%s) 得分: %s", best_match['Brand'], best_match['CnName'], best_match['ItemCode'], best_score)
                 return best_match['ItemId'], []
             
             # 如果都没有匹配，返回第一个
-            print(f"使用第一个匹配的成品: {items[0]['Brand']} - {items[0]['CnName']} ({items[0]['ItemCode']})")
+            logger.debug("使用第一个匹配的成品: %s - %s (%s)", items[0]['Brand'], items[0]['CnName'], items[0]['ItemCode'])
             return items[0]['ItemId'], []
             
         except Exception as e:
             return None, [f"查找成品失败 {brand}: {str(e)}"]
     
     @staticmethod
-    def find_component_by_code_and_spec(code: str, spec: str) -> Tuple[Optional[int], List[str]]:
+    def build_component_index() -> Dict[str, Dict]:
+        """
+        一次读取全部可作零部件的物料（RM/SFG/FG），按标准化的编码、规格建立哈希索引
+        每个键只保留 ItemId 最小的物料，与逐条打分时"先到先得"的规则一致
+        
+        Returns:
+            Dict[str, Dict]: {'by_code_spec': {(编码, 规格): 物料}, 'by_code': {...}, 'by_spec': {...}, 'count': 物料数}
+        """
+        sql = """
+            SELECT ItemId, ItemCode, CnName, ItemSpec FROM Items 
+            WHERE ItemType IN ('RM', 'SFG', 'FG')
+            ORDER BY ItemId
+        """
+        by_code_spec, by_code, by_spec = {}, {}, {}
+        items = query_all(sql)
+        for item in items:
+            code = BomMatrixImportService.normalize_string(item['ItemCode'])
+            spec = BomMatrixImportService.normalize_string(item['ItemSpec'])
+            by_code_spec.setdefault((code, spec), item)
+            by_code.setdefault(code, item)
+            by_spec.setdefault(spec, item)
+        return {'by_code_spec': by_code_spec, 'by_code': by_code, 'by_spec': by_spec, 'count': len(items)}
+    
+    @staticmethod
+    def find_component_by_code_and_spec(code: str, spec: str,
+                                        component_index: Dict[str, Dict] = None) -> Tuple[Optional[int], List[str]]:
         """
         通过编码和规格查找零部件
+        编码匹配得3分、规格匹配得2分，取得分最高者（同分取先出现的），至少要有编码或规格匹配
         
         Args:
             code: 编码
             spec: 规格
+            component_index: build_component_index() 的结果，批量导入时复用
             
         Returns:
             Tuple[Optional[int], List[str]]: (物料ID, 错误信息列表)
         """
         try:
-            # 获取所有类型的物料（包括成品作为组件的情况）
-            sql = """
-                SELECT ItemId, ItemCode, CnName, ItemSpec FROM Items 
-                WHERE ItemType IN ('RM', 'SFG', 'FG')
-            """
-            items = query_all(sql)
+            if component_index is None:
+                component_index = BomMatrixImportService.build_component_index()
             
-            if not items:
+            if not component_index['count']:
                 return None, ["没有找到任何零部件物料"]
             
             # 标准化搜索条件
             normalized_code = BomMatrixImportService.normalize_string(code)
             normalized_spec = BomMatrixImportService.normalize_string(spec)
             
-            best_match = None
-            best_score = 0
+            # 按得分从高到低：编码+规格(5) > 编码(3) > 规格(2)
+            best_match = (component_index['by_code_spec'].get((normalized_code, normalized_spec))
+                          or component_index['by_code'].get(normalized_code)
+                          or component_index['by_spec'].get(normalized_spec))
             
-            for item in items:
-                score = 0
-                
-                # 编码匹配（权重更高）
-                if BomMatrixImportService.normalize_string(item['ItemCode']) == normalized_code:
-                    score += 3
-                
-                # 规格匹配
-                if BomMatrixImportService.normalize_string(item['ItemSpec']) == normalized_spec:
-                    score += 2
-                
-                if score > best_score:
-                    best_score = score
-                    best_match = item
-            
-            if best_match and best_score >= 2:  # 至少要有编码或规格匹配
-                print(f"找到零部件: {best_match['CnName']} ({best_match['ItemCode']}) 得分: {best_score}")
+            if best_match:
                 return best_match['ItemId'], []
             
             return None, [f"未找到零部件: {code} ({spec})"]
@@ -281,28 +318,34 @@ class BomMatrixImportService:
             return None, [f"查找零部件失败 {code}: {str(e)}"]
     
     @staticmethod
-    def find_or_create_bom_by_brand(brand: str, product_id: int) -> Tuple[Optional[int], List[str]]:
+    def find_or_create_bom_by_brand(brand: str, product_id: int,
+                                    bom_index: Dict[Tuple[str, int], int] = None) -> Tuple[Optional[int], List[str]]:
         """
         通过品牌查找或创建BOM
         
         Args:
             brand: 品牌（作为BOM名称）
             product_id: 父产品ID
+            bom_index: {(BOM名称, 父产品ID): BOM ID}，批量导入时复用，新建的BOM会写回
             
         Returns:
             Tuple[Optional[int], List[str]]: (BOM ID, 错误信息列表)
         """
         try:
             # 查找现有BOM
-            sql = """
-                SELECT BomId FROM BomHeaders 
-                WHERE BomName = ? AND ParentItemId = ?
-            """
-            existing_bom = query_one(sql, (brand, product_id))
+            if bom_index is None:
+                sql = """
+                    SELECT BomId FROM BomHeaders 
+                    WHERE BomName = ? AND ParentItemId = ?
+                """
+                existing_bom = query_one(sql, (brand, product_id))
+                existing_bom_id = existing_bom['BomId'] if existing_bom else None
+            else:
+                existing_bom_id = bom_index.get((brand, product_id))
             
-            if existing_bom:
-                print(f"找到现有BOM: {brand} -> ID: {existing_bom['BomId']}")
-                return existing_bom['BomId'], []
+            if existing_bom_id:
+                logger.debug("找到现有BOM: %s -> ID: %s", brand, existing_bom_id)
+                return existing_bom_id, []
             
             # 创建新BOM
             bom_data = {
@@ -315,7 +358,9 @@ class BomMatrixImportService:
             }
             
             bom_id = BomService.create_bom_header(bom_data)
-            print(f"创建新BOM: {brand} -> ID: {bom_id}")
+            if bom_index is not None:
+                bom_index[(brand, product_id)] = bom_id
+            logger.debug("创建新BOM: %s -> ID: %s", brand, bom_id)
             return bom_id, []
             
         except Exception as e:
@@ -354,6 +399,7 @@ class BomMatrixImportService:
                         WHERE LineId = ?
                     """
                     execute(update_sql, (quantity, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), existing_line['LineId']))
+                    BomExplosionService.invalidate_cache()
                     
                     # 记录更新历史
                     BomHistoryService.log_operation(
@@ -368,7 +414,7 @@ class BomMatrixImportService:
                         remark=f"导入更新数量: {quantity}"
                     )
                     
-                    print(f"更新BOM行: BOM {bom_id} -> 零部件 {component_id} = {quantity}")
+                    logger.debug("更新BOM行: BOM %s -> 零部件 %s = %s", bom_id, component_id, quantity)
                 else:
                     # 获取旧数据用于历史记录
                     old_line = query_one("SELECT * FROM BomLines WHERE LineId = ?", (existing_line['LineId'],))
@@ -379,6 +425,7 @@ class BomMatrixImportService:
                         WHERE LineId = ?
                     """
                     execute(delete_sql, (existing_line['LineId'],))
+                    BomExplosionService.invalidate_cache()
                     
                     # 记录删除历史
                     BomHistoryService.log_operation(
@@ -392,7 +439,7 @@ class BomMatrixImportService:
                         remark=f"导入删除零部件 (数量={quantity})"
                     )
                     
-                    print(f"删除BOM行: BOM {bom_id} -> 零部件 {component_id} (数量={quantity})")
+                    logger.debug("删除BOM行: BOM %s -> 零部件 %s (数量=%s)", bom_id, component_id, quantity)
             else:
                 if quantity > 0:
                     # 创建新行
@@ -401,10 +448,10 @@ class BomMatrixImportService:
                         'QtyPer': quantity,
                         'ScrapFactor': 0
                     })
-                    print(f"创建BOM行: BOM {bom_id} -> 零部件 {component_id} = {quantity}")
+                    logger.debug("创建BOM行: BOM %s -> 零部件 %s = %s", bom_id, component_id, quantity)
                 else:
                     # 数量为0，不需要创建
-                    print(f"跳过创建BOM行: BOM {bom_id} -> 零部件 {component_id} (数量={quantity})")
+                    logger.debug("跳过创建BOM行: BOM %s -> 零部件 %s (数量=%s)", bom_id, component_id, quantity)
             
             return True, []
             
@@ -412,9 +459,12 @@ class BomMatrixImportService:
             return False, [f"更新BOM数量失败: {str(e)}"]
     
     @staticmethod
+    @profiled()
     def import_matrix_excel(file_path: str) -> Tuple[int, List[str], List[str]]:
         """
         导入矩阵格式的Excel文件
+        成品、零部件、BOM主表各只加载一次，在内存中匹配和比对；
+        整个文件的BOM行增删改及历史记录在一个事务中完成，失败时整体回滚
         
         Args:
             file_path: Excel文件路径
@@ -423,145 +473,253 @@ class BomMatrixImportService:
             Tuple[int, List[str], List[str]]: (成功数量, 错误信息列表, 警告信息列表)
         """
         try:
-            print("=== 开始导入矩阵Excel文件 ===")
-            print(f"文件路径: {file_path}")
+            logger.debug("=== 开始导入矩阵Excel文件 ===")
+            logger.debug("文件路径: %s", file_path)
             
             # 解析Excel文件
             result, parse_errors = BomMatrixImportService.parse_matrix_excel(file_path)
             if parse_errors:
-                print(f"解析错误: {parse_errors}")
+                logger.error("解析错误: %s", parse_errors)
                 return 0, parse_errors, []
             
             products = result['products']
             components = result['components']
             quantity_matrix = result['quantity_matrix']
             
-            print(f"解析结果: {len(products)}个成品, {len(components)}个零部件, {len(quantity_matrix)}个数量关系")
+            logger.debug("解析结果: %s个成品, %s个零部件, %s个数量关系", len(products), len(components), len(quantity_matrix))
             
             success_count = 0
             errors = []
             warnings = []
             
-            # 处理每个成品
-            for product in products:
-                try:
-                    print(f"\n处理成品: {product['Brand']} - {product['CnName']}")
-                    
-                    # 查找成品物料
-                    print(f"  查找成品: 品牌={product['Brand']}, 编码={product['ItemCode']}, 名称={product['CnName']}, 规格={product['ItemSpec']}")
-                    product_id, product_errors = BomMatrixImportService.find_product_by_brand_and_info(
-                        product['Brand'], product['ItemCode'], product['CnName'], product['ItemSpec']
-                    )
-                    
-                    if product_errors:
-                        print(f"  成品查找错误: {product_errors}")
-                        errors.extend(product_errors)
-                        continue
-                    
-                    if not product_id:
-                        print(f"  未找到成品: {product['Brand']} - {product['CnName']}")
-                        errors.append(f"未找到成品: {product['Brand']} - {product['CnName']}")
-                        continue
-                    
-                    print(f"  找到成品ID: {product_id}")
-                    
-                    # 查找或创建BOM
-                    bom_id, bom_errors = BomMatrixImportService.find_or_create_bom_by_brand(
-                        product['Brand'], product_id
-                    )
-                    
-                    if bom_errors:
-                        errors.extend(bom_errors)
-                        continue
-                    
-                    if not bom_id:
-                        errors.append(f"无法创建BOM: {product['Brand']}")
-                        continue
-                    
-                    # 获取现有BOM结构
-                    existing_structure = BomMatrixImportService.get_existing_bom_structure(bom_id)
-                    
-                    # 处理Excel中的所有零部件
-                    product_success_count = 0
-                    processed_components = set()  # 记录已处理的零部件
-                    
-                    for component_code, component_data in quantity_matrix.items():
-                        try:
-                            component = component_data['component']
-                            quantities = component_data['quantities']
-                            
+            # 查找表：成品按品牌、零部件按标准化编码/规格、BOM按(名称, 父产品)
+            product_index = BomMatrixImportService.build_product_index()
+            component_index = BomMatrixImportService.build_component_index()
+            bom_index = {}
+            for row in query_all("SELECT BomId, BomName, ParentItemId FROM BomHeaders ORDER BY BomId"):
+                bom_index.setdefault((row['BomName'], row['ParentItemId']), row['BomId'])
+            
+            # 每个零部件只匹配一次：{零部件编码: (物料ID, 错误信息列表)}
+            resolved_components = {
+                component_code: BomMatrixImportService.find_component_by_code_and_spec(
+                    component_data['component']['ItemCode'],
+                    component_data['component']['ItemSpec'],
+                    component_index
+                )
+                for component_code, component_data in quantity_matrix.items()
+            }
+            
+            with transaction() as conn:
+                # 处理每个成品
+                for product in products:
+                    try:
+                        logger.debug("\n处理成品: %s - %s", product['Brand'], product['CnName'])
+                        
+                        # 查找成品物料
+                        product_id, product_errors = BomMatrixImportService.find_product_by_brand_and_info(
+                            product['Brand'], product['ItemCode'], product['CnName'], product['ItemSpec'],
+                            product_index
+                        )
+                        
+                        if product_errors:
+                            logger.error("成品查找错误: %s", product_errors)
+                            errors.extend(product_errors)
+                            continue
+                        
+                        if not product_id:
+                            logger.warning("未找到成品: %s - %s", product['Brand'], product['CnName'])
+                            errors.append(f"未找到成品: {product['Brand']} - {product['CnName']}")
+                            continue
+                        
+                        # 查找或创建BOM
+                        bom_id, bom_errors = BomMatrixImportService.find_or_create_bom_by_brand(
+                            product['Brand'], product_id, bom_index
+                        )
+                        
+                        if bom_errors:
+                            errors.extend(bom_errors)
+                            continue
+                        
+                        if not bom_id:
+                            errors.append(f"无法创建BOM: {product['Brand']}")
+                            continue
+                        
+                        # 获取现有BOM结构，后续在内存中比对
+                        existing_structure = BomMatrixImportService.get_existing_bom_structure(bom_id)
+                        lines = {
+                            row['ChildItemId']: dict(row)
+                            for row in conn.execute(
+                                "SELECT * FROM BomLines WHERE BomId = ? ORDER BY LineId", (bom_id,)
+                            )
+                        }
+                        pending = {'updates': [], 'deletes': [], 'inserts': {}, 'history': []}
+                        
+                        # 处理Excel中的所有零部件
+                        product_success_count = 0
+                        processed_components = set()  # 记录已处理的零部件
+                        
+                        for component_code, component_data in quantity_matrix.items():
                             # 获取该零部件在当前成品中的数量（如果没有则为0）
-                            quantity = quantities.get(product['Brand'], 0)
+                            quantity = component_data['quantities'].get(product['Brand'], 0)
                             
-                            print(f"  处理零部件: {component['CnName']} -> 数量: {quantity}")
-                            
-                            # 查找零部件
-                            component_id, component_errors = BomMatrixImportService.find_component_by_code_and_spec(
-                                component['ItemCode'], component['ItemSpec']
-                            )
+                            component_id, component_errors = resolved_components[component_code]
                             
                             if component_errors:
                                 errors.extend(component_errors)
                                 continue
                             
-                            if not component_id:
-                                errors.append(f"未找到零部件: {component['ItemCode']} ({component['ItemSpec']})")
-                                continue
-                            
                             # 记录已处理的零部件
                             processed_components.add(component_id)
                             
                             # 更新BOM数量（包括删除和清零）
-                            success, update_errors = BomMatrixImportService.update_bom_quantities(
-                                bom_id, component_id, quantity
+                            BomMatrixImportService._stage_line_quantity(
+                                bom_id, lines, component_id, quantity, pending
                             )
-                            
-                            if success:
-                                product_success_count += 1
-                                success_count += 1
-                                print(f"  处理完成: {component['CnName']} = {quantity}")
-                            else:
-                                errors.extend(update_errors)
+                            product_success_count += 1
+                            success_count += 1
                         
-                        except Exception as e:
-                            error_msg = f"处理零部件失败 {component_code}: {str(e)}"
-                            errors.append(error_msg)
-                            print(f"  错误: {error_msg}")
-                    
-                    # 删除Excel中不存在的零部件关系
-                    for existing_component_id in existing_structure:
-                        if existing_component_id not in processed_components:
-                            # 这个零部件在Excel中不存在，应该删除
-                            success, delete_errors = BomMatrixImportService.update_bom_quantities(
-                                bom_id, existing_component_id, 0
-                            )
-                            if success:
+                        # 删除Excel中不存在的零部件关系
+                        for existing_component_id in existing_structure:
+                            if existing_component_id not in processed_components:
+                                BomMatrixImportService._stage_line_quantity(
+                                    bom_id, lines, existing_component_id, 0, pending
+                                )
                                 product_success_count += 1
                                 success_count += 1
-                                print(f"  删除多余零部件: ID {existing_component_id}")
-                            else:
-                                errors.extend(delete_errors)
+                        
+                        BomMatrixImportService._flush_line_changes(conn, pending, lines)
+                        
+                        if product_success_count > 0:
+                            logger.debug("成品 %s 处理完成: %s 个零部件", product['Brand'], product_success_count)
+                        else:
+                            warnings.append(f"成品 {product['Brand']} 没有找到任何有效的零部件关系")
                     
-                    if product_success_count > 0:
-                        print(f"成品 {product['Brand']} 处理完成: {product_success_count} 个零部件")
-                    else:
-                        warnings.append(f"成品 {product['Brand']} 没有找到任何有效的零部件关系")
-                
-                except Exception as e:
-                    error_msg = f"处理成品失败 {product['Brand']}: {str(e)}"
-                    errors.append(error_msg)
-                    print(f"错误: {error_msg}")
+                    except sqlite3.Error:
+                        # 数据库错误时整个文件回滚
+                        raise
+                    except Exception as e:
+                        error_msg = f"处理成品失败 {product['Brand']}: {str(e)}"
+                        errors.append(error_msg)
+                        logger.error("错误: %s", error_msg)
             
-            print(f"\n=== 导入完成 ===")
-            print(f"成功更新: {success_count} 个BOM关系")
-            print(f"错误数量: {len(errors)}")
-            print(f"警告数量: {len(warnings)}")
+            BomExplosionService.invalidate_cache()
+            
+            logger.debug("\n=== 导入完成 ===")
+            logger.debug("成功更新: %s 个BOM关系", success_count)
+            logger.info("错误数量: %s", len(errors))
+            logger.info("警告数量: %s", len(warnings))
             
             return success_count, errors, warnings
             
         except Exception as e:
             return 0, [f"导入矩阵Excel失败: {str(e)}"], []
     
+    @staticmethod
+    def _stage_line_quantity(bom_id: int, lines: Dict[int, Dict], component_id: int,
+                             quantity: float, pending: Dict) -> None:
+        """
+        在内存中比对并登记一个零部件的数量变更（规则同 update_bom_quantities）：
+        - 已存在且数量>0：数量有变化时更新
+        - 已存在且数量<=0：删除
+        - 不存在且数量>0：新建（登记到 pending['inserts']，落库时批量插入）
+        lines 为该BOM当前的行 {零部件ID: 行数据}，随变更同步维护
+        """
+        inserts = pending['inserts']
+        if component_id in inserts:
+            # 同一零部件在本次登记中已待新建：只调整待插入的数量
+            if quantity > 0:
+                inserts[component_id] = (bom_id, quantity)
+            else:
+                del inserts[component_id]
+            return
+        
+        existing_line = lines.get(component_id)
+        
+        if existing_line:
+            if quantity > 0:
+                if existing_line['QtyPer'] == quantity:
+                    return  # 数量未变化
+                
+                old_line = dict(existing_line)
+                existing_line['QtyPer'] = quantity
+                existing_line['CreatedDate'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                pending['updates'].append((quantity, existing_line['CreatedDate'], existing_line['LineId']))
+                pending['history'].append(BomMatrixImportService._history_row(
+                    bom_id, 'UPDATE', existing_line['LineId'],
+                    old_data=old_line,
+                    new_data={'ChildItemId': component_id, 'QtyPer': quantity, 'ScrapFactor': 0},
+                    operation_source='IMPORT',
+                    remark=f"导入更新数量: {quantity}"
+                ))
+            else:
+                del lines[component_id]
+                pending['deletes'].append((existing_line['LineId'],))
+                pending['history'].append(BomMatrixImportService._history_row(
+                    bom_id, 'DELETE', existing_line['LineId'],
+                    old_data=existing_line,
+                    operation_source='IMPORT',
+                    remark=f"导入删除零部件 (数量={quantity})"
+                ))
+        elif quantity > 0:
+            inserts[component_id] = (bom_id, quantity)
+    
+    @staticmethod
+    def _history_row(bom_id: int, operation_type: str, target_id: int,
+                     old_data: Optional[Dict] = None, new_data: Optional[Dict] = None,
+                     operation_source: str = "IMPORT", remark: str = "") -> Tuple:
+        """BomOperationHistory 的一行参数，格式同 BomHistoryService.log_operation"""
+        return (
+            bom_id, operation_type, 'LINE', target_id,
+            json.dumps(old_data, ensure_ascii=False) if old_data else None,
+            json.dumps(new_data, ensure_ascii=False) if new_data else None,
+            '系统', operation_source, remark
+        )
+    
+    @staticmethod
+    def _flush_line_changes(conn, pending: Dict, lines: Dict[int, Dict]) -> None:
+        """
+        批量写入登记的BOM行更新、删除、新建和历史记录
+        删除先于新建执行（同一零部件先删后建时不违反唯一约束）；新建行批量插入后
+        按 BOM 查询一次取回 LineId，用于历史记录并回填 lines
+        """
+        if pending['updates']:
+            conn.executemany("""
+                UPDATE BomLines 
+                SET QtyPer = ?, CreatedDate = ?
+                WHERE LineId = ?
+            """, pending['updates'])
+        if pending['deletes']:
+            conn.executemany("DELETE FROM BomLines WHERE LineId = ?", pending['deletes'])
+        inserts = pending['inserts']
+        if inserts:
+            conn.executemany("""
+                INSERT INTO BomLines (BomId, ChildItemId, QtyPer, ScrapFactor)
+                VALUES (?, ?, ?, ?)
+            """, [(bom_id, component_id, quantity, 0)
+                  for component_id, (bom_id, quantity) in inserts.items()])
+            created: Dict[Tuple[int, int], Dict] = {}
+            for bom_id in {bom_id for bom_id, _ in inserts.values()}:
+                for row in conn.execute("SELECT * FROM BomLines WHERE BomId = ?", (bom_id,)):
+                    created[(bom_id, row['ChildItemId'])] = dict(row)
+            for component_id, (bom_id, quantity) in inserts.items():
+                row = created[(bom_id, component_id)]
+                lines[component_id] = row
+                pending['history'].append(BomMatrixImportService._history_row(
+                    bom_id, 'CREATE', row['LineId'],
+                    new_data={'ChildItemId': component_id, 'QtyPer': quantity, 'ScrapFactor': 0},
+                    operation_source='UI',
+                    remark="添加零部件到BOM"
+                ))
+        if pending['history']:
+            conn.executemany("""
+                INSERT INTO BomOperationHistory (
+                    BomId, OperationType, OperationTarget, TargetId,
+                    OldData, NewData, OperationUser, OperationSource, Remark
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, pending['history'])
+        for rows in pending.values():
+            rows.clear()
+    
     @staticmethod
     def get_existing_bom_structure(bom_id: int) -> Dict[int, float]:
         """
@@ -584,11 +742,11 @@ class BomMatrixImportService:
             for line in lines:
                 existing_structure[line['ChildItemId']] = line['QtyPer']
             
-            print(f"现有BOM结构: {len(existing_structure)}个零部件")
+            logger.debug("现有BOM结构: %s个零部件", len(existing_structure))
             return existing_structure
             
         except Exception as e:
-            print(f"获取BOM结构失败: {str(e)}")
+            logger.error("获取BOM结构失败: %s", str(e))
             return {}
 
 
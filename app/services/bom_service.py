@@ -1,6 +1,12 @@
 from typing import List, Dict, Optional, Tuple
 from app.db import query_all, query_one, execute, get_last_id
 from app.services.bom_history_service import BomHistoryService
+from app.services.bom_explosion_service import BomExplosionService
+from app.utils.perf import get_logger
+
+logger = get_logger(__name__)
+
+_IN_CHUNK = 500  # IN 列表每批 ID 数（低于 SQLite 参数个数上限）
 
 
 class BomService:
@@ -138,6 +144,7 @@ class BomService:
                 bom_data.get('ExpireDate'),
                 bom_data.get('Remark', '')
             ))
+            BomExplosionService.invalidate_cache()
             
             # 记录操作历史
             BomHistoryService.log_operation(
@@ -184,6 +191,7 @@ class BomService:
                 line_data['QtyPer'],
                 line_data.get('ScrapFactor', 0)
             ))
+            BomExplosionService.invalidate_cache()
             
             # 记录操作历史
             BomHistoryService.log_operation(
@@ -252,10 +260,10 @@ class BomService:
                 
                 # 如果没有变化，直接返回
                 if not has_changes:
-                    print(f"调试 - BOM主表无变化，跳过更新")
+                    logger.debug("调试 - BOM主表无变化，跳过更新")
                     return True
                 
-                print(f"调试 - BOM主表变化: {'; '.join(changes)}")
+                logger.debug("调试 - BOM主表变化: %s", '; '.join(changes))
             else:
                 has_changes = True
             
@@ -274,6 +282,7 @@ class BomService:
                 bom_data.get('Remark', ''),
                 bom_id
             ))
+            BomExplosionService.invalidate_cache()
             
             # 记录更新历史（只有变化时才记录）
             if has_changes:
@@ -327,10 +336,10 @@ class BomService:
                 
                 # 如果没有变化，直接返回
                 if not has_changes:
-                    print(f"调试 - BOM明细无变化，跳过更新")
+                    logger.debug("调试 - BOM明细无变化，跳过更新")
                     return True
                 
-                print(f"调试 - BOM明细变化: {'; '.join(changes)}")
+                logger.debug("调试 - BOM明细变化: %s", '; '.join(changes))
             else:
                 has_changes = True
             
@@ -346,6 +355,7 @@ class BomService:
                 line_data.get('ScrapFactor', 0),
                 line_id
             ))
+            BomExplosionService.invalidate_cache()
             
             # 记录更新历史（只有变化时才记录）
             if bom_id and has_changes:
@@ -404,6 +414,7 @@ class BomService:
             
             # 删除BOM主表（明细会通过外键约束自动删除）
             execute("DELETE FROM BomHeaders WHERE BomId = ?", (bom_id,))
+            BomExplosionService.invalidate_cache()
             return True
             
         except Exception as e:
@@ -434,6 +445,7 @@ class BomService:
                 )
             
             execute("DELETE FROM BomLines WHERE LineId = ?", (line_id,))
+            BomExplosionService.invalidate_cache()
             return True
             
         except Exception as e:
@@ -443,39 +455,63 @@ class BomService:
     def get_bom_status(bom_id: int) -> str:
         """
         获取BOM状态
-        返回: '有效' 或 '失效'
+        返回: '有效' 或 '失效'（BOM 不存在或查询失败时为 '未知'）
         """
         try:
-            # 获取BOM信息
-            bom = query_one("SELECT * FROM BomHeaders WHERE BomId = ?", (bom_id,))
-            if not bom:
-                return '未知'
-            
-            bom = dict(bom)
-            
-            # 检查父产品状态
-            parent_item = query_one("SELECT IsActive FROM Items WHERE ItemId = ?", (bom.get('ParentItemId'),))
-            if not parent_item or parent_item['IsActive'] != 1:
-                return '失效'
-            
-            # 检查所有零部件状态
-            bom_lines = query_all("""
-                SELECT i.IsActive 
-                FROM BomLines bl 
-                JOIN Items i ON bl.ChildItemId = i.ItemId 
-                WHERE bl.BomId = ?
-            """, (bom_id,))
-            
-            for line in bom_lines:
-                if line['IsActive'] != 1:
-                    return '失效'
-            
-            return '有效'
-            
+            status = BomService.get_bom_statuses([bom_id]).get(bom_id)
+            return status['status'] if status else '未知'
         except Exception as e:
-            print(f"获取BOM状态失败: {str(e)}")
+            logger.error("获取BOM状态失败: %s", str(e))
             return '未知'
     
+    @staticmethod
+    def get_bom_statuses(bom_ids: Optional[List[int]] = None) -> Dict[int, Dict]:
+        """
+        批量获取BOM状态：BOM主表关联父产品与全部明细零部件，按 BomId 分组一次统计
+        父产品不存在或已禁用、或存在已禁用的零部件时为 '失效'，否则为 '有效'
+
+        Args:
+            bom_ids: BOM ID 列表，None 表示全部BOM
+
+        Returns:
+            {BomId: {'status': '有效'/'失效', 'parent_active': bool, 'disabled_components': 禁用零部件行数}}
+            （不存在的 BomId 不在结果中）
+        """
+        try:
+            base_sql = """
+                SELECT bh.BomId,
+                       MAX(CASE WHEN p.IsActive = 1 THEN 1 ELSE 0 END) AS ParentActive,
+                       SUM(CASE WHEN c.ItemId IS NOT NULL AND c.IsActive IS NOT 1 THEN 1 ELSE 0 END) AS DisabledComponents
+                FROM BomHeaders bh
+                LEFT JOIN Items p ON bh.ParentItemId = p.ItemId
+                LEFT JOIN BomLines bl ON bl.BomId = bh.BomId
+                LEFT JOIN Items c ON bl.ChildItemId = c.ItemId
+            """
+            if bom_ids is None:
+                batches = [(base_sql + " GROUP BY bh.BomId", ())]
+            else:
+                ids = list(dict.fromkeys(bom_ids))
+                batches = []
+                for i in range(0, len(ids), _IN_CHUNK):
+                    chunk = ids[i:i + _IN_CHUNK]
+                    placeholders = ",".join(["?"] * len(chunk))
+                    batches.append((base_sql + f" WHERE bh.BomId IN ({placeholders}) GROUP BY bh.BomId",
+                                    tuple(chunk)))
+
+            statuses = {}
+            for sql, params in batches:
+                for row in query_all(sql, params):
+                    parent_active = row['ParentActive'] == 1
+                    disabled = row['DisabledComponents'] or 0
+                    statuses[row['BomId']] = {
+                        'status': '有效' if parent_active and disabled == 0 else '失效',
+                        'parent_active': parent_active,
+                        'disabled_components': disabled,
+                    }
+            return statuses
+        except Exception as e:
+            raise Exception(f"批量获取BOM状态失败: {str(e)}")
+    
     @staticmethod
     def get_bom_status_details(bom_id: int) -> Dict:
         """
@@ -538,69 +574,14 @@ class BomService:
             }
             
         except Exception as e:
-            print(f"获取BOM状态详情失败: {str(e)}")
+            logger.error("获取BOM状态详情失败: %s", str(e))
             return {'status': '未知', 'parent_status': '未知', 'disabled_components': []}
 
     @staticmethod
     def expand_bom(parent_item_id: int, qty: float, rev: str = None) -> List[Dict]:
-        """展开BOM结构"""
+        """展开BOM结构（集合式加载BOM后在内存中多级展开）"""
         try:
-            # 获取BOM
-            bom = BomService.get_bom_by_parent_item(parent_item_id, rev)
-            if not bom:
-                return []
-            
-            # 获取BOM明细
-            bom_lines = BomService.get_bom_lines(bom['BomId'])
-            
-            expanded_items = []
-            for line in bom_lines:
-                # 计算实际用量（考虑损耗）
-                actual_qty = line['QtyPer'] * qty * (1 + line['ScrapFactor'])
-                
-                # 获取Brand和ProjectName数据
-                brand_value = line.get('ChildItemBrand', '')  # 商品品牌字段
-                project_name_value = line.get('ChildItemProjectName', '')
-                
-                # 如果ProjectName为空，根据商品品牌字段从项目映射表获取
-                if not project_name_value and brand_value:
-                    try:
-                        from app.services.project_service import ProjectService
-                        project_code = ProjectService.get_project_by_item_brand(brand_value)
-                        if project_code:
-                            mappings = ProjectService.get_project_mappings_by_project_code(project_code)
-                            if mappings:
-                                project_name_value = mappings[0].get('ProjectName', project_code)
-                    except Exception as e:
-                        print(f"获取项目名称失败: {e}")
-                
-                print(f"🔍 [expand_bom] 展开物料 {line['ChildItemCode']}: Brand='{brand_value}', ProjectName='{project_name_value}'")
-                
-                expanded_items.append({
-                    'ItemId': line['ChildItemId'],
-                    'ItemCode': line['ChildItemCode'],
-                    'ItemName': line['ChildItemName'],
-                    'ItemSpec': line['ChildItemSpec'],
-                    'ItemType': line['ChildItemType'],
-                    'Brand': brand_value,
-                    'ProjectName': project_name_value,
-                    'QtyPer': line['QtyPer'],
-                    'ActualQty': actual_qty,
-                    'ScrapFactor': line['ScrapFactor'],
-                    'Level': 1,
-                    'ParentItemId': parent_item_id
-                })
-                
-                # 递归展开子物料的BOM
-                child_bom = BomService.get_bom_by_parent_item(line['ChildItemId'])
-                if child_bom:
-                    child_items = BomService.expand_bom(line['ChildItemId'], actual_qty)
-                    for child_item in child_items:
-                        child_item['Level'] = child_item.get('Level', 1) + 1
-                        expanded_items.append(child_item)
-            
-            return expanded_items
-            
+            return BomExplosionService.expand(parent_item_id, qty, rev)
         except Exception as e:
             raise Exception(f"展开BOM失败: {str(e)}")
     
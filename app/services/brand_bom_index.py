@@ -0,0 +1,73 @@
+# app/services/brand_bom_index.py
+# -*- coding: utf-8 -*-
+"""
+品牌 → BOM 解析索引
+- 客户订单的 ItemNumber 即成品的品牌，按 BomName 包含品牌（LIKE '%品牌%'）匹配有效BOM
+- 一次读取全部有效 BomHeaders，在内存中按相同规则匹配，同一品牌只解析一次
+- 多个BOM匹配时取版本号（Rev）最大的一个，与 MRPService.find_bom_by_brand 一致
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from app.db import query_all
+
+
+class BrandBomIndex:
+    """有效BOM主表的内存索引，生命周期为一次计算"""
+
+    def __init__(self, headers: List[Dict]):
+        # 按 Rev 降序排列，首个匹配即为结果；Rev 相同时保持 BomId 顺序
+        self.headers = sorted(headers, key=lambda h: str(h["Rev"]), reverse=True)
+        self._resolved: Dict[str, Optional[Dict]] = {}
+
+    @classmethod
+    def load(cls) -> "BrandBomIndex":
+        """读取全部有效BOM主表（含父物料信息，字段与 find_bom_by_brand 相同）"""
+        rows = query_all("""
+            SELECT bh.*, i.ItemCode as ParentItemCode, i.CnName as ParentItemName,
+                   i.ItemSpec as ParentItemSpec, i.Brand as ParentItemBrand
+            FROM BomHeaders bh
+            LEFT JOIN Items i ON bh.ParentItemId = i.ItemId
+            WHERE bh.IsActive = 1
+            ORDER BY bh.BomId
+        """)
+        return cls([dict(r) for r in rows])
+
+    def resolve(self, brand: str) -> Optional[Dict]:
+        """返回 BomName 包含该品牌的最高版本BOM（副本），未找到返回 None"""
+        key = f"{brand}"
+        if key not in self._resolved:
+            matcher = BrandBomIndex._like_contains(key)
+            self._resolved[key] = next(
+                (h for h in self.headers
+                 if h.get("BomName") is not None and matcher.search(str(h["BomName"]))),
+                None
+            )
+        found = self._resolved[key]
+        return dict(found) if found else None
+
+    def resolve_parent(self, brand: str) -> Optional[int]:
+        """品牌 → ParentItemId"""
+        found = self.resolve(brand)
+        return found.get("ParentItemId") if found else None
+
+    def bom_names(self) -> List[str]:
+        """全部有效BOM名称（用于未匹配时的调试输出）"""
+        return [h.get("BomName") for h in sorted(self.headers, key=lambda h: h["BomId"])]
+
+    @staticmethod
+    def _like_contains(brand: str):
+        """
+        等价于 SQLite 的 LIKE '%brand%'：
+        % 匹配任意串，_ 匹配单个字符，仅 ASCII 字母大小写不敏感
+        """
+        parts = []
+        for ch in brand:
+            if ch == "%":
+                parts.append(".*")
+            elif ch == "_":
+                parts.append(".")
+            else:
+                parts.append(re.escape(ch))
+        return re.compile("".join(parts), re.IGNORECASE | re.ASCII | re.DOTALL)
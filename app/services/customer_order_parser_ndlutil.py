@@ -3,10 +3,17 @@
 """
 独立的 NDLUtil 解析器（可单测/可复用）
 注意：这里返回的 DeliveryDate 为 date 对象；如需入库请转成 'YYYY-MM-DD'
+流式事件解析 iter_release_events 同时供 CustomerOrderService 使用
 """
+import multiprocessing
+import os
 import re
+from collections import deque
+from itertools import islice
 from pathlib import Path
 from datetime import datetime, date
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 # -------- 解析规则 --------
 RE_SUPPLIER   = re.compile(r"^\s*Supplier:\s*([A-Za-z0-9\-]+)")
@@ -35,64 +42,72 @@ def _parse_date_safe(s):
     except Exception:
         return s
 
-def parse_txt(paths):
-    """
-    返回:
-      lines: list[dict]  每条计划行（DeliveryDate 为 date 类型）
-      release_info: dict[(supplier,item)] -> {release_date, release_id, purchase_order, receipt_qty, cum_received}
-    """
-    if isinstance(paths, (str, Path)):
-        paths = [paths]
+# -------- 流式解析 --------
+HEADER = "header"   # 一个 (Supplier, Item) 头信息结束（Item 切换/Supplier 切换/文件结束）
+PLAN = "plan"       # 一条计划行
 
-    lines = []
-    release_info = {}
+_PLAN_LEADS = frozenset("0123456789DWM")  # RE_LINE 去掉前导空白后可能的首字符
 
-    for p in map(Path, paths):
-        raw = p.read_text(encoding="utf-8", errors="ignore")
+# 文件总大小低于该值时直接在当前进程解析（进程启动开销大于解析本身）
+_POOL_MIN_BYTES = 4 * 1024 * 1024
 
-        sup_code = sup_name = None
-        item = None
 
-        header_po = header_rel_id = header_rel_date_txt = None
-        header_receipt_qty = header_cum_received = None
+def iter_release_events(text_lines: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+    """
+    逐行解析 NDLUtil 文本，惰性产出事件：
+      (HEADER, {Supplier, SupplierName, Item, PurchaseOrder, ReleaseId, ReleaseDate, ReceiptQuantity, CumReceived})
+      (PLAN,   同上字段 + {Date, OrderType, Qty})
+    字段保持原文（日期 mm/dd/yy、数量含千分位），由调用方自行转换。
+    按行首做前缀分派：不含 ":" 的行不做头字段匹配，首字符不可能匹配的行不做计划行匹配。
+    """
+    sup_code = sup_name = None
+    item = None
 
-        po = rel_id = rel_date_txt = None
-        receipt_qty = cum_received = None
+    # header_*: Supplier 段落的头字段；后续 Item 出现时继承
+    header_po = header_rel_id = header_rel_date = None
+    header_receipt_qty = header_cum_received = None
 
-        capture_name = False
+    # 当前 Item 的头字段（默认继承 header_*，若遇到新值则覆盖）
+    po = rel_id = rel_date = None
+    receipt_qty = cum_received = None
 
-        def flush():
-            if sup_code and item:
-                key = (sup_code, item)
-                info = release_info.get(key, {})
-                if rel_date_txt:
-                    info["release_date"] = _parse_date_safe(rel_date_txt)
-                if rel_id:
-                    info["release_id"] = rel_id
-                if po:
-                    info["purchase_order"] = po
-                if receipt_qty is not None:
-                    info["receipt_qty"] = float(str(receipt_qty).replace(",", ""))
-                if cum_received is not None:
-                    info["cum_received"] = float(str(cum_received).replace(",", ""))
-                release_info[key] = info
+    capture_name = False
 
+    def header_fields() -> Dict:
+        return {
+            "Supplier": sup_code,
+            "SupplierName": sup_name,
+            "Item": item,
+            "PurchaseOrder": po,
+            "ReleaseId": rel_id,
+            "ReleaseDate": rel_date,
+            "ReceiptQuantity": receipt_qty,
+            "CumReceived": cum_received,
+        }
+
+    for raw in text_lines:
+        # 与 str.splitlines 的分行规则保持一致（含 \f 等分隔符）
         for ln in raw.splitlines():
-            m = RE_SUPPLIER.search(ln)
-            if m:
-                flush()
-                sup_code = m.group(1)
-                sup_name = None
-                capture_name = True
-                header_po = header_rel_id = header_rel_date_txt = None
-                header_receipt_qty = header_cum_received = None
-                item = None
-                po = rel_id = rel_date_txt = None
-                receipt_qty = cum_received = None
-                continue
+            stripped = ln.lstrip()
+
+            if stripped.startswith("Supplier:"):
+                m = RE_SUPPLIER.search(ln)
+                if m:
+                    if sup_code and item:
+                        yield HEADER, header_fields()
+                    sup_code = m.group(1)
+                    sup_name = None
+                    capture_name = True
+                    header_po = header_rel_id = header_rel_date = None
+                    header_receipt_qty = header_cum_received = None
+                    item = None
+                    po = rel_id = rel_date = None
+                    receipt_qty = cum_received = None
+                    continue
 
+            # Supplier 名称：在 Supplier: 行之后直到 Ship-To: 之前的第一行非空白
             if capture_name:
-                if RE_SHIPTO.search(ln):
+                if stripped.startswith("Ship-To:"):
                     capture_name = False
                     continue
                 t = ln.strip()
@@ -101,59 +116,153 @@ def parse_txt(paths):
                     capture_name = False
                 continue
 
-            # 头字段（允许同行多字段）
-            m = RE_PO.search(ln)
-            if m:
-                if item:  po = m.group(1)
-                else:     header_po = m.group(1)
-            m = RE_RELID.search(ln)
-            if m:
-                if item:  rel_id = m.group(1)
-                else:     header_rel_id = m.group(1)
-            m = RE_RELD.search(ln)
-            if m:
-                if item:  rel_date_txt = m.group(1)
-                else:     header_rel_date_txt = m.group(1)
-            m = RE_RECEIPT_Q.search(ln)
-            if m:
-                if item:  receipt_qty = m.group(1)
-                else:     header_receipt_qty = m.group(1)
-            m = RE_CUM_RECV.search(ln)
-            if m:
-                if item:  cum_received = m.group(1)
-                else:     header_cum_received = m.group(1)
-
-            m = RE_ITEM.search(ln)
-            if m:
-                flush()
-                item = m.group(1)
-                po = header_po
-                rel_id = header_rel_id
-                rel_date_txt = header_rel_date_txt
-                receipt_qty = header_receipt_qty
-                cum_received = header_cum_received
-                continue
+            if ":" in stripped:
+                # 头字段（同一行可多字段同时出现）
+                m = RE_PO.search(ln)
+                if m:
+                    if item:  po = m.group(1)
+                    else:     header_po = m.group(1)
+                m = RE_RELID.search(ln)
+                if m:
+                    if item:  rel_id = m.group(1)
+                    else:     header_rel_id = m.group(1)
+                m = RE_RELD.search(ln)
+                if m:
+                    if item:  rel_date = m.group(1)
+                    else:     header_rel_date = m.group(1)
+                m = RE_RECEIPT_Q.search(ln)
+                if m:
+                    if item:  receipt_qty = m.group(1)
+                    else:     header_receipt_qty = m.group(1)
+                m = RE_CUM_RECV.search(ln)
+                if m:
+                    if item:  cum_received = m.group(1)
+                    else:     header_cum_received = m.group(1)
+
+                # Item Number 行：切换当前 PN，并继承 header_* 值
+                m = RE_ITEM.search(ln)
+                if m:
+                    if sup_code and item:
+                        yield HEADER, header_fields()
+                    item = m.group(1)
+                    po = header_po
+                    rel_id = header_rel_id
+                    rel_date = header_rel_date
+                    receipt_qty = header_receipt_qty
+                    cum_received = header_cum_received
+                    continue
+
+            # 计划行（日期 + FP + 数量）
+            if stripped[:1] in _PLAN_LEADS and sup_code and item:
+                m = RE_LINE.match(ln)
+                if m:
+                    d_s, fp, qty_s = m.groups()
+                    event = header_fields()
+                    event["Date"] = d_s
+                    event["OrderType"] = fp
+                    event["Qty"] = qty_s
+                    yield PLAN, event
+
+    # 收尾：最后一个 item 的头信息
+    if sup_code and item:
+        yield HEADER, header_fields()
+
+
+def iter_file_events(path) -> Iterator[Tuple[str, Dict]]:
+    """按行流式读取文件并产出事件，不把整个文件读入内存"""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        yield from iter_release_events(f)
+
+
+def read_file_events(path) -> List[Tuple[str, Dict]]:
+    """读取单个文件的全部事件（进程池任务，需为模块级函数）"""
+    return list(iter_file_events(path))
 
-            m = RE_LINE.match(ln)
-            if m and sup_code and item:
-                d_s, fp, qty_s = m.groups()
-                d = datetime.strptime(d_s, "%m/%d/%y").date()
-                fp = fp.upper() if fp.upper() in ("F", "P") else "P"
-                qty = float(qty_s.replace(",", ""))
+
+def _file_size(path: str) -> int:
+    """文件大小；文件不存在等错误留到解析该文件时再报告"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _future_events(future: Future) -> Iterator[Tuple[str, Dict]]:
+    """进程池任务的事件：迭代时才取结果，解析失败的异常在消费该文件时抛出，不影响其余文件"""
+    yield from future.result()
+
+
+def iter_files_events(paths, max_workers: Optional[int] = None) -> Iterator[Tuple[str, Iterable[Tuple[str, Dict]]]]:
+    """
+    多文件解析，按输入顺序产出 (path, events)；某个文件解析失败时在迭代其 events 时抛出
+    - 单个文件、文件总量较小或 max_workers == 1 时在当前进程流式解析
+    - 否则用进程池并行解析，每个文件在子进程内流式读取；同时提交的文件数不超过进程数，
+      调用方处理完一个文件后才提交下一个，内存占用与进程数而不是输入总量成正比
+    """
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    paths = [str(p) for p in paths]
+
+    if (len(paths) <= 1 or max_workers == 1
+            or sum(_file_size(p) for p in paths) < _POOL_MIN_BYTES):
+        for p in paths:
+            yield p, iter_file_events(p)
+        return
+
+    workers = min(max_workers if max_workers and max_workers > 0 else (os.cpu_count() or 1), len(paths))
+    remaining = iter(paths)
+    # GUI 进程含多个线程，子进程统一用 spawn 方式启动，避免 fork 继承锁状态
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque((p, pool.submit(read_file_events, p)) for p in islice(remaining, workers))
+        while pending:
+            p, future = pending.popleft()
+            yield p, _future_events(future)
+            for nxt in islice(remaining, 1):
+                pending.append((nxt, pool.submit(read_file_events, nxt)))
+
+
+def parse_txt(paths, max_workers: Optional[int] = None):
+    """
+    返回:
+      lines: list[dict]  每条计划行（DeliveryDate 为 date 类型）
+      release_info: dict[(supplier,item)] -> {release_date, release_id, purchase_order, receipt_qty, cum_received}
+    多个文件时并行解析，结果按文件顺序合并
+    """
+    lines = []
+    release_info = {}
+
+    for _, events in iter_files_events(paths, max_workers):
+        for kind, ev in events:
+            if kind == HEADER:
+                key = (ev["Supplier"], ev["Item"])
+                info = release_info.get(key, {})
+                if ev["ReleaseDate"]:
+                    info["release_date"] = _parse_date_safe(ev["ReleaseDate"])
+                if ev["ReleaseId"]:
+                    info["release_id"] = ev["ReleaseId"]
+                if ev["PurchaseOrder"]:
+                    info["purchase_order"] = ev["PurchaseOrder"]
+                if ev["ReceiptQuantity"] is not None:
+                    info["receipt_qty"] = float(str(ev["ReceiptQuantity"]).replace(",", ""))
+                if ev["CumReceived"] is not None:
+                    info["cum_received"] = float(str(ev["CumReceived"]).replace(",", ""))
+                release_info[key] = info
+            else:
+                d = datetime.strptime(ev["Date"], "%m/%d/%y").date()
+                fp = ev["OrderType"].upper()
+                fp = fp if fp in ("F", "P") else "P"
                 lines.append({
-                    "Supplier": sup_code,
-                    "Item": item,
+                    "Supplier": ev["Supplier"],
+                    "Item": ev["Item"],
                     "DeliveryDate": d,
                     "OrderType": fp,
-                    "RequiredQty": qty,
-                    "ReleaseId": rel_id,
-                    "ReleaseDate": rel_date_txt,
-                    "PurchaseOrder": po,
-                    "ReceiptQuantity": receipt_qty,
-                    "CumReceived": cum_received,
-                    "SupplierName": sup_name,
+                    "RequiredQty": float(ev["Qty"].replace(",", "")),
+                    "ReleaseId": ev["ReleaseId"],
+                    "ReleaseDate": ev["ReleaseDate"],
+                    "PurchaseOrder": ev["PurchaseOrder"],
+                    "ReceiptQuantity": ev["ReceiptQuantity"],
+                    "CumReceived": ev["CumReceived"],
+                    "SupplierName": ev["SupplierName"],
                 })
 
-        flush()
-
     return lines, release_info
@@ -7,12 +7,18 @@
 - 查询接口与 UI 适配：get_order_lines_by_import_version 不再引用不存在列
 """
 
+import logging
 import os
+import time
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from collections import defaultdict
 
-from app.db import get_conn
+from app.db import get_conn, transaction
+from app.services import customer_order_parser_ndlutil as ndlutil_parser
+from app.utils.perf import get_logger, profiled
+
+logger = get_logger(__name__)
 
 
 class CustomerOrderService:
@@ -33,189 +39,199 @@ class CustomerOrderService:
 
         orders: 每个 (Supplier, Item) 的头信息（ReleaseDate/ReleaseId/ReceiptQty/CumReceived...）
         order_lines: 明细行（按日期、F/P、数量）
+        文件按行流式解析（见 customer_order_parser_ndlutil.iter_file_events）
+        """
+        return CustomerOrderService._records_from_events(ndlutil_parser.iter_file_events(file_path))
+
+    @staticmethod
+    def iter_txt_order_files(file_paths: List[str],
+                             max_workers: Optional[int] = None) -> Iterator[Tuple[str, List[Dict], List[Dict]]]:
+        """
+        逐个产出多个 TXT 的解析结果 (file_path, orders, order_lines)，顺序与输入一致
+        多个文件时使用进程池并行解析，调用方处理完一个文件后才继续，只保留少量文件的结果在内存中；
+        某个文件解析失败时在产出该文件时抛出
         """
-        from pathlib import Path
-        import re
-
-        RE_SUPPLIER  = re.compile(r"^\s*Supplier:\s*([A-Za-z0-9\-]+)")
-        RE_SHIPTO    = re.compile(r"^\s*Ship-To:")
-        RE_ITEM      = re.compile(r"^\s*Item Number:\s*([A-Z0-9\-]+)", re.I)
-
-        RE_PO        = re.compile(r"Purchase Order:\s*([A-Z0-9\-]+)", re.I)
-        RE_RELID     = re.compile(r"Release ID:\s*([\w\-]+)", re.I)
-        RE_RELD      = re.compile(r"Release Date:\s*([0-9/]+)", re.I)
-        # 数量支持整数或小数
-        RE_RECEIPT_Q = re.compile(r"Receipt Quantity:\s*([0-9][0-9,]*(?:\.\d+)?)", re.I)
-        RE_CUM_RECV  = re.compile(r"Cum Received:\s*([0-9][0-9,]*(?:\.\d+)?)", re.I)
-
-        # 计划行：日期 + F/P + 数量
-        RE_LINE      = re.compile(
-            r"^\s*(?:Daily|Weekly|Monthly)?\s*([0-9]{2}/[0-9]{2}/[0-9]{2})\s+([FPfp])\s+([0-9][0-9,]*(?:\.\d+)?)(?:\s+.*)?$"
-        )
-
-        def mmddyy_to_dt(s: str) -> datetime:
-            dt = datetime.strptime(s, "%m/%d/%y")
-            if dt.year < 2000:
-                dt = dt.replace(year=dt.year + 2000)
-            return dt
+        for path, events in ndlutil_parser.iter_files_events(file_paths, max_workers):
+            yield (path, *CustomerOrderService._records_from_events(events))
 
+    @staticmethod
+    def parse_txt_order_files(file_paths: List[str],
+                              max_workers: Optional[int] = None) -> List[Tuple[str, List[Dict], List[Dict]]]:
+        """
+        批量解析多个 TXT（多个文件时使用进程池并行解析）
+        返回 [(file_path, orders, order_lines), ...]，顺序与输入一致
+        """
+        return list(CustomerOrderService.iter_txt_order_files(file_paths, max_workers))
+
+    @staticmethod
+    def _records_from_events(events) -> Tuple[List[Dict], List[Dict]]:
+        """把解析事件转换为入库用的 orders / order_lines 记录"""
         orders: List[Dict] = []
         order_lines: List[Dict] = []
 
-        raw = Path(file_path).read_text(encoding="utf-8", errors="ignore")
-        lines = raw.splitlines()
+        # 同一文件中日期大量重复，转换结果按原文缓存
+        iso_dates: Dict[str, str] = {}
+        delivery_weeks: Dict[str, Tuple[str, str]] = {}
 
-        sup_code = sup_name = None
-        item = None
+        def to_iso(s: str) -> str:
+            if s not in iso_dates:
+                iso_dates[s] = CustomerOrderService._parse_mmddyy_to_iso(s)
+            return iso_dates[s]
 
-        # header_*: Supplier 段落的头字段；后续 Item 出现时继承
-        header_po = header_rel_id = header_rel_date = None
-        header_receipt_qty = header_cum_received = None
+        for kind, ev in events:
+            sup_code, item = ev["Supplier"], ev["Item"]
+            rel_date = ev["ReleaseDate"]
+            receipt_qty, cum_received = ev["ReceiptQuantity"], ev["CumReceived"]
 
-        # 当前 Item 的头字段（默认继承 header_*，若遇到新值则覆盖）
-        po = rel_id = rel_date = None
-        receipt_qty = cum_received = None
-
-        capture_sup_name = False
+            if kind == ndlutil_parser.HEADER:
+                # 当前 supplier+item 的头信息
+                rec = {
+                    "OrderNumber": f"{sup_code}_{item}",
+                    "SupplierCode": sup_code,
+                    "SupplierName": ev["SupplierName"] or "",
+                    "CustomerCode": "",
+                    "CustomerName": "",
+                    "ReleaseDate": "",
+                    "ReleaseId": ev["ReleaseId"] or "",
+                    "Buyer": "",
+                    "ShipToAddress": "",
+                    "ReceiptQuantity": 0.0,
+                    "CumReceived": 0.0,
+                    "Project": "",
+                    "PurchaseOrder": ev["PurchaseOrder"] or "",
+                }
+                if rel_date:
+                    try:
+                        rec["ReleaseDate"] = to_iso(rel_date)
+                    except Exception:
+                        rec["ReleaseDate"] = rel_date  # 兜底存原文
+                if receipt_qty is not None:
+                    rec["ReceiptQuantity"] = float(str(receipt_qty).replace(",", ""))
+                if cum_received is not None:
+                    rec["CumReceived"] = float(str(cum_received).replace(",", ""))
+                orders.append(rec)
+                continue
 
-        def flush_order_header():
-            """把当前 supplier+item 的头信息写入 orders"""
-            nonlocal po, rel_id, rel_date, receipt_qty, cum_received
-            if not (sup_code and item):
-                return
-            rec = {
+            # 计划行（日期 + FP + 数量）
+            d_s = ev["Date"]
+            if d_s not in delivery_weeks:
+                dt = datetime.strptime(to_iso(d_s), "%Y-%m-%d")
+                delivery_weeks[d_s] = (dt.strftime("%Y-%m-%d"), f"CW{dt.isocalendar()[1]:02d}")
+            delivery_date, calendar_week = delivery_weeks[d_s]
+            fp = ev["OrderType"].upper()
+            qty = float(ev["Qty"].replace(",", ""))
+            order_lines.append({
                 "OrderNumber": f"{sup_code}_{item}",
+                "ItemNumber": item,
+                "ItemDescription": "PEMM ASSY",
+                "UnitOfMeasure": "EA",
+                "DeliveryDate": delivery_date,
+                "CalendarWeek": calendar_week,
+                "OrderType": fp if fp in ("F", "P") else "P",
+                "RequiredQty": qty,
+                "CumulativeQty": qty,
+                "NetRequiredQty": qty,
+                "InTransitQty": 0,
+                "ReceivedQty": 0,
+                "LineStatus": "Active",
                 "SupplierCode": sup_code,
-                "SupplierName": sup_name or "",
-                "CustomerCode": "",
-                "CustomerName": "",
-                "ReleaseDate": "",
-                "ReleaseId": rel_id or "",
-                "Buyer": "",
-                "ShipToAddress": "",
-                "ReceiptQuantity": 0.0,
-                "CumReceived": 0.0,
-                "Project": "",
-                "PurchaseOrder": po or "",
-            }
-            if rel_date:
-                try:
-                    rec["ReleaseDate"] = CustomerOrderService._parse_mmddyy_to_iso(rel_date)
-                except Exception:
-                    rec["ReleaseDate"] = rel_date  # 兜底存原文
-            if receipt_qty is not None:
-                rec["ReceiptQuantity"] = float(str(receipt_qty).replace(",", ""))
-            if cum_received is not None:
-                rec["CumReceived"] = float(str(cum_received).replace(",", ""))
-            orders.append(rec)
-
-        for ln in lines:
-            # Supplier 行
-            m = RE_SUPPLIER.search(ln)
-            if m:
-                flush_order_header()
-                sup_code = m.group(1)
-                sup_name = None
-                capture_sup_name = True
-                # 重置 header_* 与当前 item 值
-                header_po = header_rel_id = header_rel_date = None
-                header_receipt_qty = header_cum_received = None
-                item = None
-                po = rel_id = rel_date = None
-                receipt_qty = cum_received = None
-                continue
-
-            # Supplier 名称：在 Supplier: 行之后直到 Ship-To: 之前的第一行非空白
-            if capture_sup_name:
-                if RE_SHIPTO.search(ln):
-                    capture_sup_name = False
-                    continue
-                t = ln.strip()
-                if t:
-                    sup_name = sup_name or t
-                    capture_sup_name = False
-                continue
-
-            # 头字段（同一行可多字段同时出现，不使用 continue）
-            m = RE_PO.search(ln)
-            if m:
-                if item:  po = m.group(1)
-                else:     header_po = m.group(1)
-            m = RE_RELID.search(ln)
-            if m:
-                if item:  rel_id = m.group(1)
-                else:     header_rel_id = m.group(1)
-            m = RE_RELD.search(ln)
-            if m:
-                if item:  rel_date = m.group(1)
-                else:     header_rel_date = m.group(1)
-            m = RE_RECEIPT_Q.search(ln)
-            if m:
-                if item:  receipt_qty = m.group(1)
-                else:     header_receipt_qty = m.group(1)
-            m = RE_CUM_RECV.search(ln)
-            if m:
-                if item:  cum_received = m.group(1)
-                else:     header_cum_received = m.group(1)
-
-            # Item Number 行：切换当前 PN，并继承 header_* 值
-            m = RE_ITEM.search(ln)
-            if m:
-                flush_order_header()
-                item = m.group(1)
-                po = header_po
-                rel_id = header_rel_id
-                rel_date = header_rel_date
-                receipt_qty = header_receipt_qty
-                cum_received = header_cum_received
-                continue
+                "SupplierName": ev["SupplierName"] or "",
+                "ReleaseId": ev["ReleaseId"] or "",
+                "ReleaseDate": (to_iso(rel_date) if rel_date else ""),
+                "PurchaseOrder": ev["PurchaseOrder"] or "",
+                "ReceiptQuantity": float(str(receipt_qty or "0").replace(",", "")),
+                "CumReceived": float(str(cum_received or "0").replace(",", "")),
+            })
 
-            # 计划行（日期 + FP + 数量）
-            m = RE_LINE.match(ln)
-            if m and sup_code and item:
-                d_s, fp, qty_s = m.groups()
-                dt = mmddyy_to_dt(d_s)
-                qty = float(qty_s.replace(",", ""))
-                order_lines.append({
-                    "OrderNumber": f"{sup_code}_{item}",
-                    "ItemNumber": item,
-                    "ItemDescription": "PEMM ASSY",
-                    "UnitOfMeasure": "EA",
-                    "DeliveryDate": dt.strftime("%Y-%m-%d"),
-                    "CalendarWeek": f"CW{dt.isocalendar()[1]:02d}",
-                    "OrderType": fp.upper() if fp.upper() in ("F", "P") else "P",
-                    "RequiredQty": qty,
-                    "CumulativeQty": qty,
-                    "NetRequiredQty": qty,
-                    "InTransitQty": 0,
-                    "ReceivedQty": 0,
-                    "LineStatus": "Active",
-                    "SupplierCode": sup_code,
-                    "SupplierName": sup_name or "",
-                    "ReleaseId": rel_id or "",
-                    "ReleaseDate": (CustomerOrderService._parse_mmddyy_to_iso(rel_date) if rel_date else ""),
-                    "PurchaseOrder": po or "",
-                    "ReceiptQuantity": float(str(receipt_qty or "0").replace(",", "")),
-                    "CumReceived": float(str(cum_received or "0").replace(",", "")),
-                })
-
-        # 收尾：最后一个 item 的头信息落盘
-        flush_order_header()
         return orders, order_lines
 
     # ------------------------- 导入/删除 -------------------------
     @staticmethod
+    @profiled()
     def import_orders_from_txt(file_path: str, import_user: str = "System") -> Tuple[bool, str, int]:
-        """导入 TXT 到 DB；保证 CustomerOrders.OrderYear（NOT NULL）被正确写入。"""
+        """
+        导入 TXT 到 DB；保证 CustomerOrders.OrderYear（NOT NULL）被正确写入。
+        明细一次遍历分组，头表/行表批量写入，整个导入在同一事务中完成，并输出各阶段耗时。
+        """
+        t0 = time.perf_counter()
         try:
             orders, order_lines = CustomerOrderService.parse_txt_order_file(file_path)
+        except Exception as e:
+            return False, f"导入失败: {e}", 0
+        return CustomerOrderService._import_parsed_orders(
+            file_path, orders, order_lines, import_user, time.perf_counter() - t0)
+
+    @staticmethod
+    @profiled()
+    def import_orders_from_txt_files(file_paths: List[str],
+                                     import_user: str = "System") -> List[Tuple[str, bool, str, int]]:
+        """
+        批量导入多个 TXT：按文件流式解析（多个文件时进程池并行），
+        每个文件解析完成后立即写入（每个文件一个导入版本、一个事务），不等待其余文件
+        返回 [(file_path, 成功, 消息, 导入ID), ...]，顺序与输入一致；某个文件解析失败不影响其余文件
+        """
+        results: List[Tuple[str, bool, str, int]] = []
+        t0 = time.perf_counter()
+        for path, events in ndlutil_parser.iter_files_events(file_paths):
+            try:
+                orders, order_lines = CustomerOrderService._records_from_events(events)
+            except Exception as e:
+                results.append((path, False, f"导入失败: {e}", 0))
+                t0 = time.perf_counter()
+                continue
+            parse_seconds = time.perf_counter() - t0
+            results.append((path, *CustomerOrderService._import_parsed_orders(
+                path, orders, order_lines, import_user, parse_seconds)))
+            t0 = time.perf_counter()
+        return results
+
+    @staticmethod
+    def _import_parsed_orders(file_path: str, orders: List[Dict], order_lines: List[Dict],
+                              import_user: str, parse_seconds: float) -> Tuple[bool, str, int]:
+        """把已解析的 orders / order_lines 写入数据库（parse_seconds 为解析耗时，计入耗时日志）"""
+        try:
+            timings: List[Tuple[str, float]] = [("解析", parse_seconds)]
+            t1 = time.perf_counter()
             if not orders:
                 return False, "没有解析到有效的订单数据", 0
 
             file_name = os.path.basename(file_path)
             now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-            with get_conn() as conn:
+            # 以 (Supplier, Item) → CW 维度一次遍历聚合，保持行的原始顺序
+            groups: Dict[Tuple[str, str], Dict[str, List[Dict]]] = {}
+            for ln in order_lines:
+                key = (ln["SupplierCode"], ln["ItemNumber"])
+                groups.setdefault(key, {}).setdefault(ln["CalendarWeek"], []).append(ln)
+
+            order_map = {o["OrderNumber"]: o for o in orders}
+
+            # 头表按 (Supplier, CW, OrderYear) 唯一；OrderYear 取该周第一条 DeliveryDate 的 ISO 年
+            headers: Dict[Tuple[str, str, int], Tuple] = {}
+            planned_lines: List[Tuple[Tuple[str, str, int], Dict]] = []
+            for (sup, item), by_week in groups.items():
+                oi = order_map.get(f"{sup}_{item}", {})
+                for cw in sorted(by_week):
+                    week_lines = by_week[cw]
+                    order_year = datetime.strptime(week_lines[0]["DeliveryDate"], "%Y-%m-%d").date().isocalendar()[0]
+                    header_key = (sup, cw, order_year)
+                    if header_key not in headers:
+                        headers[header_key] = (
+                            f"{sup}_{item}_{cw}",
+                            cw, order_year,
+                            sup, oi.get("SupplierName", ""),
+                            oi.get("CustomerCode", ""), oi.get("CustomerName", ""),
+                            oi.get("ReleaseDate", ""), oi.get("ReleaseId", ""),
+                            oi.get("Buyer", ""), oi.get("ShipToAddress", ""),
+                            oi.get("ReceiptQuantity", 0.0), oi.get("CumReceived", 0.0),
+                            oi.get("Project", ""), "Active",
+                            now, now
+                        )
+                    planned_lines.extend((header_key, ln) for ln in week_lines)
+            t2 = time.perf_counter()
+            timings.append(("分组", t2 - t1))
+
+            with transaction() as conn:
                 # 新建导入历史
                 cur = conn.execute("""
                     INSERT INTO OrderImportHistory
@@ -224,86 +240,61 @@ class CustomerOrderService:
                 """, (file_name, now, len(orders), len(order_lines), 'Success', import_user))
                 import_id = cur.lastrowid
 
-                # 以 (Supplier, Item) 维度聚合
-                groups: Dict[Tuple[str, str], Dict] = {}
-                for ln in order_lines:
-                    key = (ln["SupplierCode"], ln["ItemNumber"])
-                    g = groups.setdefault(key, {"order_info": {}, "weeks": set(), "lines": []})
-                    g["weeks"].add(ln["CalendarWeek"])
-                    g["lines"].append(ln)
-
-                order_map = {o["OrderNumber"]: o for o in orders}
-                for (sup, item), g in groups.items():
-                    g["order_info"] = order_map.get(f"{sup}_{item}", {})
-
-                # 写入头表 + 行表；头表按 (Supplier, CW, OrderYear) 唯一
-                for (sup, item), g in groups.items():
-                    for cw in sorted(g["weeks"]):
-                        # 计算 OrderYear：取该周任意一条 DeliveryDate 的 ISO 年
-                        order_year = None
-                        for ln in g["lines"]:
-                            if ln["CalendarWeek"] == cw:
-                                d = datetime.strptime(ln["DeliveryDate"], "%Y-%m-%d").date()
-                                order_year = d.isocalendar()[0]
-                                break
-                        if order_year is None:
-                            order_year = datetime.now().year
-
-                        # 是否已存在
-                        row = conn.execute("""
-                            SELECT OrderId FROM CustomerOrders
-                            WHERE ImportId = ? AND SupplierCode = ? AND CalendarWeek = ? AND OrderYear = ?
-                        """, (import_id, sup, cw, order_year)).fetchone()
-
-                        if row:
-                            order_id = row["OrderId"]
-                        else:
-                            oi = g["order_info"]
-                            cur = conn.execute("""
-                                INSERT INTO CustomerOrders
-                                (OrderNumber, ImportId, CalendarWeek, OrderYear,
-                                 SupplierCode, SupplierName,
-                                 CustomerCode, CustomerName,
-                                 ReleaseDate, ReleaseId, Buyer, ShipToAddress,
-                                 ReceiptQuantity, CumReceived, Project, OrderStatus,
-                                 CreatedDate, UpdatedDate)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                f"{sup}_{item}_{cw}",
-                                import_id, cw, order_year,
-                                sup, oi.get("SupplierName", ""),
-                                oi.get("CustomerCode", ""), oi.get("CustomerName", ""),
-                                oi.get("ReleaseDate", ""), oi.get("ReleaseId", ""),
-                                oi.get("Buyer", ""), oi.get("ShipToAddress", ""),
-                                oi.get("ReceiptQuantity", 0.0), oi.get("CumReceived", 0.0),
-                                oi.get("Project", ""), "Active",
-                                now, now
-                            ))
-                            order_id = cur.lastrowid
-
-                        # 行表：仅写当前 CW 的行
-                        for ln in g["lines"]:
-                            if ln["CalendarWeek"] != cw:
-                                continue
-                            exists = conn.execute("""
-                                SELECT LineId FROM CustomerOrderLines
-                                WHERE OrderId = ? AND ItemNumber = ? AND DeliveryDate = ?
-                            """, (order_id, ln["ItemNumber"], ln["DeliveryDate"])).fetchone()
-                            if not exists:
-                                conn.execute("""
-                                    INSERT INTO CustomerOrderLines
-                                    (OrderId, ImportId, ItemNumber, ItemDescription, UnitOfMeasure,
-                                     DeliveryDate, CalendarWeek, OrderType, RequiredQty, CumulativeQty,
-                                     NetRequiredQty, InTransitQty, ReceivedQty, LineStatus,
-                                     CreatedDate, UpdatedDate)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                """, (
-                                    order_id, import_id, ln["ItemNumber"], ln["ItemDescription"], ln["UnitOfMeasure"],
-                                    ln["DeliveryDate"], ln["CalendarWeek"], ln["OrderType"], ln["RequiredQty"],
-                                    ln["CumulativeQty"], ln["NetRequiredQty"], ln["InTransitQty"], ln["ReceivedQty"],
-                                    ln["LineStatus"], now, now
-                                ))
-                conn.commit()
+                # 头表批量写入，再一次查询取回 OrderId
+                conn.executemany("""
+                    INSERT INTO CustomerOrders
+                    (OrderNumber, ImportId, CalendarWeek, OrderYear,
+                     SupplierCode, SupplierName,
+                     CustomerCode, CustomerName,
+                     ReleaseDate, ReleaseId, Buyer, ShipToAddress,
+                     ReceiptQuantity, CumReceived, Project, OrderStatus,
+                     CreatedDate, UpdatedDate)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(h[0], import_id) + h[1:] for h in headers.values()])
+
+                order_ids = {
+                    (r["SupplierCode"], r["CalendarWeek"], r["OrderYear"]): r["OrderId"]
+                    for r in conn.execute("""
+                        SELECT OrderId, SupplierCode, CalendarWeek, OrderYear
+                        FROM CustomerOrders WHERE ImportId = ?
+                    """, (import_id,))
+                }
+                t3 = time.perf_counter()
+                timings.append(("写入头表", t3 - t2))
+
+                # 行表批量写入；同一订单下 (ItemNumber, DeliveryDate) 重复时保留第一条
+                # （先在内存中去重，避免冲突行占用自增 LineId）
+                line_params = []
+                seen_lines = set()
+                for header_key, ln in planned_lines:
+                    order_id = order_ids[header_key]
+                    line_key = (order_id, ln["ItemNumber"], ln["DeliveryDate"])
+                    if line_key in seen_lines:
+                        continue
+                    seen_lines.add(line_key)
+                    line_params.append((
+                        order_id, import_id, ln["ItemNumber"], ln["ItemDescription"], ln["UnitOfMeasure"],
+                        ln["DeliveryDate"], ln["CalendarWeek"], ln["OrderType"], ln["RequiredQty"],
+                        ln["CumulativeQty"], ln["NetRequiredQty"], ln["InTransitQty"], ln["ReceivedQty"],
+                        ln["LineStatus"], now, now
+                    ))
+                conn.executemany("""
+                    INSERT INTO CustomerOrderLines
+                    (OrderId, ImportId, ItemNumber, ItemDescription, UnitOfMeasure,
+                     DeliveryDate, CalendarWeek, OrderType, RequiredQty, CumulativeQty,
+                     NetRequiredQty, InTransitQty, ReceivedQty, LineStatus,
+                     CreatedDate, UpdatedDate)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(OrderId, ItemNumber, DeliveryDate) DO NOTHING
+                """, line_params)
+                t4 = time.perf_counter()
+                timings.append(("写入行表", t4 - t3))
+
+            timings.append(("提交", time.perf_counter() - t4))
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("[import_orders_from_txt] %s: %s，合计 %.3fs", file_name,
+                            "，".join(f"{stage} {seconds:.3f}s" for stage, seconds in timings),
+                            parse_seconds + time.perf_counter() - t1)
 
             return True, f"成功导入 {len(orders)} 个订单，{len(order_lines)} 行明细", import_id
         except Exception as e:
@@ -334,7 +325,7 @@ class CustomerOrderService:
                 """)
                 return [dict(r) for r in cur.fetchall()]
         except Exception as e:
-            print("获取导入历史失败:", e)
+            logger.error("获取导入历史失败: %s", e)
             return []
 
     @staticmethod
@@ -345,6 +336,7 @@ class CustomerOrderService:
         return item_number[:-1]
 
     @staticmethod
+    @profiled()
     def get_ndlutil_kanban_data(import_id: Optional[int] = None,
                                 start_date: Optional[str] = None,
                                 end_date: Optional[str] = None) -> List[Dict]:
@@ -428,7 +420,7 @@ class CustomerOrderService:
                 rows.sort(key=sort_key)
                 return rows
         except Exception as e:
-            print("获取NDLUtil看板数据失败:", e)
+            logger.error("获取NDLUtil看板数据失败: %s", e)
             return []
 
     @staticmethod
@@ -448,7 +440,7 @@ class CustomerOrderService:
                 """, (import_id,))
                 return [dict(r) for r in cur.fetchall()]
         except Exception as e:
-            print("获取版本订单数据失败:", e)
+            logger.error("获取版本订单数据失败: %s", e)
             return []
 
     @staticmethod
@@ -518,5 +510,5 @@ class CustomerOrderService:
                 rows.sort(key=sort_key)
                 return rows
         except Exception as e:
-            print("获取版本订单明细数据失败:", e)
+            logger.error("获取版本订单明细数据失败: %s", e)
             return []
@@ -2,10 +2,15 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
 import re
+from datetime import date
 from typing import List, Dict, Tuple, Optional
+from app.db import query_all, query_one, transaction
 from app.services.inventory_service import InventoryService
 from app.services.item_service import ItemService
-from app.services.warehouse_service import WarehouseService
+from app.utils.excel_reader import cell_text, is_blank, iter_sheet_records
+from app.utils.perf import get_logger, profiled
+
+logger = get_logger(__name__)
 
 class InventoryImportService:
     """库存导入服务"""
@@ -44,33 +49,117 @@ class InventoryImportService:
         return normalized.upper()
     
     @staticmethod
-    def find_matching_item(item_code: str, item_spec: str = None) -> Optional[Dict]:
-        """根据编码和规格查找匹配的物料"""
+    def build_item_index(items: List[Dict] = None) -> Dict:
+        """
+        构建物料匹配索引（一次加载、一次标准化）
+        - by_code: 标准化编码 → 首个物料
+        - by_code_spec: (标准化编码, 标准化规格) → 首个物料
+        物料按 ItemCode 排序，"首个"与逐条遍历的匹配结果一致
+        """
+        if items is None:
+            items = ItemService.get_all_items()
+        
+        by_code = {}
+        by_code_spec = {}
+        for item in items:
+            sys_code = InventoryImportService.normalize_code(item.get("ItemCode", ""))
+            sys_spec = InventoryImportService.normalize_spec(item.get("ItemSpec", ""))
+            by_code.setdefault(sys_code, item)
+            by_code_spec.setdefault((sys_code, sys_spec), item)
+        
+        return {"by_code": by_code, "by_code_spec": by_code_spec}
+    
+    @staticmethod
+    def find_matching_item(item_code: str, item_spec: str = None,
+                           item_index: Dict = None) -> Optional[Dict]:
+        """
+        根据编码和规格查找匹配的物料
+        编码必须匹配；如果导入数据有规格，则规格也必须匹配
+        批量导入时传入 build_item_index() 的结果，避免每次重新加载全部物料
+        """
+        if item_index is None:
+            item_index = InventoryImportService.build_item_index()
+        
         normalized_code = InventoryImportService.normalize_code(item_code)
         normalized_spec = InventoryImportService.normalize_spec(item_spec) if item_spec else ""
         
-        # 获取所有物料
-        all_items = ItemService.get_all_items()
+        if normalized_spec:
+            return item_index["by_code_spec"].get((normalized_code, normalized_spec))
+        return item_index["by_code"].get(normalized_code)
+    
+    @staticmethod
+    def load_warehouse_onhand(warehouse: str) -> Dict[int, float]:
+        """
+        一次查询仓库内全部物料的现存量（无库位），与 InventoryService.get_onhand 取值一致
+        """
+        rows = query_all("""
+            SELECT ItemId, COALESCE(QtyOnHand,0) AS q
+            FROM InventoryBalance
+            WHERE Warehouse=? AND IFNULL(Location,'')=''
+            ORDER BY rowid
+        """, (warehouse,))
         
-        for item in all_items:
-            # 标准化系统物料编码和规格
-            sys_code = InventoryImportService.normalize_code(item.get("ItemCode", ""))
-            sys_spec = InventoryImportService.normalize_spec(item.get("ItemSpec", ""))
-            
-            # 编码必须匹配
-            if sys_code != normalized_code:
-                continue
+        onhand = {}
+        for r in rows:
+            onhand.setdefault(r["ItemId"], float(r["q"]))
+        return onhand
+    
+    @staticmethod
+    def apply_stock_changes(warehouse: str, link_item_ids: List[int],
+                            balances: Dict[int, Tuple[bool, float]],
+                            transactions: List[Tuple]) -> None:
+        """
+        在一个事务中批量写入：仓库-物料关联、库存流水（ADJ）、库存余额
+        balances: ItemId → (余额记录是否已存在, 最终现存量)
+        transactions: (ItemId, TxDate, Qty, Warehouse, Remark)
+        """
+        warehouse_row = query_one(
+            "SELECT WarehouseId FROM Warehouses WHERE Code=? AND IsActive=1", (warehouse,)
+        )
+        if not warehouse_row:
+            logger.error("添加物料到仓库失败：仓库 '%s' 不存在或已停用", warehouse)
+        
+        with transaction() as conn:
+            if warehouse_row and link_item_ids:
+                # 已关联的物料不再插入（冲突忽略同样会消耗自增ID）
+                linked = {r["ItemId"] for r in conn.execute(
+                    "SELECT ItemId FROM WarehouseItems WHERE WarehouseId=?",
+                    (warehouse_row["WarehouseId"],)
+                )}
+                link_item_ids = [item_id for item_id in link_item_ids if item_id not in linked]
+                conn.executemany("""
+                    INSERT OR IGNORE INTO WarehouseItems(WarehouseId,ItemId,MinQty,MaxQty,ReorderPoint)
+                    VALUES(?,?,0,0,0)
+                """, [(warehouse_row["WarehouseId"], item_id) for item_id in link_item_ids])
             
-            # 如果导入数据有规格，则规格也必须匹配
-            if normalized_spec:
-                if sys_spec != normalized_spec:
-                    continue
+            if transactions:
+                # 与 add_inventory_transaction 的 ADJ 流水一致：无单价，TotalCost 为 0
+                conn.executemany("""
+                    INSERT INTO InventoryTx
+                    (ItemId, TxDate, TxType, Qty, UnitCost, TotalCost,
+                     Warehouse, Location, BatchNo, RefType, RefId, Remark)
+                    VALUES (?, ?, 'ADJ', ?, NULL, 0.0, ?, NULL, NULL, NULL, NULL, ?)
+                """, transactions)
             
-            return item
-        
-        return None
+            updates = [(qty, item_id, warehouse)
+                       for item_id, (exists, qty) in balances.items() if exists]
+            inserts = [(item_id, warehouse, qty)
+                       for item_id, (exists, qty) in balances.items() if not exists]
+            if updates:
+                conn.executemany("""
+                    UPDATE InventoryBalance
+                    SET QtyOnHand=?, LastUpdated=CURRENT_TIMESTAMP
+                    WHERE ItemId=? AND Warehouse=? AND IFNULL(Location,'')=''
+                """, updates)
+            if inserts:
+                conn.executemany("""
+                    INSERT INTO InventoryBalance
+                    (ItemId, Warehouse, Location, QtyOnHand, UnitCost, LastUpdated)
+                    VALUES (?, ?, NULL, ?, 0, CURRENT_TIMESTAMP)
+                """, inserts)
     
     @staticmethod
+    @profiled()
     def import_inventory_from_file(file_path: str, warehouse: str = "默认仓库") -> Tuple[bool, str, List[Dict]]:
         """
         从文件导入库存数据（支持Excel和CSV格式，支持重复物资累计计算）
@@ -110,7 +199,7 @@ class InventoryImportService:
                     except UnicodeDecodeError:
                         continue
                     except Exception as e:
-                        print(f"尝试编码 {encoding} 时出错: {e}")
+                        logger.debug("尝试编码 %s 时出错: %s", encoding, e)
                         continue
                 
                 if df is None:
@@ -121,77 +210,72 @@ class InventoryImportService:
                 # 检查数据是否为空
                 if df.empty:
                     return False, "文件为空或没有有效数据", [], []
+                
+                columns = list(df.columns)
+                records = enumerate(df.itertuples(index=False, name=None))
                     
             elif file_path.lower().endswith(('.xlsx', '.xls')):
-                # 读取Excel文件
-                df = pd.read_excel(file_path, header=0)
+                # 流式读取Excel文件
+                columns, records = iter_sheet_records(file_path)
                 used_encoding = "Excel格式"
             else:
                 return False, "不支持的文件格式，请使用CSV或Excel文件", [], []
             
-            # 智能识别列
-            item_code_column = None
-            spec_column = None
-            qty_column = None
+            # 智能识别列（取第一个包含关键字的列）
+            def find_column(keyword: str) -> Optional[int]:
+                return next((i for i, col in enumerate(columns) if keyword in str(col)), None)
             
             # 查找物料代码列
-            for col in df.columns:
-                if "物料代码" in str(col):
-                    item_code_column = col
-                    break
-            
-            if not item_code_column:
+            item_code_pos = find_column("物料代码")
+            if item_code_pos is None:
                 return False, "文件中未找到'物料代码'列", [], []
             
             # 查找规格型号列
-            for col in df.columns:
-                if "规格型号" in str(col):
-                    spec_column = col
-                    break
+            spec_pos = find_column("规格型号")
             
             # 查找数量列
-            for col in df.columns:
-                if "基本单位数量" in str(col):
-                    qty_column = col
-                    break
-            
-            if not qty_column:
+            qty_pos = find_column("基本单位数量")
+            if qty_pos is None:
                 return False, "文件中未找到'基本单位数量'列", [], []
             
             # 记录找到的列信息
-            found_columns = f"找到列：物料代码({item_code_column})"
-            if spec_column:
-                found_columns += f", 规格型号({spec_column})"
-            found_columns += f", 数量({qty_column})"
+            found_columns = f"找到列：物料代码({columns[item_code_pos]})"
+            if spec_pos is not None:
+                found_columns += f", 规格型号({columns[spec_pos]})"
+            found_columns += f", 数量({columns[qty_pos]})"
             
             # 添加编码信息
             if used_encoding:
                 found_columns += f" [文件编码：{used_encoding}]"
             
-            # 预处理：收集所有有效数据并进行累计计算
+            # 预处理：逐行收集所有有效数据（向后看一行以识别最后一行）
             raw_data = []
-            for index, row in df.iterrows():
+            current = next(records, None)
+            while current is not None:
+                index, values = current
+                current = next(records, None)
+                
+                # 获取数据
+                item_code = cell_text(values[item_code_pos])
+                
                 # 跳过最后一行合计行
-                if index == len(df) - 1:
-                    item_code = str(row.get(item_code_column, "")).strip()
+                if current is None:
                     if "合计" in item_code or "总计" in item_code or item_code == "":
                         continue
                 
-                # 获取数据
-                item_code = str(row.get(item_code_column, "")).strip()
-                item_spec = str(row.get(spec_column, "")).strip() if spec_column else None
+                item_spec = (cell_text(values[spec_pos]) or None) if spec_pos is not None else None
                 
                 # 处理空规格型号
                 if item_spec and item_spec.lower() in ['nan', 'none', 'null', '']:
                     item_spec = None
                 
                 try:
-                    qty = float(row.get(qty_column, 0))
+                    qty = float(values[qty_pos]) if not is_blank(values[qty_pos]) else 0
                 except (ValueError, TypeError):
                     qty = 0
                 
                 # 跳过空行
-                if not item_code or item_code == "":
+                if not item_code:
                     continue
                 
                 raw_data.append({
@@ -240,26 +324,47 @@ class InventoryImportService:
             success_count = 0
             error_count = 0
             
+            # 匹配索引与现存量各只加载一次，库存变更先在内存中计算，最后一次性写入
+            item_index = InventoryImportService.build_item_index()
+            onhand = InventoryImportService.load_warehouse_onhand(warehouse)
+            link_item_ids = []
+            linked = set()
+            balances = {}       # ItemId → (余额记录是否已存在, 最终现存量)
+            transactions = []
+            tx_date = date.today().strftime("%Y-%m-%d")
+            
             for key, data in accumulated_data.items():
                 # 查找匹配的物料
-                matched_item = InventoryImportService.find_matching_item(data["item_code"], data["item_spec"])
+                matched_item = InventoryImportService.find_matching_item(
+                    data["item_code"], data["item_spec"], item_index
+                )
                 
                 if matched_item:
                     try:
+                        item_id = matched_item["ItemId"]
+                        
                         # 自动建立物料和仓库的关联关系
-                        WarehouseService.add_item_by_warehouse_name(warehouse, matched_item["ItemId"])
+                        if item_id not in linked:
+                            linked.add(item_id)
+                            link_item_ids.append(item_id)
                         
-                        # 更新库存
-                        current_qty = InventoryService.get_onhand(matched_item["ItemId"], warehouse)
+                        # 更新库存（与 InventoryService.set_onhand 的计算规则一致）
+                        current_qty = onhand.get(item_id, 0.0)
                         diff = data["qty"] - current_qty
                         
                         if abs(diff) > 0.001:  # 有差异才更新
-                            InventoryService.set_onhand(
-                                matched_item["ItemId"], 
-                                warehouse, 
-                                data["qty"], 
-                                remark_prefix=f"文件导入累计({current_qty}→{data['qty']})"
-                            )
+                            remark_prefix = f"文件导入累计({current_qty}→{data['qty']})"
+                            transactions.append((
+                                item_id, tx_date, diff, warehouse,
+                                f"{remark_prefix}({current_qty}→{data['qty']})"
+                            ))
+                            if item_id in onhand:  # 已有余额记录（含本次导入新建的）
+                                new_qty = max(0, current_qty + diff)
+                                balances[item_id] = (balances.get(item_id, (True,))[0], new_qty)
+                                onhand[item_id] = float(new_qty)
+                            elif diff > 0:  # 首次正数才建余额
+                                balances[item_id] = (False, diff)
+                                onhand[item_id] = diff
                         
                         # 生成消息
                         if len(data["rows"]) > 1:
@@ -308,6 +413,9 @@ class InventoryImportService:
                     })
                     error_count += 1
             
+            # 一个事务内写入全部关联、流水和余额；失败时整体回滚
+            InventoryImportService.apply_stock_changes(warehouse, link_item_ids, balances, transactions)
+            
             # 生成结果消息
             if success_count > 0 and error_count == 0:
                 message = f"导入成功！共处理 {success_count} 条记录\n{found_columns}"
@@ -322,6 +430,7 @@ class InventoryImportService:
             return False, f"导入过程中发生错误：{str(e)}", [], []
     
     @staticmethod
+    @profiled()
     def import_inventory_from_excel(file_path: str, warehouse: str = "默认仓库") -> Tuple[bool, str, List[Dict]]:
         """
         从Excel文件导入库存数据（支持重复物资累计计算）
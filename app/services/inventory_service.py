@@ -3,6 +3,9 @@
 from typing import List, Dict, Optional
 from datetime import date
 from app.db import query_all, query_one, execute
+from app.utils.perf import get_logger
+
+logger = get_logger(__name__)
 
 class InventoryService:
     """
@@ -62,6 +65,72 @@ class InventoryService:
         
         return [dict(r) for r in query_all(sql, tuple(params))]
 
+    @staticmethod
+    def get_inventory_view(warehouse: Optional[str] = None,
+                           item_type: Optional[str] = None,
+                           keyword: Optional[str] = None) -> List[Dict]:
+        """
+        库存余额视图（一次查询）：启用物料 LEFT JOIN 库存余额，筛选与排序都在 SQL 中完成
+
+        Args:
+            warehouse: 仓库代码；为空时显示全部启用物料（每条余额一行，无余额的物料显示一行 0），
+                       指定时只显示该仓库中登记的物料及其在该仓库的余额
+            item_type: 物料类型（RM/SFG/FG/PKG），为空不筛选
+            keyword: 模糊匹配物料编码、名称、规格、品牌
+
+        Returns:
+            按 低于安全库存 → 有库存 → 库存为0 的顺序排列（同组内按物料编码）的行列表
+        """
+        where = ["i.IsActive = 1"]
+        params: List = []
+
+        if warehouse:
+            source = """
+                FROM Items i
+                JOIN WarehouseItems wi ON wi.ItemId = i.ItemId
+                JOIN Warehouses w ON wi.WarehouseId = w.WarehouseId AND w.Code = ? AND w.IsActive = 1
+                LEFT JOIN InventoryBalance ib ON ib.ItemId = i.ItemId AND ib.Warehouse = w.Code
+            """
+            warehouse_col = "w.Code"
+            params.append(warehouse)
+        else:
+            source = """
+                FROM Items i
+                LEFT JOIN InventoryBalance ib ON ib.ItemId = i.ItemId
+            """
+            warehouse_col = "COALESCE(ib.Warehouse, '')"
+
+        if item_type:
+            where.append("i.ItemType = ?")
+            params.append(item_type)
+
+        if keyword:
+            where.append("(i.ItemCode LIKE ? OR i.CnName LIKE ? OR i.ItemSpec LIKE ? OR i.Brand LIKE ?)")
+            params.extend([f"%{keyword}%"] * 4)
+
+        sql = f"""
+            SELECT * FROM (
+                SELECT
+                    i.ItemId, i.ItemCode, i.CnName, i.ItemSpec, i.ItemType, i.Unit, i.Brand,
+                    COALESCE(i.SafetyStock, 0) AS SafetyStock,
+                    {warehouse_col} AS Warehouse,
+                    COALESCE(ib.Location, '') AS Location,
+                    COALESCE(ib.QtyOnHand, 0) AS QtyOnHand,
+                    COALESCE(ib.UnitCost, 0) AS UnitCost
+                {source}
+                WHERE {' AND '.join(where)}
+            ) v
+            ORDER BY
+                CASE
+                    WHEN CAST(SafetyStock AS INTEGER) > 0
+                         AND CAST(QtyOnHand AS INTEGER) < CAST(SafetyStock AS INTEGER) THEN 0
+                    WHEN CAST(QtyOnHand AS INTEGER) > 0 THEN 1
+                    ELSE 2
+                END,
+                ItemCode, Warehouse, Location
+        """
+        return [dict(r) for r in query_all(sql, tuple(params))]
+
     @staticmethod
     def get_warehouses() -> List[str]:
         # 优先读新表 Warehouses；没有则从余额/流水兜底
@@ -234,7 +303,7 @@ class InventoryService:
             try:
                 InventoryService.add_inventory_transaction(t); ok += 1
             except Exception as e:
-                print("批量记账失败:", e, t)
+                logger.error("批量记账失败: %s %s", e, t)
         return ok
 
     @staticmethod
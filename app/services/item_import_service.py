@@ -3,6 +3,8 @@
 import pandas as pd
 from typing import List, Dict, Optional, Tuple
 from app.services.item_service import ItemService
+from app.utils.excel_reader import cell_text, iter_sheet_records
+from app.utils.perf import profiled
 
 class ItemImportService:
     """物料导入服务类"""
@@ -154,6 +156,7 @@ class ItemImportService:
         return import_duplicates, db_duplicates
     
     @staticmethod
+    @profiled()
     def import_items(data: List[Dict]) -> Tuple[int, List[str], List[str]]:
         """
         批量导入物料
@@ -203,30 +206,21 @@ class ItemImportService:
         返回: (数据列表, 错误信息列表)
         """
         try:
-            # 尝试读取Excel文件
-            df = pd.read_excel(file_path)
+            # 流式读取Excel文件
+            columns, records = iter_sheet_records(file_path)
             
             # 检查必需的列
             required_columns = ['代码', '名称', '全名', '规格型号']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in required_columns if col not in columns]
             if missing_columns:
                 return [], [f"缺少必需的列: {', '.join(missing_columns)}"]
             
-            # 转换为字典列表
-            data = df.to_dict('records')
-            
-            # 过滤空行
+            # 过滤空行并转换为字典列表（空值处理为空字符串）
+            key_positions = [columns.index(col) for col in required_columns[:2]]
             filtered_data = []
-            for row in data:
-                if any(pd.notna(row.get(col)) and str(row.get(col)).strip() for col in required_columns[:2]):
-                    # 处理NaN值
-                    cleaned_row = {}
-                    for key, value in row.items():
-                        if pd.isna(value):
-                            cleaned_row[key] = ''
-                        else:
-                            cleaned_row[key] = str(value).strip()
-                    filtered_data.append(cleaned_row)
+            for _, values in records:
+                if any(cell_text(values[pos]) for pos in key_positions):
+                    filtered_data.append({key: cell_text(value) for key, value in zip(columns, values)})
             
             return filtered_data, []
             
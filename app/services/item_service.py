@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 from typing import List, Dict, Optional
 from app.db import query_all, query_one, execute, get_last_id
+from app.services.bom_explosion_service import BomExplosionService
 
 class ItemService:
     """物料服务类（统一返回 dict）"""
@@ -91,16 +92,19 @@ class ItemService:
             item_id
         )
         execute(sql, params)
+        BomExplosionService.invalidate_cache()
 
     @staticmethod
     def delete_item(item_id) -> None:
         execute("DELETE FROM Items WHERE ItemId = ?", (item_id,))
+        BomExplosionService.invalidate_cache()
 
     @staticmethod
     def toggle_item_status(item_id: int, is_active: bool) -> None:
         """切换物料启用状态"""
         execute("UPDATE Items SET IsActive = ?, UpdatedDate = CURRENT_TIMESTAMP WHERE ItemId = ?", 
                 (1 if is_active else 0, item_id))
+        BomExplosionService.invalidate_cache()
 
     @staticmethod
     def search_items(search_text: str) -> List[Dict]:
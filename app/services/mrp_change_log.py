@@ -0,0 +1,55 @@
+# app/services/mrp_change_log.py
+# -*- coding: utf-8 -*-
+"""
+MRP 数据变更日志读取
+MrpChangeLog 由 schema.sql 中的触发器维护：客户订单、库存、BOM、物料变更时记录变更键，
+ChangeId 单调递增，可作为 MRP 输入数据的版本号（增量MRP计算、MRP结果快照与缓存共用）
+"""
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterable, Set, Tuple
+
+from app.db import query_all, query_one
+
+# 记录变更日志的表（MRP 看板计算的全部输入）
+MRP_INPUT_TABLES = ("CustomerOrderLines", "CustomerOrders", "InventoryBalance",
+                    "BomHeaders", "BomLines", "Items")
+
+
+class MRPChangeLog:
+    """MrpChangeLog 读取"""
+
+    @staticmethod
+    def is_missing(error: Exception) -> bool:
+        """是否为数据库中缺少 MrpChangeLog 表（如导入了旧版本数据库）导致的错误"""
+        return isinstance(error, sqlite3.OperationalError) and "MrpChangeLog" in str(error)
+
+    @staticmethod
+    def current_id() -> int:
+        """当前最大变更号（计算开始前读取，计算期间的变更留给下一次）"""
+        row = query_one("SELECT MAX(ChangeId) AS ChangeId FROM MrpChangeLog")
+        return int(row["ChangeId"] or 0) if row else 0
+
+    @staticmethod
+    def table_versions(tables: Iterable[str] = MRP_INPUT_TABLES) -> Dict[str, int]:
+        """各表的数据版本（该表最新变更号，无变更记录为 0），走 (TableName, ChangeId) 索引"""
+        versions = {}
+        for table in tables:
+            row = query_one("SELECT MAX(ChangeId) AS ChangeId FROM MrpChangeLog WHERE TableName = ?", (table,))
+            versions[table] = int(row["ChangeId"] or 0) if row else 0
+        return versions
+
+    @staticmethod
+    def changes_since(change_id: int) -> Tuple[int, Dict[str, Set[str]]]:
+        """变更号之后的变更：(最新变更号, {表名: 变更键集合})"""
+        rows = query_all("""
+            SELECT ChangeId, TableName, ChangeKey
+            FROM MrpChangeLog
+            WHERE ChangeId > ?
+        """, (change_id,))
+        latest = change_id
+        changes: Dict[str, Set[str]] = defaultdict(set)
+        for r in rows:
+            latest = max(latest, int(r["ChangeId"]))
+            changes[r["TableName"]].add(r["ChangeKey"])
+        return latest, changes
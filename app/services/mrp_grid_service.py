@@ -0,0 +1,158 @@
+# app/services/mrp_grid_service.py
+# -*- coding: utf-8 -*-
+"""
+MRP 矩阵计算核心
+- 成品需求：父物料 × 日期 的稠密矩阵
+- BOM：父物料 × 子件 的用量矩阵（多级取扁平化累计用量，单级取 BomLines.QtyPer）
+- 子件需求 = BOMᵀ · 成品需求，运行库存 = 期初库存 - 按列累计需求
+- 只在最后一步转换为看板需要的 cells 字典
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.db import query_all
+from app.services.bom_explosion_service import BomExplosionService
+
+# SQLite 单条语句的参数个数有限，IN 列表分批
+_IN_CHUNK = 500
+
+
+class BomMatrix:
+    """父物料 × 子件 的用量矩阵，附带子件元数据（按首次出现顺序）"""
+
+    def __init__(self, parent_ids: List[int], child_ids: List[int],
+                 child_meta: Dict[int, Dict], qty: np.ndarray,
+                 linked: Optional[np.ndarray] = None):
+        self.parent_ids = parent_ids
+        self.child_ids = child_ids
+        self.child_meta = child_meta
+        self.qty = qty
+        # 父物料是否含该子件（用量为 0 的BOM行也算包含）
+        self.linked = linked if linked is not None else qty != 0
+
+    def explode(self, parent_demand: np.ndarray) -> np.ndarray:
+        """成品需求矩阵（父物料 × 日期）→ 子件需求矩阵（子件 × 日期），数量<=0 的需求不展开"""
+        if not self.child_ids:
+            return np.zeros((0, parent_demand.shape[1]))
+        return self.qty.T @ np.clip(parent_demand, 0.0, None)
+
+
+class MRPGridService:
+    """MRP 矩阵计算服务"""
+
+    @staticmethod
+    def active_parents(parent_demand: Dict[int, Dict[str, float]]) -> List[int]:
+        """有正数需求的父物料（保持原有顺序），数量<=0 的需求不参与展开"""
+        return [pid for pid, by_date in parent_demand.items()
+                if any(qty > 0 for qty in by_date.values())]
+
+    @staticmethod
+    def demand_matrix(demand: Dict[int, Dict[str, float]], item_ids: List[int],
+                      dates: List[str]) -> np.ndarray:
+        """构建 物料 × 日期 的稠密需求矩阵，不在 dates 中的日期被忽略"""
+        col = {d: j for j, d in enumerate(dates)}
+        matrix = np.zeros((len(item_ids), len(dates)))
+        for i, item_id in enumerate(item_ids):
+            for d, qty in demand.get(item_id, {}).items():
+                j = col.get(d)
+                if j is not None:
+                    matrix[i, j] += qty
+        return matrix
+
+    @staticmethod
+    def flat_bom_matrix(parent_ids: List[int],
+                        include_types: Optional[Tuple[str, ...]] = None) -> BomMatrix:
+        """
+        基于扁平化BOM（多级、含损耗）构建用量矩阵
+        child_meta 保留扁平化记录中的全部字段（ItemType 为空时记为 ""）
+        """
+        flats = BomExplosionService.get_flat_boms(parent_ids)
+
+        child_index: Dict[int, int] = {}
+        child_meta: Dict[int, Dict] = {}
+        entries: List[Tuple[int, int, float]] = []
+        for p, parent_id in enumerate(parent_ids):
+            for cid, entry in flats.get(parent_id, {}).items():
+                itype = entry.get("ItemType") or ""
+                if include_types and itype not in include_types:
+                    continue
+                cid = int(cid)
+                if cid not in child_index:
+                    child_index[cid] = len(child_index)
+                    child_meta[cid] = dict(entry, ItemType=itype)
+                entries.append((p, child_index[cid], float(entry.get("CumQtyPer") or 0.0)))
+
+        return MRPGridService._build_matrix(parent_ids, child_index, child_meta, entries)
+
+    @staticmethod
+    def single_level_bom_matrix(parent_ids: List[int]) -> BomMatrix:
+        """
+        基于有效BOM的直接子件（单级、不含损耗、仅启用物料）构建用量矩阵
+        每个父物料取 BomId 最小的有效BOM，一次查询完成
+        """
+        child_index: Dict[int, int] = {}
+        child_meta: Dict[int, Dict] = {}
+        entries: List[Tuple[int, int, float]] = []
+        row_of = {pid: p for p, pid in enumerate(parent_ids)}
+
+        for start in range(0, len(parent_ids), _IN_CHUNK):
+            chunk = parent_ids[start:start + _IN_CHUNK]
+            placeholders = ",".join(["?"] * len(chunk))
+            rows = query_all(f"""
+                SELECT bh.ParentItemId, bl.ChildItemId, bl.QtyPer,
+                       i.ItemCode, i.CnName, i.ItemSpec, i.ItemType
+                FROM BomLines bl
+                JOIN (
+                    SELECT ParentItemId, MIN(BomId) AS BomId
+                    FROM BomHeaders
+                    WHERE IsActive = 1 AND ParentItemId IN ({placeholders})
+                    GROUP BY ParentItemId
+                ) bh ON bl.BomId = bh.BomId
+                JOIN Items i ON bl.ChildItemId = i.ItemId
+                WHERE i.IsActive = 1
+                ORDER BY bh.ParentItemId, bl.LineId
+            """, tuple(chunk))
+
+            for r in rows:
+                cid = int(r["ChildItemId"])
+                if cid not in child_index:
+                    child_index[cid] = len(child_index)
+                    child_meta[cid] = {
+                        "ItemId": cid,
+                        "ItemCode": r["ItemCode"],
+                        "CnName": r["CnName"],
+                        "ItemSpec": r["ItemSpec"],
+                        "ItemType": r["ItemType"],
+                    }
+                entries.append((row_of[int(r["ParentItemId"])], child_index[cid],
+                                float(r["QtyPer"] or 0.0)))
+
+        return MRPGridService._build_matrix(parent_ids, child_index, child_meta, entries)
+
+    @staticmethod
+    def _build_matrix(parent_ids: List[int], child_index: Dict[int, int],
+                      child_meta: Dict[int, Dict],
+                      entries: List[Tuple[int, int, float]]) -> BomMatrix:
+        qty = np.zeros((len(parent_ids), len(child_index)))
+        linked = np.zeros((len(parent_ids), len(child_index)), dtype=bool)
+        for p, c, q in entries:
+            qty[p, c] += q
+            linked[p, c] = True
+        return BomMatrix(list(parent_ids), list(child_index), child_meta, qty, linked)
+
+    @staticmethod
+    def onhand_vector(item_ids: List[int], onhand: Dict[int, float]) -> np.ndarray:
+        """按 item_ids 顺序取期初库存，缺省为 0"""
+        return np.array([float(onhand.get(i, 0.0)) for i in item_ids], dtype=float)
+
+    @staticmethod
+    def running_stock(start_onhand: np.ndarray, plan: np.ndarray) -> np.ndarray:
+        """即时库存：本期库存 = 期初库存 - 截至本期的累计计划（允许为负以暴露缺口）"""
+        return start_onhand[:, None] - np.cumsum(plan, axis=1)
+
+    @staticmethod
+    def to_cells(dates: List[str], values: Iterable[float]) -> Dict[str, float]:
+        """矩阵的一行 → {日期: 数量}"""
+        return dict(zip(dates, np.asarray(values, dtype=float).tolist()))
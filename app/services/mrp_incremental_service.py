@@ -0,0 +1,403 @@
+# app/services/mrp_incremental_service.py
+# -*- coding: utf-8 -*-
+"""
+增量 MRP 计算（零部件MRP看板）
+- 数据变更由 schema.sql 中的触发器写入 MrpChangeLog：同一表同一变更键只保留最新的 ChangeId
+- 首次计算走完整流程，并保留中间结果（成品需求矩阵、BOM用量矩阵、子件计划/累计计划矩阵、期初库存）
+- 再次计算时只读取上次之后的变更：
+  * 客户订单行变更 → 只重新汇总受影响品牌对应成品的需求，重算受影响子件从首个变化日期起的计划与即时库存
+  * 库存余额变更 → 只更新受影响物料的期初库存和即时库存
+  * 只重建受影响子件的看板行，其余行沿用上次结果
+  * BOM、物料主数据、订单主表变更或日期列变化 → 回退为完整计算
+结果与 MRPService.calculate_mrp_kanban 相同
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.db import add_reset_listener, query_all
+from app.services.brand_bom_index import BrandBomIndex
+from app.services.mrp_change_log import MRPChangeLog
+from app.services.mrp_grid_service import MRPGridService
+from app.services.mrp_service import MRPService
+from app.utils.perf import get_logger, profiled
+
+logger = get_logger(__name__)
+
+# SQLite 单条语句的参数个数有限，IN 列表分批
+_IN_CHUNK = 500
+
+# 这些表变更会影响BOM展开结构或品牌匹配，只能完整重算
+_STRUCTURE_TABLES = ("BomHeaders", "BomLines", "Items", "CustomerOrders")
+
+
+class _KanbanState:
+    """一次零部件MRP看板计算的中间结果"""
+
+    def __init__(self):
+        self.change_id = 0
+        self.start_date = ""
+        self.end_date = ""
+        self.weeks: List[str] = []
+        self.col: Dict[str, int] = {}
+        self.brand_index: Optional[BrandBomIndex] = None
+        self.brand_parent: Dict[str, Optional[int]] = {}   # 有订单行的品牌 → 父物料
+        self.unmatched_items: List[str] = []
+        # 父物料（已载入BOM的）× 日期
+        self.parent_ids: List[int] = []
+        self.parent_row: Dict[int, int] = {}
+        self.demand = np.zeros((0, 0))
+        # 父物料 × 子件
+        self.qty = np.zeros((0, 0))
+        self.linked = np.zeros((0, 0), dtype=bool)
+        # 子件
+        self.child_ids: List[int] = []
+        self.child_index: Dict[int, int] = {}
+        self.child_meta: Dict[int, Dict] = {}
+        self.plan = np.zeros((0, 0))
+        self.cum_plan = np.zeros((0, 0))
+        self.start_onhand = np.zeros(0)
+        self.row_pairs: Dict[int, Tuple[Dict, Dict]] = {}
+
+
+class MRPIncrementalService:
+    """零部件MRP看板的增量计算，按计算参数保留最近几次的中间结果"""
+
+    MAX_STATES = 4
+    _states: "OrderedDict[tuple, _KanbanState]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    @profiled()
+    def calculate_mrp_kanban(start_date: str, end_date: str,
+                             import_id: Optional[int] = None,
+                             search_filter: Optional[str] = None,
+                             include_types: Tuple[str, ...] = ("RM", "PKG")) -> Dict:
+        """参数与返回值同 MRPService.calculate_mrp_kanban"""
+        key = (start_date, end_date, import_id, search_filter, tuple(include_types))
+        try:
+            with MRPIncrementalService._lock:
+                state = MRPIncrementalService._states.pop(key, None)
+                if state is not None and not MRPIncrementalService._apply_changes(
+                        state, import_id, search_filter, include_types):
+                    state = None
+                if state is None:
+                    logger.debug("[MRPIncrementalService] 完整计算零部件MRP")
+                    state = MRPIncrementalService._full_state(
+                        start_date, end_date, import_id, search_filter, include_types)
+                MRPIncrementalService._states[key] = state
+                while len(MRPIncrementalService._states) > MRPIncrementalService.MAX_STATES:
+                    MRPIncrementalService._states.popitem(last=False)
+                return MRPIncrementalService._result(state)
+        except sqlite3.OperationalError as e:
+            if not MRPChangeLog.is_missing(e):
+                raise
+            # 没有变更日志无法增量计算，改为完整计算
+            logger.warning("MRP变更日志不可用，改为完整计算: %s", e)
+            MRPIncrementalService.clear()
+            return MRPService.calculate_mrp_kanban(start_date, end_date, import_id, search_filter, include_types)
+
+    @staticmethod
+    def clear():
+        """丢弃全部中间结果，下次完整计算"""
+        with MRPIncrementalService._lock:
+            MRPIncrementalService._states.clear()
+
+    # ---------------- 完整计算 ----------------
+    @staticmethod
+    def _full_state(start_date: str, end_date: str, import_id: Optional[int],
+                    search_filter: Optional[str], include_types: Tuple[str, ...]) -> _KanbanState:
+        state = _KanbanState()
+        state.change_id = MRPChangeLog.current_id()
+        state.start_date, state.end_date = MRPIncrementalService._date_range(start_date, end_date, import_id)
+        state.weeks = MRPService._gen_weeks(state.start_date, state.end_date, import_id)
+        state.col = {d: j for j, d in enumerate(state.weeks)}
+        state.brand_index = BrandBomIndex.load()
+
+        # 成品需求（与 MRPService._fetch_parent_weekly_demand 相同的汇总规则）
+        parent_weekly: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for r in MRPIncrementalService._fetch_demand_rows(state, import_id, search_filter):
+            item_number = r["ItemNumber"]
+            parent_id = state.brand_index.resolve_parent(item_number)
+            state.brand_parent[item_number] = parent_id
+            if parent_id:
+                parent_weekly[parent_id][r["DeliveryDate"]] += float(r["Qty"] or 0.0)
+            elif item_number not in state.unmatched_items:
+                state.unmatched_items.append(item_number)
+
+        parent_ids = MRPGridService.active_parents(parent_weekly)
+        bom = MRPGridService.flat_bom_matrix(parent_ids, include_types)
+        state.parent_ids = list(parent_ids)
+        state.parent_row = {pid: p for p, pid in enumerate(parent_ids)}
+        state.demand = MRPGridService.demand_matrix(parent_weekly, parent_ids, state.weeks)
+        state.qty = bom.qty
+        state.linked = bom.linked
+        state.child_ids = list(bom.child_ids)
+        state.child_index = {cid: k for k, cid in enumerate(bom.child_ids)}
+        state.child_meta = {cid: MRPIncrementalService._child_meta(cid, e) for cid, e in bom.child_meta.items()}
+        state.plan = bom.explode(state.demand)
+        state.cum_plan = np.cumsum(state.plan, axis=1)
+        state.start_onhand = MRPGridService.onhand_vector(state.child_ids, MRPService._fetch_onhand_total())
+        for k in range(len(state.child_ids)):
+            MRPIncrementalService._build_rows(state, k)
+        return state
+
+    # ---------------- 增量更新 ----------------
+    @staticmethod
+    def _apply_changes(state: _KanbanState, import_id: Optional[int],
+                       search_filter: Optional[str], include_types: Tuple[str, ...]) -> bool:
+        """把上次计算之后的变更应用到中间结果；需要完整重算时返回 False"""
+        latest, changes = MRPChangeLog.changes_since(state.change_id)
+        if not changes:
+            logger.debug("[MRPIncrementalService] 数据无变更，沿用上次结果")
+            return True
+        if any(t in changes for t in _STRUCTURE_TABLES):
+            logger.debug("[MRPIncrementalService] BOM/物料/订单主表有变更，完整重算")
+            return False
+
+        brands = changes.get("CustomerOrderLines", set())
+        if brands and import_id is not None:
+            # 订单版本的日期范围和日期列由订单行决定，变化时列结构不同
+            start, end = MRPIncrementalService._date_range(state.start_date, state.end_date, import_id)
+            if (start, end) != (state.start_date, state.end_date) or \
+                    MRPService._gen_weeks(start, end, import_id) != state.weeks:
+                logger.debug("[MRPIncrementalService] 日期列变化，完整重算")
+                return False
+
+        state.change_id = latest
+        dirty_from: Dict[int, int] = {}  # 子件序号 → 首个需要重算的日期列
+        if brands:
+            MRPIncrementalService._apply_demand_changes(state, brands, import_id, search_filter,
+                                                        include_types, dirty_from)
+        items = changes.get("InventoryBalance", set())
+        if items:
+            MRPIncrementalService._apply_onhand_changes(state, items, dirty_from)
+
+        for k in dirty_from:
+            MRPIncrementalService._build_rows(state, k)
+        logger.debug("[MRPIncrementalService] 增量更新：品牌 %s 个，库存物料 %s 个，重算子件 %s 个", len(brands), len(items), len(dirty_from))
+        return True
+
+    @staticmethod
+    def _apply_demand_changes(state: _KanbanState, brands: Set[str], import_id: Optional[int],
+                              search_filter: Optional[str], include_types: Tuple[str, ...],
+                              dirty_from: Dict[int, int]):
+        # 受影响的父物料，以及需要重新汇总的全部品牌（同一父物料可能由多个品牌匹配）
+        affected = {p for p in (state.brand_index.resolve_parent(b) for b in brands) if p}
+        query_brands = set(brands)
+        query_brands.update(b for b, p in state.brand_parent.items() if p in affected)
+
+        new_demand = {p: np.zeros(len(state.weeks)) for p in affected}
+        seen_brands = set()
+        for r in MRPIncrementalService._fetch_demand_rows(state, import_id, search_filter, query_brands):
+            item_number = r["ItemNumber"]
+            seen_brands.add(item_number)
+            parent_id = state.brand_index.resolve_parent(item_number)
+            j = state.col.get(r["DeliveryDate"])
+            if parent_id and j is not None:
+                new_demand[parent_id][j] += float(r["Qty"] or 0.0)
+
+        # 品牌映射与未匹配列表
+        for b in query_brands:
+            parent_id = state.brand_index.resolve_parent(b)
+            if b in seen_brands:
+                state.brand_parent[b] = parent_id
+                if not parent_id and b not in state.unmatched_items:
+                    state.unmatched_items.append(b)
+            else:
+                state.brand_parent.pop(b, None)
+                if b in state.unmatched_items:
+                    state.unmatched_items.remove(b)
+
+        # 新出现的有效父物料：补充其BOM行和新子件
+        new_parents = [p for p, row in new_demand.items()
+                       if p not in state.parent_row and (row > 0).any()]
+        if new_parents:
+            MRPIncrementalService._add_parents(state, new_parents, include_types)
+
+        # 需求有变化的父物料 → 受影响子件及其首个变化日期列
+        n_cols = len(state.weeks)
+        for parent_id, row in new_demand.items():
+            p = state.parent_row.get(parent_id)
+            if p is None:
+                continue
+            changed = np.nonzero(np.clip(row, 0.0, None) != np.clip(state.demand[p], 0.0, None))[0]
+            state.demand[p] = row
+            if not len(changed):
+                continue
+            j0 = int(changed[0])
+            for k in np.nonzero(state.linked[p])[0]:
+                k = int(k)
+                dirty_from[k] = min(dirty_from.get(k, n_cols), j0)
+
+        # 受影响子件：只重算首个变化日期之后的计划和累计计划
+        if dirty_from:
+            clipped = np.clip(state.demand, 0.0, None)
+            for k, j0 in dirty_from.items():
+                state.plan[k, j0:] = state.qty[:, k] @ clipped[:, j0:]
+                base = state.cum_plan[k, j0 - 1] if j0 > 0 else 0.0
+                state.cum_plan[k, j0:] = np.cumsum(np.concatenate(([base], state.plan[k, j0:])))[1:]
+
+    @staticmethod
+    def _add_parents(state: _KanbanState, parent_ids: List[int], include_types: Tuple[str, ...]):
+        """为新出现的父物料载入BOM行，新子件追加到子件列表末尾"""
+        bom = MRPGridService.flat_bom_matrix(parent_ids, include_types)
+        new_children = [cid for cid in bom.child_ids if cid not in state.child_index]
+        n_cols = len(state.weeks)
+
+        if new_children:
+            onhand = MRPIncrementalService._fetch_onhand(new_children)
+            for cid in new_children:
+                state.child_index[cid] = len(state.child_ids)
+                state.child_ids.append(cid)
+                state.child_meta[cid] = MRPIncrementalService._child_meta(cid, bom.child_meta[cid])
+            extra = len(new_children)
+            state.qty = np.hstack([state.qty, np.zeros((state.qty.shape[0], extra))])
+            state.linked = np.hstack([state.linked, np.zeros((state.linked.shape[0], extra), dtype=bool)])
+            state.plan = np.vstack([state.plan, np.zeros((extra, n_cols))])
+            state.cum_plan = np.vstack([state.cum_plan, np.zeros((extra, n_cols))])
+            state.start_onhand = np.concatenate(
+                [state.start_onhand, MRPGridService.onhand_vector(new_children, onhand)])
+
+        qty_rows = np.zeros((len(parent_ids), len(state.child_ids)))
+        linked_rows = np.zeros((len(parent_ids), len(state.child_ids)), dtype=bool)
+        cols = [state.child_index[cid] for cid in bom.child_ids]
+        qty_rows[:, cols] = bom.qty
+        linked_rows[:, cols] = bom.linked
+        for parent_id in parent_ids:
+            state.parent_row[parent_id] = len(state.parent_ids)
+            state.parent_ids.append(parent_id)
+        state.qty = np.vstack([state.qty, qty_rows])
+        state.linked = np.vstack([state.linked, linked_rows])
+        state.demand = np.vstack([state.demand, np.zeros((len(parent_ids), n_cols))])
+
+    @staticmethod
+    def _apply_onhand_changes(state: _KanbanState, item_keys: Set[str], dirty_from: Dict[int, int]):
+        item_ids = [int(i) for i in item_keys if str(i).isdigit() and int(i) in state.child_index]
+        if not item_ids:
+            return
+        onhand = MRPIncrementalService._fetch_onhand(item_ids)
+        for item_id in item_ids:
+            k = state.child_index[item_id]
+            state.start_onhand[k] = float(onhand.get(item_id, 0.0))
+            # 期初库存变化影响整行即时库存（计划不变，无需重算累计计划）
+            dirty_from.setdefault(k, len(state.weeks))
+
+    # ---------------- 结果 ----------------
+    @staticmethod
+    def _build_rows(state: _KanbanState, k: int):
+        """重建子件 k 的订单计划/即时库存两行"""
+        meta = state.child_meta[state.child_ids[k]]
+        onhand = float(state.start_onhand[k])
+        # 运行库存：按照 "本周库存 = 上周库存 - 本周计划"，允许出现负数以暴露缺口
+        stock = state.start_onhand[k] - state.cum_plan[k]
+        plan_row = dict(meta, RowType="订单计划", StartOnHand=onhand,
+                        cells=MRPGridService.to_cells(state.weeks, state.plan[k]))
+        stock_row = dict(meta, RowType="即时库存", StartOnHand=onhand,
+                         cells=MRPGridService.to_cells(state.weeks, stock))
+        state.row_pairs[state.child_ids[k]] = (plan_row, stock_row)
+
+    @staticmethod
+    def _result(state: _KanbanState) -> Dict:
+        # 只输出当前有正数需求的父物料所含子件（与完整计算一致）
+        active = (state.demand > 0).any(axis=1) if len(state.parent_ids) else np.zeros(0, dtype=bool)
+        visible = state.linked[active].any(axis=0) if active.any() else np.zeros(len(state.child_ids), dtype=bool)
+
+        order = sorted((k for k in range(len(state.child_ids)) if visible[k]),
+                       key=lambda k: (state.child_meta[state.child_ids[k]].get("ItemType", ""),
+                                      state.child_meta[state.child_ids[k]].get("ItemCode", "")))
+        rows: List[Dict] = []
+        for k in order:
+            rows.extend(state.row_pairs[state.child_ids[k]])
+
+        unmatched_items = list(state.unmatched_items)
+        warnings = []
+        if unmatched_items:
+            logger.warning("[MRPIncrementalService] %d 个品牌未找到对应BOM：%s",
+                           len(unmatched_items), ", ".join(unmatched_items))
+            warnings.append(f"⚠️ 以下客户订单中的ItemNumber未找到对应的BOM或物料信息：{', '.join(unmatched_items)}")
+            warnings.append("请检查：")
+            warnings.append("1. 客户订单中的ItemNumber是否与BOM名称完全一致")
+            warnings.append("2. 物料主数据中的品牌字段是否与客户订单ItemNumber匹配")
+            warnings.append("3. BOM是否已正确创建并激活")
+
+        return {
+            "weeks": list(state.weeks),
+            "rows": rows,
+            "warnings": warnings,
+            "unmatched_items": unmatched_items
+        }
+
+    # ---------------- 数据读取 ----------------
+    @staticmethod
+    def _date_range(start_date: str, end_date: str, import_id: Optional[int]) -> Tuple[str, str]:
+        """指定订单版本时使用订单的实际日期范围（同 MRPService.calculate_mrp_kanban）"""
+        if import_id is not None:
+            order_range = MRPService.get_order_version_date_range(import_id)
+            if order_range and order_range.get("earliest_date") and order_range.get("latest_date"):
+                return order_range["earliest_date"], order_range["latest_date"]
+        return start_date, end_date
+
+    @staticmethod
+    def _fetch_demand_rows(state: _KanbanState, import_id: Optional[int], search_filter: Optional[str],
+                           brands: Optional[Iterable[str]] = None) -> List:
+        """客户订单行（筛选条件同 MRPService._fetch_parent_weekly_demand），可只取指定品牌"""
+        where_conditions = ["col.LineStatus='Active'", "col.DeliveryDate BETWEEN ? AND ?"]
+        params: List = [state.start_date, state.end_date]
+        if import_id is not None:
+            where_conditions.append("co.ImportId = ?")
+            params.append(import_id)
+        if search_filter:
+            where_conditions.append("col.ItemNumber LIKE ?")
+            params.append(f"%{search_filter}%")
+
+        sql = """
+        SELECT col.ItemNumber, col.DeliveryDate, col.RequiredQty AS Qty
+        FROM CustomerOrderLines col
+        JOIN CustomerOrders co ON col.OrderId = co.OrderId
+        WHERE {where}
+        ORDER BY col.DeliveryDate
+        """
+        if brands is None:
+            return query_all(sql.format(where=" AND ".join(where_conditions)), tuple(params))
+
+        rows = []
+        brands = sorted(brands)
+        for start in range(0, len(brands), _IN_CHUNK):
+            chunk = brands[start:start + _IN_CHUNK]
+            where = " AND ".join(where_conditions + [f"col.ItemNumber IN ({','.join(['?'] * len(chunk))})"])
+            rows.extend(query_all(sql.format(where=where), tuple(params) + tuple(chunk)))
+        return rows
+
+    @staticmethod
+    def _fetch_onhand(item_ids: List[int]) -> Dict[int, float]:
+        """指定物料的全部仓库存合计"""
+        onhand: Dict[int, float] = {}
+        for start in range(0, len(item_ids), _IN_CHUNK):
+            chunk = item_ids[start:start + _IN_CHUNK]
+            rows = query_all(f"""
+                SELECT ItemId, SUM(QtyOnHand) AS OnHand
+                FROM InventoryBalance
+                WHERE ItemId IN ({','.join(['?'] * len(chunk))})
+                GROUP BY ItemId
+            """, tuple(chunk))
+            onhand.update({int(r["ItemId"]): float(r["OnHand"] or 0.0) for r in rows})
+        return onhand
+
+    @staticmethod
+    def _child_meta(cid: int, entry: Dict) -> Dict:
+        return {
+            "ItemId": cid,
+            "ItemCode": entry.get("ItemCode", ""),
+            "ItemName": entry.get("ItemName", ""),
+            "ItemSpec": entry.get("ItemSpec", ""),
+            "ItemType": entry["ItemType"],
+        }
+
+
+# 恢复数据库后变更日志与中间结果不再对应（含其中的品牌索引），下次完整计算
+add_reset_listener(MRPIncrementalService.clear)
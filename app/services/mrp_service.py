@@ -1,13 +1,20 @@
 # app/services/mrp_service.py
 # -*- coding: utf-8 -*-
-from typing import Dict, List, Tuple, Optional
+import logging
+from typing import Dict, Iterable, List, Tuple, Optional
 from datetime import datetime, timedelta
 from collections import defaultdict
 
 from app.db import query_all, query_one
-from app.services.bom_service import BomService
+from app.services.bom_explosion_service import BomExplosionService
+from app.services.brand_bom_index import BrandBomIndex
+from app.services.mrp_grid_service import MRPGridService
+from app.services.mrp_snapshot_service import mrp_snapshot
 from app.services.inventory_service import InventoryService
 from app.services.customer_order_service import CustomerOrderService
+from app.utils.perf import get_logger, profiled, stage
+
+logger = get_logger(__name__)
 
 WEEK_FMT = "CW{0:02d}"
 
@@ -21,6 +28,8 @@ class MRPService:
 
     # ---------------- 公共入口 ----------------
     @staticmethod
+    @profiled()
+    @mrp_snapshot("kanban_child")
     def calculate_mrp_kanban(start_date: str, end_date: str,
                               import_id: Optional[int] = None,
                               search_filter: Optional[str] = None,
@@ -42,94 +51,79 @@ class MRPService:
         - import_id: 指定客户订单版本ID，如果为None则计算所有订单
         - parent_item_filter: 成品筛选，支持模糊匹配，如果为None则计算所有成品
         """
-        print(f"📊 [calculate_mrp_kanban] 开始计算零部件MRP看板")
-        print(f"📊 [calculate_mrp_kanban] 参数：start_date={start_date}, end_date={end_date}")
-        print(f"📊 [calculate_mrp_kanban] 参数：import_id={import_id}, search_filter={search_filter}")
-        print(f"📊 [calculate_mrp_kanban] 参数：include_types={include_types}")
+        logger.debug("[calculate_mrp_kanban] 开始计算零部件MRP看板")
+        logger.debug("[calculate_mrp_kanban] 参数：start_date=%s, end_date=%s", start_date, end_date)
+        logger.debug("[calculate_mrp_kanban] 参数：import_id=%s, search_filter=%s", import_id, search_filter)
+        logger.debug("[calculate_mrp_kanban] 参数：include_types=%s", include_types)
         
         # 如果指定了订单版本，使用订单的实际日期范围
         if import_id is not None:
-            print(f"📊 [calculate_mrp_kanban] 获取订单版本日期范围")
+            logger.debug("[calculate_mrp_kanban] 获取订单版本日期范围")
             order_range = MRPService.get_order_version_date_range(import_id)
             if order_range and order_range.get("earliest_date") and order_range.get("latest_date"):
                 start_date = order_range["earliest_date"]
                 end_date = order_range["latest_date"]
-                print(f"📊 [calculate_mrp_kanban] 使用订单日期范围：{start_date} 到 {end_date}")
+                logger.debug("[calculate_mrp_kanban] 使用订单日期范围：%s 到 %s", start_date, end_date)
         
-        print(f"📊 [calculate_mrp_kanban] 生成周列表")
+        logger.debug("[calculate_mrp_kanban] 生成周列表")
         weeks = MRPService._gen_weeks(start_date, end_date, import_id)
-        print(f"📊 [calculate_mrp_kanban] 生成周：{weeks}")
+        logger.debug("[calculate_mrp_kanban] 生成周：%s", weeks)
 
         # 1) 成品周需求（ItemCode 维度）
-        print(f"📊 [calculate_mrp_kanban] 获取成品周需求")
+        logger.debug("[calculate_mrp_kanban] 获取成品周需求")
         parent_weekly, unmatched_items = MRPService._fetch_parent_weekly_demand(
             start_date, end_date, import_id, search_filter
         )
-        print(f"📊 [calculate_mrp_kanban] 成品周需求：{parent_weekly}")
-        print(f"📊 [calculate_mrp_kanban] 未匹配的ItemNumber：{unmatched_items}")
-
-        # 2) 展开到子件周需求
-        print(f"📊 [calculate_mrp_kanban] 展开BOM到子件")
-        child_weekly: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
-        child_meta: Dict[int, Dict] = {}  # ItemId -> {code,name,type}
-
-        for parent_id, wk_map in parent_weekly.items():
-            print(f"📊 [calculate_mrp_kanban] 处理父物料ID：{parent_id}")
-            for delivery_date, qty in wk_map.items():
-                if qty <= 0:
-                    continue
-                print(f"📊 [calculate_mrp_kanban] 展开BOM：父物料{parent_id}，日期{delivery_date}，数量{qty}")
-                # 用 BomService.expand_bom 递归展开并考虑损耗
-                expanded = BomService.expand_bom(parent_id, qty)
-                print(f"📊 [calculate_mrp_kanban] BOM展开结果：{len(expanded)} 个组件")
-                for e in expanded:
-                    itype = e.get("ItemType") or ""
-                    if include_types and itype not in include_types:
-                        print(f"📊 [calculate_mrp_kanban] 跳过组件：{e.get('ItemCode', '')}，类型{itype}")
-                        continue
-                    cid = int(e["ItemId"])
-                    child_weekly[cid][delivery_date] += float(e.get("ActualQty") or 0.0)
-                    if cid not in child_meta:
-                        child_meta[cid] = {
-                            "ItemId": cid,
-                            "ItemCode": e.get("ItemCode", ""),
-                            "ItemName": e.get("ItemName", ""),
-                            "ItemSpec": e.get("ItemSpec", ""),
-                            "ItemType": itype,
-                        }
-
-        print(f"📊 [calculate_mrp_kanban] 子件需求汇总：{len(child_weekly)} 个物料")
+        logger.debug("[calculate_mrp_kanban] 成品周需求：%s", parent_weekly)
+        logger.debug("[calculate_mrp_kanban] 未匹配的ItemNumber：%s", unmatched_items)
+
+        # 2) 展开到子件周需求：子件需求矩阵 = BOM用量矩阵ᵀ × 成品需求矩阵
+        logger.debug("[calculate_mrp_kanban] 展开BOM到子件")
+        with stage("mrp_service.展开BOM"):
+            parent_ids = MRPGridService.active_parents(parent_weekly)
+            bom = MRPGridService.flat_bom_matrix(parent_ids, include_types)
+            plan = bom.explode(MRPGridService.demand_matrix(parent_weekly, parent_ids, weeks))
+        child_meta: Dict[int, Dict] = {
+            cid: {
+                "ItemId": cid,
+                "ItemCode": e.get("ItemCode", ""),
+                "ItemName": e.get("ItemName", ""),
+                "ItemSpec": e.get("ItemSpec", ""),
+                "ItemType": e["ItemType"],
+            }
+            for cid, e in bom.child_meta.items()
+        }
+
+        logger.debug("[calculate_mrp_kanban] 子件需求汇总：%s 个物料", len(child_meta))
 
         # 3) 期初库存（聚合全部仓）
-        print(f"📊 [calculate_mrp_kanban] 获取期初库存")
+        logger.debug("[calculate_mrp_kanban] 获取期初库存")
         onhand_all = MRPService._fetch_onhand_total()  # {ItemId: Qty}
-        print(f"📊 [calculate_mrp_kanban] 期初库存：{len(onhand_all)} 个物料")
+        logger.debug("[calculate_mrp_kanban] 期初库存：%s 个物料", len(onhand_all))
 
         # 4) 生成两行（计划/即时库存）
-        print(f"📊 [calculate_mrp_kanban] 生成MRP行")
+        logger.debug("[calculate_mrp_kanban] 生成MRP行")
+        start_onhand = MRPGridService.onhand_vector(bom.child_ids, onhand_all)
+        # 运行库存：按照 "本周库存 = 上周库存 - 本周计划"，允许出现负数以暴露缺口
+        stock = MRPGridService.running_stock(start_onhand, plan)
+
         rows: List[Dict] = []
-        for item_id in sorted(child_weekly.keys(),
-                              key=lambda i: (child_meta[i].get("ItemType",""), child_meta[i].get("ItemCode",""))):
-            meta = child_meta[item_id]
+        order = sorted(range(len(bom.child_ids)),
+                       key=lambda k: (child_meta[bom.child_ids[k]].get("ItemType",""),
+                                      child_meta[bom.child_ids[k]].get("ItemCode","")))
+        for k in order:
+            meta = child_meta[bom.child_ids[k]]
             # 使用具体的订单日期作为键，与客户订单看板保持一致
-            plan_cells = {delivery_date: float(child_weekly[item_id].get(delivery_date, 0.0)) for delivery_date in weeks}
-
-            # 期初库存（允许缺省为 0）
-            start_onhand = float(onhand_all.get(item_id, 0.0))
+            plan_cells = MRPGridService.to_cells(weeks, plan[k])
+            stock_cells = MRPGridService.to_cells(weeks, stock[k])
+            onhand = float(start_onhand[k])
 
-            # 运行库存：按照 "本周库存 = 上周库存 - 本周计划"
-            stock_cells: Dict[str, float] = {}
-            running = start_onhand
-            for delivery_date in weeks:
-                running = running - plan_cells[delivery_date]
-                stock_cells[delivery_date] = running  # 允许出现负数以暴露缺口
-
-            plan_row = dict(meta, RowType="订单计划", StartOnHand=start_onhand, cells=plan_cells)
-            stock_row = dict(meta, RowType="即时库存", StartOnHand=start_onhand, cells=stock_cells)
+            plan_row = dict(meta, RowType="订单计划", StartOnHand=onhand, cells=plan_cells)
+            stock_row = dict(meta, RowType="即时库存", StartOnHand=onhand, cells=stock_cells)
             rows.append(plan_row)
             rows.append(stock_row)
 
-        print(f"✅ [calculate_mrp_kanban] 计算完成，返回：weeks={len(weeks)}, rows={len(rows)}")
+        logger.debug("[calculate_mrp_kanban] 计算完成，返回：weeks=%s, rows=%s", len(weeks), len(rows))
         
         # 构建警告信息
         warnings = []
@@ -148,6 +142,8 @@ class MRPService:
         }
 
     @staticmethod
+    @profiled()
+    @mrp_snapshot("kanban_parent")
     def calculate_parent_mrp_kanban(start_date: str, end_date: str,
                                     import_id: Optional[int] = None,
                                     search_filter: Optional[str] = None) -> Dict:
@@ -184,16 +180,21 @@ class MRPService:
         # 获取成品信息（从BOM表获取，确保名称对应）
         parent_meta = MRPService._fetch_parent_items_from_bom(list(parent_weekly.keys()))
 
+        # 成品需求矩阵（成品 × 日期）与运行库存
+        parent_ids = list(parent_weekly.keys())
+        demand = MRPGridService.demand_matrix(parent_weekly, parent_ids, weeks)
+        start_onhand = MRPGridService.onhand_vector(parent_ids, MRPService._fetch_onhand_total())
+        stock = MRPGridService.running_stock(start_onhand, demand)
+
         # 生成成品MRP行（每个成品两行：订单计划、即时库存）
         rows: List[Dict] = []
-        for item_id in sorted(parent_weekly.keys(),
-                              key=lambda i: (parent_meta[i].get("ItemType",""), parent_meta[i].get("ItemCode",""))):
-            meta = parent_meta[item_id]
-            demand_cells = {w: float(parent_weekly[item_id].get(w, 0.0)) for w in weeks}
+        order = sorted(range(len(parent_ids)),
+                       key=lambda k: (parent_meta[parent_ids[k]].get("ItemType",""),
+                                      parent_meta[parent_ids[k]].get("ItemCode","")))
+        for k in order:
+            meta = parent_meta[parent_ids[k]]
+            onhand = float(start_onhand[k])
 
-            # 期初库存
-            start_onhand = MRPService._fetch_item_onhand(item_id)
-            
             # 安全库存
             safety_stock = meta.get("SafetyStock", 0.0)
 
@@ -205,19 +206,13 @@ class MRPService:
                 "ItemSpec": meta.get("ItemSpec", ""),
                 "ItemType": meta.get("ItemType"),
                 "RowType": "订单计划", 
-                "StartOnHand": start_onhand,
+                "StartOnHand": onhand,
                 "SafetyStock": safety_stock,
-                "cells": demand_cells  # 显示原始需求
+                "cells": MRPGridService.to_cells(weeks, demand[k])  # 显示原始需求
             }
             rows.append(plan_row)
 
-            # 即时库存行：按照 "本周库存 = 上周库存 - 本周计划" 计算
-            stock_cells: Dict[str, float] = {}
-            running = start_onhand
-            for w in weeks:
-                running = running - demand_cells.get(w, 0.0)
-                stock_cells[w] = running  # 允许出现负数以暴露缺口
-
+            # 即时库存行：按照 "本周库存 = 上周库存 - 本周计划" 计算，允许出现负数以暴露缺口
             stock_row = {
                 "ItemId": meta.get("ItemId"),
                 "ItemCode": meta.get("ItemCode"),
@@ -225,9 +220,9 @@ class MRPService:
                 "ItemSpec": meta.get("ItemSpec", ""),
                 "ItemType": meta.get("ItemType"),
                 "RowType": "即时库存", 
-                "StartOnHand": start_onhand,
+                "StartOnHand": onhand,
                 "SafetyStock": safety_stock,
-                "cells": stock_cells  # 显示库存变化
+                "cells": MRPGridService.to_cells(weeks, stock[k])  # 显示库存变化
             }
             rows.append(stock_row)
 
@@ -248,11 +243,16 @@ class MRPService:
         }
 
     @staticmethod
+    @profiled()
+    @mrp_snapshot("kanban_comprehensive")
     def calculate_comprehensive_mrp_kanban(start_date: str, end_date: str,
                                           import_id: Optional[int] = None,
-                                          search_filter: Optional[str] = None) -> Dict:
+                                          search_filter: Optional[str] = None,
+                                          multi_level: bool = True) -> Dict:
         """
         计算综合MRP看板（结合成品库存和零部件库存）
+        multi_level=True（默认）时成品库存按多级BOM下卷折算为零部件数量，成品中半成品所含的零部件也计入；
+        False 时只按直接用量折算（见 _calculate_child_in_parent_quantity）
         
         返回格式：
         {
@@ -266,99 +266,73 @@ class MRPService:
           ]
         }
         """
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 开始计算综合MRP看板")
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 参数：start_date={start_date}, end_date={end_date}")
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 参数：import_id={import_id}, search_filter={search_filter}")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 开始计算综合MRP看板")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 参数：start_date=%s, end_date=%s", start_date, end_date)
+        logger.debug("[calculate_comprehensive_mrp_kanban] 参数：import_id=%s, search_filter=%s", import_id, search_filter)
         
         # 如果有指定的订单版本，使用该版本的日期范围
         if import_id is not None:
-            print(f"📊 [calculate_comprehensive_mrp_kanban] 获取订单版本日期范围")
+            logger.debug("[calculate_comprehensive_mrp_kanban] 获取订单版本日期范围")
             order_range = MRPService.get_order_version_date_range(import_id)
             if order_range and order_range.get("earliest_date") and order_range.get("latest_date"):
                 start_date = order_range["earliest_date"]
                 end_date = order_range["latest_date"]
-                print(f"📊 [calculate_comprehensive_mrp_kanban] 使用订单日期范围：{start_date} 到 {end_date}")
+                logger.debug("[calculate_comprehensive_mrp_kanban] 使用订单日期范围：%s 到 %s", start_date, end_date)
         
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 生成周列表")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 生成周列表")
         weeks = MRPService._gen_weeks(start_date, end_date, import_id)
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 生成周：{weeks}")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 生成周：%s", weeks)
 
         # 1) 成品周需求（ItemCode 维度）
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 获取成品周需求")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 获取成品周需求")
         parent_weekly, unmatched_items = MRPService._fetch_parent_weekly_demand(
             start_date, end_date, import_id, search_filter
         )
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 成品周需求：{parent_weekly}")
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 未匹配的ItemNumber：{unmatched_items}")
-
-        # 2) 展开到子件周需求
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 展开BOM到子件")
-        child_weekly: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
-        child_meta: Dict[int, Dict] = {}  # ItemId -> {code,name,type}
-
-        for parent_id, wk_map in parent_weekly.items():
-            print(f"📊 [calculate_comprehensive_mrp_kanban] 处理父物料ID：{parent_id}")
-            for cw, qty in wk_map.items():
-                if qty <= 0:
-                    continue
-                
-                # 展开BOM（只获取有效的BOM和启用的物料）
-                bom_lines = query_all("""
-                    SELECT bl.ChildItemId, bl.QtyPer, i.ItemCode, i.CnName, i.ItemSpec, i.ItemType
-                    FROM BomLines bl
-                    JOIN Items i ON bl.ChildItemId = i.ItemId
-                    WHERE bl.BomId = (
-                        SELECT BomId FROM BomHeaders WHERE ParentItemId = ? AND IsActive = 1
-                    ) AND i.IsActive = 1
-                """, (parent_id,))
-                
-                for e in bom_lines:
-                    # 转换 sqlite3.Row 为字典
-                    if hasattr(e, 'keys'):
-                        e = dict(e)
-                    cid = int(e["ChildItemId"])
-                    child_weekly[cid][cw] += float(e.get("QtyPer") or 0.0) * qty
-                    if cid not in child_meta:
-                        print(f"📊 [calculate_comprehensive_mrp_kanban] 添加物料元数据：ID={cid}, Code={e.get('ItemCode')}, Name={e.get('CnName')}, Spec={e.get('ItemSpec')}")
-                        child_meta[cid] = {
-                            "ItemId": cid,
-                            "ItemCode": e.get("ItemCode", ""),
-                            "CnName": e.get("CnName", ""),
-                            "ItemSpec": e.get("ItemSpec", ""),
-                            "ItemType": e.get("ItemType", "")
-                        }
-
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 子件需求汇总：{len(child_weekly)} 个物料")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 成品周需求：%s", parent_weekly)
+        logger.debug("[calculate_comprehensive_mrp_kanban] 未匹配的ItemNumber：%s", unmatched_items)
+
+        # 2) 展开到子件周需求（单级有效BOM，一次查询得到用量矩阵）
+        logger.debug("[calculate_comprehensive_mrp_kanban] 展开BOM到子件")
+        with stage("mrp_service.展开BOM(单级)"):
+            parent_ids = MRPGridService.active_parents(parent_weekly)
+            bom = MRPGridService.single_level_bom_matrix(parent_ids)
+            plan = bom.explode(MRPGridService.demand_matrix(parent_weekly, parent_ids, weeks))
+        child_meta: Dict[int, Dict] = bom.child_meta  # ItemId -> {code,name,type}
+
+        logger.debug("[calculate_comprehensive_mrp_kanban] 子件需求汇总：%s 个物料", len(child_meta))
 
         # 3) 获取成品库存信息（用于计算零部件在成品中的数量）
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 获取成品库存信息")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 获取成品库存信息")
         parent_inventory = MRPService._fetch_parent_inventory_for_comprehensive()
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 成品库存：{parent_inventory}")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 成品库存：%s", parent_inventory)
 
         # 4) 计算每个零部件在成品中的数量
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 计算零部件在成品中的数量")
-        child_in_parent_qty = MRPService._calculate_child_in_parent_quantity(child_meta.keys(), parent_inventory)
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 零部件在成品中的数量：{child_in_parent_qty}")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 计算零部件在成品中的数量")
+        child_in_parent_qty = MRPService._calculate_child_in_parent_quantity(
+            child_meta.keys(), parent_inventory, multi_level)
+        logger.debug("[calculate_comprehensive_mrp_kanban] 零部件在成品中的数量：%s", child_in_parent_qty)
 
         # 5) 期初库存（聚合全部仓）
-        print(f"📊 [calculate_comprehensive_mrp_kanban] 获取期初库存")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 获取期初库存")
         onhand_all = MRPService._fetch_onhand_total()
 
         # 6) 生成MRP行（每个物料两行：订单计划、即时库存）
+        direct_onhand = MRPGridService.onhand_vector(bom.child_ids, onhand_all)
+        in_parent_qty = MRPGridService.onhand_vector(bom.child_ids, child_in_parent_qty)
+        # 计算总库存（成品中的数量 + 直接库存数量），即时库存按综合库存累计扣减
+        total_stock = direct_onhand + in_parent_qty
+        stock = MRPGridService.running_stock(total_stock, plan)
+
         rows: List[Dict] = []
-        for item_id in sorted(child_weekly.keys(),
-                              key=lambda i: (child_meta[i].get("ItemType",""), child_meta[i].get("ItemCode",""))):
+        order = sorted(range(len(bom.child_ids)),
+                       key=lambda k: (child_meta[bom.child_ids[k]].get("ItemType",""),
+                                      child_meta[bom.child_ids[k]].get("ItemCode","")))
+        for k in order:
+            item_id = bom.child_ids[k]
             meta = child_meta[item_id]
-            print(f"📊 [calculate_comprehensive_mrp_kanban] 生成MRP行：ID={item_id}, Code={meta.get('ItemCode')}, Name={meta.get('CnName')}, Spec={meta.get('ItemSpec')}")
-            plan_cells = {w: float(child_weekly[item_id].get(w, 0.0)) for w in weeks}
 
             # 期初库存（成品中的数量 + 直接库存数量）
-            direct_onhand = float(onhand_all.get(item_id, 0.0))
-            in_parent_qty = float(child_in_parent_qty.get(item_id, 0.0))
-            start_onhand_str = f"{int(in_parent_qty)}+{int(direct_onhand)}"
-
-            # 计算总库存（成品中的数量 + 直接库存数量）
-            total_stock = direct_onhand + in_parent_qty
+            start_onhand_str = f"{int(in_parent_qty[k])}+{int(direct_onhand[k])}"
 
             # 订单计划行
             plan_row = {
@@ -369,18 +343,12 @@ class MRPService:
                 "ItemType": meta.get("ItemType", ""),
                 "RowType": "订单计划",
                 "StartOnHand": start_onhand_str,
-                "TotalStock": total_stock,
-                "cells": plan_cells
+                "TotalStock": float(total_stock[k]),
+                "cells": MRPGridService.to_cells(weeks, plan[k])
             }
             rows.append(plan_row)
 
-            # 即时库存行（累计计算）
-            stock_cells = {}
-            running = direct_onhand + in_parent_qty  # 综合库存
-            for w in weeks:
-                running = running - plan_cells[w]
-                stock_cells[w] = running  # 允许出现负数以暴露缺口
-
+            # 即时库存行（累计计算，允许出现负数以暴露缺口）
             stock_row = {
                 "ItemId": item_id,
                 "ItemCode": meta.get("ItemCode", ""),
@@ -389,12 +357,12 @@ class MRPService:
                 "ItemType": meta.get("ItemType", ""),
                 "RowType": "即时库存",
                 "StartOnHand": start_onhand_str,
-                "TotalStock": total_stock,
-                "cells": stock_cells
+                "TotalStock": float(total_stock[k]),
+                "cells": MRPGridService.to_cells(weeks, stock[k])
             }
             rows.append(stock_row)
 
-        print(f"✅ [calculate_comprehensive_mrp_kanban] 计算完成，返回：weeks={len(weeks)}, rows={len(rows)}")
+        logger.debug("[calculate_comprehensive_mrp_kanban] 计算完成，返回：weeks=%s, rows=%s", len(weeks), len(rows))
         
         # 构建警告信息
         warnings = []
@@ -468,6 +436,7 @@ class MRPService:
         return weeks
 
     @staticmethod
+    @profiled()
     def _fetch_parent_weekly_demand(start_date: str, end_date: str,
                                     import_id: Optional[int] = None,
                                     search_filter: Optional[str] = None) -> Tuple[Dict[int, Dict[str, float]], List[str]]:
@@ -479,9 +448,9 @@ class MRPService:
         - import_id: 指定客户订单版本ID
         - parent_item_filter: 成品筛选，支持模糊匹配
         """
-        print(f"📊 [_fetch_parent_weekly_demand] 开始获取成品周需求")
-        print(f"📊 [_fetch_parent_weekly_demand] 参数：start_date={start_date}, end_date={end_date}")
-        print(f"📊 [_fetch_parent_weekly_demand] 参数：import_id={import_id}, search_filter={search_filter}")
+        logger.debug("[_fetch_parent_weekly_demand] 开始获取成品周需求")
+        logger.debug("[_fetch_parent_weekly_demand] 参数：start_date=%s, end_date=%s", start_date, end_date)
+        logger.debug("[_fetch_parent_weekly_demand] 参数：import_id=%s, search_filter=%s", import_id, search_filter)
         
         # 构建WHERE条件
         where_conditions = ["col.LineStatus='Active'", "col.DeliveryDate BETWEEN ? AND ?"]
@@ -498,8 +467,8 @@ class MRPService:
             params.append(filter_pattern)
         
         where_clause = " AND ".join(where_conditions)
-        print(f"📊 [_fetch_parent_weekly_demand] WHERE条件：{where_clause}")
-        print(f"📊 [_fetch_parent_weekly_demand] 参数：{params}")
+        logger.debug("[_fetch_parent_weekly_demand] WHERE条件：%s", where_clause)
+        logger.debug("[_fetch_parent_weekly_demand] 参数：%s", params)
         
         # 首先获取订单行数据，然后通过品牌匹配BOM来获取对应的父物料
         # 修改：使用具体的订单日期而不是CW，与客户订单看板保持一致
@@ -520,11 +489,12 @@ class MRPService:
         """
         
         rows = query_all(sql, tuple(params))
-        print(f"📊 [_fetch_parent_weekly_demand] 查询结果：{len(rows)} 行")
+        logger.debug("[_fetch_parent_weekly_demand] 查询结果：%s 行", len(rows))
         
-        # 通过品牌匹配BOM来获取父物料ID
+        # 通过品牌匹配BOM来获取父物料ID（同一品牌只解析一次）
         out: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
         unmatched_items = []  # 收集未匹配的ItemNumber
+        brand_index = BrandBomIndex.load()
         
         for r in rows:
             item_number = r["ItemNumber"]  # 这是品牌字段
@@ -537,19 +507,20 @@ class MRPService:
                 continue
             
             # 通过品牌查找BOM，获取父物料ID
-            bom = MRPService.find_bom_by_brand(item_number)
-            if bom and bom.get("ParentItemId"):
-                parent_item_id = bom["ParentItemId"]
+            parent_item_id = brand_index.resolve_parent(item_number)
+            if parent_item_id:
                 # 使用具体的订单日期作为键，与客户订单看板保持一致
                 out[parent_item_id][delivery_date] += qty
-                print(f"📊 [_fetch_parent_weekly_demand] 品牌 {item_number} 匹配到父物料ID {parent_item_id}, Date={delivery_date}, CW={calendar_week}, Qty={qty}")
-            else:
-                print(f"📊 [_fetch_parent_weekly_demand] 品牌 {item_number} 未找到对应BOM")
-                if item_number not in unmatched_items:
-                    unmatched_items.append(item_number)
+                logger.debug("[_fetch_parent_weekly_demand] 品牌 %s 匹配到父物料ID %s, Date=%s, CW=%s, Qty=%s", item_number, parent_item_id, delivery_date, calendar_week, qty)
+            elif item_number not in unmatched_items:
+                unmatched_items.append(item_number)
         
-        print(f"📊 [_fetch_parent_weekly_demand] 汇总结果：{out}")
-        print(f"📊 [_fetch_parent_weekly_demand] 未匹配的ItemNumber：{unmatched_items}")
+        # 未匹配的品牌每次计算汇总输出一次
+        if unmatched_items:
+            logger.warning("[_fetch_parent_weekly_demand] %d 个品牌未找到对应BOM：%s",
+                           len(unmatched_items), ", ".join(map(str, unmatched_items)))
+        logger.debug("[_fetch_parent_weekly_demand] 汇总结果：%s", out)
+        logger.debug("[_fetch_parent_weekly_demand] 未匹配的ItemNumber：%s", unmatched_items)
         return out, unmatched_items
 
     @staticmethod
@@ -616,6 +587,7 @@ class MRPService:
         return float(row["OnHand"] or 0.0) if row else 0.0
 
     @staticmethod
+    @profiled()
     def _fetch_onhand_total() -> Dict[int, float]:
         # 直接按余额表汇总全部仓库的 QtyOnHand
         sql = """
@@ -678,46 +650,65 @@ class MRPService:
         return {row["ItemId"]: float(row["TotalQty"] or 0.0) for row in rows}
 
     @staticmethod
-    def _calculate_child_in_parent_quantity(child_item_ids: List[int], parent_inventory: Dict[int, float]) -> Dict[int, float]:
-        """计算每个零部件在成品中的数量"""
-        child_in_parent_qty = {}
-        
-        for child_id in child_item_ids:
-            total_qty = 0.0
-            
-            # 查找所有包含该零部件的有效BOM
-            sql = """
-            SELECT bh.ParentItemId, bl.QtyPer
-            FROM BomLines bl
-            JOIN BomHeaders bh ON bl.BomId = bh.BomId
-            WHERE bl.ChildItemId = ? AND bh.IsActive = 1
-            """
-            bom_lines = query_all(sql, (child_id,))
-            
-            for line in bom_lines:
-                # 转换 sqlite3.Row 为字典
-                if hasattr(line, 'keys'):
-                    line = dict(line)
-                parent_id = line["ParentItemId"]
-                qty_per = float(line.get("QtyPer") or 0.0)
-                parent_qty = parent_inventory.get(parent_id, 0.0)
-                
-                # 零部件在成品中的数量 = BOM用量 × 成品库存
-                total_qty += qty_per * parent_qty
-            
-            child_in_parent_qty[child_id] = total_qty
-        
+    @profiled()
+    def _calculate_child_in_parent_quantity(child_item_ids: Iterable[int], parent_inventory: Dict[int, float],
+                                            multi_level: bool = False) -> Dict[int, float]:
+        """
+        计算每个零部件在成品中的数量（成品库存折算为零部件数量），全部零部件一次计算
+        - 默认单级：零部件在各有效BOM中的直接用量 × 父物料成品库存，一次分组查询
+        - multi_level=True：按扁平化BOM（各层累计用量，含损耗，与展开时选用同一BOM版本）下卷，
+          一次遍历全部有库存成品的扁平化结果，成品中半成品所含的零部件也折算在内
+        """
+        child_in_parent_qty = {int(cid): 0.0 for cid in child_item_ids}
+        stocked = {int(pid): float(qty) for pid, qty in parent_inventory.items() if qty}
+        if not child_in_parent_qty or not stocked:
+            return child_in_parent_qty
+
+        if multi_level:
+            # 扁平化BOM有缓存，未缓存的成品一次加载BOM结构后批量扁平化
+            for parent_id, flat in BomExplosionService.get_flat_boms(stocked.keys()).items():
+                parent_qty = stocked[parent_id]
+                for child_id, entry in flat.items():
+                    if child_id in child_in_parent_qty:
+                        child_in_parent_qty[child_id] += entry["CumQtyPer"] * parent_qty
+            return child_in_parent_qty
+
+        # 所有有效BOM中 (子件, 父物料) 的直接用量
+        sql = """
+        SELECT bl.ChildItemId, bh.ParentItemId, SUM(bl.QtyPer) AS QtyPer
+        FROM BomLines bl
+        JOIN BomHeaders bh ON bl.BomId = bh.BomId
+        WHERE bh.IsActive = 1
+        GROUP BY bl.ChildItemId, bh.ParentItemId
+        """
+        for r in query_all(sql):
+            child_id = r["ChildItemId"]
+            parent_qty = stocked.get(r["ParentItemId"])
+            if parent_qty is None or child_id not in child_in_parent_qty:
+                continue
+            # 零部件在成品中的数量 = BOM用量 × 成品库存
+            child_in_parent_qty[child_id] += float(r["QtyPer"] or 0.0) * parent_qty
+
         return child_in_parent_qty
 
     # ---------------- 新增方法：基于商品品牌字段的BOM匹配 ---------------- 
     @staticmethod
-    def find_bom_by_brand(brand: str) -> Optional[Dict]:
+    def find_bom_by_brand(brand: str, brand_index: Optional[BrandBomIndex] = None) -> Optional[Dict]:
         """
         根据商品品牌字段查找对应的BOM
         BOM名称格式：品牌_BOM
+        传入 brand_index 时在内存索引中匹配，不再访问数据库
         """
         try:
-            print(f"🔍 [find_bom_by_brand] 开始查找品牌：{brand}")
+            logger.debug("[find_bom_by_brand] 开始查找品牌：%s", brand)
+            
+            if brand_index is not None:
+                bom_dict = brand_index.resolve(brand)
+                if bom_dict:
+                    logger.debug("[find_bom_by_brand] 找到BOM：%s - %s", bom_dict.get('BomName', ''), bom_dict.get('Rev', ''))
+                else:
+                    logger.debug("[find_bom_by_brand] 未找到品牌 '%s' 对应的BOM", brand)
+                return bom_dict
             
             sql = """
             SELECT bh.*, i.ItemCode as ParentItemCode, i.CnName as ParentItemName,
@@ -729,28 +720,30 @@ class MRPService:
             LIMIT 1
             """
             bom_pattern = f"%{brand}%"
-            print(f"🔍 [find_bom_by_brand] 使用模式：{bom_pattern}")
+            logger.debug("[find_bom_by_brand] 使用模式：%s", bom_pattern)
             
             result = query_one(sql, (bom_pattern,))
             if result:
                 bom_dict = dict(result)
-                print(f"✅ [find_bom_by_brand] 找到BOM：{bom_dict.get('BomName', '')} - {bom_dict.get('Rev', '')}")
+                logger.debug("[find_bom_by_brand] 找到BOM：%s - %s", bom_dict.get('BomName', ''), bom_dict.get('Rev', ''))
                 return bom_dict
             else:
-                print(f"❌ [find_bom_by_brand] 未找到品牌 '{brand}' 对应的BOM")
-                # 显示所有BOM名称用于调试
-                all_boms_sql = "SELECT BomName FROM BomHeaders WHERE IsActive = 1"
-                all_boms = query_all(all_boms_sql)
-                print(f"📋 [find_bom_by_brand] 所有BOM名称：{[dict(bom)['BomName'] for bom in all_boms]}")
+                logger.debug("[find_bom_by_brand] 未找到品牌 '%s' 对应的BOM", brand)
+                # 显示所有BOM名称用于调试（仅在 DEBUG 级别时查询）
+                if logger.isEnabledFor(logging.DEBUG):
+                    all_boms_sql = "SELECT BomName FROM BomHeaders WHERE IsActive = 1"
+                    all_boms = query_all(all_boms_sql)
+                    logger.debug("[find_bom_by_brand] 所有BOM名称：%s", [dict(bom)['BomName'] for bom in all_boms])
             return None
         except Exception as e:
-            print(f"❌ [find_bom_by_brand] 查找BOM时发生错误: {str(e)}")
+            logger.error("[find_bom_by_brand] 查找BOM时发生错误: %s", str(e))
             raise Exception(f"根据品牌查找BOM失败: {str(e)}")
 
     @staticmethod
-    def get_bom_structure_by_brand(brand: str) -> Dict:
+    def get_bom_structure_by_brand(brand: str, brand_index: Optional[BrandBomIndex] = None) -> Dict:
         """
         根据商品品牌字段获取完整的BOM结构
+        brand_index: 可选的品牌→BOM索引，批量计算时复用
         返回：{
             "bom_info": {...},
             "parent_item": {...},
@@ -758,20 +751,20 @@ class MRPService:
         }
         """
         try:
-            print(f"🏗️ [get_bom_structure_by_brand] 开始获取BOM结构，品牌：{brand}")
+            logger.debug("[get_bom_structure_by_brand] 开始获取BOM结构，品牌：%s", brand)
             
             # 查找BOM
-            bom = MRPService.find_bom_by_brand(brand)
+            bom = MRPService.find_bom_by_brand(brand, brand_index)
             if not bom:
-                print(f"❌ [get_bom_structure_by_brand] 未找到BOM，返回空结构")
+                logger.debug("[get_bom_structure_by_brand] 未找到BOM，返回空结构")
                 return {}
             
-            print(f"✅ [get_bom_structure_by_brand] 找到BOM，ID：{bom.get('BomId')}")
+            logger.debug("[get_bom_structure_by_brand] 找到BOM，ID：%s", bom.get('BomId'))
             
             # 获取父物料信息
             parent_item = None
             if bom.get("ParentItemId"):
-                print(f"🔍 [get_bom_structure_by_brand] 查找父物料，ID：{bom['ParentItemId']}")
+                logger.debug("[get_bom_structure_by_brand] 查找父物料，ID：%s", bom['ParentItemId'])
                 sql = """
                 SELECT ItemId, ItemCode, CnName, ItemSpec, ItemType, Brand, Unit
                 FROM Items
@@ -780,16 +773,16 @@ class MRPService:
                 result = query_one(sql, (bom["ParentItemId"],))
                 if result:
                     parent_item = dict(result)
-                    print(f"✅ [get_bom_structure_by_brand] 找到父物料：{parent_item.get('ItemCode', '')} - {parent_item.get('CnName', '')}")
+                    logger.debug("[get_bom_structure_by_brand] 找到父物料：%s - %s", parent_item.get('ItemCode', ''), parent_item.get('CnName', ''))
                 else:
-                    print(f"❌ [get_bom_structure_by_brand] 未找到父物料")
+                    logger.warning("[get_bom_structure_by_brand] 未找到父物料")
             else:
-                print(f"⚠️ [get_bom_structure_by_brand] BOM没有关联父物料")
+                logger.warning("[get_bom_structure_by_brand] BOM没有关联父物料")
             
             # 获取BOM组件
-            print(f"🔍 [get_bom_structure_by_brand] 获取BOM组件，BOM ID：{bom['BomId']}")
+            logger.debug("[get_bom_structure_by_brand] 获取BOM组件，BOM ID：%s", bom['BomId'])
             components = MRPService.get_bom_components(bom["BomId"])
-            print(f"✅ [get_bom_structure_by_brand] 找到 {len(components)} 个组件")
+            logger.debug("[get_bom_structure_by_brand] 找到 %s 个组件", len(components))
             
             return {
                 "bom_info": bom,
@@ -797,14 +790,14 @@ class MRPService:
                 "components": components
             }
         except Exception as e:
-            print(f"❌ [get_bom_structure_by_brand] 获取BOM结构时发生错误: {str(e)}")
+            logger.error("[get_bom_structure_by_brand] 获取BOM结构时发生错误: %s", str(e))
             raise Exception(f"获取BOM结构失败: {str(e)}")
 
     @staticmethod
     def get_bom_components(bom_id: int) -> List[Dict]:
         """获取BOM的所有组件"""
         try:
-            print(f"🔍 [get_bom_components] 查询BOM组件，BOM ID：{bom_id}")
+            logger.debug("[get_bom_components] 查询BOM组件，BOM ID：%s", bom_id)
             
             sql = """
             SELECT bl.*, i.ItemCode, i.CnName, i.ItemSpec, i.ItemType, i.Brand, i.Unit
@@ -816,18 +809,19 @@ class MRPService:
             results = query_all(sql, (bom_id,))
             components = [dict(row) for row in results]
             
-            print(f"✅ [get_bom_components] 找到 {len(components)} 个组件")
+            logger.debug("[get_bom_components] 找到 %s 个组件", len(components))
             for i, comp in enumerate(components[:3], 1):  # 显示前3个组件
-                print(f"  组件{i}：{comp.get('ItemCode', '')} - {comp.get('CnName', '')} - QtyPer:{comp.get('QtyPer', 1.0)}")
+                logger.debug("组件%s：%s - %s - QtyPer:%s", i, comp.get('ItemCode', ''), comp.get('CnName', ''), comp.get('QtyPer', 1.0))
             
             return components
         except Exception as e:
-            print(f"❌ [get_bom_components] 获取BOM组件时发生错误: {str(e)}")
+            logger.error("[get_bom_components] 获取BOM组件时发生错误: %s", str(e))
             raise Exception(f"获取BOM组件失败: {str(e)}")
 
     @staticmethod
     def calculate_mrp_by_brand(brand: str, required_qty: float, 
-                             include_types: Tuple[str, ...] = ("RM", "PKG")) -> Dict:
+                             include_types: Tuple[str, ...] = ("RM", "PKG"),
+                             brand_index: Optional[BrandBomIndex] = None) -> Dict:
         """
         根据商品品牌字段计算MRP需求
         
@@ -835,6 +829,7 @@ class MRPService:
         - brand: 商品品牌字段（对应客户订单的PN）
         - required_qty: 需求数量
         - include_types: 包含的物料类型
+        - brand_index: 可选的品牌→BOM索引，批量计算时复用
         
         返回：
         {
@@ -854,30 +849,30 @@ class MRPService:
         }
         """
         try:
-            print(f"📊 [calculate_mrp_by_brand] 开始MRP计算，品牌：{brand}，需求数量：{required_qty}")
-            print(f"📊 [calculate_mrp_by_brand] 包含物料类型：{include_types}")
+            logger.debug("[calculate_mrp_by_brand] 开始MRP计算，品牌：%s，需求数量：%s", brand, required_qty)
+            logger.debug("[calculate_mrp_by_brand] 包含物料类型：%s", include_types)
             
             # 获取BOM结构
-            bom_structure = MRPService.get_bom_structure_by_brand(brand)
+            bom_structure = MRPService.get_bom_structure_by_brand(brand, brand_index)
             if not bom_structure:
-                print(f"❌ [calculate_mrp_by_brand] 未找到BOM结构，返回错误")
+                logger.debug("[calculate_mrp_by_brand] 未找到BOM结构，返回错误")
                 return {"error": f"未找到品牌 '{brand}' 对应的BOM"}
             
             bom_info = bom_structure["bom_info"]
             parent_item = bom_structure["parent_item"]
             components = bom_structure["components"]
             
-            print(f"📊 [calculate_mrp_by_brand] 开始计算需求，组件数量：{len(components)}")
+            logger.debug("[calculate_mrp_by_brand] 开始计算需求，组件数量：%s", len(components))
             
             # 计算需求
             requirements = []
             for i, component in enumerate(components, 1):
                 item_type = component.get("ItemType", "")
-                print(f"🔍 [calculate_mrp_by_brand] 处理组件{i}：{component.get('ItemCode', '')} - 类型：{item_type}")
+                logger.debug("[calculate_mrp_by_brand] 处理组件%s：%s - 类型：%s", i, component.get('ItemCode', ''), item_type)
                 
                 # 只处理指定类型的物料
                 if include_types and item_type not in include_types:
-                    print(f"⏭️ [calculate_mrp_by_brand] 跳过组件{i}，类型 {item_type} 不在包含列表中")
+                    logger.debug("[calculate_mrp_by_brand] 跳过组件%s，类型 %s 不在包含列表中", i, item_type)
                     continue
                 
                 # 计算需求数量（考虑损耗）
@@ -885,16 +880,16 @@ class MRPService:
                 scrap_factor = float(component.get("ScrapFactor", 0.0))
                 required_qty_with_scrap = required_qty * qty_per * (1 + scrap_factor)
                 
-                print(f"📊 [calculate_mrp_by_brand] 组件{i}计算：需求{qty_per} × 损耗系数{1+scrap_factor} = {required_qty_with_scrap}")
+                logger.debug("[calculate_mrp_by_brand] 组件%s计算：需求%s × 损耗系数%s = %s", i, qty_per, 1+scrap_factor, required_qty_with_scrap)
                 
                 # 获取库存
                 item_id = component["ChildItemId"]
                 onhand_qty = MRPService._fetch_item_onhand(item_id)
-                print(f"📊 [calculate_mrp_by_brand] 组件{i}库存：{onhand_qty}")
+                logger.debug("[calculate_mrp_by_brand] 组件%s库存：%s", i, onhand_qty)
                 
                 # 计算净需求
                 net_qty = max(0, required_qty_with_scrap - onhand_qty)
-                print(f"📊 [calculate_mrp_by_brand] 组件{i}净需求：{net_qty}")
+                logger.debug("[calculate_mrp_by_brand] 组件%s净需求：%s", i, net_qty)
                 
                 requirements.append({
                     "ItemId": item_id,
@@ -911,7 +906,7 @@ class MRPService:
                     "NetQty": net_qty
                 })
             
-            print(f"✅ [calculate_mrp_by_brand] MRP计算完成，生成 {len(requirements)} 个需求")
+            logger.debug("[calculate_mrp_by_brand] MRP计算完成，生成 %s 个需求", len(requirements))
             
             return {
                 "bom_info": bom_info,
@@ -921,7 +916,7 @@ class MRPService:
             }
             
         except Exception as e:
-            print(f"❌ [calculate_mrp_by_brand] MRP计算时发生错误: {str(e)}")
+            logger.error("[calculate_mrp_by_brand] MRP计算时发生错误: %s", str(e))
             return {"error": f"MRP计算失败: {str(e)}"}
 
     @staticmethod
@@ -948,7 +943,7 @@ class MRPService:
         }
         """
         try:
-            print(f"📋 [calculate_mrp_for_customer_order] 开始客户订单MRP计算，导入ID：{import_id}")
+            logger.debug("[calculate_mrp_for_customer_order] 开始客户订单MRP计算，导入ID：%s", import_id)
             
             # 获取客户订单信息
             sql = """
@@ -964,19 +959,20 @@ class MRPService:
             results = query_all(sql, (import_id,))
             order_lines = [dict(row) for row in results]
             
-            print(f"📋 [calculate_mrp_for_customer_order] 找到 {len(order_lines)} 个订单行")
+            logger.debug("[calculate_mrp_for_customer_order] 找到 %s 个订单行", len(order_lines))
             
             # 显示订单行信息
             for i, line in enumerate(order_lines[:5], 1):  # 显示前5行
-                print(f"  订单行{i}：{line.get('ItemNumber', '')} - {line.get('CnName', '')} - 品牌：{line.get('Brand', '')} - 数量：{line.get('RequiredQty', 0)}")
+                logger.debug("订单行%s：%s - %s - 品牌：%s - 数量：%s", i, line.get('ItemNumber', ''), line.get('CnName', ''), line.get('Brand', ''), line.get('RequiredQty', 0))
             
             # 按品牌分组计算（使用ItemNumber作为品牌）
             brand_requirements = {}
+            missing_brand_lines = 0
             for line in order_lines:
                 # 根据要求，客户订单提供的PN就是对应成品的商品品牌字段
                 brand = line.get("ItemNumber", "")
                 if not brand:
-                    print(f"⚠️ [calculate_mrp_for_customer_order] 订单行没有物料编码")
+                    missing_brand_lines += 1
                     continue
                 
                 if brand not in brand_requirements:
@@ -984,13 +980,17 @@ class MRPService:
                 
                 brand_requirements[brand] += float(line.get("RequiredQty", 0.0))
             
-            print(f"📋 [calculate_mrp_for_customer_order] 按品牌分组结果：{brand_requirements}")
+            if missing_brand_lines:
+                logger.warning("[calculate_mrp_for_customer_order] %d 个订单行没有物料编码", missing_brand_lines)
+            logger.debug("[calculate_mrp_for_customer_order] 按品牌分组结果：%s", brand_requirements)
             
-            # 计算每个品牌的MRP
+            # 计算每个品牌的MRP（品牌→BOM索引只加载一次）
+            brand_index = BrandBomIndex.load()
             mrp_results = []
+            failed_brands = []
             for brand, total_qty in brand_requirements.items():
-                print(f"📊 [calculate_mrp_for_customer_order] 计算品牌 {brand} 的MRP，总需求：{total_qty}")
-                mrp_result = MRPService.calculate_mrp_by_brand(brand, total_qty, include_types)
+                logger.debug("[calculate_mrp_for_customer_order] 计算品牌 %s 的MRP，总需求：%s", brand, total_qty)
+                mrp_result = MRPService.calculate_mrp_by_brand(brand, total_qty, include_types, brand_index)
                 if "error" not in mrp_result:
                     mrp_results.append({
                         "brand": brand,
@@ -999,11 +999,14 @@ class MRPService:
                         "parent_item": mrp_result.get("parent_item", {}),
                         "requirements": mrp_result.get("requirements", [])
                     })
-                    print(f"✅ [calculate_mrp_for_customer_order] 品牌 {brand} MRP计算成功")
+                    logger.debug("[calculate_mrp_for_customer_order] 品牌 %s MRP计算成功", brand)
                 else:
-                    print(f"❌ [calculate_mrp_for_customer_order] 品牌 {brand} MRP计算失败：{mrp_result['error']}")
+                    failed_brands.append(brand)
             
-            print(f"📊 [calculate_mrp_for_customer_order] 客户订单MRP计算完成，处理了 {len(mrp_results)} 个品牌")
+            if failed_brands:
+                logger.warning("[calculate_mrp_for_customer_order] %d 个品牌MRP计算失败（未找到BOM）：%s",
+                               len(failed_brands), ", ".join(map(str, failed_brands)))
+            logger.debug("[calculate_mrp_for_customer_order] 客户订单MRP计算完成，处理了 %s 个品牌", len(mrp_results))
             
             return {
                 "import_id": import_id,
@@ -1013,5 +1016,5 @@ class MRPService:
             }
             
         except Exception as e:
-            print(f"❌ [calculate_mrp_for_customer_order] 客户订单MRP计算时发生错误: {str(e)}")
+            logger.error("[calculate_mrp_for_customer_order] 客户订单MRP计算时发生错误: %s", str(e))
             return {"error": f"客户订单MRP计算失败: {str(e)}"}
@@ -0,0 +1,376 @@
+# app/services/mrp_snapshot_service.py
+# -*- coding: utf-8 -*-
+"""
+MRP 计算结果快照
+- 以 (来源, 来源键, 输入指纹) 为键，把整份计算结果存为一条 MrpSnapshots 记录，一条语句写入
+- 结果按列式编码：行元数据按字段成列，日期单元格整理为 float64 稠密矩阵，再整体 zlib 压缩
+- 输入指纹 = 计算参数 + 数据版本（MrpChangeLog 最大变更号）+ 调用方提供的其它输入，
+  任一输入变化时指纹随之变化，旧快照不再命中，按保存时间/数量淘汰
+- 排产订单、排产计划的MRP结果只保存为快照（不再写逐行明细表），
+  每个订单/计划最近的一条快照不参与按时间和总数的淘汰，删除订单/计划时一并删除
+- MRP 看板计算另有进程内 LRU 缓存（MRPResultCache），键含各输入表的数据版本，
+  同一会话中切换计算类型再切回时直接返回，输入表变更后自动失效
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.db import add_reset_listener, query_one, execute, transaction
+from app.services.mrp_change_log import MRPChangeLog, MRP_INPUT_TABLES
+from app.utils.perf import get_logger
+
+logger = get_logger(__name__)
+
+_MAGIC = b"MRPS1"
+_HEADER_LEN = struct.Struct("<I")
+
+
+class MRPSnapshotService:
+    """MRP 结果快照的指纹、编码与存取"""
+
+    MAX_AGE_DAYS = 30          # 超过该天数的快照淘汰
+    MAX_PER_KEY = 3            # 每个 (来源, 来源键) 最多保留的快照数
+    MAX_SNAPSHOTS = 100        # 全部快照最多保留数
+    # 以快照为唯一保存位置的来源：每个来源键最近的一条不按时间/总数淘汰
+    DURABLE_SOURCES = ("scheduling_order", "production_schedule")
+
+    # ---------------- 指纹 ----------------
+    @staticmethod
+    def data_version() -> Any:
+        """
+        MRP 相关数据版本：客户订单/库存/BOM/物料任一变更都会使其增大
+        数据库缺少变更日志时返回一次性的版本标记，快照照常保存但不会被之后的计算复用
+        """
+        try:
+            return MRPChangeLog.current_id()
+        except sqlite3.OperationalError as e:
+            if not MRPChangeLog.is_missing(e):
+                raise
+            logger.warning("MRP变更日志不可用，快照不复用: %s", e)
+            return f"unversioned-{time.time_ns()}"
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """任意可 JSON 化的输入 → 指纹"""
+        text = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    # ---------------- 编码 ----------------
+    @staticmethod
+    def encode(result: Dict, rows_key: str) -> Tuple[bytes, int, int]:
+        """
+        计算结果 → (压缩数据, 行数, 列数)
+        result[rows_key] 为行列表，每行的 cells 为 {日期: 数值} 或 {日期: {字段: 数值}}；
+        其余键原样以 JSON 保存。单元格缺失记为 NaN，解码时跳过。
+        """
+        rows = result.get(rows_key) or []
+
+        cols: List[str] = []
+        col_index: Dict[str, int] = {}
+        cell_fields: Optional[List[str]] = None
+        for row in rows:
+            cells = row.get("cells", {})
+            if cells.keys() - col_index.keys():
+                for d in cells:
+                    if d not in col_index:
+                        col_index[d] = len(cols)
+                        cols.append(d)
+            if cell_fields is None and cells:
+                first = next(iter(cells.values()))
+                if isinstance(first, dict):
+                    cell_fields = list(first.keys())
+
+        # 行元数据：按键的排列方式分组（layout），各字段成列保存
+        layouts: List[List[str]] = []
+        layout_index: Dict[Tuple[str, ...], int] = {}
+        row_layout: List[int] = []
+        columns: Dict[str, List[Any]] = {}
+        for i, row in enumerate(rows):
+            keys = tuple(k for k in row.keys() if k != "cells")
+            if keys not in layout_index:
+                layout_index[keys] = len(layouts)
+                layouts.append(list(keys))
+            row_layout.append(layout_index[keys])
+            for k in keys:
+                columns.setdefault(k, [None] * len(rows))[i] = row[k]
+
+        depth = len(cell_fields) if cell_fields else 1
+        matrix = np.full((len(rows), len(cols), depth), np.nan)
+        for i, row in enumerate(rows):
+            cells = row.get("cells", {})
+            if not cell_fields and len(cells) == len(cols):
+                # 常见情况：各行日期列相同，整行按列顺序写入
+                matrix[i, :, 0] = [cells[d] for d in cols]
+                continue
+            for d, v in cells.items():
+                j = col_index[d]
+                if cell_fields:
+                    for f, field in enumerate(cell_fields):
+                        if field in v:
+                            matrix[i, j, f] = v[field]
+                else:
+                    matrix[i, j, 0] = v
+
+        header = {
+            "rows_key": rows_key,
+            "extra": {k: v for k, v in result.items() if k != rows_key},
+            "cols": cols,
+            "cell_fields": cell_fields,
+            "layouts": layouts,
+            "row_layout": row_layout,
+            "columns": columns,
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False, default=str).encode("utf-8")
+        raw = _HEADER_LEN.pack(len(header_bytes)) + header_bytes + matrix.astype("<f8").tobytes()
+        return _MAGIC + zlib.compress(raw, 1), len(rows), len(cols)
+
+    @staticmethod
+    def decode(payload: bytes) -> Dict:
+        """压缩数据 → 计算结果（结构同 encode 的输入）"""
+        if not payload.startswith(_MAGIC):
+            raise ValueError("未知的MRP快照格式")
+        raw = zlib.decompress(payload[len(_MAGIC):])
+        (header_len,) = _HEADER_LEN.unpack_from(raw)
+        header = json.loads(raw[_HEADER_LEN.size:_HEADER_LEN.size + header_len].decode("utf-8"))
+
+        cols = header["cols"]
+        cell_fields = header["cell_fields"]
+        layouts = header["layouts"]
+        columns = header["columns"]
+        n = len(header["row_layout"])
+        depth = len(cell_fields) if cell_fields else 1
+        matrix = np.frombuffer(raw, dtype="<f8", offset=_HEADER_LEN.size + header_len)
+        matrix = matrix.reshape(n, len(cols), depth)
+        present = ~np.isnan(matrix)
+        dense = present.reshape(n, -1).all(axis=1)
+        values = matrix.tolist()
+
+        rows = []
+        for i, layout in enumerate(header["row_layout"]):
+            row = {k: columns[k][i] for k in layouts[layout]}
+            if dense[i]:
+                # 整行无缺失单元格：直接按列顺序组装
+                if cell_fields:
+                    row["cells"] = {d: dict(zip(cell_fields, v)) for d, v in zip(cols, values[i])}
+                else:
+                    row["cells"] = {d: v[0] for d, v in zip(cols, values[i])}
+                rows.append(row)
+                continue
+            cells = {}
+            for j, d in enumerate(cols):
+                if not present[i, j].any():
+                    continue
+                if cell_fields:
+                    cells[d] = {field: values[i][j][f]
+                                for f, field in enumerate(cell_fields) if present[i, j, f]}
+                else:
+                    cells[d] = values[i][j][0]
+            row["cells"] = cells
+            rows.append(row)
+
+        result = dict(header["extra"])
+        result[header["rows_key"]] = rows
+        return result
+
+    # ---------------- 存取 ----------------
+    @staticmethod
+    def load(source: str, source_key: Any, fingerprint: str) -> Optional[Dict]:
+        """读取快照，不存在或无法解码时返回 None"""
+        try:
+            row = query_one("""
+                SELECT Payload FROM MrpSnapshots
+                WHERE Source = ? AND SourceKey = ? AND Fingerprint = ?
+            """, (source, MRPSnapshotService._key(source_key), fingerprint))
+            if not row:
+                return None
+            result = MRPSnapshotService.decode(row["Payload"])
+            logger.debug("[MRPSnapshot] 载入快照：%s/%s", source, MRPSnapshotService._key(source_key))
+            return result
+        except Exception as e:
+            logger.error("读取MRP快照失败: %s", e)
+            return None
+
+    @staticmethod
+    def save(source: str, source_key: Any, fingerprint: str, result: Dict, rows_key: str):
+        """保存快照（仅作缓存的来源）；保存失败只记录日志，不影响计算结果"""
+        try:
+            MRPSnapshotService.write(source, source_key, fingerprint, result, rows_key)
+        except Exception as e:
+            logger.error("保存MRP快照失败: %s", e)
+
+    @staticmethod
+    def write(source: str, source_key: Any, fingerprint: str, result: Dict, rows_key: str):
+        """
+        写入快照（一条语句写入），并淘汰过期/超量的旧快照；失败时抛出异常
+        快照是结果唯一保存位置时（DURABLE_SOURCES）由调用方在同一 transaction() 中使用
+        """
+        payload, row_count, col_count = MRPSnapshotService.encode(result, rows_key)
+        with transaction():
+            execute("""
+                INSERT OR REPLACE INTO MrpSnapshots
+                (Source, SourceKey, Fingerprint, RowCount, ColCount, Payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (source, MRPSnapshotService._key(source_key), fingerprint,
+                  row_count, col_count, payload))
+            MRPSnapshotService.evict()
+        logger.debug("[MRPSnapshot] 保存快照：%s/%s，%s 行 × %s 列，%s 字节", source, MRPSnapshotService._key(source_key), row_count, col_count, len(payload))
+
+    @staticmethod
+    def evict(max_age_days: Optional[int] = None, max_per_key: Optional[int] = None,
+              max_snapshots: Optional[int] = None) -> int:
+        """
+        按保存时间和数量淘汰旧快照，返回删除条数
+        DURABLE_SOURCES 中每个来源键最近的一条快照是该订单/计划MRP结果的唯一保存位置，始终保留
+        """
+        max_age_days = MRPSnapshotService.MAX_AGE_DAYS if max_age_days is None else max_age_days
+        max_per_key = MRPSnapshotService.MAX_PER_KEY if max_per_key is None else max_per_key
+        max_snapshots = MRPSnapshotService.MAX_SNAPSHOTS if max_snapshots is None else max_snapshots
+        durable = MRPSnapshotService.DURABLE_SOURCES
+        pinned = f"""
+            SELECT MAX(SnapshotId) FROM MrpSnapshots
+            WHERE Source IN ({','.join('?' * len(durable))})
+            GROUP BY Source, SourceKey
+        """
+        with transaction():
+            deleted = execute(f"""
+                DELETE FROM MrpSnapshots
+                WHERE CreatedAt < datetime('now', ?) AND SnapshotId NOT IN ({pinned})
+            """, (f"-{int(max_age_days)} days",) + durable)
+            deleted += execute(f"""
+                DELETE FROM MrpSnapshots WHERE SnapshotId IN (
+                    SELECT SnapshotId FROM (
+                        SELECT SnapshotId,
+                               ROW_NUMBER() OVER (PARTITION BY Source, SourceKey
+                                                  ORDER BY SnapshotId DESC) AS rn
+                        FROM MrpSnapshots
+                    ) WHERE rn > ?
+                ) AND SnapshotId NOT IN ({pinned})
+            """, (max_per_key,) + durable)
+            deleted += execute(f"""
+                DELETE FROM MrpSnapshots WHERE SnapshotId NOT IN (
+                    SELECT SnapshotId FROM MrpSnapshots ORDER BY SnapshotId DESC LIMIT ?
+                ) AND SnapshotId NOT IN ({pinned})
+            """, (max_snapshots,) + durable)
+        return deleted
+
+    @staticmethod
+    def delete(source: str, source_key: Any) -> int:
+        """删除某来源键的全部快照（如删除排产订单时）"""
+        return execute("DELETE FROM MrpSnapshots WHERE Source = ? AND SourceKey = ?",
+                       (source, MRPSnapshotService._key(source_key)))
+
+    @staticmethod
+    def get_latest(source: str, source_key: Any) -> Optional[Dict]:
+        """某来源键最近保存的快照（不校验指纹），无则返回 None"""
+        try:
+            row = query_one("""
+                SELECT Payload FROM MrpSnapshots
+                WHERE Source = ? AND SourceKey = ?
+                ORDER BY SnapshotId DESC LIMIT 1
+            """, (source, MRPSnapshotService._key(source_key)))
+            return MRPSnapshotService.decode(row["Payload"]) if row else None
+        except Exception as e:
+            logger.error("读取MRP快照失败: %s", e)
+            return None
+
+    @staticmethod
+    def _key(source_key: Any) -> str:
+        return "" if source_key is None else str(source_key)
+
+
+class MRPResultCache:
+    """
+    进程内 MRP 结果 LRU 缓存
+    键为 (来源, 指纹)；数据版本与上次不同时整体清空，旧结果不会再被返回。
+    缓存的结果与调用方共享，调用方只读不改。
+    """
+
+    MAX_ENTRIES = 16
+
+    _entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+    _versions: Optional[Dict[str, int]] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(source: str, fingerprint: str, versions: Dict[str, int]) -> Optional[Dict]:
+        with MRPResultCache._lock:
+            if versions != MRPResultCache._versions:
+                MRPResultCache._entries.clear()
+                MRPResultCache._versions = dict(versions)
+                return None
+            result = MRPResultCache._entries.get((source, fingerprint))
+            if result is not None:
+                MRPResultCache._entries.move_to_end((source, fingerprint))
+            return result
+
+    @staticmethod
+    def put(source: str, fingerprint: str, versions: Dict[str, int], result: Dict):
+        with MRPResultCache._lock:
+            if versions != MRPResultCache._versions:
+                # 计算期间数据已变更（或缓存已按新版本清空），该结果不再缓存
+                return
+            MRPResultCache._entries[(source, fingerprint)] = result
+            MRPResultCache._entries.move_to_end((source, fingerprint))
+            while len(MRPResultCache._entries) > MRPResultCache.MAX_ENTRIES:
+                MRPResultCache._entries.popitem(last=False)
+
+    @staticmethod
+    def clear():
+        with MRPResultCache._lock:
+            MRPResultCache._entries.clear()
+            MRPResultCache._versions = None
+
+
+def mrp_snapshot(source: str, rows_key: str = "rows", key_arg: str = "import_id"):
+    """
+    MRP 看板计算的缓存装饰器：按调用参数 + 各输入表数据版本生成指纹，
+    依次查找进程内缓存、数据库快照，都未命中时计算并保存；
+    数据版本在计算前读取，计算期间的变更会使下一次调用重新计算
+    """
+    def decorator(func: Callable[..., Dict]) -> Callable[..., Dict]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            source_key = params.get(key_arg)
+            try:
+                versions = MRPChangeLog.table_versions(MRP_INPUT_TABLES)
+            except sqlite3.OperationalError as e:
+                if not MRPChangeLog.is_missing(e):
+                    raise
+                # 无法判断数据版本时不读写缓存与快照，直接计算
+                logger.warning("MRP变更日志不可用，不使用结果缓存: %s", e)
+                return func(*args, **kwargs)
+            fingerprint = MRPSnapshotService.fingerprint(source, params, versions)
+
+            result = MRPResultCache.get(source, fingerprint, versions)
+            if result is not None:
+                logger.debug("[MRPResultCache] 命中缓存：%s", source)
+                return result
+            result = MRPSnapshotService.load(source, source_key, fingerprint)
+            if result is None:
+                result = func(*args, **kwargs)
+                MRPSnapshotService.save(source, source_key, fingerprint, result, rows_key)
+            MRPResultCache.put(source, fingerprint, versions, result)
+            return result
+
+        return wrapper
+    return decorator
+
+
+# 恢复数据库后变更号可能与缓存时相同，不能再按数据版本判断，整体清空
+add_reset_listener(MRPResultCache.clear)
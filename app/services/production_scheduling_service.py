@@ -7,13 +7,18 @@
 - 集成MRP计算功能，细化到每一天
 """
 
+import logging
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta, date
 from collections import defaultdict
 
-from app.db import query_all, query_one, get_conn
+from app.db import query_all, query_one, execute, get_conn, transaction
 from app.services.mrp_service import MRPService
-from app.services.bom_service import BomService
+from app.services.bom_explosion_service import BomExplosionService
+from app.services.mrp_snapshot_service import MRPSnapshotService
+from app.utils.perf import get_logger, profiled
+
+logger = get_logger(__name__)
 
 
 class ProductionSchedulingService:
@@ -49,7 +54,7 @@ class ProductionSchedulingService:
             rows = query_all(sql)
             return [dict(row) for row in rows]
         except Exception as e:
-            print(f"获取排产计划失败: {e}")
+            logger.error("获取排产计划失败: %s", e)
             return []
     
     @staticmethod
@@ -65,7 +70,7 @@ class ProductionSchedulingService:
             row = query_one(sql, (schedule_id,))
             return dict(row) if row else None
         except Exception as e:
-            print(f"获取排产计划失败: {e}")
+            logger.error("获取排产计划失败: %s", e)
             return None
     
     @staticmethod
@@ -120,6 +125,7 @@ class ProductionSchedulingService:
                 conn.execute("DELETE FROM ProductionScheduleLines WHERE ScheduleId = ?", (schedule_id,))
                 conn.execute("DELETE FROM ProductionSchedules WHERE ScheduleId = ?", (schedule_id,))
                 conn.commit()
+            MRPSnapshotService.delete("production_schedule", schedule_id)
             return True, "删除成功"
         except Exception as e:
             return False, f"删除失败: {str(e)}"
@@ -141,10 +147,11 @@ class ProductionSchedulingService:
             rows = query_all(sql)
             return [dict(row) for row in rows]
         except Exception as e:
-            print(f"获取可排产成品失败: {e}")
+            logger.error("获取可排产成品失败: %s", e)
             return []
     
     @staticmethod
+    @profiled()
     def get_schedule_kanban_data(schedule_id: int) -> Dict:
         """
         获取排产看板数据
@@ -239,7 +246,7 @@ class ProductionSchedulingService:
                 "products": products
             }
         except Exception as e:
-            print(f"获取排产看板数据失败: {e}")
+            logger.error("获取排产看板数据失败: %s", e)
             return {"error": f"获取排产看板数据失败: {str(e)}"}
     
     @staticmethod
@@ -312,6 +319,7 @@ class ProductionSchedulingService:
             return False, f"批量更新失败: {str(e)}"
     
     @staticmethod
+    @profiled()
     def calculate_daily_mrp(schedule_id: int, include_types: Tuple[str, ...] = ("RM", "PKG")) -> Dict:
         """
         根据排产计划计算每日MRP
@@ -361,6 +369,17 @@ class ProductionSchedulingService:
             """
             rows = query_all(sql, (schedule_id,))
             
+            # 输入指纹：日期范围、物料类型、排产明细、MRP数据版本（库存/BOM/物料）
+            fingerprint = MRPSnapshotService.fingerprint(
+                date_range, include_types,
+                sorted((int(r["ItemId"]), r["ProductionDate"], float(r["PlannedQty"])) for r in rows),
+                MRPSnapshotService.data_version()
+            )
+            snapshot = MRPSnapshotService.load("production_schedule", schedule_id, fingerprint)
+            if snapshot is not None:
+                snapshot["schedule_info"] = schedule_info
+                return snapshot
+            
             # 按日期分组排产数据
             daily_production = defaultdict(lambda: defaultdict(float))
             for row in rows:
@@ -380,13 +399,16 @@ class ProductionSchedulingService:
             # 获取期初库存
             onhand_all = ProductionSchedulingService._fetch_onhand_total()
             
+            # 一次性加载所有排产成品的扁平化BOM
+            BomExplosionService.get_flat_boms({row["ItemId"] for row in rows})
+            
             for production_date in date_range:
-                print(f"📊 [calculate_daily_mrp] 计算日期 {production_date} 的MRP")
+                logger.debug("[calculate_daily_mrp] 计算日期 %s 的MRP", production_date)
                 
                 # 获取该日期的生产计划
                 daily_items = daily_production.get(production_date, {})
                 if not daily_items:
-                    print(f"📊 [calculate_daily_mrp] 日期 {production_date} 无生产计划")
+                    logger.debug("[calculate_daily_mrp] 日期 %s 无生产计划", production_date)
                     continue
                 
                 # 计算该日期的零部件需求
@@ -394,10 +416,10 @@ class ProductionSchedulingService:
                 child_meta = {}
                 
                 for item_id, qty in daily_items.items():
-                    print(f"📊 [calculate_daily_mrp] 展开BOM：父物料{item_id}，数量{qty}")
+                    logger.debug("[calculate_daily_mrp] 展开BOM：父物料%s，数量%s", item_id, qty)
                     
-                    # 展开BOM
-                    expanded = BomService.expand_bom(item_id, qty)
+                    # 展开BOM（扁平化BOM × 数量）
+                    expanded = BomExplosionService.explode_flat(item_id, qty)
                     for e in expanded:
                         itype = e.get("ItemType") or ""
                         if include_types and itype not in include_types:
@@ -451,22 +473,24 @@ class ProductionSchedulingService:
                             "NetQty": 0.0
                         }
             
-            # 保存MRP计算结果到数据库
-            ProductionSchedulingService._save_mrp_results(schedule_id, mrp_results, date_range)
-            
             # 转换为列表并排序
             mrp_list = []
             for item_id in sorted(mrp_results.keys(), 
                                 key=lambda i: (mrp_results[i]["ItemType"], mrp_results[i]["ItemCode"])):
                 mrp_list.append(mrp_results[item_id])
             
-            return {
+            result = {
                 "schedule_info": schedule_info,
                 "date_range": date_range,
                 "mrp_results": mrp_list
             }
+            
+            # 保存MRP计算结果快照
+            ProductionSchedulingService._save_mrp_results(schedule_id, result, fingerprint)
+            
+            return result
         except Exception as e:
-            print(f"计算每日MRP失败: {e}")
+            logger.error("计算每日MRP失败: %s", e)
             return {"error": f"计算每日MRP失败: {str(e)}"}
     
     @staticmethod
@@ -481,36 +505,40 @@ class ProductionSchedulingService:
         return {int(r["ItemId"]): float(r["OnHand"] or 0.0) for r in rows}
     
     @staticmethod
-    def _save_mrp_results(schedule_id: int, mrp_results: Dict, date_range: List[str]):
-        """保存MRP计算结果到数据库"""
-        try:
-            with get_conn() as conn:
-                # 先删除该计划的旧MRP数据
-                conn.execute("DELETE FROM ProductionScheduleMRP WHERE ScheduleId = ?", (schedule_id,))
-                
-                # 插入新的MRP数据
-                for item_id, mrp_data in mrp_results.items():
-                    for date_str in date_range:
-                        cell_data = mrp_data["cells"].get(date_str, {})
-                        conn.execute("""
-                            INSERT INTO ProductionScheduleMRP
-                            (ScheduleId, ItemId, ProductionDate, RequiredQty, OnHandQty, NetQty)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """, (
-                            schedule_id, item_id, date_str,
-                            cell_data.get("RequiredQty", 0.0),
-                            cell_data.get("OnHandQty", 0.0),
-                            cell_data.get("NetQty", 0.0)
-                        ))
-                
-                conn.commit()
-        except Exception as e:
-            print(f"保存MRP结果失败: {e}")
+    def _save_mrp_results(schedule_id: int, result: Dict, fingerprint: str):
+        """
+        保存MRP计算结果：整份结果压缩为一条快照写入，并清除旧版逐行明细
+        快照是结果的唯一保存位置，最近一条不参与淘汰（见 MRPSnapshotService.DURABLE_SOURCES）；
+        清除与写入在同一事务中完成，失败时整体回滚并抛出异常，旧结果保持不变
+        """
+        with transaction():
+            execute("DELETE FROM ProductionScheduleMRP WHERE ScheduleId = ?", (schedule_id,))
+            MRPSnapshotService.write("production_schedule", schedule_id, fingerprint, result, "mrp_results")
     
     @staticmethod
     def get_mrp_results(schedule_id: int) -> List[Dict]:
-        """获取已保存的MRP计算结果"""
+        """获取已保存的MRP计算结果（按物料、日期展开为明细行）"""
         try:
+            snapshot = MRPSnapshotService.get_latest("production_schedule", schedule_id)
+            if snapshot is not None:
+                return [
+                    {
+                        "ItemId": r["ItemId"],
+                        "ProductionDate": date_str,
+                        "RequiredQty": r["cells"].get(date_str, {}).get("RequiredQty", 0.0),
+                        "OnHandQty": r["cells"].get(date_str, {}).get("OnHandQty", 0.0),
+                        "NetQty": r["cells"].get(date_str, {}).get("NetQty", 0.0),
+                        "ItemCode": r["ItemCode"],
+                        "CnName": r["ItemName"],
+                        "ItemSpec": r["ItemSpec"],
+                        "ItemType": r["ItemType"],
+                        "Brand": r["Brand"],
+                    }
+                    for r in snapshot["mrp_results"]
+                    for date_str in snapshot["date_range"]
+                ]
+            
+            # 旧版本保存的逐行明细
             sql = """
                 SELECT 
                     psm.ItemId, psm.ProductionDate, psm.RequiredQty, 
@@ -524,14 +552,14 @@ class ProductionSchedulingService:
             rows = query_all(sql, (schedule_id,))
             return [dict(row) for row in rows]
         except Exception as e:
-            print(f"获取MRP结果失败: {e}")
+            logger.error("获取MRP结果失败: %s", e)
             return []
     
     @staticmethod
     def get_product_info_by_pn(pn: str) -> Optional[Dict]:
         """根据PN字段获取成品信息"""
         try:
-            print(f"🔍 [get_product_info_by_pn] 查找PN: {pn}")
+            logger.debug("[get_product_info_by_pn] 查找PN: %s", pn)
             
             sql = """
                 SELECT 
@@ -550,15 +578,16 @@ class ProductionSchedulingService:
             row = query_one(sql, (pn,))
             if row:
                 result = dict(row)
-                print(f"✅ [get_product_info_by_pn] 找到成品信息: {result}")
+                logger.debug("[get_product_info_by_pn] 找到成品信息: %s", result)
                 return result
             else:
-                print(f"❌ [get_product_info_by_pn] 未找到PN '{pn}' 对应的成品")
-                # 显示所有可用的成品用于调试
-                all_fg_sql = "SELECT ItemCode, CnName, Brand FROM Items WHERE ItemType = 'FG' AND IsActive = 1 LIMIT 10"
-                all_fg = query_all(all_fg_sql)
-                print(f"📋 [get_product_info_by_pn] 可用的成品示例: {[dict(item) for item in all_fg]}")
+                logger.debug("[get_product_info_by_pn] 未找到PN '%s' 对应的成品", pn)
+                # 显示所有可用的成品用于调试（仅在 DEBUG 级别时查询）
+                if logger.isEnabledFor(logging.DEBUG):
+                    all_fg_sql = "SELECT ItemCode, CnName, Brand FROM Items WHERE ItemType = 'FG' AND IsActive = 1 LIMIT 10"
+                    all_fg = query_all(all_fg_sql)
+                    logger.debug("[get_product_info_by_pn] 可用的成品示例: %s", [dict(item) for item in all_fg])
             return None
         except Exception as e:
-            print(f"根据PN获取成品信息失败: {e}")
+            logger.error("根据PN获取成品信息失败: %s", e)
             return None
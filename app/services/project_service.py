@@ -3,6 +3,10 @@
 
 from typing import List, Dict, Optional, Tuple
 from app.db import query_all, query_one, execute
+from app.services.bom_explosion_service import BomExplosionService
+from app.utils.perf import get_logger
+
+logger = get_logger(__name__)
 
 class ProjectService:
     """项目管理服务类 - 管理成品物料和project的映射关系"""
@@ -37,11 +41,11 @@ class ProjectService:
             results = query_all(sql)
             mappings = [dict(row) for row in results]
             
-            print(f"📊 [get_all_project_mappings] 获取到 {len(mappings)} 条项目映射记录")
+            logger.debug("[get_all_project_mappings] 获取到 %s 条项目映射记录", len(mappings))
             return mappings
             
         except Exception as e:
-            print(f"❌ [get_all_project_mappings] 获取项目映射失败: {str(e)}")
+            logger.error("[get_all_project_mappings] 获取项目映射失败: %s", str(e))
             raise Exception(f"获取项目映射失败: {str(e)}")
     
     @staticmethod
@@ -77,7 +81,7 @@ class ProjectService:
             return None
             
         except Exception as e:
-            print(f"❌ [get_project_mapping_by_id] 获取项目映射失败: {str(e)}")
+            logger.error("[get_project_mapping_by_id] 获取项目映射失败: %s", str(e))
             raise Exception(f"获取项目映射失败: {str(e)}")
     
     @staticmethod
@@ -112,11 +116,11 @@ class ProjectService:
             results = query_all(sql, (project_code,))
             mappings = [dict(row) for row in results]
             
-            print(f"📊 [get_project_mappings_by_project_code] 项目 {project_code} 有 {len(mappings)} 条映射记录")
+            logger.debug("[get_project_mappings_by_project_code] 项目 %s 有 %s 条映射记录", project_code, len(mappings))
             return mappings
             
         except Exception as e:
-            print(f"❌ [get_project_mappings_by_project_code] 获取项目映射失败: {str(e)}")
+            logger.error("[get_project_mappings_by_project_code] 获取项目映射失败: %s", str(e))
             raise Exception(f"获取项目映射失败: {str(e)}")
     
     @staticmethod
@@ -152,7 +156,7 @@ class ProjectService:
             return None
             
         except Exception as e:
-            print(f"❌ [get_project_mapping_by_item_id] 获取项目映射失败: {str(e)}")
+            logger.error("[get_project_mapping_by_item_id] 获取项目映射失败: %s", str(e))
             raise Exception(f"获取项目映射失败: {str(e)}")
     
     @staticmethod
@@ -178,11 +182,11 @@ class ProjectService:
             results = query_all(sql)
             items = [dict(row) for row in results]
             
-            print(f"📊 [get_available_finished_goods] 获取到 {len(items)} 个成品物料")
+            logger.debug("[get_available_finished_goods] 获取到 %s 个成品物料", len(items))
             return items
             
         except Exception as e:
-            print(f"❌ [get_available_finished_goods] 获取成品物料失败: {str(e)}")
+            logger.error("[get_available_finished_goods] 获取成品物料失败: %s", str(e))
             raise Exception(f"获取成品物料失败: {str(e)}")
     
     @staticmethod
@@ -227,12 +231,13 @@ class ProjectService:
                 project_code, project_name, item_id, item_code, item_name, brand,
                 created_by, remark
             ))
+            BomExplosionService.invalidate_cache()
             
-            print(f"✅ [create_project_mapping] 成功创建项目映射: {project_code} -> {item_code}")
+            logger.debug("[create_project_mapping] 成功创建项目映射: %s -> %s", project_code, item_code)
             return mapping_id
             
         except Exception as e:
-            print(f"❌ [create_project_mapping] 创建项目映射失败: {str(e)}")
+            logger.error("[create_project_mapping] 创建项目映射失败: %s", str(e))
             raise Exception(f"创建项目映射失败: {str(e)}")
     
     @staticmethod
@@ -283,12 +288,13 @@ class ProjectService:
             """
             
             execute(update_sql, params)
+            BomExplosionService.invalidate_cache()
             
-            print(f"✅ [update_project_mapping] 成功更新项目映射 ID: {mapping_id}")
+            logger.debug("[update_project_mapping] 成功更新项目映射 ID: %s", mapping_id)
             return True
             
         except Exception as e:
-            print(f"❌ [update_project_mapping] 更新项目映射失败: {str(e)}")
+            logger.error("[update_project_mapping] 更新项目映射失败: %s", str(e))
             raise Exception(f"更新项目映射失败: {str(e)}")
     
     @staticmethod
@@ -306,12 +312,13 @@ class ProjectService:
             """
             
             execute(sql, (mapping_id,))
+            BomExplosionService.invalidate_cache()
             
-            print(f"✅ [delete_project_mapping] 成功删除项目映射 ID: {mapping_id}")
+            logger.debug("[delete_project_mapping] 成功删除项目映射 ID: %s", mapping_id)
             return True
             
         except Exception as e:
-            print(f"❌ [delete_project_mapping] 删除项目映射失败: {str(e)}")
+            logger.error("[delete_project_mapping] 删除项目映射失败: %s", str(e))
             raise Exception(f"删除项目映射失败: {str(e)}")
     
     @staticmethod
@@ -331,11 +338,11 @@ class ProjectService:
             results = query_all(sql)
             project_codes = [row["ProjectCode"] for row in results]
             
-            print(f"📊 [get_all_project_codes] 获取到 {len(project_codes)} 个项目代码")
+            logger.debug("[get_all_project_codes] 获取到 %s 个项目代码", len(project_codes))
             return project_codes
             
         except Exception as e:
-            print(f"❌ [get_all_project_codes] 获取项目代码失败: {str(e)}")
+            logger.error("[get_all_project_codes] 获取项目代码失败: %s", str(e))
             raise Exception(f"获取项目代码失败: {str(e)}")
     
     @staticmethod
@@ -360,7 +367,7 @@ class ProjectService:
             return None
             
         except Exception as e:
-            print(f"❌ [get_project_by_item_brand] 根据品牌获取项目失败: {str(e)}")
+            logger.error("[get_project_by_item_brand] 根据品牌获取项目失败: %s", str(e))
             raise Exception(f"根据品牌获取项目失败: {str(e)}")
     
     @staticmethod
@@ -388,13 +395,14 @@ class ProjectService:
             """
             
             execute(update_sql, (new_status, mapping_id))
+            BomExplosionService.invalidate_cache()
             
             status_text = "启用" if new_status else "禁用"
-            print(f"✅ [toggle_mapping_status] 成功{status_text}映射 ID: {mapping_id}")
+            logger.debug("[toggle_mapping_status] 成功%s映射 ID: %s", status_text, mapping_id)
             return True
             
         except Exception as e:
-            print(f"❌ [toggle_mapping_status] 切换映射状态失败: {str(e)}")
+            logger.error("[toggle_mapping_status] 切换映射状态失败: %s", str(e))
             raise Exception(f"切换映射状态失败: {str(e)}")
     
     @staticmethod
@@ -414,12 +422,13 @@ class ProjectService:
             """
             
             execute(sql, (new_order, mapping_id))
+            BomExplosionService.invalidate_cache()
             
-            print(f"✅ [update_mapping_order] 成功更新映射顺序 ID: {mapping_id}, Order: {new_order}")
+            logger.debug("[update_mapping_order] 成功更新映射顺序 ID: %s, Order: %s", mapping_id, new_order)
             return True
             
         except Exception as e:
-            print(f"❌ [update_mapping_order] 更新映射顺序失败: {str(e)}")
+            logger.error("[update_mapping_order] 更新映射顺序失败: %s", str(e))
             raise Exception(f"更新映射顺序失败: {str(e)}")
     
     @staticmethod
@@ -433,11 +442,11 @@ class ProjectService:
             for mapping_id, new_order in order_updates:
                 ProjectService.update_mapping_order(mapping_id, new_order)
             
-            print(f"✅ [batch_update_orders] 成功批量更新 {len(order_updates)} 个映射顺序")
+            logger.debug("[batch_update_orders] 成功批量更新 %s 个映射顺序", len(order_updates))
             return True
             
         except Exception as e:
-            print(f"❌ [batch_update_orders] 批量更新映射顺序失败: {str(e)}")
+            logger.error("[batch_update_orders] 批量更新映射顺序失败: %s", str(e))
             raise Exception(f"批量更新映射顺序失败: {str(e)}")
     
     @staticmethod
@@ -470,9 +479,9 @@ class ProjectService:
             results = query_all(sql)
             mappings = [dict(row) for row in results]
             
-            print(f"📊 [get_project_mappings_for_display] 获取到 {len(mappings)} 条项目映射记录")
+            logger.debug("[get_project_mappings_for_display] 获取到 %s 条项目映射记录", len(mappings))
             return mappings
             
         except Exception as e:
-            print(f"❌ [get_project_mappings_for_display] 获取项目映射失败: {str(e)}")
+            logger.error("[get_project_mappings_for_display] 获取项目映射失败: %s", str(e))
             raise Exception(f"获取项目映射失败: {str(e)}")
@@ -12,8 +12,15 @@ from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta, date
 from collections import defaultdict
 
-from app.db import query_all, query_one, get_conn
-from app.services.bom_service import BomService
+import numpy as np
+
+from app.db import query_all, query_one, execute, get_conn, transaction
+from app.services.bom_explosion_service import BomExplosionService
+from app.services.mrp_snapshot_service import MRPSnapshotService
+from app.services.mrp_grid_service import MRPGridService
+from app.utils.perf import get_logger, profiled
+
+logger = get_logger(__name__)
 
 
 class SchedulingOrderService:
@@ -55,7 +62,7 @@ class SchedulingOrderService:
             rows = query_all(sql)
             return [dict(row) for row in rows]
         except Exception as e:
-            print(f"获取排产订单失败: {e}")
+            logger.error("获取排产订单失败: %s", e)
             return []
     
     @staticmethod
@@ -71,7 +78,7 @@ class SchedulingOrderService:
             row = query_one(sql, (order_id,))
             return dict(row) if row else None
         except Exception as e:
-            print(f"获取排产订单失败: {e}")
+            logger.error("获取排产订单失败: %s", e)
             return None
     
     @staticmethod
@@ -133,6 +140,7 @@ class SchedulingOrderService:
                 conn.execute("DELETE FROM SchedulingOrderProducts WHERE OrderId = ?", (order_id,))
                 conn.execute("DELETE FROM SchedulingOrders WHERE OrderId = ?", (order_id,))
                 conn.commit()
+            MRPSnapshotService.delete("scheduling_order", order_id)
             return True, "删除成功"
         except Exception as e:
             return False, f"删除失败: {str(e)}"
@@ -154,7 +162,7 @@ class SchedulingOrderService:
             rows = query_all(sql)
             return [dict(row) for row in rows]
         except Exception as e:
-            print(f"获取可排产成品失败: {e}")
+            logger.error("获取可排产成品失败: %s", e)
             return []
     
     @staticmethod
@@ -215,10 +223,11 @@ class SchedulingOrderService:
             rows = query_all(sql, (order_id,))
             return [dict(row) for row in rows]
         except Exception as e:
-            print(f"获取订单产品失败: {e}")
+            logger.error("获取订单产品失败: %s", e)
             return []
     
     @staticmethod
+    @profiled()
     def get_scheduling_kanban_data(order_id: int) -> Dict:
         """
         获取排产看板数据
@@ -321,7 +330,7 @@ class SchedulingOrderService:
                 "products": products
             }
         except Exception as e:
-            print(f"获取排产看板数据失败: {e}")
+            logger.error("获取排产看板数据失败: %s", e)
             return {"error": f"获取排产看板数据失败: {str(e)}"}
     
     @staticmethod
@@ -394,10 +403,11 @@ class SchedulingOrderService:
             return False, f"批量更新失败: {str(e)}"
     
     @staticmethod
+    @profiled()
     def calculate_child_mrp_for_order(order_id: int, start_date: str, end_date: str) -> Dict:
         """计算零部件MRP - 与订单MRP管理保持一致"""
         try:
-            print(f"📊 [calculate_child_mrp_for_order] 开始计算零部件MRP")
+            logger.debug("[calculate_child_mrp_for_order] 开始计算零部件MRP")
             
             # 生成周列表
             weeks = SchedulingOrderService._gen_weeks_from_dates(start_date, end_date)
@@ -405,15 +415,20 @@ class SchedulingOrderService:
             # 获取排产订单的成品周需求
             parent_weekly = SchedulingOrderService._fetch_scheduling_parent_weekly_demand(order_id, weeks)
             
-            # 展开到子件周需求
-            child_weekly, child_meta = SchedulingOrderService._expand_to_child_weekly(parent_weekly, ("RM", "PKG"))
+            # 展开到子件周需求（子件 × 日期 矩阵）
+            child_ids, child_meta, plan = SchedulingOrderService._expand_to_child_grid(parent_weekly, weeks, ("RM", "PKG"))
             
             # 获取期初库存
             onhand_all = SchedulingOrderService._fetch_onhand_total()
             
+            # 即时库存：本周库存 = 上周库存 - 本周计划
+            start_onhand = MRPGridService.onhand_vector(child_ids, onhand_all)
+            stock = MRPGridService.running_stock(start_onhand, plan)
+            
             # 构建结果
             rows = []
-            for item_id, meta in child_meta.items():
+            for k, item_id in enumerate(child_ids):
+                meta = child_meta[item_id]
                 # 订单计划行
                 plan_row = {
                     "ItemId": item_id,
@@ -425,7 +440,7 @@ class SchedulingOrderService:
                     "ProjectName": meta.get("ProjectName", ""),
                     "RowType": "生产计划",
                     "StartOnHand": onhand_all.get(item_id, 0.0),
-                    "cells": {}
+                    "cells": MRPGridService.to_cells(weeks, plan[k])
                 }
                 
                 # 即时库存行
@@ -439,21 +454,9 @@ class SchedulingOrderService:
                     "ProjectName": meta.get("ProjectName", ""),
                     "RowType": "即时库存",
                     "StartOnHand": onhand_all.get(item_id, 0.0),
-                    "cells": {}
+                    "cells": MRPGridService.to_cells(weeks, stock[k])
                 }
                 
-                # 填充周数据
-                start_onhand = onhand_all.get(item_id, 0.0)
-                running_stock = start_onhand
-                
-                for week in weeks:
-                    plan_qty = child_weekly.get(item_id, {}).get(week, 0.0)
-                    plan_row["cells"][week] = plan_qty
-                    
-                    # 即时库存：本周库存 = 上周库存 - 本周计划
-                    running_stock = running_stock - plan_qty
-                    stock_row["cells"][week] = running_stock
-                
                 rows.extend([plan_row, stock_row])
             
             return {
@@ -465,10 +468,11 @@ class SchedulingOrderService:
             return {"error": f"计算零部件MRP失败: {str(e)}"}
     
     @staticmethod
+    @profiled()
     def calculate_parent_mrp_for_order(order_id: int, start_date: str, end_date: str) -> Dict:
         """计算成品MRP - 与订单MRP管理保持一致"""
         try:
-            print(f"📊 [calculate_parent_mrp_for_order] 开始计算成品MRP")
+            logger.debug("[calculate_parent_mrp_for_order] 开始计算成品MRP")
             
             # 生成周列表
             weeks = SchedulingOrderService._gen_weeks_from_dates(start_date, end_date)
@@ -482,9 +486,15 @@ class SchedulingOrderService:
             # 获取期初库存
             onhand_all = SchedulingOrderService._fetch_onhand_total()
             
+            # 成品 × 日期 需求矩阵；即时库存：本周库存 = 上周库存 - 本周计划
+            parent_ids = list(parent_meta.keys())
+            demand = MRPGridService.demand_matrix(parent_weekly, parent_ids, weeks)
+            stock = MRPGridService.running_stock(MRPGridService.onhand_vector(parent_ids, onhand_all), demand)
+            
             # 构建结果
             rows = []
-            for item_id, meta in parent_meta.items():
+            for k, item_id in enumerate(parent_ids):
+                meta = parent_meta[item_id]
                 # 订单计划行
                 plan_row = {
                     "ItemId": item_id,
@@ -496,7 +506,7 @@ class SchedulingOrderService:
                     "ProjectName": meta.get("ProjectName", ""),
                     "RowType": "生产计划",
                     "StartOnHand": onhand_all.get(item_id, 0.0),
-                    "cells": {}
+                    "cells": MRPGridService.to_cells(weeks, demand[k])
                 }
                 
                 # 即时库存行
@@ -510,21 +520,9 @@ class SchedulingOrderService:
                     "ProjectName": meta.get("ProjectName", ""),
                     "RowType": "即时库存",
                     "StartOnHand": onhand_all.get(item_id, 0.0),
-                    "cells": {}
+                    "cells": MRPGridService.to_cells(weeks, stock[k])
                 }
                 
-                # 填充周数据
-                start_onhand = onhand_all.get(item_id, 0.0)
-                running_stock = start_onhand
-                
-                for week in weeks:
-                    plan_qty = parent_weekly.get(item_id, {}).get(week, 0.0)
-                    plan_row["cells"][week] = plan_qty
-                    
-                    # 即时库存：本周库存 = 上周库存 - 本周计划
-                    running_stock = running_stock - plan_qty
-                    stock_row["cells"][week] = running_stock
-                
                 rows.extend([plan_row, stock_row])
             
             return {
@@ -536,10 +534,11 @@ class SchedulingOrderService:
             return {"error": f"计算成品MRP失败: {str(e)}"}
     
     @staticmethod
+    @profiled()
     def calculate_comprehensive_mrp_for_order(order_id: int, start_date: str, end_date: str) -> Dict:
         """计算综合MRP - 与订单MRP管理保持一致"""
         try:
-            print(f"📊 [calculate_comprehensive_mrp_for_order] 开始计算综合MRP")
+            logger.debug("[calculate_comprehensive_mrp_for_order] 开始计算综合MRP")
             
             # 生成周列表
             weeks = SchedulingOrderService._gen_weeks_from_dates(start_date, end_date)
@@ -547,8 +546,8 @@ class SchedulingOrderService:
             # 获取排产订单的成品周需求
             parent_weekly = SchedulingOrderService._fetch_scheduling_parent_weekly_demand(order_id, weeks)
             
-            # 展开到子件周需求
-            child_weekly, child_meta = SchedulingOrderService._expand_to_child_weekly(parent_weekly, ("RM", "PKG"))
+            # 展开到子件周需求（子件 × 日期 矩阵）
+            child_ids, child_meta, plan = SchedulingOrderService._expand_to_child_grid(parent_weekly, weeks, ("RM", "PKG"))
             
             # 获取成品信息
             parent_meta = SchedulingOrderService._fetch_parent_meta_from_scheduling(order_id)
@@ -556,14 +555,18 @@ class SchedulingOrderService:
             # 获取期初库存
             onhand_all = SchedulingOrderService._fetch_onhand_total()
             
+            # 即时库存：本周库存 = 上周库存 - 本周计划
+            stock = MRPGridService.running_stock(MRPGridService.onhand_vector(child_ids, onhand_all), plan)
+            
             # 构建结果 - 综合MRP只显示零部件，不显示成品
             rows = []
             
             # 添加零部件行
-            for item_id, meta in child_meta.items():
+            for k, item_id in enumerate(child_ids):
+                meta = child_meta[item_id]
                 # 计算总库存（期初库存+第一周生产计划）
                 start_onhand = onhand_all.get(item_id, 0.0)
-                first_week_plan = child_weekly.get(item_id, {}).get(weeks[0], 0.0)
+                first_week_plan = float(plan[k, 0])
                 total_stock = start_onhand + first_week_plan
                 
                 # 订单计划行
@@ -578,7 +581,7 @@ class SchedulingOrderService:
                     "RowType": "生产计划",
                     "StartOnHand": f"{start_onhand}+{first_week_plan}",
                     "TotalStock": total_stock,
-                    "cells": {}
+                    "cells": MRPGridService.to_cells(weeks, plan[k])
                 }
                 
                 # 即时库存行
@@ -593,21 +596,9 @@ class SchedulingOrderService:
                     "RowType": "即时库存",
                     "StartOnHand": f"{start_onhand}+{first_week_plan}",
                     "TotalStock": total_stock,
-                    "cells": {}
+                    "cells": MRPGridService.to_cells(weeks, stock[k])
                 }
                 
-                # 填充周数据
-                start_onhand = onhand_all.get(item_id, 0.0)
-                running_stock = start_onhand
-                
-                for week in weeks:
-                    plan_qty = child_weekly.get(item_id, {}).get(week, 0.0)
-                    plan_row["cells"][week] = plan_qty
-                    
-                    # 即时库存：本周库存 = 上周库存 - 本周计划
-                    running_stock = running_stock - plan_qty
-                    stock_row["cells"][week] = running_stock
-                
                 rows.extend([plan_row, stock_row])
             
             return {
@@ -654,38 +645,27 @@ class SchedulingOrderService:
         return parent_weekly
     
     @staticmethod
-    def _expand_to_child_weekly(parent_weekly: Dict[int, Dict[str, float]], include_types: Tuple[str, ...]) -> Tuple[Dict[int, Dict[str, float]], Dict[int, Dict]]:
-        """展开到子件周需求"""
-        child_weekly = defaultdict(lambda: defaultdict(float))
-        child_meta = {}
+    def _expand_to_child_grid(parent_weekly: Dict[int, Dict[str, float]], weeks: List[str],
+                              include_types: Tuple[str, ...]) -> Tuple[List[int], Dict[int, Dict], np.ndarray]:
+        """展开到子件周需求，返回 (子件ID列表, 子件信息, 子件 × 日期 需求矩阵)"""
+        parent_ids = MRPGridService.active_parents(parent_weekly)
+        bom = MRPGridService.flat_bom_matrix(parent_ids, include_types)
+        plan = bom.explode(MRPGridService.demand_matrix(parent_weekly, parent_ids, weeks))
         
-        for parent_id, wk_map in parent_weekly.items():
-            for week, qty in wk_map.items():
-                if qty <= 0:
-                    continue
-                
-                # 展开BOM
-                expanded = BomService.expand_bom(parent_id, qty)
-                for e in expanded:
-                    itype = e.get("ItemType") or ""
-                    if include_types and itype not in include_types:
-                        continue
-                    
-                    cid = int(e["ItemId"])
-                    child_weekly[cid][week] += float(e.get("ActualQty") or 0.0)
-                    
-                    if cid not in child_meta:
-                        child_meta[cid] = {
-                            "ItemId": cid,
-                            "ItemCode": e.get("ItemCode", ""),
-                            "ItemName": e.get("ItemName", ""),
-                            "ItemSpec": e.get("ItemSpec", ""),
-                            "ItemType": itype,
-                            "Brand": e.get("Brand", ""),
-                            "ProjectName": e.get("ProjectName", ""),
-                        }
+        child_meta = {
+            cid: {
+                "ItemId": cid,
+                "ItemCode": e.get("ItemCode", ""),
+                "ItemName": e.get("ItemName", ""),
+                "ItemSpec": e.get("ItemSpec", ""),
+                "ItemType": e["ItemType"],
+                "Brand": e.get("Brand", ""),
+                "ProjectName": e.get("ProjectName", ""),
+            }
+            for cid, e in bom.child_meta.items()
+        }
         
-        return child_weekly, child_meta
+        return bom.child_ids, child_meta, plan
     
     @staticmethod
     def _fetch_parent_meta_from_scheduling(order_id: int) -> Dict[int, Dict]:
@@ -727,11 +707,12 @@ class SchedulingOrderService:
             for row in inventory_data:
                 onhand_all[row["ItemId"]] = float(row["TotalQty"] or 0.0)
         except Exception as e:
-            print(f"获取库存数据失败: {e}")
+            logger.error("获取库存数据失败: %s", e)
         
         return onhand_all
 
     @staticmethod
+    @profiled()
     def calculate_mrp_for_order(order_id: int, include_types: Tuple[str, ...] = ("RM", "PKG")) -> Dict:
         """
         根据排产订单计算MRP
@@ -781,6 +762,17 @@ class SchedulingOrderService:
             """
             rows = query_all(sql, (order_id,))
             
+            # 输入指纹：日期范围、物料类型、排产明细、MRP数据版本（库存/BOM/物料）
+            fingerprint = MRPSnapshotService.fingerprint(
+                date_range, include_types,
+                sorted((int(r["ItemId"]), r["ProductionDate"], float(r["PlannedQty"])) for r in rows),
+                MRPSnapshotService.data_version()
+            )
+            snapshot = MRPSnapshotService.load("scheduling_order", order_id, fingerprint)
+            if snapshot is not None:
+                snapshot["order_info"] = order_info
+                return snapshot
+            
             # 按日期分组排产数据
             daily_production = defaultdict(lambda: defaultdict(float))
             for row in rows:
@@ -800,13 +792,16 @@ class SchedulingOrderService:
             # 获取期初库存
             onhand_all = SchedulingOrderService._fetch_onhand_total()
             
+            # 一次性加载所有排产成品的扁平化BOM
+            BomExplosionService.get_flat_boms({row["ItemId"] for row in rows})
+            
             for production_date in date_range:
-                print(f"📊 [calculate_mrp_for_order] 计算日期 {production_date} 的MRP")
+                logger.debug("[calculate_mrp_for_order] 计算日期 %s 的MRP", production_date)
                 
                 # 获取该日期的生产计划
                 daily_items = daily_production.get(production_date, {})
                 if not daily_items:
-                    print(f"📊 [calculate_mrp_for_order] 日期 {production_date} 无生产计划")
+                    logger.debug("[calculate_mrp_for_order] 日期 %s 无生产计划", production_date)
                     continue
                 
                 # 计算该日期的零部件需求
@@ -814,10 +809,10 @@ class SchedulingOrderService:
                 child_meta = {}
                 
                 for item_id, qty in daily_items.items():
-                    print(f"📊 [calculate_mrp_for_order] 展开BOM：父物料{item_id}，数量{qty}")
+                    logger.debug("[calculate_mrp_for_order] 展开BOM：父物料%s，数量%s", item_id, qty)
                     
-                    # 展开BOM
-                    expanded = BomService.expand_bom(item_id, qty)
+                    # 展开BOM（扁平化BOM × 数量）
+                    expanded = BomExplosionService.explode_flat(item_id, qty)
                     for e in expanded:
                         itype = e.get("ItemType") or ""
                         if include_types and itype not in include_types:
@@ -871,22 +866,24 @@ class SchedulingOrderService:
                             "NetQty": 0.0
                         }
             
-            # 保存MRP计算结果到数据库
-            SchedulingOrderService._save_mrp_results(order_id, mrp_results, date_range)
-            
             # 转换为列表并排序
             mrp_list = []
             for item_id in sorted(mrp_results.keys(), 
                                 key=lambda i: (mrp_results[i]["ItemType"], mrp_results[i]["ItemCode"])):
                 mrp_list.append(mrp_results[item_id])
             
-            return {
+            result = {
                 "order_info": order_info,
                 "date_range": date_range,
                 "mrp_results": mrp_list
             }
+            
+            # 保存MRP计算结果快照
+            SchedulingOrderService._save_mrp_results(order_id, result, fingerprint)
+            
+            return result
         except Exception as e:
-            print(f"计算MRP失败: {e}")
+            logger.error("计算MRP失败: %s", e)
             return {"error": f"计算MRP失败: {str(e)}"}
     
     @staticmethod
@@ -904,7 +901,7 @@ class SchedulingOrderService:
             row = query_one(sql, (item_id,))
             return dict(row) if row else None
         except Exception as e:
-            print(f"获取产品信息失败: {e}")
+            logger.error("获取产品信息失败: %s", e)
             return None
     
     @staticmethod
@@ -919,36 +916,40 @@ class SchedulingOrderService:
         return {int(r["ItemId"]): float(r["OnHand"] or 0.0) for r in rows}
     
     @staticmethod
-    def _save_mrp_results(order_id: int, mrp_results: Dict, date_range: List[str]):
-        """保存MRP计算结果到数据库"""
-        try:
-            with get_conn() as conn:
-                # 先删除该订单的旧MRP数据
-                conn.execute("DELETE FROM SchedulingOrderMRP WHERE OrderId = ?", (order_id,))
-                
-                # 插入新的MRP数据
-                for item_id, mrp_data in mrp_results.items():
-                    for date_str in date_range:
-                        cell_data = mrp_data["cells"].get(date_str, {})
-                        conn.execute("""
-                            INSERT INTO SchedulingOrderMRP
-                            (OrderId, ItemId, ProductionDate, RequiredQty, OnHandQty, NetQty)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """, (
-                            order_id, item_id, date_str,
-                            cell_data.get("RequiredQty", 0.0),
-                            cell_data.get("OnHandQty", 0.0),
-                            cell_data.get("NetQty", 0.0)
-                        ))
-                
-                conn.commit()
-        except Exception as e:
-            print(f"保存MRP结果失败: {e}")
+    def _save_mrp_results(order_id: int, result: Dict, fingerprint: str):
+        """
+        保存MRP计算结果：整份结果压缩为一条快照写入，并清除旧版逐行明细
+        快照是结果的唯一保存位置，最近一条不参与淘汰（见 MRPSnapshotService.DURABLE_SOURCES）；
+        清除与写入在同一事务中完成，失败时整体回滚并抛出异常，旧结果保持不变
+        """
+        with transaction():
+            execute("DELETE FROM SchedulingOrderMRP WHERE OrderId = ?", (order_id,))
+            MRPSnapshotService.write("scheduling_order", order_id, fingerprint, result, "mrp_results")
     
     @staticmethod
     def get_mrp_results(order_id: int) -> List[Dict]:
-        """获取已保存的MRP计算结果"""
+        """获取已保存的MRP计算结果（按物料、日期展开为明细行）"""
         try:
+            snapshot = MRPSnapshotService.get_latest("scheduling_order", order_id)
+            if snapshot is not None:
+                return [
+                    {
+                        "ItemId": r["ItemId"],
+                        "ProductionDate": date_str,
+                        "RequiredQty": r["cells"].get(date_str, {}).get("RequiredQty", 0.0),
+                        "OnHandQty": r["cells"].get(date_str, {}).get("OnHandQty", 0.0),
+                        "NetQty": r["cells"].get(date_str, {}).get("NetQty", 0.0),
+                        "ItemCode": r["ItemCode"],
+                        "CnName": r["ItemName"],
+                        "ItemSpec": r["ItemSpec"],
+                        "ItemType": r["ItemType"],
+                        "Brand": r["Brand"],
+                    }
+                    for r in snapshot["mrp_results"]
+                    for date_str in snapshot["date_range"]
+                ]
+            
+            # 旧版本保存的逐行明细
             sql = """
                 SELECT 
                     som.ItemId, som.ProductionDate, som.RequiredQty, 
@@ -962,5 +963,5 @@ class SchedulingOrderService:
             rows = query_all(sql, (order_id,))
             return [dict(row) for row in rows]
         except Exception as e:
-            print(f"获取MRP结果失败: {e}")
+            logger.error("获取MRP结果失败: %s", e)
             return []
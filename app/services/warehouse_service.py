@@ -2,6 +2,9 @@
 # -*- coding: utf-8 -*-
 from typing import List, Dict, Optional
 from app.db import query_all, query_one, execute
+from app.utils.perf import get_logger
+
+logger = get_logger(__name__)
 
 class WarehouseService:
     """仓库主数据 & 仓库-物料关系"""
@@ -65,7 +68,7 @@ class WarehouseService:
         # 删除仓库
         execute("DELETE FROM Warehouses WHERE WarehouseId=?", (warehouse_id,))
         
-        print(f"仓库删除完成：删除了 {balance_deleted} 条库存余额记录，{tx_deleted} 条库存流水记录，{items_deleted} 条物料关联记录")
+        logger.debug("仓库删除完成：删除了 %s 条库存余额记录，%s 条库存流水记录，%s 条物料关联记录", balance_deleted, tx_deleted, items_deleted)
 
     # ---- 仓库-物料 ----
     @staticmethod
@@ -149,5 +152,5 @@ class WarehouseService:
             
             return True
         except Exception as e:
-            print(f"添加物料到仓库失败：{e}")
+            logger.error("添加物料到仓库失败：%s", e)
             return False
@@ -0,0 +1,373 @@
+# app/ui/async_loader.py
+# -*- coding: utf-8 -*-
+"""
+列表界面的后台加载与分页
+- AsyncLoader：在共享线程池（QThreadPool + QRunnable）中执行查询，结果经信号回到界面线程；
+  再次 load() 或 cancel() 时取消上一次加载（CancelToken 置为取消，过期结果直接丢弃），
+  筛选条件快速变化时只有最后一次加载的结果会被显示
+- LazyTableModel：通用表格模型，整份结果交给模型后视图按 canFetchMore/fetchMore 分页取行，首屏只生成一页
+- TableWidgetPager：同样的分页协议用于含单元格控件（复选框、操作按钮）的 QTableWidget，
+  滚动接近底部时追加下一页；需要整表数据的操作（全选、导出）先调用 fetch_all()
+"""
+
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from PySide6.QtCore import (
+    QAbstractTableModel, QCoreApplication, QModelIndex, QObject, QRunnable, QThreadPool, QTimer, Qt, Signal
+)
+from PySide6.QtWidgets import QTableWidget
+
+PAGE_SIZE = 200          # 每页行数
+LOADER_THREADS = 2       # 加载线程数
+FETCH_AHEAD_ROWS = 20    # 滚动到距底部不足该行数时取下一页
+
+
+class LoadCancelled(Exception):
+    """加载已取消（加载函数可在多次查询之间调用 token.check() 提前结束）"""
+
+
+class CancelToken:
+    """一次加载的取消标记，由 AsyncLoader 传给加载函数"""
+
+    __slots__ = ("_cancelled",)
+
+    def __init__(self):
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def check(self):
+        if self._cancelled:
+            raise LoadCancelled()
+
+
+# ---------------- 线程池 ----------------
+_pool: Optional[QThreadPool] = None
+_loaders: "weakref.WeakSet[AsyncLoader]" = weakref.WeakSet()
+
+
+def loader_pool() -> QThreadPool:
+    """加载共用的线程池（与全局线程池分开，线程常驻：app.db 按线程持有长连接）"""
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(LOADER_THREADS)
+        _pool.setExpiryTimeout(-1)
+    return _pool
+
+
+def shutdown_loaders(timeout_ms: int = 3000):
+    """程序退出前调用：取消全部加载，丢弃排队任务并等待执行中的任务结束"""
+    for loader in list(_loaders):
+        loader.cancel()
+    if _pool is not None:
+        _pool.clear()
+        _pool.waitForDone(timeout_ms)
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, loader: "AsyncLoader", seq: int, fn: Callable[[CancelToken], Any], token: CancelToken):
+        super().__init__()
+        self.setAutoDelete(True)
+        self._loader = loader
+        self._seq = seq
+        self._fn = fn
+        self._token = token
+
+    def run(self):
+        if self._token.cancelled:
+            return
+        try:
+            result = self._fn(self._token)
+        except LoadCancelled:
+            return
+        except Exception as e:
+            if not self._token.cancelled:
+                self._emit(self._loader._failed, e)
+            return
+        if not self._token.cancelled:
+            self._emit(self._loader._done, result)
+
+    def _emit(self, signal, payload):
+        try:
+            signal.emit(self._seq, payload)
+        except RuntimeError:
+            pass  # 加载器所在界面已销毁
+
+
+class AsyncLoader(QObject):
+    """
+    后台加载器：每个列表（或每组互斥的加载）一个实例
+    load(fn, on_result) 在线程池中执行 fn(token)，完成后在界面线程调用 on_result(结果)；
+    新的 load() 会取消尚未完成的上一次加载
+    """
+
+    loading_changed = Signal(bool)
+    _done = Signal(int, object)
+    _failed = Signal(int, object)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._seq = 0
+        self._token: Optional[CancelToken] = None
+        self._on_result: Optional[Callable[[Any], None]] = None
+        self._on_error: Optional[Callable[[Exception], None]] = None
+        # 工作线程发出、加载器在界面线程接收：自动按队列连接投递
+        self._done.connect(self._deliver)
+        self._failed.connect(self._deliver_error)
+        _loaders.add(self)
+
+    def load(self, fn: Callable[[CancelToken], Any], on_result: Callable[[Any], None],
+             on_error: Optional[Callable[[Exception], None]] = None):
+        """
+        开始一次加载
+
+        Args:
+            fn: 在工作线程执行的加载函数，参数为 CancelToken；不得访问界面控件
+            on_result: 界面线程中处理结果
+            on_error: 界面线程中处理异常（默认输出到控制台）
+        """
+        was_loading = self._token is not None
+        if was_loading:
+            self._token.cancel()
+        self._seq += 1
+        self._token = token = CancelToken()
+        self._on_result, self._on_error = on_result, on_error
+        loader_pool().start(_LoadTask(self, self._seq, fn, token))
+        if not was_loading:
+            self.loading_changed.emit(True)
+
+    def cancel(self):
+        """取消当前加载（结果不再回调）"""
+        if self._token is not None:
+            self._token.cancel()
+            self._token = None
+            self.loading_changed.emit(False)
+
+    def is_loading(self) -> bool:
+        return self._token is not None
+
+    def wait(self, timeout_ms: int = 30000) -> bool:
+        """处理事件直到当前加载完成（脚本或必须立即使用结果的场合），超时返回 False"""
+        deadline = time.monotonic() + timeout_ms / 1000.0
+        while self._token is not None:
+            if time.monotonic() > deadline:
+                return False
+            QCoreApplication.processEvents()
+            time.sleep(0.002)
+        return True
+
+    def _finish(self, seq: int) -> bool:
+        """结果是否属于当前加载；是则结束加载状态"""
+        if seq != self._seq or self._token is None:
+            return False
+        self._token = None
+        self.loading_changed.emit(False)
+        return True
+
+    def _deliver(self, seq: int, result: Any):
+        if self._finish(seq):
+            self._on_result(result)
+
+    def _deliver_error(self, seq: int, error: Exception):
+        if not self._finish(seq):
+            return
+        if self._on_error:
+            self._on_error(error)
+        else:
+            print(f"后台加载失败: {error}")
+
+
+# ---------------- 分页模型 ----------------
+class TableColumn:
+    """
+    LazyTableModel 的列定义
+    value: 行字典的键，或 行 → 显示值 的函数；background/foreground: 行 → QColor/QBrush（None 不着色）
+    """
+
+    __slots__ = ("title", "value", "background", "foreground", "align")
+
+    def __init__(self, title: str, value: Union[str, Callable[[Dict], Any]],
+                 background: Optional[Callable[[Dict], Any]] = None,
+                 foreground: Optional[Callable[[Dict], Any]] = None,
+                 align: Optional[Qt.AlignmentFlag] = None):
+        self.title = title
+        self.value = value
+        self.background = background
+        self.foreground = foreground
+        self.align = align
+
+    def text(self, row: Dict) -> str:
+        value = self.value(row) if callable(self.value) else row.get(self.value)
+        return "" if value is None else str(value)
+
+
+class LazyTableModel(QAbstractTableModel):
+    """整份结果集一次装入，视图按页取行（canFetchMore/fetchMore），单元格在 data() 中按需生成"""
+
+    def __init__(self, columns: Sequence[TableColumn], page_size: int = PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self._columns = list(columns)
+        self._page_size = page_size
+        self._rows: List[Dict] = []
+        self._loaded = 0
+
+    # ---------- 数据 ----------
+    def set_rows(self, rows: Sequence[Dict]):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._loaded = min(self._page_size, len(self._rows))
+        self.endResetModel()
+
+    def rows(self) -> List[Dict]:
+        """全部结果行（含尚未取到视图的行）"""
+        return self._rows
+
+    def row_data(self, row: int) -> Optional[Dict]:
+        return self._rows[row] if 0 <= row < self._loaded else None
+
+    def total_count(self) -> int:
+        return len(self._rows)
+
+    def row_texts(self, row: Dict) -> List[str]:
+        """一行各列的显示文本（导出等操作使用，与表格显示一致）"""
+        return [column.text(row) for column in self._columns]
+
+    def fetch_all(self):
+        if self._loaded < len(self._rows):
+            self.fetchMore(QModelIndex(), len(self._rows) - self._loaded)
+
+    # ---------- 分页 ----------
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self._loaded < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex(), count: Optional[int] = None):
+        if parent.isValid():
+            return
+        n = min(count or self._page_size, len(self._rows) - self._loaded)
+        if n <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + n - 1)
+        self._loaded += n
+        self.endInsertRows()
+
+    # ---------- Qt 接口 ----------
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        row = self._rows[index.row()]
+        column = self._columns[index.column()]
+        if role == Qt.DisplayRole:
+            return column.text(row)
+        if role == Qt.BackgroundRole and column.background:
+            return column.background(row)
+        if role == Qt.ForegroundRole and column.foreground:
+            return column.foreground(row)
+        if role == Qt.TextAlignmentRole and column.align is not None:
+            return int(column.align)
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._columns[section].title if 0 <= section < len(self._columns) else None
+        return section + 1
+
+
+# ---------------- QTableWidget 分页 ----------------
+class TableWidgetPager(QObject):
+    """
+    QTableWidget 分页填充：set_rows() 后只渲染第一页，滚动接近底部时由 render_row(行号, 行数据) 追加下一页
+    启用排序的表格在用户点击表头排序后改为一次渲染全部行（只对已显示的页排序会误导），
+    因此行操作应通过单元格中保存的主键定位，不依赖行号
+    """
+
+    def __init__(self, table: QTableWidget, render_row: Callable[[int, Any], None],
+                 page_size: int = PAGE_SIZE):
+        super().__init__(table)
+        self._table = table
+        self._render_row = render_row
+        self._page_size = page_size
+        self._rows: List[Any] = []
+        self._loaded = 0
+        self._sorted_by_user = False
+        bar = table.verticalScrollBar()
+        bar.valueChanged.connect(self._on_scrolled)
+        bar.rangeChanged.connect(self._on_range_changed)
+        # 启用排序的表格：点击表头排序时取全部行
+        table.horizontalHeader().sortIndicatorChanged.connect(self._on_sort_requested)
+
+    @property
+    def rows(self) -> List[Any]:
+        """全部结果行（含尚未渲染的行）"""
+        return self._rows
+
+    def loaded_count(self) -> int:
+        return self._loaded
+
+    def set_rows(self, rows: Sequence[Any]):
+        self._rows = list(rows)
+        self._loaded = 0
+        self._table.setRowCount(0)
+        self._table.verticalScrollBar().setValue(0)
+        if self._sorted_by_user and self._table.isSortingEnabled():
+            self.fetch_all()
+        else:
+            self.fetch_more()
+
+    def can_fetch_more(self) -> bool:
+        return self._loaded < len(self._rows)
+
+    def fetch_more(self, count: Optional[int] = None):
+        """渲染下一页（count 指定行数）"""
+        start = self._loaded
+        end = min(len(self._rows), start + (count or self._page_size))
+        if end <= start:
+            return
+        table = self._table
+        sorting = table.isSortingEnabled()
+        table.setSortingEnabled(False)
+        table.setUpdatesEnabled(False)
+        try:
+            table.setRowCount(end)
+            for r in range(start, end):
+                self._render_row(r, self._rows[r])
+            self._loaded = end
+        finally:
+            table.setUpdatesEnabled(True)
+            table.setSortingEnabled(sorting)
+
+    def fetch_all(self):
+        """渲染全部剩余行（全选、导出等需要整表数据的操作前调用）"""
+        if self.can_fetch_more():
+            self.fetch_more(len(self._rows) - self._loaded)
+
+    def _on_scrolled(self, value: int):
+        bar = self._table.verticalScrollBar()
+        row_height = max(self._table.verticalHeader().defaultSectionSize(), 1)
+        if self.can_fetch_more() and bar.maximum() - value <= FETCH_AHEAD_ROWS * row_height:
+            self.fetch_more()
+
+    def _on_range_changed(self, _minimum: int, maximum: int):
+        # 一页未填满视口（没有滚动条）时继续取下一页
+        if maximum == 0 and self.can_fetch_more():
+            QTimer.singleShot(0, self.fetch_more)
+
+    def _on_sort_requested(self, *_):
+        if self._table.isSortingEnabled():
+            self._sorted_by_user = True
+            self.fetch_all()
@@ -12,14 +12,19 @@ from PySide6.QtGui import QFont, QColor
 from app.services.bom_service import BomService
 from app.services.item_service import ItemService
 from app.services.bom_matrix_import_service import BomMatrixImportService
+from app.services.bom_matrix_export_service import BomMatrixExportService
 from app.services.bom_history_service import BomHistoryService
 from app.utils.resource_path import get_resource_path
+from app.ui.async_loader import AsyncLoader, LoadCancelled, TableWidgetPager
+from app.ui.excel_export import run_excel_export
+from app.utils.excel_writer import Progress
 import re
 import os
 import sys
 import shutil
 import openpyxl
 from datetime import datetime
+from typing import Optional
 from PySide6.QtWidgets import QFileDialog
 
 
@@ -1807,6 +1812,8 @@ class BomManagementWidget(QWidget):
         # 初始化服务
         self.bom_service = BomService()
         self.item_service = ItemService()
+        # BOM 列表在后台加载（表头查询与状态计算），表格分页渲染
+        self.bom_loader = AsyncLoader(self)
         self.setup_ui()
         self.load_boms()
 
@@ -2078,16 +2085,19 @@ class BomManagementWidget(QWidget):
         header.setSectionResizeMode(10, QHeaderView.Fixed)  # 操作
         header.setDefaultSectionSize(120)  # 设置默认列宽
         self.bom_table.setColumnWidth(10, 150)  # 设置操作列宽度
+        self.bom_pager = TableWidgetPager(self.bom_table, self._render_bom_row)
 
         layout.addWidget(self.bom_table)
 
     def load_boms(self, search_filter: str = None):
-        """加载BOM列表"""
-        try:
+        """加载BOM列表（查询与状态计算在后台执行，搜索条件变化时取消上一次加载）"""
+        def fetch(token):
             boms = BomService.get_bom_headers(search_filter)
-            self.populate_bom_table(boms)
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"加载BOM列表失败: {str(e)}")
+            return self._sorted_bom_rows(boms, token)
+
+        self.bom_loader.load(
+            fetch, self.bom_pager.set_rows,
+            lambda e: QMessageBox.critical(self, "错误", f"加载BOM列表失败: {str(e)}"))
 
     def on_search_changed(self):
         """当搜索条件变化时，重新加载BOM列表"""
@@ -2317,7 +2327,7 @@ class BomManagementWidget(QWidget):
             QMessageBox.critical(self, "错误", f"显示BOM导入对话框失败: {str(e)}")
 
     def export_bom_to_excel(self):
-        """导出所有BOM到Excel文件"""
+        """导出所有BOM到Excel文件（后台生成）"""
         try:
             # 获取所有BOM数据
             all_boms = self.bom_service.get_bom_headers()
@@ -2335,178 +2345,24 @@ class BomManagementWidget(QWidget):
             
             if save_path:
                 # 生成Excel文件
-                self.generate_all_boms_excel(all_boms, save_path)
-                QMessageBox.information(self, "成功", f"所有BOM已导出到：\n{save_path}")
+                run_excel_export(
+                    self,
+                    lambda progress: self.generate_all_boms_excel(all_boms, save_path, progress),
+                    lambda _: QMessageBox.information(self, "成功", f"所有BOM已导出到：\n{save_path}"),
+                    lambda e: QMessageBox.critical(self, "错误", f"导出BOM失败: {str(e)}"),
+                )
                 
         except Exception as e:
             QMessageBox.critical(self, "错误", f"导出BOM失败: {str(e)}")
     
-    def generate_all_boms_excel(self, all_boms, file_path):
-        """生成包含所有BOM的Excel文件（矩阵格式）"""
+    def generate_all_boms_excel(self, all_boms, file_path, progress: Optional[Progress] = None):
+        """生成包含所有BOM的Excel文件（矩阵格式，可在工作线程执行）"""
         try:
-            import openpyxl
-            from openpyxl.styles import Font, Alignment, Border, Side
-            
-            # 创建工作簿
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "BOM矩阵"
-            
-            # 设置样式
-            normal_font = Font(name='宋体', size=10)
-            center_alignment = Alignment(horizontal='center', vertical='center')
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
-            # 收集所有零部件和成品信息
-            all_components = {}  # {component_id: component_info}
-            all_products = []    # [product_info]
-            bom_matrix = {}      # {(component_id, product_id): quantity}
-            
-            for bom_data in all_boms:
-                # 将Row对象转换为字典
-                if hasattr(bom_data, 'keys'):
-                    bom_data = dict(bom_data)
-                
-                # 获取父产品信息
-                parent_item_id = bom_data.get('ParentItemId')
-                parent_item = None
-                if parent_item_id:
-                    parent_item = self.item_service.get_item_by_id(parent_item_id)
-                
-                if not parent_item:
-                    continue
-                
-                # 添加到成品列表
-                product_info = {
-                    'ItemId': parent_item_id,
-                    'ItemCode': parent_item.get('ItemCode', ''),
-                    'CnName': parent_item.get('CnName', ''),
-                    'ItemSpec': parent_item.get('ItemSpec', ''),
-                    'Brand': parent_item.get('Brand', ''),
-                    'BomId': bom_data.get('BomId')
-                }
-                all_products.append(product_info)
-                
-                # 获取BOM的物料清单
-                bom_lines = self.bom_service.get_bom_lines(bom_data.get('BomId'))
-                if not bom_lines:
-                    continue
-                
-                # 处理零部件信息
-                for bom_line in bom_lines:
-                    # 将Row对象转换为字典
-                    if hasattr(bom_line, 'keys'):
-                        bom_line = dict(bom_line)
-                    
-                    child_item_id = bom_line.get('ChildItemId')
-                    if child_item_id:
-                        # 获取零部件信息
-                        child_item = self.item_service.get_item_by_id(child_item_id)
-                        if child_item:
-                            # 添加到零部件字典
-                            all_components[child_item_id] = {
-                                'ItemId': child_item_id,
-                                'ItemCode': child_item.get('ItemCode', ''),
-                                'CnName': child_item.get('CnName', ''),
-                                'ItemSpec': child_item.get('ItemSpec', '')
-                            }
-                            
-                            # 记录用量关系
-                            quantity = bom_line.get('QtyPer', 0)
-                            bom_matrix[(child_item_id, parent_item_id)] = quantity
-            
-            # 对成品进行排序：按名称、规格排序
-            all_products.sort(key=lambda x: (x.get('CnName', ''), x.get('ItemSpec', '')))
-            
-            # 对零部件进行排序：按名称、规格排序
-            sorted_components = sorted(all_components.items(), key=lambda x: (x[1].get('CnName', ''), x[1].get('ItemSpec', '')))
-            
-            # 生成Excel表格
-            current_row = 1
-            
-            # 第一行：成品编码（A-C列保持空白）
-            for i, product in enumerate(all_products):
-                col_letter = openpyxl.utils.get_column_letter(4 + i)  # 从D列开始
-                ws[f'{col_letter}1'] = product['ItemCode']
-                ws[f'{col_letter}1'].font = normal_font
-                ws[f'{col_letter}1'].alignment = center_alignment
-                ws[f'{col_letter}1'].border = border
-            
-            # 第二行：成品名称
-            for i, product in enumerate(all_products):
-                col_letter = openpyxl.utils.get_column_letter(4 + i)
-                ws[f'{col_letter}2'] = product['CnName']
-                ws[f'{col_letter}2'].font = normal_font
-                ws[f'{col_letter}2'].alignment = center_alignment
-                ws[f'{col_letter}2'].border = border
-            
-            # 第三行：成品规格
-            for i, product in enumerate(all_products):
-                col_letter = openpyxl.utils.get_column_letter(4 + i)
-                ws[f'{col_letter}3'] = product['ItemSpec']
-                ws[f'{col_letter}3'].font = normal_font
-                ws[f'{col_letter}3'].alignment = center_alignment
-                ws[f'{col_letter}3'].border = border
-            
-            # 第四行：成品品牌
-            for i, product in enumerate(all_products):
-                col_letter = openpyxl.utils.get_column_letter(4 + i)
-                ws[f'{col_letter}4'] = product['Brand']
-                ws[f'{col_letter}4'].font = normal_font
-                ws[f'{col_letter}4'].alignment = center_alignment
-                ws[f'{col_letter}4'].border = border
-            
-            # 从第5行开始：零部件信息
-            current_row = 5
-            
-            for component_id, component in sorted_components:
-                # 零部件信息
-                ws[f'A{current_row}'] = component['ItemCode']
-                ws[f'A{current_row}'].font = normal_font
-                ws[f'A{current_row}'].alignment = center_alignment
-                ws[f'A{current_row}'].border = border
-                
-                ws[f'B{current_row}'] = component['CnName']
-                ws[f'B{current_row}'].font = normal_font
-                ws[f'B{current_row}'].alignment = center_alignment
-                ws[f'B{current_row}'].border = border
-                
-                ws[f'C{current_row}'] = component['ItemSpec']
-                ws[f'C{current_row}'].font = normal_font
-                ws[f'C{current_row}'].alignment = center_alignment
-                ws[f'C{current_row}'].border = border
-                
-                # 用量信息
-                for i, product in enumerate(all_products):
-                    col_letter = openpyxl.utils.get_column_letter(4 + i)
-                    quantity = bom_matrix.get((component_id, product['ItemId']), 0)
-                    ws[f'{col_letter}{current_row}'] = quantity
-                    ws[f'{col_letter}{current_row}'].font = normal_font
-                    ws[f'{col_letter}{current_row}'].alignment = center_alignment
-                    ws[f'{col_letter}{current_row}'].border = border
-                
-                current_row += 1
-            
-            # 设置列宽
-            ws.column_dimensions['A'].width = 15  # 零部件编码
-            ws.column_dimensions['B'].width = 20  # 零部件名称
-            ws.column_dimensions['C'].width = 15  # 零部件规格
-            
-            # 设置成品列的宽度
-            for i in range(len(all_products)):
-                col_letter = openpyxl.utils.get_column_letter(4 + i)
-                ws.column_dimensions[col_letter].width = 12
-            
-            # 保存文件
-            wb.save(file_path)
-            
-        except ImportError:
-            QMessageBox.warning(self, "警告", "需要安装openpyxl库才能导出Excel文件！\n请运行: pip install openpyxl")
+            # 一次联表查询取出这些BOM的成品、明细与物料，透视后流式写出
+            bom_ids = [dict(bom_data).get('BomId') for bom_data in all_boms]
+            BomMatrixExportService.export_matrix_excel(file_path, bom_ids, progress)
+        except LoadCancelled:
+            raise
         except Exception as e:
             raise Exception(f"生成Excel文件失败: {str(e)}")
     
@@ -2616,131 +2472,135 @@ class BomManagementWidget(QWidget):
         except Exception as e:
             raise Exception(f"生成Excel文件失败: {str(e)}")
 
+    @staticmethod
+    def _sorted_bom_rows(boms, token=None):
+        """批量计算BOM状态并排序：有效的排在前面，失效的排在后面，返回 [(bom, 状态信息)]"""
+        bom_ids = [bom['BomId'] for bom in boms if 'BomId' in bom.keys()]
+        statuses = BomService.get_bom_statuses(bom_ids)
+        if token is not None:
+            token.check()
+        unknown = {'status': '未知', 'disabled_components': 0}
+        rows = [(bom, statuses.get(bom.get('BomId'), unknown)) for bom in boms]
+        
+        # 有效=0（排在前面），失效=1（排在后面），未知=2（排在最后）
+        order = {"有效": 0, "失效": 1}
+        rows.sort(key=lambda r: order.get(r[1]['status'], 2))
+        return rows
+
     def populate_bom_table(self, boms):
         """填充BOM表格"""
-        # 对BOM列表进行排序：有效的排在前面，失效的排在后面
-        def sort_key(bom):
-            bom_id = bom['BomId'] if 'BomId' in bom.keys() else 0
-            bom_status = BomService.get_bom_status(bom_id)
-            # 有效=0（排在前面），失效=1（排在后面），未知=2（排在最后）
-            if bom_status == "有效":
-                return 0
-            elif bom_status == "失效":
-                return 1
-            else:
-                return 2
-        
-        # 排序BOM列表
-        sorted_boms = sorted(boms, key=sort_key)
-        
-        self.bom_table.setRowCount(len(sorted_boms))
+        self.bom_pager.set_rows(self._sorted_bom_rows(boms))
 
-        for row, bom in enumerate(sorted_boms):
-            # 修复SQLite Row对象的访问方式
-            bom_id = bom['BomId'] if 'BomId' in bom.keys() else ''
-            bom_name = bom['BomName'] if 'BomName' in bom.keys() else ''
-            parent_item_code = bom['ParentItemCode'] if 'ParentItemCode' in bom.keys() else ''
-            parent_item_name = bom['ParentItemName'] if 'ParentItemName' in bom.keys() else ''
-            parent_item_spec = bom['ParentItemSpec'] if 'ParentItemSpec' in bom.keys() else ''
-            rev = bom['Rev'] if 'Rev' in bom.keys() else ''
-            effective_date = bom['EffectiveDate'] if 'EffectiveDate' in bom.keys() else ''
-            expire_date = bom['ExpireDate'] if 'ExpireDate' in bom.keys() else ''
-            remark = bom['Remark'] if 'Remark' in bom.keys() else ''
-            
-            # BOM ID
-            self.bom_table.setItem(row, 0, QTableWidgetItem(str(bom_id)))
-            # BOM名称
-            self.bom_table.setItem(row, 1, QTableWidgetItem(str(bom_name)))
-            # 父产品编码
-            self.bom_table.setItem(row, 2, QTableWidgetItem(str(parent_item_code)))
-            # 父产品名称
-            self.bom_table.setItem(row, 3, QTableWidgetItem(str(parent_item_name)))
-            # 父产品规格
-            self.bom_table.setItem(row, 4, QTableWidgetItem(str(parent_item_spec)))
-            # 版本
-            self.bom_table.setItem(row, 5, QTableWidgetItem(str(rev)))
-            # 生效日期
-            self.bom_table.setItem(row, 6, QTableWidgetItem(str(effective_date)))
-            # 失效日期
-            expire_date_display = str(expire_date) if expire_date else "未设置"
-            self.bom_table.setItem(row, 7, QTableWidgetItem(expire_date_display))
-            # 备注
-            self.bom_table.setItem(row, 8, QTableWidgetItem(str(remark) if remark else ""))
-            # 状态 - 使用新的BOM状态检测逻辑
-            bom_status = BomService.get_bom_status(bom_id)
-            status_item = QTableWidgetItem(bom_status)
-            
-            # 设置状态颜色
-            if bom_status == "失效":
-                status_item.setForeground(QColor("#ff4d4f"))  # 红色
-                status_item.setBackground(QColor("#fff2f0"))  # 浅红色背景
-            elif bom_status == "有效":
-                status_item.setForeground(QColor("#52c41a"))  # 绿色
-                status_item.setBackground(QColor("#f6ffed"))  # 浅绿色背景
-            else:
-                status_item.setForeground(QColor("#8c8c8c"))  # 灰色
-                status_item.setBackground(QColor("#fafafa"))  # 浅灰色背景
-            
-            self.bom_table.setItem(row, 9, status_item)
+    def _render_bom_row(self, row, bom_row):
+        """渲染BOM表格的一行"""
+        bom, status_info = bom_row
+        bom_status = status_info['status']
+        # 修复SQLite Row对象的访问方式
+        bom_id = bom['BomId'] if 'BomId' in bom.keys() else ''
+        bom_name = bom['BomName'] if 'BomName' in bom.keys() else ''
+        parent_item_code = bom['ParentItemCode'] if 'ParentItemCode' in bom.keys() else ''
+        parent_item_name = bom['ParentItemName'] if 'ParentItemName' in bom.keys() else ''
+        parent_item_spec = bom['ParentItemSpec'] if 'ParentItemSpec' in bom.keys() else ''
+        rev = bom['Rev'] if 'Rev' in bom.keys() else ''
+        effective_date = bom['EffectiveDate'] if 'EffectiveDate' in bom.keys() else ''
+        expire_date = bom['ExpireDate'] if 'ExpireDate' in bom.keys() else ''
+        remark = bom['Remark'] if 'Remark' in bom.keys() else ''
+
+        # BOM ID
+        self.bom_table.setItem(row, 0, QTableWidgetItem(str(bom_id)))
+        # BOM名称
+        self.bom_table.setItem(row, 1, QTableWidgetItem(str(bom_name)))
+        # 父产品编码
+        self.bom_table.setItem(row, 2, QTableWidgetItem(str(parent_item_code)))
+        # 父产品名称
+        self.bom_table.setItem(row, 3, QTableWidgetItem(str(parent_item_name)))
+        # 父产品规格
+        self.bom_table.setItem(row, 4, QTableWidgetItem(str(parent_item_spec)))
+        # 版本
+        self.bom_table.setItem(row, 5, QTableWidgetItem(str(rev)))
+        # 生效日期
+        self.bom_table.setItem(row, 6, QTableWidgetItem(str(effective_date)))
+        # 失效日期
+        expire_date_display = str(expire_date) if expire_date else "未设置"
+        self.bom_table.setItem(row, 7, QTableWidgetItem(expire_date_display))
+        # 备注
+        self.bom_table.setItem(row, 8, QTableWidgetItem(str(remark) if remark else ""))
+        # 状态 - 使用新的BOM状态检测逻辑（加载时已计算）
+        status_item = QTableWidgetItem(bom_status)
+
+        # 设置状态颜色
+        if bom_status == "失效":
+            status_item.setForeground(QColor("#ff4d4f"))  # 红色
+            status_item.setBackground(QColor("#fff2f0"))  # 浅红色背景
+            if status_info['disabled_components']:
+                status_item.setToolTip(f"含 {status_info['disabled_components']} 个已禁用零部件，双击查看详情")
+        elif bom_status == "有效":
+            status_item.setForeground(QColor("#52c41a"))  # 绿色
+            status_item.setBackground(QColor("#f6ffed"))  # 浅绿色背景
+        else:
+            status_item.setForeground(QColor("#8c8c8c"))  # 灰色
+            status_item.setBackground(QColor("#fafafa"))  # 浅灰色背景
 
-            # 操作按钮
-            view_btn = QPushButton("查看")
-            view_btn.setStyleSheet("""
-                QPushButton {
-                    background: #1890ff;
-                    color: white;
-                    border: none;
-                    padding: 4px 8px;
-                    border-radius: 3px;
-                    font-size: 11px;
-                }
-                QPushButton:hover {
-                    background: #40a9ff;
-                }
-            """)
-            view_btn.clicked.connect(lambda checked, r=row: self.view_bom(r))
+        self.bom_table.setItem(row, 9, status_item)
 
-            edit_btn = QPushButton("编辑")
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background: #52c41a;
-                    color: white;
-                    border: none;
-                    padding: 4px 8px;
-                    border-radius: 3px;
-                    font-size: 11px;
-                }
-                QPushButton:hover {
-                    background: #73d13d;
-                }
-            """)
-            edit_btn.clicked.connect(lambda checked, r=row: self.edit_bom(r))
+        # 操作按钮
+        view_btn = QPushButton("查看")
+        view_btn.setStyleSheet("""
+            QPushButton {
+                background: #1890ff;
+                color: white;
+                border: none;
+                padding: 4px 8px;
+                border-radius: 3px;
+                font-size: 11px;
+            }
+            QPushButton:hover {
+                background: #40a9ff;
+            }
+        """)
+        view_btn.clicked.connect(lambda checked, r=row: self.view_bom(r))
 
-            delete_btn = QPushButton("删除")
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background: #ff4d4f;
-                    color: white;
-                    border: none;
-                    padding: 4px 8px;
-                    border-radius: 3px;
-                    font-size: 11px;
-                }
-                QPushButton:hover {
-                    background: #ff7875;
-                }
-            """)
-            delete_btn.clicked.connect(lambda checked, r=row: self.delete_bom(r))
+        edit_btn = QPushButton("编辑")
+        edit_btn.setStyleSheet("""
+            QPushButton {
+                background: #52c41a;
+                color: white;
+                border: none;
+                padding: 4px 8px;
+                border-radius: 3px;
+                font-size: 11px;
+            }
+            QPushButton:hover {
+                background: #73d13d;
+            }
+        """)
+        edit_btn.clicked.connect(lambda checked, r=row: self.edit_bom(r))
+
+        delete_btn = QPushButton("删除")
+        delete_btn.setStyleSheet("""
+            QPushButton {
+                background: #ff4d4f;
+                color: white;
+                border: none;
+                padding: 4px 8px;
+                border-radius: 3px;
+                font-size: 11px;
+            }
+            QPushButton:hover {
+                background: #ff7875;
+            }
+        """)
+        delete_btn.clicked.connect(lambda checked, r=row: self.delete_bom(r))
 
-            btn_layout = QHBoxLayout()
-            btn_layout.addWidget(view_btn)
-            btn_layout.addWidget(edit_btn)
-            btn_layout.addWidget(delete_btn)
-            btn_layout.setContentsMargins(4, 2, 4, 2)
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(view_btn)
+        btn_layout.addWidget(edit_btn)
+        btn_layout.addWidget(delete_btn)
+        btn_layout.setContentsMargins(4, 2, 4, 2)
 
-            btn_widget = QWidget()
-            btn_widget.setLayout(btn_layout)
-            self.bom_table.setCellWidget(row, 10, btn_widget)
+        btn_widget = QWidget()
+        btn_widget.setLayout(btn_layout)
+        self.bom_table.setCellWidget(row, 10, btn_widget)
 
     def add_bom(self):
         """新增BOM"""
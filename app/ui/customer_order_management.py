@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import os
 from collections import defaultdict
 from typing import Optional, List, Dict, Tuple
 from datetime import datetime, timedelta, date as _date
@@ -14,10 +15,12 @@ from PySide6.QtWidgets import (
 )
 
 from app.services.customer_order_service import CustomerOrderService
+from app.ui.async_loader import AsyncLoader
+from app.ui.excel_export import run_excel_export
+from app.utils.excel_writer import THIN_BORDER, Progress, StreamingWorkbook, report_rows
 
 # Excel导出相关导入
-import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.styles import PatternFill, Font, Alignment
 from openpyxl.utils import get_column_letter
 
 
@@ -169,6 +172,8 @@ class TwoRowHeader(QHeaderView):
 class CustomerOrderManagement(QWidget):
     def __init__(self):
         super().__init__()
+        # 看板数据在后台查询与聚合，版本/日期/类型变化时取消上一次加载
+        self.kanban_loader = AsyncLoader(self)
         self.init_ui()
         self.load_version_list()
 
@@ -347,20 +352,29 @@ class CustomerOrderManagement(QWidget):
                 self.load_kanban_data()
                 return
             version_id = int(m.group(1))
-            data = CustomerOrderService.get_order_lines_by_import_version(version_id)
-            all_dates = []
-            for ln in data or []:
-                d = _safe_parse_date(_get(ln, "DeliveryDate", "delivery_date", "DueDate", "due_date", ""))
-                if d:
-                    all_dates.append(d)
-            if all_dates:
-                all_dates.sort()
-                self.start_date_edit.setDate(QDate(all_dates[0].year, all_dates[0].month, all_dates[0].day))
-                self.end_date_edit.setDate(QDate(all_dates[-1].year, all_dates[-1].month, all_dates[-1].day))
-            self.load_kanban_data()
+
+            def fetch(token):
+                data = CustomerOrderService.get_order_lines_by_import_version(version_id)
+                all_dates = []
+                for ln in data or []:
+                    d = _safe_parse_date(_get(ln, "DeliveryDate", "delivery_date", "DueDate", "due_date", ""))
+                    if d:
+                        all_dates.append(d)
+                return (min(all_dates), max(all_dates)) if all_dates else None
+
+            self.kanban_loader.load(fetch, self._on_version_dates_loaded,
+                                    lambda e: print(f"版本切换失败: {e}"))
         except Exception as e:
             print(f"版本切换失败: {e}")
 
+    def _on_version_dates_loaded(self, date_range):
+        """版本订单日期范围取回后设置日期筛选，再加载看板"""
+        if date_range:
+            first, last = date_range
+            self.start_date_edit.setDate(QDate(first.year, first.month, first.day))
+            self.end_date_edit.setDate(QDate(last.year, last.month, last.day))
+        self.load_kanban_data()
+
     def on_filter_changed(self):
         self.load_kanban_data()
 
@@ -369,6 +383,7 @@ class CustomerOrderManagement(QWidget):
             version_text = self.version_combo.currentText()
             sd = self.start_date_edit.date().toString("yyyy-MM-dd")
             ed = self.end_date_edit.date().toString("yyyy-MM-dd")
+            order_type = self.order_type_combo.currentText()
             if version_text != "全部版本汇总":
                 import re
                 m = re.search(r'^(\d+) - ', version_text)
@@ -376,37 +391,44 @@ class CustomerOrderManagement(QWidget):
             else:
                 version_id = None
 
-            if version_id:
-                data = CustomerOrderService.get_order_lines_by_import_version(version_id)
-                self.display_kanban_data_by_version(data, sd, ed, self.order_type_combo.currentText())
-            else:
-                # 汇总口径：把 Firm/Predict 拆成伪明细
-                rows = CustomerOrderService.get_ndlutil_kanban_data(start_date=sd, end_date=ed)
-                expanded = []
-                for r in rows or []:
-                    common = {
-                        "SupplierCode": r.get("SupplierCode",""),
-                        "SupplierName": r.get("SupplierName",""),
-                        "ItemNumber":   r.get("ItemNumber",""),
-                        "ItemDescription": r.get("ItemDescription",""),
-                        "DeliveryDate": r.get("DeliveryDate",""),
-                        "CalendarWeek": r.get("CalendarWeek",""),
-                        "ReleaseDate":  r.get("ReleaseDate",""),
-                        "ReleaseId":    r.get("ReleaseId",""),
-                        "PurchaseOrder":r.get("PurchaseOrder",""),
-                        "ReceiptQuantity": 0,
-                        "CumReceived":  0,
-                    }
-                    f = _norm_int(r.get("FirmQty"), 0)
-                    p = _norm_int(r.get("ForecastQty"), 0)
-                    if f:
-                        e = dict(common); e["OrderType"]="F"; e["RequiredQty"]=f; expanded.append(e)
-                    if p:
-                        e = dict(common); e["OrderType"]="P"; e["RequiredQty"]=p; expanded.append(e)
-                self.display_kanban_data_by_version(expanded, sd, ed, self.order_type_combo.currentText())
+            # 查询与聚合在后台执行，结果回到界面线程后渲染
+            self.kanban_loader.load(
+                lambda token: self._build_kanban_board(self._fetch_kanban_lines(version_id, sd, ed), sd, ed, order_type),
+                self._render_kanban_board,
+                lambda e: print(f"加载看板数据失败: {e}"))
         except Exception as e:
             print(f"加载看板数据失败: {e}")
 
+    @staticmethod
+    def _fetch_kanban_lines(version_id: Optional[int], sd: str, ed: str) -> list:
+        """看板订单明细：指定版本取该版本订单行，否则取汇总数据并拆成伪明细"""
+        if version_id:
+            return CustomerOrderService.get_order_lines_by_import_version(version_id)
+        # 汇总口径：把 Firm/Predict 拆成伪明细
+        rows = CustomerOrderService.get_ndlutil_kanban_data(start_date=sd, end_date=ed)
+        expanded = []
+        for r in rows or []:
+            common = {
+                "SupplierCode": r.get("SupplierCode",""),
+                "SupplierName": r.get("SupplierName",""),
+                "ItemNumber":   r.get("ItemNumber",""),
+                "ItemDescription": r.get("ItemDescription",""),
+                "DeliveryDate": r.get("DeliveryDate",""),
+                "CalendarWeek": r.get("CalendarWeek",""),
+                "ReleaseDate":  r.get("ReleaseDate",""),
+                "ReleaseId":    r.get("ReleaseId",""),
+                "PurchaseOrder":r.get("PurchaseOrder",""),
+                "ReceiptQuantity": 0,
+                "CumReceived":  0,
+            }
+            f = _norm_int(r.get("FirmQty"), 0)
+            p = _norm_int(r.get("ForecastQty"), 0)
+            if f:
+                e = dict(common); e["OrderType"]="F"; e["RequiredQty"]=f; expanded.append(e)
+            if p:
+                e = dict(common); e["OrderType"]="P"; e["RequiredQty"]=p; expanded.append(e)
+        return expanded
+
     # ------- 渲染（行集合固定，列按范围变动）-------
     def display_kanban_data_by_version(self, data: list, start_date: str, end_date: str, order_type: str):
         """
@@ -414,6 +436,11 @@ class CustomerOrderManagement(QWidget):
         列（CW/年合计）随页面日期范围变化；
         数量来自【按日期范围 + 类型过滤】后的数据进行周聚合。
         """
+        self._render_kanban_board(self._build_kanban_board(data, start_date, end_date, order_type))
+
+    @staticmethod
+    def _build_kanban_board(data: list, start_date: str, end_date: str, order_type: str) -> dict:
+        """看板数据聚合：列定义、排序后的行集合、周数量与项目名称（不访问界面，可在加载线程执行）"""
         sd = _safe_parse_date(start_date)
         ed = _safe_parse_date(end_date)
         if sd and ed and sd > ed:
@@ -479,37 +506,6 @@ class CustomerOrderManagement(QWidget):
             if (cur is None) or (cur == "P" and ln["__fp__"] == "F"):
                 fp_map[(sup, pn, d)] = ln["__fp__"]
 
-        # 5) 表头
-        fixed_headers = [
-            "Release Date", "Release ID", "PN", "Des", "Project", "Item",
-            "Purchase Order", "Receipt Quantity", "Cum Received"
-        ]
-        headers_count = len(fixed_headers) + len(colspec) + 1
-        self.kanban_table.clear()
-        self.kanban_table.setColumnCount(headers_count)
-
-        for i, title in enumerate(fixed_headers):
-            item = QTableWidgetItem(title)
-            self.kanban_table.setHorizontalHeaderItem(i, item)
-
-        base_col = len(fixed_headers)
-        for i, (kind, val) in enumerate(colspec):
-            if kind == "date":
-                cw = f"CW{val.isocalendar()[1]:02d}"
-                date_str = val.strftime("%Y/%m/%d")
-                it = QTableWidgetItem(cw)
-                it.setData(Qt.UserRole, date_str)
-                print(f"DEBUG: 设置CW表头 - 列{base_col + i}: '{cw}' / '{date_str}'")
-            else:
-                it = QTableWidgetItem(f"{val}合计")
-            self.kanban_table.setHorizontalHeaderItem(base_col + i, it)
-        self.kanban_table.setHorizontalHeaderItem(headers_count - 1, QTableWidgetItem("Total"))
-        
-        # 强制刷新表头显示
-        header = self.kanban_table.horizontalHeader()
-        header.updateGeometry()
-        header.repaint()
-
         # 6) 行集合（按项目映射表的DisplayOrder排序）
         def sort_key(item):
             sup, pn = item
@@ -573,9 +569,6 @@ class CustomerOrderManagement(QWidget):
         
         keys_all = sorted(groups_all.keys(), key=sort_key)
         
-        data_rows = len(keys_all)
-        self.kanban_table.setRowCount(data_rows + 1)  # +1 行留给 TOTAL
-
         def project_name(pn: str) -> str:
             """根据产品型号获取项目名称，使用项目映射表"""
             if not pn:
@@ -640,13 +633,60 @@ class CustomerOrderManagement(QWidget):
                 print(f"❌ [project_name] 获取项目名称失败: {str(e)}")
                 return "UNKNOWN"
 
+        projects = {pn: project_name(pn) for _, pn in keys_all}
+
+        return {
+            "colspec": colspec, "by_year": by_year, "keys_all": keys_all,
+            "groups_all": groups_all, "date_qty": date_qty, "fp_map": fp_map, "projects": projects,
+        }
+
+    def _render_kanban_board(self, board: dict):
+        """按聚合结果填充看板表格"""
+        colspec, by_year, keys_all = board["colspec"], board["by_year"], board["keys_all"]
+        groups_all, date_qty, fp_map = board["groups_all"], board["date_qty"], board["fp_map"]
+        projects = board["projects"]
+
+        # 5) 表头
+        fixed_headers = [
+            "Release Date", "Release ID", "PN", "Des", "Project", "Item",
+            "Purchase Order", "Receipt Quantity", "Cum Received"
+        ]
+        headers_count = len(fixed_headers) + len(colspec) + 1
+        self.kanban_table.clear()
+        self.kanban_table.setColumnCount(headers_count)
+
+        for i, title in enumerate(fixed_headers):
+            item = QTableWidgetItem(title)
+            self.kanban_table.setHorizontalHeaderItem(i, item)
+
+        base_col = len(fixed_headers)
+        for i, (kind, val) in enumerate(colspec):
+            if kind == "date":
+                cw = f"CW{val.isocalendar()[1]:02d}"
+                date_str = val.strftime("%Y/%m/%d")
+                it = QTableWidgetItem(cw)
+                it.setData(Qt.UserRole, date_str)
+                print(f"DEBUG: 设置CW表头 - 列{base_col + i}: '{cw}' / '{date_str}'")
+            else:
+                it = QTableWidgetItem(f"{val}合计")
+            self.kanban_table.setHorizontalHeaderItem(base_col + i, it)
+        self.kanban_table.setHorizontalHeaderItem(headers_count - 1, QTableWidgetItem("Total"))
+        
+        # 强制刷新表头显示
+        header = self.kanban_table.horizontalHeader()
+        header.updateGeometry()
+        header.repaint()
+
+        data_rows = len(keys_all)
+        self.kanban_table.setRowCount(data_rows + 1)  # +1 行留给 TOTAL
+
         # 7) 填充数据行
         for row_idx, (sup, pn) in enumerate(keys_all):
             ri = groups_all[(sup, pn)]["release"]
             rd_obj = _safe_parse_date(ri.get("release_date"))
             rd_txt = rd_obj.strftime("%Y/%m/%d") if rd_obj else (ri.get("release_date") or "")
 
-            project_result = project_name(pn)
+            project_result = projects[pn]
 
             fixed_vals = [
                 rd_txt, str(ri.get("release_id", "") or ""), pn,
@@ -781,7 +821,7 @@ class CustomerOrderManagement(QWidget):
             return None
 
     def export_kanban_to_excel(self):
-        """导出看板数据到Excel"""
+        """导出看板数据到Excel（后台写出）"""
         if not hasattr(self, 'kanban_table') or self.kanban_table.rowCount() == 0:
             QMessageBox.warning(self, "提示", "请先生成看板数据")
             return
@@ -805,28 +845,37 @@ class CustomerOrderManagement(QWidget):
             return
 
         try:
-            self._export_kanban_excel(file_path)
-            QMessageBox.information(self, "导出成功", f"文件已保存到：\n{file_path}")
+            snapshot = self._kanban_export_snapshot()
         except Exception as e:
             QMessageBox.critical(self, "导出失败", f"导出过程中发生错误：\n{str(e)}")
+            return
+        run_excel_export(
+            self,
+            lambda progress: self._write_kanban_excel(file_path, snapshot, progress),
+            lambda _: QMessageBox.information(self, "导出成功", f"文件已保存到：\n{file_path}"),
+            lambda e: QMessageBox.critical(self, "导出失败", f"导出过程中发生错误：\n{str(e)}"),
+        )
 
-    def _export_kanban_excel(self, file_path: str):
+    def _export_kanban_excel(self, file_path: str, progress: Optional[Progress] = None):
         """导出看板数据到Excel文件的具体实现"""
-        # 创建工作簿和工作表
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        
+        self._write_kanban_excel(file_path, self._kanban_export_snapshot(), progress)
+
+    def _kanban_export_snapshot(self) -> dict:
+        """
+        在界面线程取出看板表格的导出数据
+        返回 {"title": 工作表名, "fixed_headers", "week_headers", "date_row": 第二行,
+              "rows": 单元格文本（无单元格为 None）, "colors": 周列单元格背景色名（无效为 None）}
+        """
         # 获取Release Date对应的CW信息
         release_cw = self._get_release_cw_from_kanban()
         print(f"DEBUG: 导出时获取到的CW信息: {release_cw}")
         
         if release_cw:
             # 设置工作表名称为CW几
-            ws_title = f"CW{release_cw['week']:02d}"
-            ws.title = ws_title
-            print(f"DEBUG: 设置工作表名称为: {ws_title}")
+            title = f"CW{release_cw['week']:02d}"
+            print(f"DEBUG: 设置工作表名称为: {title}")
         else:
-            ws.title = "客户订单看板"
+            title = "客户订单看板"
             print("DEBUG: 未获取到CW信息，使用默认工作表名称: 客户订单看板")
 
         # 获取当前看板数据
@@ -837,14 +886,6 @@ class CustomerOrderManagement(QWidget):
         if rows_count == 0 or cols_count == 0:
             raise ValueError("看板数据为空")
 
-        # 定义样式
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
         # 获取表头信息
         fixed_headers = []
         week_headers = []
@@ -857,146 +898,119 @@ class CustomerOrderManagement(QWidget):
                 else:
                     week_headers.append(header_text)
 
-        # 写入表头（两行）
-        # 第一行：固定列标题 + 周标题
-        first_row = fixed_headers + week_headers
-        ws.append(first_row)
-
         # 第二行：空行 + 日期
-        second_row = [""] * len(fixed_headers)
+        date_row = [""] * len(fixed_headers)
         for i, header in enumerate(week_headers):
+            date_text = ""
             if "CW" in header:
                 # 从表头数据中获取日期
                 header_item = table.horizontalHeaderItem(len(fixed_headers) + i)
-                if header_item:
-                    date_data = header_item.data(Qt.UserRole)
-                    if date_data:
-                        try:
-                            date_obj = datetime.strptime(date_data, "%Y/%m/%d")
-                            second_row.append(date_obj.strftime("%m/%d"))
-                        except:
-                            second_row.append("")
-                    else:
-                        second_row.append("")
-                else:
-                    second_row.append("")
-            else:
-                second_row.append("")
-
-        ws.append(second_row)
+                date_data = header_item.data(Qt.UserRole) if header_item else None
+                if date_data:
+                    try:
+                        date_text = datetime.strptime(date_data, "%Y/%m/%d").strftime("%m/%d")
+                    except:
+                        pass
+            date_row.append(date_text)
 
-        # 写入数据行
+        # 单元格文本与周列背景色（F/P 着色来自表格背景色）
+        rows = []
+        colors = []
         for row in range(rows_count):
-            row_data = []
+            texts = []
+            row_colors = []
             for col in range(cols_count):
                 item = table.item(row, col)
-                if item:
-                    # 尝试转换为数字
-                    try:
-                        value = int(float(item.text())) if item.text().strip() else 0
-                    except:
-                        value = item.text() or ""
-                    row_data.append(value)
-                else:
-                    row_data.append("")
-            ws.append(row_data)
-
-        # 工作表标题已在前面设置，这里不需要重复设置
-
-        # ====== 样式设置 ======
-
-        # 1) 列宽设置
-        tight_widths = [11, 14, 12, 10, 16, 10, 14, 12, 12]  # 对应9个固定列
-        for i, w in enumerate(tight_widths, start=1):
-            if i <= len(fixed_headers):
-                ws.column_dimensions[get_column_letter(i)].width = w
-
-        # 周列宽度
-        for ci in range(len(fixed_headers) + 1, ws.max_column + 1):
-            ws.column_dimensions[get_column_letter(ci)].width = 9.0
-
-        # 2) 冻结窗格：固定列 + 两行表头
-        ws.freeze_panes = get_column_letter(len(fixed_headers) + 1) + "3"
-
-        # 3) 表头样式
-        for cell in ws[1] + ws[2]:
-            cell.font = Font(name="Arial", bold=True)
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            cell.border = thin_border
-
-        # 4) 数据行样式
-        first_data_row = 3
-        for r in range(first_data_row, ws.max_row + 1):
-            for c in range(1, ws.max_column + 1):
-                cell = ws.cell(r, c)
-                if c <= len(fixed_headers):
-                    # 固定列：居中对齐，自动换行
-                    cell.alignment = Alignment(
-                        horizontal="center", vertical="center",
-                        wrap_text=True, shrink_to_fit=True
-                    )
-                else:
-                    # 数字列：居中对齐
-                    cell.alignment = Alignment(
-                        horizontal="center", vertical="center",
-                        wrap_text=False, shrink_to_fit=True
-                    )
-
-                # 设置字体
-                cell.font = Font(name="Arial")
-
-                # 设置边框（所有有内容的单元格都有边框）
-                if cell.value not in (None, "", 0):
-                    cell.border = thin_border
-                else:
-                    # 对于空单元格，也设置边框以保持表格完整性
-                    cell.border = thin_border
-
-        # 5) 数字格式设置
-        for r in ws.iter_rows(min_row=first_data_row, max_row=ws.max_row,
-                              min_col=len(fixed_headers) + 1, max_col=ws.max_column):
-            for c in r:
-                if isinstance(c.value, (int, float)) and c.value != 0:
-                    c.number_format = "0"
-
-        # 6) F/P 着色（从表格背景色获取）
-        fill_f = PatternFill("solid", fgColor="C6E0B4")  # F 绿色
-        fill_p = PatternFill("solid", fgColor="FFF2CC")  # P 黄色
-
-        for r in range(rows_count):
-            for c in range(len(fixed_headers), cols_count):
-                table_item = table.item(r, c)
-                if table_item and table_item.background().color().isValid():
-                    bg_color = table_item.background().color()
-                    excel_cell = ws.cell(r + first_data_row, c + 1)
-
-                    # 根据背景色判断F/P
-                    if bg_color.name() == "#c6e0b4":  # 绿色 - F
-                        excel_cell.fill = fill_f
-                    elif bg_color.name() == "#fff2cc":  # 黄色 - P
-                        excel_cell.fill = fill_p
-
-        # 7) 合计列样式
-        sum_fill = PatternFill("solid", fgColor="E2F0D9")
-        for c in range(len(fixed_headers) + 1, ws.max_column + 1):
-            col_letter = get_column_letter(c)
-            if "合计" in ws.cell(1, c).value or "Total" in ws.cell(1, c).value:
-                for r in range(1, ws.max_row + 1):
-                    ws.cell(r, c).fill = sum_fill
-                # 数据行加粗
-                for r in range(first_data_row, ws.max_row + 1):
-                    ws.cell(r, c).font = Font(name="Arial", bold=True)
-
-        # 8) TOTAL行样式
-        total_row = ws.max_row
-        ws.cell(total_row, 1).font = Font(name="Arial", bold=True)
-        for c in range(1, ws.max_column + 1):
-            ws.cell(total_row, c).font = Font(name="Arial", bold=True)
-            ws.cell(total_row, c).border = thin_border
-
-        # 保存文件
-        wb.save(file_path)
-        wb.close()
+                texts.append(item.text() if item else None)
+                if col >= len(fixed_headers):
+                    color = item.background().color() if item else None
+                    row_colors.append(color.name() if color is not None and color.isValid() else None)
+            rows.append(texts)
+            colors.append(row_colors)
+
+        return {"title": title, "fixed_headers": fixed_headers, "week_headers": week_headers,
+                "date_row": date_row, "rows": rows, "colors": colors}
+
+    @staticmethod
+    def _write_kanban_excel(file_path: str, snapshot: dict, progress: Optional[Progress] = None):
+        """按看板快照流式写出客户订单看板（可在工作线程执行）"""
+        fixed_headers = snapshot["fixed_headers"]
+        fixed_count = len(fixed_headers)
+        first_row = fixed_headers + snapshot["week_headers"]
+        rows = snapshot["rows"]
+        max_column = max([len(first_row)] + [len(texts) for texts in rows])
+
+        # 合计列（表头含“合计”或“Total”）：整列浅绿底色，数据行加粗
+        sum_cols = {c for c in range(fixed_count, len(first_row))
+                    if "合计" in first_row[c] or "Total" in first_row[c]}
+
+        # 列宽：9个固定列按内容收紧，周列 9；冻结固定列 + 两行表头
+        widths = dict(list(enumerate([11, 14, 12, 10, 16, 10, 14, 12, 12], start=1))[:fixed_count])
+        widths.update({c: 9.0 for c in range(fixed_count + 1, max_column + 1)})
+
+        fills = {
+            "sum": PatternFill("solid", fgColor="E2F0D9"),
+            "f": PatternFill("solid", fgColor="C6E0B4"),  # F 绿色
+            "p": PatternFill("solid", fgColor="FFF2CC"),  # P 黄色
+        }
+        fp_colors = {"#c6e0b4": "f", "#fff2cc": "p"}
+
+        with StreamingWorkbook() as book:
+            header_font = Font(name="Arial", bold=True)
+            header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
+            book.add_style("ckb_header", font=header_font, border=THIN_BORDER, alignment=header_align)
+            book.add_style("ckb_header_sum", font=header_font, fill=fills["sum"], border=THIN_BORDER,
+                           alignment=header_align)
+
+            def data_style(fixed: bool, fill: Optional[str], bold: bool, number: bool) -> str:
+                """数据行单元格样式：按需注册，同一组合只注册一次"""
+                name = f"ckb_{'fixed' if fixed else 'week'}_{fill or 'plain'}{'_bold' if bold else ''}" \
+                       f"{'_num' if number else ''}"
+                if not book.has_style(name):
+                    # 固定列自动换行，数字列不换行，均缩小字体填充
+                    book.add_style(name, font=Font(name="Arial", bold=bold), fill=fills.get(fill),
+                                   border=THIN_BORDER,
+                                   alignment=Alignment(horizontal="center", vertical="center",
+                                                       wrap_text=fixed, shrink_to_fit=True),
+                                   number_format="0" if number else None)
+                return name
+
+            sheet = book.create_sheet(snapshot["title"], column_widths=widths,
+                                      freeze_panes=get_column_letter(fixed_count + 1) + "3")
+            header_styles = ["ckb_header_sum" if c in sum_cols else "ckb_header" for c in range(max_column)]
+            sheet.append(first_row + [None] * (max_column - len(first_row)), header_styles)
+            date_row = snapshot["date_row"]
+            sheet.append(date_row + [None] * (max_column - len(date_row)), header_styles)
+
+            last = len(rows) - 1
+            for r, (texts, row_colors) in enumerate(report_rows(zip(rows, snapshot["colors"]), len(rows), progress)):
+                values = []
+                styles = []
+                for c in range(max_column):
+                    text = texts[c] if c < len(texts) else None
+                    if text is None:
+                        value = ""
+                    else:
+                        # 尝试转换为数字
+                        try:
+                            value = int(float(text)) if text.strip() else 0
+                        except:
+                            value = text or ""
+                    values.append(value)
+
+                    fixed = c < fixed_count
+                    fill = None
+                    if c in sum_cols:
+                        fill = "sum"
+                    elif not fixed and c - fixed_count < len(row_colors):
+                        fill = fp_colors.get(row_colors[c - fixed_count])
+                    # 合计列与最后一行（TOTAL行）加粗；周列非零数字按整数显示
+                    bold = c in sum_cols or r == last
+                    number = not fixed and isinstance(value, (int, float)) and value != 0
+                    styles.append(data_style(fixed, fill, bold, number))
+                sheet.append(values, styles)
+
+            book.save(file_path)
     # ===================== 订单明细页 =====================
     def create_order_details_tab(self):
         details_widget = QWidget()
@@ -1253,21 +1267,40 @@ class CustomerOrderManagement(QWidget):
         self.load_order_details()
 
     def import_txt_file(self):
-        """从 TXT 导入"""
-        path, _ = QFileDialog.getOpenFileName(self, "选择客户订单 TXT", "", "Text Files (*.txt);;All Files (*)")
-        if not path:
+        """从 TXT 导入（可多选，多个文件一次批量解析，每个文件生成一个导入版本）"""
+        paths, _ = QFileDialog.getOpenFileNames(self, "选择客户订单 TXT", "", "Text Files (*.txt);;All Files (*)")
+        if not paths:
             return
-        ok, msg, import_id = CustomerOrderService.import_orders_from_txt(path, import_user="UI")
-        if not ok:
-            QMessageBox.warning(self, "导入失败", msg or "未知错误")
+        results = CustomerOrderService.import_orders_from_txt_files(paths, import_user="UI")
+        if len(results) == 1:
+            _, ok, msg, import_id = results[0]
+            if not ok:
+                QMessageBox.warning(self, "导入失败", msg or "未知错误")
+            else:
+                # 检查是否有不匹配的产品型号
+                unmatched_items = self._check_unmatched_items(import_id)
+                if unmatched_items:
+                    warning_msg = f"导入成功！\n\n发现以下产品型号没有匹配到项目，将默认放到最后：\n{unmatched_items}\n\n这些产品将按照默认规则排序。"
+                    QMessageBox.information(self, "导入成功（含警告）", warning_msg)
+                else:
+                    QMessageBox.information(self, "导入成功", msg)
         else:
-            # 检查是否有不匹配的产品型号
-            unmatched_items = self._check_unmatched_items(import_id)
-            if unmatched_items:
-                warning_msg = f"导入成功！\n\n发现以下产品型号没有匹配到项目，将默认放到最后：\n{unmatched_items}\n\n这些产品将按照默认规则排序。"
-                QMessageBox.information(self, "导入成功（含警告）", warning_msg)
+            lines = []
+            unmatched = set()
+            for path, ok, msg, import_id in results:
+                lines.append(f"{os.path.basename(path)}：{msg or '未知错误'}")
+                if ok:
+                    unmatched_items = self._check_unmatched_items(import_id)
+                    if unmatched_items:
+                        unmatched.update(unmatched_items.split("\n"))
+            summary = "\n".join(lines)
+            if unmatched:
+                unmatched_text = "\n".join(sorted(unmatched))
+                summary += f"\n\n发现以下产品型号没有匹配到项目，将默认放到最后：\n{unmatched_text}"
+            if all(ok for _, ok, _, _ in results):
+                QMessageBox.information(self, "导入成功", summary)
             else:
-                QMessageBox.information(self, "导入成功", msg)
+                QMessageBox.warning(self, "部分导入失败", summary)
         # 刷新
         self.refresh_data()
         
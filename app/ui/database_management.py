@@ -19,7 +19,8 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, QDate, QThread, Signal, QTimer, QSize
 from PySide6.QtGui import QFont, QColor, QIcon, QPixmap, QPainter, QBrush, QAction
-from app.db import get_conn
+from app.db import get_conn, notify_data_reset
+from app.utils import sql_trace
 import sqlite3
 
 
@@ -347,6 +348,11 @@ class DatabaseManagement(QWidget):
         self.sql_tab = self.create_sql_tab()
         self.tab_widget.addTab(self.sql_tab, "SQL")
         
+        # 查询统计标签页
+        self.query_stats_tab = self.create_query_stats_tab()
+        self.tab_widget.addTab(self.query_stats_tab, "查询统计")
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+        
         right_layout.addWidget(self.tab_widget)
         
         return right_frame
@@ -821,11 +827,199 @@ class DatabaseManagement(QWidget):
         
         return tab
     
+    def create_query_stats_tab(self):
+        """创建查询统计标签页（应用内 SQL 跟踪的实时统计）"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        layout.setSpacing(8)
+        layout.setContentsMargins(8, 8, 8, 8)
+        
+        # 控制栏
+        controls = QHBoxLayout()
+        
+        self.trace_enabled_check = QCheckBox("启用SQL跟踪")
+        self.trace_enabled_check.setChecked(sql_trace.enabled())
+        self.trace_enabled_check.toggled.connect(self.on_trace_enabled_toggled)
+        controls.addWidget(self.trace_enabled_check)
+        
+        controls.addWidget(QLabel("慢查询阈值(ms):"))
+        self.slow_threshold_spin = QSpinBox()
+        self.slow_threshold_spin.setRange(1, 60000)
+        self.slow_threshold_spin.setValue(int(sql_trace.slow_threshold_ms()))
+        self.slow_threshold_spin.valueChanged.connect(sql_trace.set_slow_threshold_ms)
+        controls.addWidget(self.slow_threshold_spin)
+        
+        refresh_btn = QPushButton("刷新")
+        refresh_btn.clicked.connect(self.refresh_query_stats)
+        refresh_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #007bff;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #0056b3;
+            }
+        """)
+        controls.addWidget(refresh_btn)
+        
+        reset_btn = QPushButton("清空统计")
+        reset_btn.clicked.connect(self.reset_query_stats)
+        reset_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #545b62;
+            }
+        """)
+        controls.addWidget(reset_btn)
+        
+        controls.addStretch()
+        self.query_stats_label = QLabel("")
+        self.query_stats_label.setStyleSheet("color: #6c757d;")
+        controls.addWidget(self.query_stats_label)
+        layout.addLayout(controls)
+        
+        # 统计表格（按总耗时降序）
+        self.query_stats_table = QTableWidget()
+        self.query_stats_table.setColumnCount(8)
+        self.query_stats_table.setHorizontalHeaderLabels(
+            ["SQL", "次数", "总耗时(ms)", "平均(ms)", "最大(ms)", "行数", "慢查询", "参数形态"]
+        )
+        self.query_stats_table.setAlternatingRowColors(True)
+        self.query_stats_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.query_stats_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.query_stats_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.query_stats_table.setWordWrap(False)
+        header = self.query_stats_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for col in range(1, 8):
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        self.query_stats_table.setStyleSheet("""
+            QTableWidget {
+                gridline-color: #dee2e6;
+                background-color: white;
+                alternate-background-color: #f8f9fa;
+            }
+            QHeaderView::section {
+                background-color: #f8f9fa;
+                border: 1px solid #dee2e6;
+                padding: 6px;
+                font-weight: bold;
+            }
+        """)
+        self.query_stats_table.itemSelectionChanged.connect(self.show_query_stat_detail)
+        layout.addWidget(self.query_stats_table, 3)
+        
+        # 选中语句的完整 SQL、参数形态与执行计划
+        self.query_stat_detail = QTextEdit()
+        self.query_stat_detail.setReadOnly(True)
+        self.query_stat_detail.setPlaceholderText("选中一条语句查看完整SQL、参数形态和执行计划")
+        self.query_stat_detail.setStyleSheet("""
+            QTextEdit {
+                border: 1px solid #ced4da;
+                border-radius: 4px;
+                padding: 8px;
+                font-family: 'Consolas', 'Monaco', monospace;
+                font-size: 12px;
+            }
+        """)
+        layout.addWidget(self.query_stat_detail, 1)
+        
+        # 页面可见且跟踪开启时每 2 秒刷新一次
+        self._query_stats = []
+        self.query_stats_timer = QTimer(self)
+        self.query_stats_timer.setInterval(2000)
+        self.query_stats_timer.timeout.connect(self.refresh_query_stats)
+        
+        return tab
+    
+    def on_tab_changed(self, index):
+        """切换到查询统计页时刷新并启动定时刷新，离开时停止"""
+        if self.tab_widget.widget(index) is self.query_stats_tab:
+            self.refresh_query_stats()
+            if sql_trace.enabled():
+                self.query_stats_timer.start()
+        else:
+            self.query_stats_timer.stop()
+    
+    def on_trace_enabled_toggled(self, checked):
+        """开关 SQL 跟踪"""
+        sql_trace.set_enabled(checked)
+        if checked and self.tab_widget.currentWidget() is self.query_stats_tab:
+            self.query_stats_timer.start()
+        else:
+            self.query_stats_timer.stop()
+        self.refresh_query_stats()
+    
+    def refresh_query_stats(self):
+        """刷新查询统计表格，保持当前选中的语句"""
+        selected_sql = None
+        row = self.query_stats_table.currentRow()
+        if 0 <= row < len(self._query_stats):
+            selected_sql = self._query_stats[row]["Sql"]
+        
+        self._query_stats = sql_trace.stats(200)
+        table = self.query_stats_table
+        table.blockSignals(True)
+        try:
+            table.setRowCount(len(self._query_stats))
+            for r, stat in enumerate(self._query_stats):
+                shapes = stat["Shapes"][0][0] if stat["Shapes"] else ""
+                values = [
+                    stat["Sql"], str(stat["Count"]), f"{stat['TotalMs']:.1f}", f"{stat['AvgMs']:.2f}",
+                    f"{stat['MaxMs']:.1f}", str(stat["Rows"]), str(stat["Slow"]), shapes,
+                ]
+                for c, value in enumerate(values):
+                    item = QTableWidgetItem(value)
+                    if c > 0:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    if c == 6 and stat["Slow"]:
+                        item.setForeground(QBrush(QColor("#dc3545")))
+                    table.setItem(r, c, item)
+                if stat["Sql"] == selected_sql:
+                    table.selectRow(r)
+        finally:
+            table.blockSignals(False)
+        
+        total_count = sum(s["Count"] for s in self._query_stats)
+        total_ms = sum(s["TotalMs"] for s in self._query_stats)
+        state = "跟踪中" if sql_trace.enabled() else "未启用"
+        self.query_stats_label.setText(
+            f"{state} | 语句 {len(self._query_stats)} 条，执行 {total_count} 次，总耗时 {total_ms:.1f} ms"
+        )
+        self.show_query_stat_detail()
+    
+    def show_query_stat_detail(self):
+        """显示选中语句的详细信息"""
+        row = self.query_stats_table.currentRow()
+        if not (0 <= row < len(self._query_stats)) or not self.query_stats_table.selectedItems():
+            self.query_stat_detail.clear()
+            return
+        stat = self._query_stats[row]
+        shapes = "\n".join(f"  {shape}：{count} 次" for shape, count in stat["Shapes"])
+        plan = stat["Plan"] or f"（未超过慢查询阈值 {sql_trace.slow_threshold_ms():g}ms，未采集）"
+        self.query_stat_detail.setPlainText(
+            f"{stat['Sql']}\n\n参数形态：\n{shapes}\n\n执行计划：\n{plan}"
+        )
+    
+    def reset_query_stats(self):
+        """清空查询统计"""
+        sql_trace.reset()
+        self.refresh_query_stats()
+    
     def load_database_info(self):
         """加载数据库信息"""
         try:
-            from app.db import DatabaseManager
-            db_manager = DatabaseManager()
+            from app.db import db_manager
             
             # 更新状态栏
             self.db_info_label.setText(f"数据库: {db_manager.db_path.name}")
@@ -1194,6 +1388,7 @@ class DatabaseManagement(QWidget):
                         deleted_count += 1
                     
                     conn.commit()
+                    notify_data_reset()
                     
                     # 刷新表格
                     self.load_table_data(self.current_table)
@@ -1256,6 +1451,7 @@ class DatabaseManagement(QWidget):
                     conn.execute(f"UPDATE {self.current_table} SET {column_name} = ? WHERE {where_clause}", (new_value,))
                 
                 conn.commit()
+                notify_data_reset()
                 
                 self.status_label.setText(f"已更新表 {self.current_table} 的 {column_name} 列")
                 
@@ -1310,6 +1506,7 @@ class DatabaseManagement(QWidget):
                 else:
                     # 非SELECT查询
                     conn.commit()
+                    notify_data_reset()
                     self.status_label.setText("SQL执行成功")
                     
                     # 如果是修改表结构的操作，刷新表列表
@@ -1359,8 +1556,7 @@ class DatabaseManagement(QWidget):
     def backup_database(self):
         """备份数据库"""
         try:
-            from app.db import DatabaseManager
-            db_manager = DatabaseManager()
+            from app.db import db_manager
             
             # 选择备份文件路径
             backup_path, _ = QFileDialog.getSaveFileName(
@@ -1371,8 +1567,8 @@ class DatabaseManagement(QWidget):
             )
             
             if backup_path:
-                import shutil
-                shutil.copy2(db_manager.db_path, backup_path)
+                if not db_manager.backup_database(backup_path):
+                    raise Exception("数据库文件不存在或备份失败")
                 
                 self.status_label.setText(f"数据库已备份到: {backup_path}")
                 QMessageBox.information(self, "成功", f"数据库已备份到: {backup_path}")
@@ -1386,8 +1582,7 @@ class DatabaseManagement(QWidget):
     def restore_database(self):
         """恢复数据库"""
         try:
-            from app.db import DatabaseManager
-            db_manager = DatabaseManager()
+            from app.db import db_manager
             
             # 选择要恢复的备份文件
             backup_path, _ = QFileDialog.getOpenFileName(
@@ -1468,7 +1663,6 @@ class DatabaseManagement(QWidget):
                     
                     # 备份当前数据库到程序运行目录
                     try:
-                        import shutil
                         from pathlib import Path
                         
                         # 获取程序运行目录
@@ -1480,8 +1674,8 @@ class DatabaseManagement(QWidget):
                         current_backup_path = program_dir / backup_filename
                         
                         if db_manager.db_path.exists():
-                            # 复制当前数据库到程序运行目录
-                            shutil.copy2(db_manager.db_path, current_backup_path)
+                            # 复制当前数据库到程序运行目录（在线备份，包含WAL中的数据）
+                            db_manager.backup_database(str(current_backup_path))
                             print(f"✅ 当前数据库已备份到: {current_backup_path}")
                             
                             # 更新进度对话框信息
@@ -1495,15 +1689,9 @@ class DatabaseManagement(QWidget):
                         QMessageBox.warning(self, "警告", f"无法备份当前数据库: {str(e)}")
                         current_backup_path = None
                     
-                    # 恢复数据库
-                    import shutil
-                    
-                    # 删除当前数据库文件
-                    if db_manager.db_path.exists():
-                        db_manager.db_path.unlink()
-                    
-                    # 复制备份文件到当前数据库位置
-                    shutil.copy2(backup_path, db_manager.db_path)
+                    # 恢复数据库：关闭所有连接、删除当前数据库文件（含WAL），复制备份文件到当前数据库位置
+                    if not db_manager.restore_database(backup_path):
+                        raise Exception("复制备份文件失败")
                     
                     # 验证恢复后的数据库
                     test_conn = sqlite3.connect(db_manager.db_path)
@@ -1567,7 +1755,7 @@ class DatabaseManagement(QWidget):
                     # 恢复失败，尝试恢复原数据库
                     try:
                         if current_backup_path and current_backup_path.exists():
-                            shutil.copy2(current_backup_path, db_manager.db_path)
+                            db_manager.restore_database(str(current_backup_path))
                             QMessageBox.warning(
                                 self, 
                                 "❌ 恢复失败", 
@@ -1715,6 +1903,7 @@ class DatabaseManagement(QWidget):
                     # 执行删除
                     conn.execute(f"DELETE FROM {self.current_table} WHERE {where_clause}")
                     conn.commit()
+                    notify_data_reset()
                     
                     # 刷新表格
                     self.load_table_data(self.current_table, self.current_page)
@@ -1766,6 +1955,7 @@ class DatabaseManagement(QWidget):
                     # 清空表数据
                     conn.execute(f"DELETE FROM {self.current_table}")
                     conn.commit()
+                    notify_data_reset()
                     
                     # 刷新表格
                     self.load_table_data(self.current_table, 1)
@@ -1792,6 +1982,7 @@ class DatabaseManagement(QWidget):
                     # 清空表数据
                     conn.execute(f"DELETE FROM {table_name}")
                     conn.commit()
+                    notify_data_reset()
                     
                     # 如果当前选中的是这个表，刷新表格
                     if self.current_table == table_name:
@@ -1805,8 +1996,7 @@ class DatabaseManagement(QWidget):
     def clear_database(self):
         """清空数据库"""
         try:
-            from app.db import DatabaseManager, get_conn
-            db_manager = DatabaseManager()
+            from app.db import db_manager, get_conn
             
             # 获取数据库信息
             with get_conn() as conn:
@@ -1893,7 +2083,6 @@ class DatabaseManagement(QWidget):
                     try:
                         # 备份当前数据库到程序运行目录
                         try:
-                            import shutil
                             from pathlib import Path
                             from datetime import datetime
                             
@@ -1906,8 +2095,8 @@ class DatabaseManagement(QWidget):
                             backup_path = program_dir / backup_filename
                             
                             if db_manager.db_path.exists():
-                                # 复制当前数据库到程序运行目录
-                                shutil.copy2(db_manager.db_path, backup_path)
+                                # 复制当前数据库到程序运行目录（在线备份，包含WAL中的数据）
+                                db_manager.backup_database(str(backup_path))
                                 print(f"✅ 数据库已自动备份到: {backup_path}")
                                 
                                 # 更新进度对话框信息
@@ -1940,6 +2129,7 @@ class DatabaseManagement(QWidget):
                             conn.execute("PRAGMA foreign_keys = ON")
                             
                             conn.commit()
+                        notify_data_reset()
                         
                         # 关闭进度对话框
                         progress_dialog.close()
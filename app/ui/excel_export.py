@@ -0,0 +1,115 @@
+# app/ui/excel_export.py
+# -*- coding: utf-8 -*-
+"""
+Excel 导出的后台执行
+- run_excel_export：导出函数在加载线程池（async_loader）中执行，界面显示可取消的进度对话框，
+  完成或失败后在界面线程回调；导出期间界面保持响应
+- 导出函数只能使用界面线程中事先取好的数据（或自行查询数据库），不得访问界面控件；
+  参数 progress(已完成, 总数) 报告进度，取消后再次调用时抛出 LoadCancelled 结束导出
+"""
+
+from typing import Any, Callable, Optional
+
+from PySide6.QtCore import QObject, Qt, Signal
+from PySide6.QtWidgets import QMessageBox, QProgressDialog, QWidget
+
+from app.ui.async_loader import AsyncLoader, CancelToken
+from app.utils.excel_writer import Progress
+
+
+class _ExportProgress:
+    """传给导出函数的进度回调：检查取消，进度百分比变化时通知界面"""
+
+    __slots__ = ("_token", "_emit", "_percent")
+
+    def __init__(self, token: CancelToken, emit: Callable[[int], None]):
+        self._token = token
+        self._emit = emit
+        self._percent = -1
+
+    def __call__(self, done: int, total: int):
+        self._token.check()
+        percent = min(100, int(done * 100 / total)) if total > 0 else 100
+        if percent != self._percent:
+            self._percent = percent
+            try:
+                self._emit(percent)
+            except RuntimeError:
+                pass  # 所在界面已销毁
+
+
+class ExcelExportJob(QObject):
+    """一次后台导出：进度对话框 + 后台加载器，结束后自行释放"""
+
+    _progress = Signal(int)
+
+    def __init__(self, parent: QWidget, label: str):
+        super().__init__(parent)
+        self._parent = parent
+        self._finished = False
+        self._loader = AsyncLoader(self)
+        self._dialog = QProgressDialog(label, "取消", 0, 100, parent)
+        self._dialog.setWindowTitle("导出Excel")
+        self._dialog.setWindowModality(Qt.WindowModal)
+        self._dialog.setMinimumDuration(300)  # 很快完成的导出不弹出对话框
+        self._dialog.setAutoClose(False)
+        self._dialog.setAutoReset(False)
+        self._dialog.canceled.connect(self.cancel)
+        self._progress.connect(self._dialog.setValue)
+
+    def start(self, write: Callable[[Progress], Any], on_success: Callable[[Any], None],
+              on_error: Optional[Callable[[Exception], None]] = None):
+        def run(token: CancelToken):
+            return write(_ExportProgress(token, self._progress.emit))
+
+        def done(result):
+            self._finish()
+            on_success(result)
+
+        def failed(error: Exception):
+            self._finish()
+            if on_error:
+                on_error(error)
+            else:
+                QMessageBox.critical(self._parent, "导出失败", f"导出过程中发生错误：\n{str(error)}")
+
+        self._dialog.setValue(0)
+        self._loader.load(run, done, failed)
+
+    def cancel(self):
+        """取消导出：工作线程在下次报告进度时结束，不生成文件"""
+        self._loader.cancel()
+        self._finish()
+
+    def wait(self, timeout_ms: int = 60000) -> bool:
+        """处理事件直到导出结束（脚本中使用）"""
+        return self._loader.wait(timeout_ms)
+
+    def _finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        # 关闭进度对话框也会发出 canceled，先断开
+        self._dialog.canceled.disconnect(self.cancel)
+        self._dialog.reset()
+        self._dialog.hide()
+        self._dialog.deleteLater()
+        self.deleteLater()
+
+
+def run_excel_export(parent: QWidget, write: Callable[[Progress], Any], on_success: Callable[[Any], None],
+                     on_error: Optional[Callable[[Exception], None]] = None,
+                     label: str = "正在导出Excel，请稍候...") -> ExcelExportJob:
+    """
+    在后台执行导出
+
+    Args:
+        parent: 发起导出的界面（进度对话框与提示框的父窗口）
+        write: 导出函数 write(progress)，在工作线程执行，返回值传给 on_success
+        on_success: 界面线程中处理导出完成（如提示文件已保存）
+        on_error: 界面线程中处理导出失败（默认弹出“导出失败”提示）
+        label: 进度对话框文本
+    """
+    job = ExcelExportJob(parent, label)
+    job.start(write, on_success, on_error)
+    return job
@@ -1,19 +1,20 @@
 # app/ui/inventory_management.py
 # -*- coding: utf-8 -*-
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableView,
     QTableWidgetItem, QGroupBox, QLineEdit, QComboBox, QMessageBox,
     QTabWidget, QHeaderView, QAbstractItemView, QFileDialog, QDialog,
     QFormLayout, QDialogButtonBox, QTextEdit, QSpinBox, QSizePolicy,
     QProgressBar, QScrollArea, QInputDialog
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QItemSelectionModel
 from PySide6.QtGui import QFont, QColor
 
 from app.services.inventory_service import InventoryService
 from app.services.item_service import ItemService
 from app.services.warehouse_service import WarehouseService
 from app.services.inventory_import_service import InventoryImportService
+from app.ui.async_loader import AsyncLoader, LazyTableModel, TableColumn, TableWidgetPager
 
 # -------- 数量/单价/安全库存输入对话框 --------
 class QtyPriceDialog(QDialog):
@@ -185,6 +186,10 @@ class InventoryManagement(QWidget):
         
         # 添加成员变量保存原始数据，避免筛选时丢失数据
         self._original_daily_data = []
+        # 各页签的后台加载器（查询在线程池执行，筛选变化时取消上一次加载）
+        self.balance_loader = AsyncLoader(self)
+        self.daily_loader = AsyncLoader(self)
+        self.tx_loader = AsyncLoader(self)
         self._init_ui()
         self.reload_all()
 
@@ -276,6 +281,7 @@ class InventoryManagement(QWidget):
         self.tbl_balance.setFont(font)
         
         layout.addWidget(self.tbl_balance)
+        self.balance_pager = TableWidgetPager(self.tbl_balance, self._render_balance_row)
 
     def load_balance(self):
         # 获取当前选择的仓库和物料类型
@@ -314,184 +320,71 @@ class InventoryManagement(QWidget):
             cur_item_type = "全部"
 
         kw = self.ed_item_filter.text().strip()
+        item_type_map = {"原材料": "RM", "半成品": "SFG", "成品": "FG", "包装": "PKG"}
         
-                    # 获取库存余额记录
-        if cur_wh == "全部":
-            # 全部仓库：显示所有启用的物料
-            if kw:
-                # 如果有关键词，先搜索物料（模糊搜索：物料编码、物料名称、物料规格、商品品牌）
-                items = ItemService.search_items(kw)
-                if items:
-                    # 为每个搜索到的物料获取库存信息
-                    rows = []
-                    for item in items:
-                        # 过滤禁用状态的物料
-                        if item.get("IsActive", 1) != 1:
-                            continue
-                        
-                        # 物料类型筛选
-                        if cur_item_type != "全部":
-                            item_type_map = {"原材料": "RM", "半成品": "SFG", "成品": "FG", "包装": "PKG"}
-                            if item.get("ItemType") != item_type_map.get(cur_item_type):
-                                continue
-                        
-                        balances = InventoryService.get_inventory_balance(item_id=item["ItemId"])
-                        if balances:
-                            rows.extend(balances)
-                        else:
-                            # 没有库存记录，显示为0
-                            rows.append({
-                                "ItemId": item["ItemId"],
-                                "ItemCode": item["ItemCode"],
-                                "CnName": item.get("CnName", ""),
-                                "ItemSpec": item.get("ItemSpec", ""),
-                                "ItemType": item.get("ItemType", ""),
-                                "Unit": item.get("Unit", ""),
-                                "Warehouse": "",
-                                "Location": "",
-                                "QtyOnHand": 0,
-                                "SafetyStock": item.get("SafetyStock", 0)
-                            })
-                else:
-                    rows = []
-            else:
-                # 没有关键词，显示所有启用的物料
-                all_items = ItemService.get_all_items()
-                rows = []
-                for item in all_items:
-                    # 过滤禁用状态的物料
-                    if item.get("IsActive", 1) != 1:
-                        continue
-                    
-                    # 物料类型筛选
-                    if cur_item_type != "全部":
-                        item_type_map = {"原材料": "RM", "半成品": "SFG", "成品": "FG", "包装": "PKG"}
-                        if item.get("ItemType") != item_type_map.get(cur_item_type):
-                            continue
-                    
-                    balances = InventoryService.get_inventory_balance(item_id=item["ItemId"])
-                    if balances:
-                        rows.extend(balances)
-                    else:
-                        # 没有库存记录，显示为0
-                        rows.append({
-                            "ItemId": item["ItemId"],
-                            "ItemCode": item["ItemCode"],
-                            "CnName": item.get("CnName", ""),
-                            "ItemSpec": item.get("ItemSpec", ""),
-                            "ItemType": item.get("ItemType", ""),
-                            "Unit": item.get("Unit", ""),
-                            "Warehouse": "",
-                            "Location": "",
-                            "QtyOnHand": 0,
-                            "SafetyStock": item.get("SafetyStock", 0)
-                        })
-        else:
-            # 指定仓库：显示该仓库下的所有启用的物料
+        # 一次查询取回启用物料及其库存余额（已按 低于安全库存 → 有库存 → 库存为0 排序），与汇总一起在后台执行
+        warehouse = None if cur_wh == "全部" else cur_wh
+        item_type = item_type_map.get(cur_item_type)
+
+        def fetch(token):
             try:
-                rows = InventoryService.get_inventory_balance(warehouse=cur_wh)
+                rows = InventoryService.get_inventory_view(
+                    warehouse=warehouse,
+                    item_type=item_type,
+                    keyword=kw or None,
+                )
             except Exception as e:
                 print(f"获取仓库 {cur_wh} 的库存余额时出错: {e}")
                 rows = []  # 如果出错，显示空列表
-            
-            # 过滤禁用状态的物料
-            filtered_rows = []
-            for row in rows:
-                # 获取物料的详细信息，检查IsActive状态
-                item_info = ItemService.get_item_by_id(row["ItemId"])
-                if item_info and item_info.get("IsActive", 1) == 1:
-                    filtered_rows.append(row)
-            rows = filtered_rows
-            
-            # 物料类型筛选
-            if cur_item_type != "全部":
-                item_type_map = {"原材料": "RM", "半成品": "SFG", "成品": "FG", "包装": "PKG"}
-                filtered_rows = []
-                for row in rows:
-                    if row.get("ItemType") == item_type_map.get(cur_item_type):
-                        filtered_rows.append(row)
-                rows = filtered_rows
-            
-            # 如果指定了物料关键词，进一步筛选（模糊搜索：物料编码、物料名称、物料规格、商品品牌）
-            if kw:
-                filtered_rows = []
-                for row in rows:
-                    if (kw.lower() in row["ItemCode"].lower() or 
-                        kw.lower() in (row.get("CnName", "") or "").lower() or
-                        kw.lower() in (row.get("ItemSpec", "") or "").lower() or
-                        kw.lower() in (row.get("Brand", "") or "").lower()):
-                        filtered_rows.append(row)
-                rows = filtered_rows
-            
-            # 确保所有物料都显示正确的库存数量
-            for row in rows:
-                if row.get("QtyOnHand", 0) == 0:
-                    # 如果显示为0，从库存服务获取真实数量
-                    real_qty = InventoryService.get_onhand(row["ItemId"], cur_wh, row.get("Location"))
-                    row["QtyOnHand"] = real_qty
-        
-        # 对数据进行排序：低于安全库存的标红最上面，然后优先展示有库存的，最后是库存为0的
-        def sort_key(row):
-            qty = int(row.get("QtyOnHand") or 0)
-            safety_stock = int(row.get("SafetyStock") or 0)
-            
-            # 第一优先级：低于安全库存的（标红最上面）
-            if safety_stock > 0 and qty < safety_stock:
-                return (0, row["ItemCode"])  # 最低值，排在最前面
-            
-            # 第二优先级：有库存的（qty > 0）
-            elif qty > 0:
-                return (1, row["ItemCode"])
-            
-            # 第三优先级：库存为0的
-            else:
-                return (2, row["ItemCode"])
-        
-        # 按排序键排序
-        rows.sort(key=sort_key)
-        
-        self.tbl_balance.setRowCount(len(rows))
-        for r, it in enumerate(rows):
-            # 先创建所有表格项
-            self.tbl_balance.setItem(r, 0, QTableWidgetItem(it["ItemCode"]))
-            self.tbl_balance.setItem(r, 1, QTableWidgetItem(it["CnName"]))
-            self.tbl_balance.setItem(r, 2, QTableWidgetItem(it.get("ItemSpec", "") or ""))
-            self.tbl_balance.setItem(r, 3, QTableWidgetItem(it["ItemType"]))
-            self.tbl_balance.setItem(r, 4, QTableWidgetItem(it.get("Unit","") or ""))
-            self.tbl_balance.setItem(r, 5, QTableWidgetItem(it.get("Location","") or ""))
-            qty = int(it.get("QtyOnHand") or 0)
-            cell_qty = QTableWidgetItem(str(qty))
-            self.tbl_balance.setItem(r, 6, cell_qty)
-            ss = int(it.get("SafetyStock") or 0)
-            cell_ss = QTableWidgetItem(str(ss))
-            self.tbl_balance.setItem(r, 7, cell_ss)
-            
-            # 检查是否低于安全库存
-            if ss > 0 and qty < ss:
-                # 低于安全库存：整行背景标红
-                for col in range(8):  # 8列（不包括操作列）
-                    item = self.tbl_balance.item(r, col)
-                    if item:
-                        item.setBackground(QColor(255, 200, 200))  # 浅红色背景
-                        if col == 6:  # 在手数量列
-                            item.setForeground(QColor(220, 20, 60))     # 红色文字
-                        elif col == 7:  # 安全库存列
-                            item.setForeground(QColor(220, 20, 60))     # 红色文字
-            else:
-                # 正常库存：绿色背景（仅在手数量列）
-                if qty > 0: 
-                    cell_qty.setBackground(QColor(198, 224, 180))
-            
-            # 操作列：安全库存设置按钮
-            btn_safety = QPushButton("设置安全库存")
-            btn_safety.clicked.connect(lambda checked, row_data=it: self.edit_safety_stock(row_data))
-            self.tbl_balance.setCellWidget(r, 8, btn_safety)
+            token.check()
+            return rows, InventoryService.get_inventory_summary()
 
-        sm = InventoryService.get_inventory_summary()
+        self.balance_loader.load(fetch, self._show_balance)
+
+    def _show_balance(self, result):
+        rows, sm = result
+        self.balance_pager.set_rows(rows)
         self.lbl_total_items.setText(str(sm["total_items"]))
         self.lbl_instock_items.setText(str(sm["items_with_stock"]))
         self.lbl_low_stock.setText(str(sm["low_stock"]))
 
+    def _render_balance_row(self, r, it):
+        """渲染库存余额表格的一行"""
+        # 先创建所有表格项
+        self.tbl_balance.setItem(r, 0, QTableWidgetItem(it["ItemCode"]))
+        self.tbl_balance.setItem(r, 1, QTableWidgetItem(it["CnName"]))
+        self.tbl_balance.setItem(r, 2, QTableWidgetItem(it.get("ItemSpec", "") or ""))
+        self.tbl_balance.setItem(r, 3, QTableWidgetItem(it["ItemType"]))
+        self.tbl_balance.setItem(r, 4, QTableWidgetItem(it.get("Unit","") or ""))
+        self.tbl_balance.setItem(r, 5, QTableWidgetItem(it.get("Location","") or ""))
+        qty = int(it.get("QtyOnHand") or 0)
+        cell_qty = QTableWidgetItem(str(qty))
+        self.tbl_balance.setItem(r, 6, cell_qty)
+        ss = int(it.get("SafetyStock") or 0)
+        cell_ss = QTableWidgetItem(str(ss))
+        self.tbl_balance.setItem(r, 7, cell_ss)
+
+        # 检查是否低于安全库存
+        if ss > 0 and qty < ss:
+            # 低于安全库存：整行背景标红
+            for col in range(8):  # 8列（不包括操作列）
+                item = self.tbl_balance.item(r, col)
+                if item:
+                    item.setBackground(QColor(255, 200, 200))  # 浅红色背景
+                    if col == 6:  # 在手数量列
+                        item.setForeground(QColor(220, 20, 60))     # 红色文字
+                    elif col == 7:  # 安全库存列
+                        item.setForeground(QColor(220, 20, 60))     # 红色文字
+        else:
+            # 正常库存：绿色背景（仅在手数量列）
+            if qty > 0: 
+                cell_qty.setBackground(QColor(198, 224, 180))
+
+        # 操作列：安全库存设置按钮
+        btn_safety = QPushButton("设置安全库存")
+        btn_safety.clicked.connect(lambda checked, row_data=it: self.edit_safety_stock(row_data))
+        self.tbl_balance.setCellWidget(r, 8, btn_safety)
+
     # ---------- 日常登记（选择仓库→展示列表→行内操作） ----------
     def _build_tab_daily(self, w: QWidget):
         layout = QVBoxLayout(w)
@@ -575,6 +468,7 @@ class InventoryManagement(QWidget):
         self.tbl_daily.setFont(font)
         
         layout.addWidget(self.tbl_daily)
+        self.daily_pager = TableWidgetPager(self.tbl_daily, self._render_daily_row)
 
     def daily_load_list(self):
         # 获取当前选择的仓库
@@ -596,54 +490,42 @@ class InventoryManagement(QWidget):
             self.cb_daily_wh.setCurrentText("全部")
             wh = "全部"
         
-        # 根据选择的仓库获取物料列表
-        if wh == "全部":
-            # 全部仓库：显示所有启用的物料
-            all_items = ItemService.get_all_items()
-            warehouse_items = [item for item in all_items if item.get("IsActive", 1) == 1]
-        else:
-            # 特定仓库：获取该仓库中确实存在的启用的物料列表
-            warehouse_items_raw = WarehouseService.list_items_by_warehouse_name(wh)
-            warehouse_items = [item for item in warehouse_items_raw if item.get("IsActive", 1) == 1]
-        
-        # 为每个物料获取库存信息
-        display_rows = []
-        for item in warehouse_items:
+        # 物料列表与逐物料的库存查询在后台执行
+        def fetch(token):
+            # 根据选择的仓库获取物料列表
             if wh == "全部":
-                # 全部仓库：汇总所有仓库的库存信息
-                all_warehouses = InventoryService.get_warehouses() or []
-                total_qty = 0
-                has_stock_in_any_warehouse = False
-                
-                # 计算所有仓库的总库存
-                for warehouse in all_warehouses:
-                    balance_info = InventoryService.get_inventory_balance(item_id=item["ItemId"], warehouse=warehouse)
-                    if balance_info:
-                        has_stock_in_any_warehouse = True
-                        for balance in balance_info:
-                            total_qty += balance.get("QtyOnHand", 0)
-                    else:
-                        real_qty = InventoryService.get_onhand(item["ItemId"], warehouse, None)
-                        if real_qty > 0:
+                # 全部仓库：显示所有启用的物料
+                all_items = ItemService.get_all_items()
+                warehouse_items = [item for item in all_items if item.get("IsActive", 1) == 1]
+            else:
+                # 特定仓库：获取该仓库中确实存在的启用的物料列表
+                warehouse_items_raw = WarehouseService.list_items_by_warehouse_name(wh)
+                warehouse_items = [item for item in warehouse_items_raw if item.get("IsActive", 1) == 1]
+
+            # 为每个物料获取库存信息
+            display_rows = []
+            for item in warehouse_items:
+                token.check()
+                if wh == "全部":
+                    # 全部仓库：汇总所有仓库的库存信息
+                    all_warehouses = InventoryService.get_warehouses() or []
+                    total_qty = 0
+                    has_stock_in_any_warehouse = False
+
+                    # 计算所有仓库的总库存
+                    for warehouse in all_warehouses:
+                        balance_info = InventoryService.get_inventory_balance(item_id=item["ItemId"], warehouse=warehouse)
+                        if balance_info:
                             has_stock_in_any_warehouse = True
-                        total_qty += real_qty
-                
-                # 显示汇总后的记录
-                display_rows.append({
-                    "ItemId": item["ItemId"],
-                    "ItemCode": item["ItemCode"],
-                    "CnName": item.get("CnName", ""),
-                    "ItemSpec": item.get("ItemSpec", ""),
-                    "ItemType": item.get("ItemType", ""),
-                    "Unit": item.get("Unit", ""),
-                    "Warehouse": "全部",  # 标记为全部仓库
-                    "Location": "",
-                    "QtyOnHand": total_qty,
-                    "SafetyStock": item.get("SafetyStock", 0)
-                })
-                
-                # 如果物料在所有仓库中都没有库存，也要显示一条记录
-                if not has_stock_in_any_warehouse and not all_warehouses:
+                            for balance in balance_info:
+                                total_qty += balance.get("QtyOnHand", 0)
+                        else:
+                            real_qty = InventoryService.get_onhand(item["ItemId"], warehouse, None)
+                            if real_qty > 0:
+                                has_stock_in_any_warehouse = True
+                            total_qty += real_qty
+
+                    # 显示汇总后的记录
                     display_rows.append({
                         "ItemId": item["ItemId"],
                         "ItemCode": item["ItemCode"],
@@ -651,18 +533,14 @@ class InventoryManagement(QWidget):
                         "ItemSpec": item.get("ItemSpec", ""),
                         "ItemType": item.get("ItemType", ""),
                         "Unit": item.get("Unit", ""),
-                        "Warehouse": "",
+                        "Warehouse": "全部",  # 标记为全部仓库
                         "Location": "",
-                        "QtyOnHand": 0,
+                        "QtyOnHand": total_qty,
                         "SafetyStock": item.get("SafetyStock", 0)
                     })
-            else:
-                # 特定仓库：获取该仓库的库存信息
-                balance_info = InventoryService.get_inventory_balance(item_id=item["ItemId"], warehouse=wh)
-                
-                if balance_info:
-                    # 有库存余额记录
-                    for balance in balance_info:
+
+                    # 如果物料在所有仓库中都没有库存，也要显示一条记录
+                    if not has_stock_in_any_warehouse and not all_warehouses:
                         display_rows.append({
                             "ItemId": item["ItemId"],
                             "ItemCode": item["ItemCode"],
@@ -670,27 +548,51 @@ class InventoryManagement(QWidget):
                             "ItemSpec": item.get("ItemSpec", ""),
                             "ItemType": item.get("ItemType", ""),
                             "Unit": item.get("Unit", ""),
-                            "Warehouse": wh,
-                            "Location": balance.get("Location", ""),
-                            "QtyOnHand": balance.get("QtyOnHand", 0),
+                            "Warehouse": "",
+                            "Location": "",
+                            "QtyOnHand": 0,
                             "SafetyStock": item.get("SafetyStock", 0)
                         })
                 else:
-                    # 没有库存余额记录，从库存服务获取真实数量
-                    real_qty = InventoryService.get_onhand(item["ItemId"], wh, None)
-                    display_rows.append({
-                        "ItemId": item["ItemId"],
-                        "ItemCode": item["ItemCode"],
-                        "CnName": item.get("CnName", ""),
-                        "ItemSpec": item.get("ItemSpec", ""),
-                        "ItemType": item.get("ItemType", ""),
-                        "Unit": item.get("Unit", ""),
-                        "Warehouse": wh,
-                        "Location": "",
-                        "QtyOnHand": real_qty,
-                        "SafetyStock": item.get("SafetyStock", 0)
-                    })
-        
+                    # 特定仓库：获取该仓库的库存信息
+                    balance_info = InventoryService.get_inventory_balance(item_id=item["ItemId"], warehouse=wh)
+
+                    if balance_info:
+                        # 有库存余额记录
+                        for balance in balance_info:
+                            display_rows.append({
+                                "ItemId": item["ItemId"],
+                                "ItemCode": item["ItemCode"],
+                                "CnName": item.get("CnName", ""),
+                                "ItemSpec": item.get("ItemSpec", ""),
+                                "ItemType": item.get("ItemType", ""),
+                                "Unit": item.get("Unit", ""),
+                                "Warehouse": wh,
+                                "Location": balance.get("Location", ""),
+                                "QtyOnHand": balance.get("QtyOnHand", 0),
+                                "SafetyStock": item.get("SafetyStock", 0)
+                            })
+                    else:
+                        # 没有库存余额记录，从库存服务获取真实数量
+                        real_qty = InventoryService.get_onhand(item["ItemId"], wh, None)
+                        display_rows.append({
+                            "ItemId": item["ItemId"],
+                            "ItemCode": item["ItemCode"],
+                            "CnName": item.get("CnName", ""),
+                            "ItemSpec": item.get("ItemSpec", ""),
+                            "ItemType": item.get("ItemType", ""),
+                            "Unit": item.get("Unit", ""),
+                            "Warehouse": wh,
+                            "Location": "",
+                            "QtyOnHand": real_qty,
+                            "SafetyStock": item.get("SafetyStock", 0)
+                        })
+
+            return display_rows
+
+        self.daily_loader.load(fetch, self._show_daily_list)
+
+    def _show_daily_list(self, display_rows):
         # 保存原始数据用于筛选
         self._original_daily_data = display_rows.copy()
         
@@ -1032,14 +934,6 @@ class InventoryManagement(QWidget):
         self.tbl_daily.setColumnCount(8)
         self.tbl_daily.setHorizontalHeaderLabels(["物料编码","物料名称","物料规格","在手","单位","库位","安全库存","操作"])
         
-        # 完全重置表格，避免任何残留内容影响显示
-        self.tbl_daily.clearContents()
-        # 确保表格完全清空，但不清除列标题
-        for row in range(self.tbl_daily.rowCount()):
-            for col in range(self.tbl_daily.columnCount()):
-                self.tbl_daily.takeItem(row, col)
-                self.tbl_daily.removeCellWidget(row, col)
-        
         # 重新设置列宽模式
         header = self.tbl_daily.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)  # 物料编码
@@ -1072,54 +966,57 @@ class InventoryManagement(QWidget):
         # 按排序键排序
         rows.sort(key=sort_key)
         
-        self.tbl_daily.setRowCount(len(rows))
-        for r, row_data in enumerate(rows):
-            # 重新创建表格项，并保存ItemId和ItemType数据
-            item_code_cell = QTableWidgetItem(row_data["ItemCode"])
-            item_code_cell.setData(Qt.UserRole, row_data["ItemId"])  # 存储ItemId
-            item_code_cell.setData(Qt.UserRole + 1, row_data["ItemType"])  # 存储ItemType
-            self.tbl_daily.setItem(r, 0, item_code_cell)
-            
-            self.tbl_daily.setItem(r, 1, QTableWidgetItem(row_data["CnName"]))
-            self.tbl_daily.setItem(r, 2, QTableWidgetItem(row_data.get("ItemSpec", "")))
-            qty = int(row_data["QtyOnHand"] or 0)
-            qty_cell = QTableWidgetItem(str(qty))
-            self.tbl_daily.setItem(r, 3, qty_cell)
-            
-            self.tbl_daily.setItem(r, 4, QTableWidgetItem(row_data["Unit"]))
-            
-            # 统一不显示仓库列
-            self.tbl_daily.setItem(r, 5, QTableWidgetItem(row_data["Location"]))
-            ss = int(row_data["SafetyStock"] or 0)
-            ss_cell = QTableWidgetItem(str(ss))
-            self.tbl_daily.setItem(r, 6, ss_cell)
-            operation_col = 7
-            
-            # 检查是否低于安全库存
-            if ss > 0 and qty < ss:
-                # 低于安全库存：整行背景标红
-                for col in range(operation_col):  # 不包括操作列
-                    item = self.tbl_daily.item(r, col)
-                    if item:
-                        item.setBackground(QColor(255, 200, 200))  # 浅红色背景
-                        if col == 3:  # 在手数量列
-                            item.setForeground(QColor(220, 20, 60))     # 红色文字
-                        elif col == 6:  # 安全库存列
-                            item.setForeground(QColor(220, 20, 60))     # 红色文字
-            else:
-                # 正常库存：绿色背景（仅在手数量列）
-                if qty > 0: 
-                    qty_cell.setBackground(QColor(198, 224, 180))
-            
-            # 重新创建操作按钮
-            w = QWidget(); h = QHBoxLayout(w); h.setContentsMargins(0,0,0,0)
-            b_in = QPushButton("入库"); b_out = QPushButton("出库"); b_edit = QPushButton("编辑"); b_delete = QPushButton("删除")
-            b_in.clicked.connect(lambda _, rec=row_data: self.row_in(rec))
-            b_out.clicked.connect(lambda _, rec=row_data: self.row_out(rec))
-            b_edit.clicked.connect(lambda _, rec=row_data: self.row_edit(rec))
-            b_delete.clicked.connect(lambda _, rec=row_data: self.row_delete(rec))
-            h.addWidget(b_in); h.addWidget(b_out); h.addWidget(b_edit); h.addWidget(b_delete)
-            self.tbl_daily.setCellWidget(r, operation_col, w)
+        # 分页渲染（先显示第一页，滚动时追加）
+        self.daily_pager.set_rows(rows)
+
+    def _render_daily_row(self, r, row_data):
+        """渲染日常登记表格的一行"""
+        # 重新创建表格项，并保存ItemId和ItemType数据
+        item_code_cell = QTableWidgetItem(row_data["ItemCode"])
+        item_code_cell.setData(Qt.UserRole, row_data["ItemId"])  # 存储ItemId
+        item_code_cell.setData(Qt.UserRole + 1, row_data["ItemType"])  # 存储ItemType
+        self.tbl_daily.setItem(r, 0, item_code_cell)
+
+        self.tbl_daily.setItem(r, 1, QTableWidgetItem(row_data["CnName"]))
+        self.tbl_daily.setItem(r, 2, QTableWidgetItem(row_data.get("ItemSpec", "")))
+        qty = int(row_data["QtyOnHand"] or 0)
+        qty_cell = QTableWidgetItem(str(qty))
+        self.tbl_daily.setItem(r, 3, qty_cell)
+
+        self.tbl_daily.setItem(r, 4, QTableWidgetItem(row_data["Unit"]))
+
+        # 统一不显示仓库列
+        self.tbl_daily.setItem(r, 5, QTableWidgetItem(row_data["Location"]))
+        ss = int(row_data["SafetyStock"] or 0)
+        ss_cell = QTableWidgetItem(str(ss))
+        self.tbl_daily.setItem(r, 6, ss_cell)
+        operation_col = 7
+
+        # 检查是否低于安全库存
+        if ss > 0 and qty < ss:
+            # 低于安全库存：整行背景标红
+            for col in range(operation_col):  # 不包括操作列
+                item = self.tbl_daily.item(r, col)
+                if item:
+                    item.setBackground(QColor(255, 200, 200))  # 浅红色背景
+                    if col == 3:  # 在手数量列
+                        item.setForeground(QColor(220, 20, 60))     # 红色文字
+                    elif col == 6:  # 安全库存列
+                        item.setForeground(QColor(220, 20, 60))     # 红色文字
+        else:
+            # 正常库存：绿色背景（仅在手数量列）
+            if qty > 0: 
+                qty_cell.setBackground(QColor(198, 224, 180))
+
+        # 重新创建操作按钮
+        w = QWidget(); h = QHBoxLayout(w); h.setContentsMargins(0,0,0,0)
+        b_in = QPushButton("入库"); b_out = QPushButton("出库"); b_edit = QPushButton("编辑"); b_delete = QPushButton("删除")
+        b_in.clicked.connect(lambda _, rec=row_data: self.row_in(rec))
+        b_out.clicked.connect(lambda _, rec=row_data: self.row_out(rec))
+        b_edit.clicked.connect(lambda _, rec=row_data: self.row_edit(rec))
+        b_delete.clicked.connect(lambda _, rec=row_data: self.row_delete(rec))
+        h.addWidget(b_in); h.addWidget(b_out); h.addWidget(b_edit); h.addWidget(b_delete)
+        self.tbl_daily.setCellWidget(r, operation_col, w)
 
     def daily_clear_filters(self):
         """清除所有筛选条件"""
@@ -1156,8 +1053,20 @@ class InventoryManagement(QWidget):
         btn_layout.addStretch()
         layout.addWidget(btn_group)
 
-        self.tbl_tx = QTableWidget(0, 9)
-        self.tbl_tx.setHorizontalHeaderLabels(["日期","类型","仓库","库位","物料编码","物料名称","数量","单价","备注"])
+        # 流水行数多且无行内控件：使用分页模型，视图滚动时按页取行
+        self.tx_model = LazyTableModel([
+            TableColumn("日期", "TxDate"),
+            TableColumn("类型", "TxType"),
+            TableColumn("仓库", "Warehouse"),
+            TableColumn("库位", "Location"),
+            TableColumn("物料编码", "ItemCode"),
+            TableColumn("物料名称", "CnName"),
+            TableColumn("数量", lambda t: t.get("Qty") or 0),
+            TableColumn("单价", "UnitCost"),
+            TableColumn("备注", "Remark"),
+        ], parent=self)
+        self.tbl_tx = QTableView()
+        self.tbl_tx.setModel(self.tx_model)
         # 优化选择性能，避免exe中的延迟问题
         self.tbl_tx.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.tbl_tx.setSelectionMode(QAbstractItemView.SingleSelection)
@@ -1166,7 +1075,7 @@ class InventoryManagement(QWidget):
         self.tbl_tx.setSortingEnabled(False)
         self.tbl_tx.setDragDropMode(QAbstractItemView.NoDragDrop)
         # 强制立即更新选择状态
-        self.tbl_tx.itemSelectionChanged.connect(self._force_selection_update)
+        self.tbl_tx.selectionModel().selectionChanged.connect(self._force_selection_update)
         header = self.tbl_tx.horizontalHeader()
         for c in [0,1,2,3,4,6,7,8]:
             header.setSectionResizeMode(c, QHeaderView.ResizeToContents)
@@ -1201,6 +1110,12 @@ class InventoryManagement(QWidget):
         kw = self.ed_tx_kw.text().strip()
         wh = None if self.cb_tx_wh.currentText()=="全部" else self.cb_tx_wh.currentText()
         
+        # 查询在后台执行，结果交给分页模型
+        self.tx_loader.load(lambda token: self._fetch_transactions(kw, wh), self.tx_model.set_rows)
+    
+    @staticmethod
+    def _fetch_transactions(kw, wh):
+        """按关键词和仓库查询启用物料的库存流水（在加载线程执行）"""
         # 获取交易记录
         if kw:
             # 如果有关键词，先搜索物料（模糊搜索：物料编码、物料名称、物料规格、商品品牌）
@@ -1228,18 +1143,7 @@ class InventoryManagement(QWidget):
         
         # 按日期倒序排列（最新的在前面）
         rows.sort(key=lambda x: x.get("TxDate", ""), reverse=True)
-        
-        self.tbl_tx.setRowCount(len(rows))
-        for r, t in enumerate(rows):
-            self.tbl_tx.setItem(r, 0, QTableWidgetItem(t.get("TxDate","")))
-            self.tbl_tx.setItem(r, 1, QTableWidgetItem(t.get("TxType","")))
-            self.tbl_tx.setItem(r, 2, QTableWidgetItem(t.get("Warehouse","") or ""))
-            self.tbl_tx.setItem(r, 3, QTableWidgetItem(t.get("Location","") or ""))
-            self.tbl_tx.setItem(r, 4, QTableWidgetItem(t.get("ItemCode","")))
-            self.tbl_tx.setItem(r, 5, QTableWidgetItem(t.get("CnName","") or ""))
-            self.tbl_tx.setItem(r, 6, QTableWidgetItem(str(t.get("Qty") or 0)))
-            self.tbl_tx.setItem(r, 7, QTableWidgetItem("" if t.get("UnitCost") is None else str(t.get("UnitCost"))))
-            self.tbl_tx.setItem(r, 8, QTableWidgetItem(t.get("Remark","") or ""))
+        return rows
     
     def export_transactions(self):
         """导出库存流水"""
@@ -1252,21 +1156,22 @@ class InventoryManagement(QWidget):
             from app.services.inventory_import_service import InventoryImportService
             
             rows = []
-            for r in range(self.tbl_tx.rowCount()):
+            # 导出全部结果行（含尚未滚动到的分页）
+            for t in self.tx_model.rows():
+                cells = self.tx_model.row_texts(t)
                 # 获取物料类型并转换为中文显示名称
-                item_type = self.tbl_tx.item(r, 1).text()
-                item_type_display = InventoryImportService.get_item_type_display_name(item_type)
+                item_type_display = InventoryImportService.get_item_type_display_name(cells[1])
                 
                 rows.append([
-                    self.tbl_tx.item(r, 0).text(),  # 日期
+                    cells[0],  # 日期
                     item_type_display,  # 类型（中文名称）
-                    self.tbl_tx.item(r, 2).text(),  # 仓库
-                    self.tbl_tx.item(r, 3).text(),  # 库位
-                    self.tbl_tx.item(r, 4).text(),  # 物料编码
-                    self.tbl_tx.item(r, 5).text(),  # 物料名称
-                    self.tbl_tx.item(r, 6).text(),  # 数量
-                    self.tbl_tx.item(r, 7).text(),  # 单价
-                    self.tbl_tx.item(r, 8).text(),  # 备注
+                    cells[2],  # 仓库
+                    cells[3],  # 库位
+                    cells[4],  # 物料编码
+                    cells[5],  # 物料名称
+                    cells[6],  # 数量
+                    cells[7],  # 单价
+                    cells[8],  # 备注
                 ])
             
             with open(path, "w", newline="", encoding="utf-8-sig") as f:
@@ -1312,6 +1217,9 @@ class InventoryManagement(QWidget):
     def _force_selection_update(self):
         """强制更新选择状态，解决exe中的延迟问题"""
         sender = self.sender()
+        # 表格视图的选择信号来自其选择模型（父对象为视图）
+        if isinstance(sender, QItemSelectionModel):
+            sender = sender.parent()
         if sender:
             # 强制重绘表格
             sender.viewport().update()
@@ -1404,7 +1312,7 @@ class InventoryManagement(QWidget):
         if not path: return
         
         # 检查是否有数据可导出
-        if self.tbl_balance.rowCount() == 0:
+        if not self.balance_pager.rows:
             QMessageBox.warning(self, "无数据", "当前没有库存数据可导出")
             return
             
@@ -1413,15 +1321,18 @@ class InventoryManagement(QWidget):
         
         rows = []
         try:
-            for r in range(self.tbl_balance.rowCount()):
-                # 检查每一行的数据完整性
-                row_data = []
-                for c in range(8):  # 8列数据
-                    item = self.tbl_balance.item(r, c)
-                    if item is None:
-                        row_data.append("")
-                    else:
-                        row_data.append(item.text())
+            # 导出全部结果行（含尚未滚动到的分页），取值与表格显示一致
+            for it in self.balance_pager.rows:
+                row_data = [
+                    it["ItemCode"] or "",
+                    it["CnName"] or "",
+                    it.get("ItemSpec", "") or "",
+                    it["ItemType"] or "",
+                    it.get("Unit", "") or "",
+                    it.get("Location", "") or "",
+                    str(int(it.get("QtyOnHand") or 0)),
+                    str(int(it.get("SafetyStock") or 0)),
+                ]
                 
                 # 获取物料类型并转换为中文显示名称
                 item_type = row_data[3]
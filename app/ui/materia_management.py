@@ -15,6 +15,7 @@ from app.services.item_service import ItemService
 from app.services.bom_service import BomService
 from app.services.item_import_service import ItemImportService
 from app.utils.resource_path import get_resource_path
+from app.ui.async_loader import AsyncLoader, TableWidgetPager
 import os
 import sys
 import shutil
@@ -1072,6 +1073,10 @@ class ItemEditor(QWidget):
         # 启用排序功能
         self.items_table.setSortingEnabled(True)
         
+        # 后台加载，表格分页渲染
+        self.items_loader = AsyncLoader(self)
+        self.items_pager = TableWidgetPager(self.items_table, self._render_item_row)
+        
         # 设置表格样式
         self.items_table.setStyleSheet("""
             QTableWidget {
@@ -1200,92 +1205,68 @@ class ItemEditor(QWidget):
             except Exception as e2:
                 print(f"设置表头列宽失败: {e2}")
     
+    def _load_items_async(self, fetch, error_text, on_loaded=None):
+        """
+        后台执行 fetch() 查询物料，结果回到界面线程后分页填充表格
+        筛选条件快速变化时，未完成的上一次查询被取消，只显示最后一次的结果
+        """
+        def show(items):
+            self.populate_items_table(items)
+            if on_loaded:
+                on_loaded(items)
+        
+        self.items_loader.load(
+            lambda token: fetch(), show,
+            lambda e: QMessageBox.critical(self, "错误", f"{error_text}: {str(e)}"))
+    
+    @staticmethod
+    def _filter_items_by(items, selected_type, selected_status):
+        """按物料类型和启用状态筛选"""
+        if selected_type:
+            items = [item for item in items if item['ItemType'] == selected_type]
+        if selected_status:
+            items = [item for item in items if item['IsActive'] == int(selected_status)]
+        return items
+    
     def load_items(self):
         """加载物料列表"""
-        try:
-            items = ItemService.get_all_items_with_status()
-            self.populate_items_table(items)
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"加载物料列表失败: {str(e)}")
+        self._load_items_async(ItemService.get_all_items_with_status, "加载物料列表失败")
     
     def filter_by_type(self):
         """根据物料类型筛选"""
-        try:
-            # 获取当前选中的物料类型和状态
-            selected_type = self.type_filter_combo.currentData()
-            selected_status = self.status_filter_combo.currentData()
-            
-            # 获取所有物料（包括启用和禁用状态）
-            all_items = ItemService.get_all_items_with_status()
-            
-            # 根据类型和状态筛选
-            filtered_items = all_items
-            if selected_type:
-                filtered_items = [item for item in filtered_items if item['ItemType'] == selected_type]
-            if selected_status:
-                filtered_items = [item for item in filtered_items if item['IsActive'] == int(selected_status)]
-            
-            # 重新填充表格
-            self.populate_items_table(filtered_items)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"筛选物料失败: {str(e)}")
+        # 获取当前选中的物料类型和状态（界面线程读取，查询与筛选在后台执行）
+        selected_type = self.type_filter_combo.currentData()
+        selected_status = self.status_filter_combo.currentData()
+        
+        def fetch():
+            # 获取所有物料（包括启用和禁用状态），根据类型和状态筛选
+            return self._filter_items_by(ItemService.get_all_items_with_status(), selected_type, selected_status)
+        
+        self._load_items_async(fetch, "筛选物料失败")
 
     def filter_by_status(self):
         """根据启用状态筛选"""
-        try:
-            # 获取当前选中的物料类型和状态
-            selected_type = self.type_filter_combo.currentData()
-            selected_status = self.status_filter_combo.currentData()
-            
-            # 获取所有物料（包括启用和禁用状态）
-            all_items = ItemService.get_all_items_with_status()
-            
-            # 根据类型和状态筛选
-            filtered_items = all_items
-            if selected_type:
-                filtered_items = [item for item in filtered_items if item['ItemType'] == selected_type]
-            if selected_status:
-                filtered_items = [item for item in filtered_items if item['IsActive'] == int(selected_status)]
-            
-            # 重新填充表格
-            self.populate_items_table(filtered_items)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"筛选物料失败: {str(e)}")
+        self.filter_by_type()
     
     def search_items(self):
-        """搜索物料"""
-        try:
-            search_text = self.search_edit.text().strip()
-            selected_type = self.type_filter_combo.currentData()
-            selected_status = self.status_filter_combo.currentData()
-            
+        """搜索物料（界面线程读取条件，查询与筛选在后台执行，与加载/筛选共用取消与分页）"""
+        search_text = self.search_edit.text().strip()
+        selected_type = self.type_filter_combo.currentData()
+        selected_status = self.status_filter_combo.currentData()
+        
+        def fetch():
             if search_text:
                 # 多字段搜索
                 items = self.search_items_by_multiple_fields(search_text)
-                
-                # 如果同时有类型筛选，进一步筛选
-                if selected_type:
-                    items = [item for item in items if item['ItemType'] == selected_type]
-                if selected_status:
-                    items = [item for item in items if item['IsActive'] == int(selected_status)]
             else:
                 # 没有搜索文本，按类型和状态筛选
-                all_items = ItemService.get_all_items_with_status()
-                items = all_items
-                if selected_type:
-                    items = [item for item in items if item['ItemType'] == selected_type]
-                if selected_status:
-                    items = [item for item in items if item['IsActive'] == int(selected_status)]
-            
-            self.populate_items_table(items)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"搜索物料失败: {str(e)}")
+                items = ItemService.get_all_items_with_status()
+            return self._filter_items_by(items, selected_type, selected_status)
+        
+        self._load_items_async(fetch, "搜索物料失败")
     
     def search_items_by_multiple_fields(self, search_text):
-        """多字段模糊搜索物料"""
+        """多字段模糊搜索物料（在后台线程执行，不访问界面控件）"""
         try:
             # 获取所有物料（包括启用和禁用状态）
             all_items = ItemService.get_all_items_with_status()
@@ -1645,150 +1626,8 @@ class ItemEditor(QWidget):
         return status_widget
 
     def populate_items_table(self, items):
-        """填充物料表格"""
-        self.items_table.setRowCount(len(items))
-        
-        for row, item in enumerate(items):
-            # 选择复选框
-            checkbox = QCheckBox()
-            # 设置复选框样式，确保在不同系统上都能正确显示
-            checkbox.setStyleSheet("""
-                QCheckBox {
-                    spacing: 8px;
-                    font-size: 14px;
-                }
-                QCheckBox::indicator {
-                    width: 18px;
-                    height: 18px;
-                    border: 2px solid #d9d9d9;
-                    border-radius: 3px;
-                    background-color: white;
-                }
-                QCheckBox::indicator:checked {
-                    background-color: #1890ff;
-                    border-color: #1890ff;
-                }
-                QCheckBox::indicator:hover {
-                    border-color: #1890ff;
-                }
-                QCheckBox::indicator:checked:hover {
-                    background-color: #40a9ff;
-                    border-color: #40a9ff;
-                }
-            """)
-            # 强制设置复选框的文本为空，避免显示默认文本
-            checkbox.setText("")
-            # 强制更新样式
-            checkbox.update()
-            # 将行号和物料ID存储在复选框的属性中
-            checkbox.setProperty("row", row)
-            checkbox.setProperty("item_id", item['ItemId'])
-            # 连接事件到统一处理方法
-            checkbox.stateChanged.connect(self.on_checkbox_state_changed)
-            print(f"创建第 {row} 行复选框，物料ID: {item['ItemId']}")  # 调试信息
-            
-            checkbox_widget = QWidget()
-            checkbox_layout = QHBoxLayout(checkbox_widget)
-            checkbox_layout.addWidget(checkbox)
-            checkbox_layout.setAlignment(Qt.AlignCenter)
-            checkbox_layout.setContentsMargins(0, 0, 0, 0)
-            self.items_table.setCellWidget(row, 0, checkbox_widget)
-            
-            # 编码
-            code_item = QTableWidgetItem(item['ItemCode'])
-            code_item.setData(Qt.UserRole, item['ItemCode'])  # 用于排序
-            self.items_table.setItem(row, 1, code_item)
-            
-            # 名称
-            name_item = QTableWidgetItem(item['CnName'])
-            name_item.setData(Qt.UserRole, item['CnName'])  # 用于排序
-            self.items_table.setItem(row, 2, name_item)
-            
-            # 规格
-            spec_item = QTableWidgetItem(item['ItemSpec'] if item['ItemSpec'] else "")
-            spec_item.setData(Qt.UserRole, item['ItemSpec'] if item['ItemSpec'] else "")  # 用于排序
-            self.items_table.setItem(row, 3, spec_item)
-            
-            # 类型
-            type_item = QTableWidgetItem(item['ItemType'])
-            type_item.setData(Qt.UserRole, item['ItemType'])  # 用于排序
-            self.items_table.setItem(row, 4, type_item)
-            
-            # 单位
-            unit_item = QTableWidgetItem(item['Unit'])
-            unit_item.setData(Qt.UserRole, item['Unit'])  # 用于排序
-            self.items_table.setItem(row, 5, unit_item)
-            
-                    # 启用状态 - 使用简单的文本显示
-            is_active = item.get('IsActive', 1)
-            status_text = "启用" if is_active else "禁用"
-            status_item = QTableWidgetItem(status_text)
-            status_item.setData(Qt.UserRole, is_active)  # 用于排序
-            
-            # 设置状态颜色和样式
-            if is_active:
-                status_item.setBackground(QColor(240, 248, 255))  # 浅蓝色背景
-                status_item.setForeground(QColor(0, 128, 0))     # 绿色文字
-            else:
-                status_item.setBackground(QColor(255, 240, 240))  # 浅红色背景
-                status_item.setForeground(QColor(128, 0, 0))     # 红色文字
-            
-            self.items_table.setItem(row, 6, status_item)
-            
-            # 安全库存
-            stock_item = QTableWidgetItem(str(item['SafetyStock']))
-            stock_item.setData(Qt.UserRole, float(item['SafetyStock']))  # 用于排序
-            self.items_table.setItem(row, 7, stock_item)
-            
-            # 商品品牌
-            brand_item = QTableWidgetItem(item['Brand'] if item['Brand'] else "")
-            brand_item.setData(Qt.UserRole, item['Brand'] if item['Brand'] else "")  # 用于排序
-            self.items_table.setItem(row, 8, brand_item)
-            
-            # 操作按钮
-            edit_btn = QPushButton("编辑")
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background: #1890ff;
-                    color: white;
-                    border: none;
-                    padding: 4px 8px;
-                    border-radius: 3px;
-                    font-size: 11px;
-                }
-                QPushButton:hover {
-                    background: #40a9ff;
-                }
-            """)
-            # 使用物料ID而不是行号
-            item_id = item['ItemId']
-            edit_btn.clicked.connect(lambda checked, item_id=item_id: self.edit_item_by_id(item_id))
-            
-            view_btn = QPushButton("查看")
-            view_btn.setStyleSheet("""
-                QPushButton {
-                    background: #52c41a;
-                    color: white;
-                    border: none;
-                    padding: 4px 8px;
-                    border-radius: 3px;
-                    font-size: 11px;
-                }
-                QPushButton:hover {
-                    background: #73d13d;
-                }
-            """)
-            # 使用物料ID而不是行号
-            view_btn.clicked.connect(lambda checked, item_id=item_id: self.view_item_by_id(item_id))
-            
-            btn_layout = QHBoxLayout()
-            btn_layout.addWidget(edit_btn)
-            btn_layout.addWidget(view_btn)
-            btn_layout.setContentsMargins(4, 2, 4, 2)
-            
-            btn_widget = QWidget()
-            btn_widget.setLayout(btn_layout)
-            self.items_table.setCellWidget(row, 9, btn_widget)
+        """填充物料表格（先渲染第一页，滚动时追加）"""
+        self.items_pager.set_rows(items)
         
         # 更新按钮状态
         self._update_button_states()
@@ -1801,6 +1640,149 @@ class ItemEditor(QWidget):
         if name_column_width < 200:  # 如果名称列太窄，设置最小宽度
             self.items_table.setColumnWidth(2, 200)
     
+    def _render_item_row(self, row, item):
+        """渲染物料表格的一行"""
+        # 选择复选框
+        checkbox = QCheckBox()
+        # 设置复选框样式，确保在不同系统上都能正确显示
+        checkbox.setStyleSheet("""
+            QCheckBox {
+                spacing: 8px;
+                font-size: 14px;
+            }
+            QCheckBox::indicator {
+                width: 18px;
+                height: 18px;
+                border: 2px solid #d9d9d9;
+                border-radius: 3px;
+                background-color: white;
+            }
+            QCheckBox::indicator:checked {
+                background-color: #1890ff;
+                border-color: #1890ff;
+            }
+            QCheckBox::indicator:hover {
+                border-color: #1890ff;
+            }
+            QCheckBox::indicator:checked:hover {
+                background-color: #40a9ff;
+                border-color: #40a9ff;
+            }
+        """)
+        # 强制设置复选框的文本为空，避免显示默认文本
+        checkbox.setText("")
+        # 强制更新样式
+        checkbox.update()
+        # 将行号和物料ID存储在复选框的属性中
+        checkbox.setProperty("row", row)
+        checkbox.setProperty("item_id", item['ItemId'])
+        # 连接事件到统一处理方法
+        checkbox.stateChanged.connect(self.on_checkbox_state_changed)
+        print(f"创建第 {row} 行复选框，物料ID: {item['ItemId']}")  # 调试信息
+        
+        checkbox_widget = QWidget()
+        checkbox_layout = QHBoxLayout(checkbox_widget)
+        checkbox_layout.addWidget(checkbox)
+        checkbox_layout.setAlignment(Qt.AlignCenter)
+        checkbox_layout.setContentsMargins(0, 0, 0, 0)
+        self.items_table.setCellWidget(row, 0, checkbox_widget)
+        
+        # 编码
+        code_item = QTableWidgetItem(item['ItemCode'])
+        code_item.setData(Qt.UserRole, item['ItemCode'])  # 用于排序
+        self.items_table.setItem(row, 1, code_item)
+        
+        # 名称
+        name_item = QTableWidgetItem(item['CnName'])
+        name_item.setData(Qt.UserRole, item['CnName'])  # 用于排序
+        self.items_table.setItem(row, 2, name_item)
+        
+        # 规格
+        spec_item = QTableWidgetItem(item['ItemSpec'] if item['ItemSpec'] else "")
+        spec_item.setData(Qt.UserRole, item['ItemSpec'] if item['ItemSpec'] else "")  # 用于排序
+        self.items_table.setItem(row, 3, spec_item)
+        
+        # 类型
+        type_item = QTableWidgetItem(item['ItemType'])
+        type_item.setData(Qt.UserRole, item['ItemType'])  # 用于排序
+        self.items_table.setItem(row, 4, type_item)
+        
+        # 单位
+        unit_item = QTableWidgetItem(item['Unit'])
+        unit_item.setData(Qt.UserRole, item['Unit'])  # 用于排序
+        self.items_table.setItem(row, 5, unit_item)
+        
+                # 启用状态 - 使用简单的文本显示
+        is_active = item.get('IsActive', 1)
+        status_text = "启用" if is_active else "禁用"
+        status_item = QTableWidgetItem(status_text)
+        status_item.setData(Qt.UserRole, is_active)  # 用于排序
+        
+        # 设置状态颜色和样式
+        if is_active:
+            status_item.setBackground(QColor(240, 248, 255))  # 浅蓝色背景
+            status_item.setForeground(QColor(0, 128, 0))     # 绿色文字
+        else:
+            status_item.setBackground(QColor(255, 240, 240))  # 浅红色背景
+            status_item.setForeground(QColor(128, 0, 0))     # 红色文字
+        
+        self.items_table.setItem(row, 6, status_item)
+        
+        # 安全库存
+        stock_item = QTableWidgetItem(str(item['SafetyStock']))
+        stock_item.setData(Qt.UserRole, float(item['SafetyStock']))  # 用于排序
+        self.items_table.setItem(row, 7, stock_item)
+        
+        # 商品品牌
+        brand_item = QTableWidgetItem(item['Brand'] if item['Brand'] else "")
+        brand_item.setData(Qt.UserRole, item['Brand'] if item['Brand'] else "")  # 用于排序
+        self.items_table.setItem(row, 8, brand_item)
+        
+        # 操作按钮
+        edit_btn = QPushButton("编辑")
+        edit_btn.setStyleSheet("""
+            QPushButton {
+                background: #1890ff;
+                color: white;
+                border: none;
+                padding: 4px 8px;
+                border-radius: 3px;
+                font-size: 11px;
+            }
+            QPushButton:hover {
+                background: #40a9ff;
+            }
+        """)
+        # 使用物料ID而不是行号
+        item_id = item['ItemId']
+        edit_btn.clicked.connect(lambda checked, item_id=item_id: self.edit_item_by_id(item_id))
+        
+        view_btn = QPushButton("查看")
+        view_btn.setStyleSheet("""
+            QPushButton {
+                background: #52c41a;
+                color: white;
+                border: none;
+                padding: 4px 8px;
+                border-radius: 3px;
+                font-size: 11px;
+            }
+            QPushButton:hover {
+                background: #73d13d;
+            }
+        """)
+        # 使用物料ID而不是行号
+        view_btn.clicked.connect(lambda checked, item_id=item_id: self.view_item_by_id(item_id))
+        
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(edit_btn)
+        btn_layout.addWidget(view_btn)
+        btn_layout.setContentsMargins(4, 2, 4, 2)
+        
+        btn_widget = QWidget()
+        btn_widget.setLayout(btn_layout)
+        self.items_table.setCellWidget(row, 9, btn_widget)
+    
     def on_checkbox_state_changed(self, state):
         """复选框状态改变事件处理"""
         # 获取发送信号的复选框
@@ -1986,33 +1968,25 @@ class ItemEditor(QWidget):
     
     def filter_items(self):
         """过滤物料列表"""
-        try:
-            search_text = self.search_edit.text().strip()
-            if search_text:
-                items = ItemService.search_items(search_text)
-            else:
-                items = ItemService.get_all_items()
-            
-            self.populate_items_table(items)
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"搜索物料失败: {str(e)}")
+        search_text = self.search_edit.text().strip()
+        if search_text:
+            fetch = lambda: ItemService.search_items(search_text)
+        else:
+            fetch = ItemService.get_all_items
+        self._load_items_async(fetch, "搜索物料失败")
 
     def search_items(self):
         """搜索物料"""
-        try:
-            search_text = self.search_edit.text().strip()
-            if not search_text:
-                self.load_items()
-                return
-            
-            items = ItemService.search_items(search_text)
-            self.populate_items_table(items)
-            
+        search_text = self.search_edit.text().strip()
+        if not search_text:
+            self.load_items()
+            return
+        
+        def on_loaded(items):
             if not items:
                 QMessageBox.information(self, "搜索结果", "未找到匹配的物料")
-                
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"搜索物料失败: {str(e)}")
+        
+        self._load_items_async(lambda: ItemService.search_items(search_text), "搜索物料失败", on_loaded)
     
     def clear_search(self):
         """清空搜索"""
@@ -2223,6 +2197,8 @@ class ItemEditor(QWidget):
         """全选所有物料"""
         try:
             print("全选按钮被点击")  # 调试信息
+            # 渲染尚未显示的分页，全选作用于全部结果
+            self.items_pager.fetch_all()
             # 获取表格中的所有行
             row_count = self.items_table.rowCount()
             print(f"表格行数: {row_count}")  # 调试信息
@@ -2321,12 +2297,14 @@ class ItemEditor(QWidget):
         """表头全选/取消全选"""
         try:
             print(f"表头复选框状态改变: {state}")  # 调试信息
+            check_state = (state == Qt.Checked.value)
+            if check_state:
+                # 渲染尚未显示的分页，全选作用于全部结果
+                self.items_pager.fetch_all()
             row_count = self.items_table.rowCount()
             if row_count == 0:
                 return
             
-            check_state = (state == Qt.Checked.value)
-            
             # 临时断开所有行复选框的事件连接
             for row in range(row_count):
                 checkbox_widget = self.items_table.cellWidget(row, 0)
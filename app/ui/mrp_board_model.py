@@ -0,0 +1,280 @@
+# app/ui/mrp_board_model.py
+# -*- coding: utf-8 -*-
+"""
+MRP 看板表格模型（Model/View）
+- 直接引用 MRP 计算结果的 rows/cells，一次整理为 numpy 数值矩阵（周列、年份合计列、Total列）
+- 单元格文本、背景色、字体在 data() 中按需生成，视图只取可见区域，不再逐格创建 QTableWidgetItem
+- 搜索过滤由 MRPBoardProxyModel 完成，合计行按过滤后的数据行重新汇总，无需重建表格
+供 MRPViewer（MRP看板）与 ProductionMRPWidget（生产MRP）共用
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PySide6.QtGui import QBrush, QColor, QFont
+
+GREEN_BG = QBrush(QColor(235, 252, 239))  # 计划行绿色
+RED_BG = QBrush(QColor(255, 235, 238))    # 库存不足红色
+BLUE_BG = QBrush(QColor(221, 235, 247))   # 合计列/总计行蓝色
+
+
+def _iso_year(date_str: str) -> Optional[int]:
+    """YYYY-MM-DD → ISO 年份，无法解析返回 None"""
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date().isocalendar()[0]
+    except Exception:
+        return None
+
+
+class MRPBoardModel(QAbstractTableModel):
+    """
+    MRP 看板数据模型
+    列：固定列 + colspec（("week", 日期) / 年份合计列 (kind, 年份)）+ Total列
+    行：数据行 + 合计行（合计行配置见 set_board 的 total_rows）
+    """
+
+    def __init__(self, fmt: Callable[[float], str],
+                 cell_brush: Callable[[str, float], Optional[QBrush]],
+                 center_cells: bool = False, parent=None):
+        """
+        Args:
+            fmt: 数值格式化函数
+            cell_brush: 周数据单元格着色规则 (行别, 数值) → 背景色，不着色返回 None
+            center_cells: 数据行的固定列和周列是否居中显示
+        """
+        super().__init__(parent)
+        self._fmt = fmt
+        self._cell_brush = cell_brush
+        self._center_cells = center_cells
+        self._bold_font = QFont()
+        self._bold_font.setBold(True)
+        self._reset_state()
+
+    def _reset_state(self):
+        self._headers: List[Tuple[str, Optional[str]]] = []
+        self._fixed_values: List[List[str]] = []
+        self._row_types = np.array([], dtype=object)
+        self._search_keys: List[Tuple[str, ...]] = []
+        self._week_cols = np.zeros(0, dtype=bool)  # 按数值列：是否为周列
+        self._values = np.zeros((0, 0))            # 数据行 × 数值列（colspec + Total）
+        self._visible = np.zeros(0, dtype=bool)
+        self._total_specs: List[Dict] = []
+        self._totals = np.zeros((0, 0))
+        self._base_col = 0
+
+    # ---------- 数据装载 ----------
+    def set_board(self, fixed_headers: List[str], fixed_values: List[List[str]], rows: List[Dict],
+                  colspec: List[Tuple[str, Any]], week_header: Callable[[str], Tuple[str, Optional[str]]],
+                  total_rows: List[Dict], search_fields: Tuple[str, ...] = ()):
+        """
+        装载一次计算结果
+
+        Args:
+            fixed_headers: 固定列标题
+            fixed_values: 每个数据行的固定列显示文本（与 fixed_headers 等长）
+            rows: MRP 计算结果行（取 RowType 与 cells）
+            colspec: 周列与年份合计列定义
+            week_header: 周列日期 → (表头第一行, 表头第二行/UserRole)
+            total_rows: 合计行配置 [{"labels": {列号: 文本}, "row_type": 只汇总该行别(None为全部), "brush": 背景色}]
+            search_fields: 参与搜索过滤的行字段
+        """
+        self.beginResetModel()
+        try:
+            self._reset_state()
+            self._base_col = len(fixed_headers)
+            self._fixed_values = fixed_values
+            self._row_types = np.array([row.get("RowType", "") for row in rows], dtype=object)
+            self._search_keys = [tuple(str(row.get(f, "") or "").lower() for f in search_fields)
+                                 for row in rows]
+
+            headers = [(title, None) for title in fixed_headers]
+            week_dates = [val for kind, val in colspec if kind == "week"]
+            n = len(rows)
+            weeks = np.array([[float(row["cells"].get(d, 0.0)) for d in week_dates] for row in rows],
+                             dtype=float).reshape(n, len(week_dates))
+            week_years = np.array([_iso_year(d) for d in week_dates], dtype=object)
+
+            values = np.zeros((n, len(colspec) + 1))
+            week_cols = np.zeros(len(colspec) + 1, dtype=bool)
+            row_total = weeks.sum(axis=1)
+            w = 0
+            for j, (kind, val) in enumerate(colspec):
+                if kind == "week":
+                    values[:, j] = weeks[:, w]
+                    week_cols[j] = True
+                    headers.append(week_header(val))
+                    w += 1
+                else:
+                    # 年份合计：该 ISO 年份所有周列之和，并计入 Total 列
+                    year_total = weeks[:, week_years == val].sum(axis=1)
+                    values[:, j] = year_total
+                    row_total = row_total + year_total
+                    headers.append((f"{val}合计", None))
+            values[:, -1] = row_total
+            headers.append(("Total", None))
+
+            self._headers = headers
+            self._values = values
+            self._week_cols = week_cols
+            self._visible = np.ones(n, dtype=bool)
+            self._total_specs = total_rows
+            self._recompute_totals()
+        finally:
+            self.endResetModel()
+
+    def show_message(self, title: str, text: str):
+        """单列提示（如计算中）"""
+        self.beginResetModel()
+        self._reset_state()
+        self._headers = [(title, None)]
+        self._base_col = 1
+        self._fixed_values = [[text]]
+        self._row_types = np.array([""], dtype=object)
+        self._values = np.zeros((1, 0))
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self._reset_state()
+        self.endResetModel()
+
+    # ---------- 过滤 ----------
+    def set_search(self, text: str):
+        """按搜索文本设置数据行可见性，并重新汇总合计行"""
+        text = (text or "").strip().lower()
+        if text:
+            self._visible = np.array([any(text in key for key in keys) for keys in self._search_keys],
+                                     dtype=bool).reshape(len(self._search_keys))
+        else:
+            self._visible = np.ones(len(self._search_keys), dtype=bool)
+        self._recompute_totals()
+        if self._total_specs:
+            first = self.data_row_count()
+            self.dataChanged.emit(self.index(first, self._base_col),
+                                  self.index(self.rowCount() - 1, self.columnCount() - 1))
+
+    def is_row_visible(self, row: int) -> bool:
+        return row >= len(self._visible) or bool(self._visible[row])
+
+    def visible_row_count(self) -> int:
+        return int(self._visible.sum())
+
+    def _recompute_totals(self):
+        totals = []
+        for spec in self._total_specs:
+            mask = self._visible
+            if spec.get("row_type"):
+                mask = mask & (self._row_types == spec["row_type"])
+            totals.append(self._values[mask].sum(axis=0))
+        self._totals = np.array(totals).reshape(len(totals), self._values.shape[1])
+
+    # ---------- Qt 接口 ----------
+    def data_row_count(self) -> int:
+        return len(self._fixed_values)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._fixed_values) + len(self._total_specs)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and 0 <= section < len(self._headers):
+            if role == Qt.DisplayRole:
+                return self._headers[section][0]
+            if role == Qt.UserRole:
+                return self._headers[section][1]
+            return None
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        r, c = index.row(), index.column()
+        n = self.data_row_count()
+        is_total_row = r >= n
+
+        if role == Qt.DisplayRole:
+            if c < self._base_col:
+                if is_total_row:
+                    return self._total_specs[r - n]["labels"].get(c, "")
+                return self._fixed_values[r][c]
+            j = c - self._base_col
+            val = self._totals[r - n, j] if is_total_row else self._values[r, j]
+            return self._fmt(float(val))
+
+        if c < self._base_col:
+            if role == Qt.TextAlignmentRole and self._center_cells and not is_total_row:
+                return int(Qt.AlignCenter)
+            return None
+
+        j = c - self._base_col
+        is_week_col = bool(self._week_cols[j])
+        if role == Qt.BackgroundRole:
+            if is_total_row:
+                return self._total_specs[r - n]["brush"]
+            if is_week_col:
+                return self._cell_brush(self._row_types[r], float(self._values[r, j]))
+            return BLUE_BG
+        if role == Qt.FontRole:
+            if is_total_row or not is_week_col:
+                return self._bold_font
+            return None
+        if role == Qt.TextAlignmentRole:
+            if self._center_cells and is_week_col and not is_total_row:
+                return int(Qt.AlignCenter)
+            return None
+        return None
+
+    def cell_text(self, row: int, col: int) -> str:
+        """单元格显示文本（导出用）"""
+        return self.data(self.index(row, col), Qt.DisplayRole) or ""
+
+    def export_snapshot(self) -> "MRPBoardSnapshot":
+        """当前数据的只读快照，供后台导出使用"""
+        return MRPBoardSnapshot(self)
+
+
+class MRPBoardSnapshot:
+    """
+    MRPBoardModel 当前数据的只读快照：引用模型的表头、固定列文本与数值矩阵（模型装载新数据时整体替换，不原地修改），
+    导出在工作线程中按行生成与 cell_text 一致的显示文本，不再访问模型
+    """
+
+    def __init__(self, model: MRPBoardModel):
+        self.headers: List[Tuple[str, Optional[str]]] = list(model._headers)
+        self._fixed_values = model._fixed_values
+        self._values = model._values
+        self._totals = model._totals
+        self._total_labels = [spec["labels"] for spec in model._total_specs]
+        self._base_col = model._base_col
+        self._fmt = model._fmt
+
+    def row_count(self) -> int:
+        return len(self._fixed_values) + len(self._total_labels)
+
+    def column_count(self) -> int:
+        return len(self.headers)
+
+    def row_texts(self, row: int) -> List[str]:
+        """一行各列的显示文本（数据行在前，合计行在后）"""
+        n = len(self._fixed_values)
+        if row < n:
+            fixed, values = self._fixed_values[row], self._values[row]
+        else:
+            labels = self._total_labels[row - n]
+            fixed, values = [labels.get(c, "") for c in range(self._base_col)], self._totals[row - n]
+        return [text or "" for text in fixed[:self._base_col]] + [self._fmt(float(v)) for v in values]
+
+
+class MRPBoardProxyModel(QSortFilterProxyModel):
+    """按 MRPBoardModel 的行可见性过滤，合计行始终保留"""
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        return self.sourceModel().is_row_visible(source_row)
+
+    def set_search(self, text: str):
+        self.sourceModel().set_search(text)
+        self.invalidateFilter()
@@ -1,19 +1,20 @@
 # app/ui/mrp_viewer.py
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
-    QTableWidgetItem, QDateEdit, QLabel, QComboBox, QGroupBox,
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, QDateEdit, QLabel, QComboBox, QGroupBox,
     QMessageBox, QHeaderView, QTabWidget, QLineEdit, QCheckBox,
     QFileDialog, QProgressBar, QAbstractItemView, QAbstractScrollArea,
     QSizePolicy
 )
 from PySide6.QtCore import Qt, QDate, QThread, Signal, QTimer, QRect
-from PySide6.QtGui import QFont, QColor, QBrush, QPainter
+from PySide6.QtGui import QFont, QColor, QPainter
 
 from app.services.mrp_service import MRPService
+from app.services.mrp_incremental_service import MRPIncrementalService
+from app.ui.mrp_board_model import MRPBoardModel, MRPBoardProxyModel, GREEN_BG, RED_BG, BLUE_BG
+from app.ui.excel_export import run_excel_export
+from app.utils.excel_writer import CENTER, THIN_BORDER, Progress, StreamingWorkbook, report_rows, solid_fill
 from typing import Optional
-import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from openpyxl.styles import Font
 
 
 # -------------------- 两行表头 --------------------
@@ -48,10 +49,11 @@ class TwoRowHeader(QHeaderView):
         painter.setPen(QColor("#d9d9d9"))
         painter.drawRect(rect)
         
-        table = self.parent()
-        item = table.horizontalHeaderItem(logicalIndex) if table else None
-        top = item.text() if item else ""
-        bottom = item.data(Qt.UserRole) if (item and item.data(Qt.UserRole) is not None) else ""
+        model = self.model()
+        top = model.headerData(logicalIndex, Qt.Horizontal, Qt.DisplayRole) if model else None
+        bottom = model.headerData(logicalIndex, Qt.Horizontal, Qt.UserRole) if model else None
+        top = top if top is not None else ""
+        bottom = bottom if bottom is not None else ""
 
         # 计算两行的矩形区域
         top_height = rect.height() // 2
@@ -88,13 +90,15 @@ class MRPCalcThread(QThread):
     progress = Signal(int, str)  # 进度百分比和状态文本
 
     def __init__(self, start_date: str, end_date: str, import_id: Optional[int] = None, 
-                  search_filter: Optional[str] = None, calc_type: str = "comprehensive"):
+                  search_filter: Optional[str] = None, calc_type: str = "comprehensive",
+                  incremental: bool = False):
         super().__init__()
         self.start_date = start_date
         self.end_date = end_date
         self.import_id = import_id
         self.search_filter = search_filter
         self.calc_type = calc_type  # "child", "parent", 或 "comprehensive"
+        self.incremental = incremental  # 零部件MRP是否只重算上次计算后变更的部分
 
     def run(self):
         try:
@@ -105,7 +109,15 @@ class MRPCalcThread(QThread):
             
             self.progress.emit(10, "正在初始化计算参数...")
             
-            if self.calc_type == "child":
+            if self.calc_type == "child" and self.incremental:
+                # 增量计算零部件MRP
+                print(f"🔄 [MRPCalcThread] 调用 MRPIncrementalService.calculate_mrp_kanban")
+                self.progress.emit(30, "正在增量计算零部件MRP...")
+                data = MRPIncrementalService.calculate_mrp_kanban(
+                    self.start_date, self.end_date, 
+                    self.import_id, self.search_filter
+                )
+            elif self.calc_type == "child":
                 # 计算零部件MRP
                 print(f"🔄 [MRPCalcThread] 调用 calculate_mrp_kanban")
                 self.progress.emit(30, "正在计算零部件MRP...")
@@ -298,6 +310,12 @@ class MRPViewer(QWidget):
         
         calc_layout.addStretch()
         
+        # 增量计算：保留上次零部件MRP结果，只重算订单/库存变更影响的物料
+        self.incremental_check = QCheckBox("增量计算")
+        self.incremental_check.setToolTip("零部件MRP保留上次结果，只重算客户订单和库存变更影响的物料；BOM或物料变更时自动完整计算")
+        self.incremental_check.setChecked(True)
+        calc_layout.addWidget(self.incremental_check)
+        
         # 生成看板按钮
         self.btn_calc = QPushButton("生成看板")
         self.btn_calc.setStyleSheet("""
@@ -363,13 +381,17 @@ class MRPViewer(QWidget):
         cly.addLayout(calc_layout)
         layout.addWidget(ctrl)
 
-        # 表格
-        self.tbl = QTableWidget()
+        # 表格（Model/View：单元格按需渲染，搜索只过滤不重建）
+        self.board_model = MRPBoardModel(self._fmt, self._cell_brush, center_cells=True, parent=self)
+        self.board_proxy = MRPBoardProxyModel(self)
+        self.board_proxy.setSourceModel(self.board_model)
+        self.tbl = QTableView()
+        self.tbl.setModel(self.board_proxy)
         self.tbl.setAlternatingRowColors(True)
         self.tbl.verticalHeader().setVisible(False)
-        self.tbl.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.tbl.setSelectionBehavior(QTableWidget.SelectRows)
-        self.tbl.setSelectionMode(QTableWidget.NoSelection)
+        self.tbl.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tbl.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tbl.setSelectionMode(QAbstractItemView.NoSelection)
         
         # 使用自定义的两行表头
         self.tbl.setHorizontalHeader(TwoRowHeader(Qt.Horizontal, self.tbl))
@@ -389,18 +411,18 @@ class MRPViewer(QWidget):
         
         # 设置表格样式
         self.tbl.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #dee2e6;
                 background-color: transparent;
                 alternate-background-color: transparent;
                 selection-background-color: transparent;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: transparent !important;
                 border: 2px solid #007bff;
                 border-radius: 2px;
             }
-            QTableWidget::item:selected:focus {
+            QTableView::item:selected:focus {
                 background-color: transparent !important;
             }
             QHeaderView::section {
@@ -523,15 +545,11 @@ class MRPViewer(QWidget):
         self.progress_bar.setValue(0)
         self.progress_bar.setFormat("准备开始计算...")
         
-        self.tbl.clear()
-        
         # 显示计算状态
-        self.tbl.setRowCount(1)
-        self.tbl.setColumnCount(1)
-        self.tbl.setHorizontalHeaderLabels(["计算中..."])
-        self.tbl.setItem(0, 0, QTableWidgetItem("正在计算MRP，请稍候..."))
+        self.board_model.show_message("计算中...", "正在计算MRP，请稍候...")
         
-        self._thread = MRPCalcThread(s, e, import_id, search_filter, calc_type)
+        incremental = self.incremental_check.isChecked()
+        self._thread = MRPCalcThread(s, e, import_id, search_filter, calc_type, incremental)
         self._thread.finished.connect(self.render_board)
         self._thread.failed.connect(self.show_error)
         self._thread.progress.connect(self.on_progress_update)
@@ -552,26 +570,22 @@ class MRPViewer(QWidget):
         QMessageBox.critical(self, "错误", msg)
 
     def on_search_changed(self):
-        """当搜索条件变化时，自动重新计算"""
-        print(f"🔍 [on_search_changed] 搜索条件变化，触发重新计算")
-        # 如果当前有数据，则重新渲染（不重新计算，只过滤显示）
+        """当搜索条件变化时，即时过滤当前看板"""
+        print(f"🔍 [on_search_changed] 搜索条件变化，过滤显示")
+        # 如果当前有数据，只切换代理模型的过滤条件（不重新计算、不重建表格）
         if hasattr(self, '_current_data') and self._current_data:
-            # 使用QTimer延迟执行，避免频繁搜索时的卡顿
-            QTimer.singleShot(300, lambda: self._perform_search())
+            self._perform_search()
 
     def _perform_search(self):
         """执行搜索过滤"""
-        if hasattr(self, '_current_data') and self._current_data:
-            self.render_board(self._current_data)
+        self.board_proxy.set_search(self.search_edit.text())
+        print(f"🔍 [_perform_search] 过滤后数据行数：{self.board_model.visible_row_count()}")
 
     def on_reset_search(self):
         """重置搜索条件"""
         print(f"🔄 [on_reset_search] 重置搜索条件")
+        # 清空搜索框会触发 textChanged → on_search_changed，恢复显示所有数据
         self.search_edit.clear()
-        # 如果当前有数据，则重新渲染显示所有数据
-        if hasattr(self, '_current_data') and self._current_data:
-            # 使用QTimer延迟执行，避免UI卡顿
-            QTimer.singleShot(10, lambda: self.render_board(self._current_data))
 
     # ---- 渲染 ----
     def render_board(self, data: dict):
@@ -587,9 +601,6 @@ class MRPViewer(QWidget):
         # 保存当前数据用于导出
         self._current_data = data
         
-        # 暂时禁用表格更新以提高性能
-        self.tbl.setUpdatesEnabled(False)
-        
         # 检查并显示警告信息
         warnings = data.get("warnings", [])
         if warnings:
@@ -599,24 +610,12 @@ class MRPViewer(QWidget):
         
         if not data:
             print(f"❌ [render_board] 数据为空，清空表格")
-            self.tbl.setRowCount(0); self.tbl.setColumnCount(0); return
+            self.board_model.clear()
+            return
 
         weeks = data.get("weeks", [])
         rows = data.get("rows", [])
         
-        # 根据搜索条件过滤数据
-        search_text = self.search_edit.text().strip().lower()
-        if search_text:
-            print(f"🔍 [render_board] 应用搜索过滤：{search_text}")
-            filtered_rows = []
-            for row in rows:
-                item_name = row.get("ItemName", "").lower()
-                item_spec = row.get("ItemSpec", "").lower()
-                if search_text in item_name or search_text in item_spec:
-                    filtered_rows.append(row)
-            rows = filtered_rows
-            print(f"🔍 [render_board] 过滤后数据行数：{len(rows)}")
-        
         print(f"🎨 [render_board] 数据解析：weeks={weeks}, rows数量={len(rows)}")
 
         # 构建年份分组和合计列
@@ -633,222 +632,38 @@ class MRPViewer(QWidget):
         else:  # 综合MRP
             # 综合MRP：物料名称、规格、类型、行别、期初库存、总库存、各周、合计
             fixed_headers = ["物料名称", "物料规格", "物料类型", "行别", "期初库存", "总库存"]
-        
-        # 设置列数和标题
-        headers_count = len(fixed_headers) + len(colspec) + 1  # +1 for Total column
-        self.tbl.setColumnCount(headers_count)
-        
-        # 设置固定列标题
-        for i, title in enumerate(fixed_headers):
-            item = QTableWidgetItem(title)
-            self.tbl.setHorizontalHeaderItem(i, item)
-        
-        # 设置周列和年份合计列标题
-        base_col = len(fixed_headers)
-        for i, (kind, val) in enumerate(colspec):
-            if kind == "week":
-                # val 现在是具体的订单日期 (YYYY-MM-DD)
-                # 需要转换为CW格式显示，但保持日期数据
-                try:
-                    from datetime import datetime
-                    date_obj = datetime.strptime(val, "%Y-%m-%d").date()
-                    cw_text = f"CW{date_obj.isocalendar()[1]:02d}"
-                    it = QTableWidgetItem(cw_text)
-                    it.setData(Qt.UserRole, val)  # 存储具体的订单日期
-                except:
-                    it = QTableWidgetItem(val)
-            else:
-                it = QTableWidgetItem(f"{val}合计")
-            self.tbl.setHorizontalHeaderItem(base_col + i, it)
-        
-        # 设置总计列标题
-        self.tbl.setHorizontalHeaderItem(headers_count - 1, QTableWidgetItem("Total"))
-        
-        # 更新表头显示
-        try:
-            hdr = self.tbl.horizontalHeader()
-            hdr.updateGeometry()
-            hdr.repaint()
-        except Exception as e:
-            print(f"更新表头时出错: {e}")
 
-        # 增加行用于显示总计行
-        calc_type = self.calc_type_combo.currentText()
-        if calc_type == "成品MRP":
-            # 成品MRP：数据行 + 订单计划总计行 + 即时库存总计行
-            self.tbl.setRowCount(len(rows) + 2)  # +2 for total rows
-        else:
-            # 零部件MRP：数据行 + 总计行
-            self.tbl.setRowCount(len(rows) + 1)  # +1 for total row
-        
-        # 设置颜色
-        green_bg = QBrush(QColor(235, 252, 239))  # 订单计划绿色
-        red_bg = QBrush(QColor(255, 235, 238))     # 库存不足红色
-        blue_bg = QBrush(QColor(221, 235, 247))   # 合计列蓝色
-
-
-        # 数据行（从第一行开始）
-        for r, row in enumerate(rows):
-            actual_row = r  # 数据行从第一行开始
-            
-            # 基本信息列
-            self._set_item(actual_row, 0, row.get("ItemName", ""))
-            self._set_item(actual_row, 1, row.get("ItemSpec", ""))
-            self._set_item(actual_row, 2, row.get("ItemType", ""))
-            self._set_item(actual_row, 3, row.get("RowType", ""))
-            
+        # 基本信息列文本（数值列由模型按需格式化）
+        fixed_values = []
+        for row in rows:
+            values = [str(row.get("ItemName", "")), str(row.get("ItemSpec", "")),
+                      str(row.get("ItemType", "")), str(row.get("RowType", ""))]
             # 期初库存列：综合MRP显示"XXX+XXX"格式，其他显示数字
             start_onhand = row.get("StartOnHand", 0)
             if isinstance(start_onhand, str) and "+" in start_onhand:
-                # 综合MRP的"XXX+XXX"格式，直接显示
-                self._set_item(actual_row, 4, start_onhand)
+                values.append(start_onhand)
             else:
-                # 其他类型，格式化为数字
-                self._set_item(actual_row, 4, self._fmt(start_onhand))
-            
+                values.append(self._fmt(start_onhand))
             # 总库存列：只有综合MRP显示
             if calc_type == "综合MRP":
-                total_stock = row.get("TotalStock", 0)
-                self._set_item(actual_row, 5, self._fmt(total_stock))
-
-            # 基本信息列不设置背景色
-
-            # 周数据列和年份合计列
-            row_total = 0
-            cursor_col = base_col
-            for kind, val in colspec:
-                if kind == "week":
-                    val_float = float(row["cells"].get(val, 0.0))
-                    row_total += val_float
-                    it = self._set_item(actual_row, cursor_col, self._fmt(val_float))
-                    
-                    # 新的着色规则：
-                    # 1. 订单计划行（非即时库存）且数值大于0时标绿色
-                    # 2. 即时库存行且数值小于0时标红色
-                    is_stock_row = (row.get("RowType") == "即时库存")
-                    if not is_stock_row and val_float > 0:
-                        it.setBackground(green_bg)  # 订单计划标绿
-                    elif is_stock_row and val_float < 0:
-                        it.setBackground(red_bg)    # 库存不足标红
-                else:
-                    # 年份合计列 - val 现在是年份
-                    # 需要计算该年份所有日期的总和
-                    year_total = 0.0
-                    for kind2, val2 in colspec:
-                        if kind2 == "week":
-                            # val2 是具体的订单日期
-                            try:
-                                from datetime import datetime
-                                date_obj = datetime.strptime(val2, "%Y-%m-%d").date()
-                                if date_obj.isocalendar()[0] == val:  # 同一年
-                                    year_total += float(row["cells"].get(val2, 0.0))
-                            except:
-                                continue
-                    
-                    it = QTableWidgetItem(self._fmt(year_total))
-                    it.setBackground(blue_bg)  # 合计列标蓝色
-                    font = it.font()
-                    font.setBold(True)
-                    it.setFont(font)
-                    self.tbl.setItem(actual_row, cursor_col, it)
-                    row_total += year_total
-                
-                cursor_col += 1
+                values.append(self._fmt(row.get("TotalStock", 0)))
+            fixed_values.append(values)
 
-            # 总计列
-            total_item = QTableWidgetItem(self._fmt(row_total))
-            total_item.setBackground(blue_bg)  # 总计列标蓝色
-            font = total_item.font()
-            font.setBold(True)
-            total_item.setFont(font)
-            self.tbl.setItem(actual_row, headers_count - 1, total_item)
-
-        # 总计行
-        calc_type = self.calc_type_combo.currentText()
+        # 总计行：成品MRP分订单计划/即时库存两行，其他一行
         if calc_type == "成品MRP":
-            # 成品MRP：两行总计行
-            # 第一行：订单计划总计
-            plan_total_row = len(rows)
-            self.tbl.setItem(plan_total_row, 0, QTableWidgetItem("订单计划TOTAL"))
-            self.tbl.setItem(plan_total_row, 1, QTableWidgetItem(""))
-            self.tbl.setItem(plan_total_row, 2, QTableWidgetItem(""))
-            self.tbl.setItem(plan_total_row, 3, QTableWidgetItem("订单计划"))
-            self.tbl.setItem(plan_total_row, 4, QTableWidgetItem(""))
-            if calc_type == "综合MRP":
-                self.tbl.setItem(plan_total_row, 5, QTableWidgetItem(""))
-            
-            # 第二行：即时库存总计
-            stock_total_row = len(rows) + 1
-            self.tbl.setItem(stock_total_row, 0, QTableWidgetItem("即时库存TOTAL"))
-            self.tbl.setItem(stock_total_row, 1, QTableWidgetItem(""))
-            self.tbl.setItem(stock_total_row, 2, QTableWidgetItem(""))
-            self.tbl.setItem(stock_total_row, 3, QTableWidgetItem("即时库存"))
-            self.tbl.setItem(stock_total_row, 4, QTableWidgetItem(""))
-            if calc_type == "综合MRP":
-                self.tbl.setItem(stock_total_row, 5, QTableWidgetItem(""))
-            
-            # 计算订单计划总计（只统计订单计划行）
-            for col in range(base_col, headers_count):
-                plan_sum = 0
-                for r in range(0, plan_total_row):  # 从0开始，没有日期行
-                    it = self.tbl.item(r, col)
-                    row_type_it = self.tbl.item(r, 3)  # 行别列
-                    try:
-                        if it and it.text().strip() and row_type_it and row_type_it.text() == "订单计划":
-                            plan_sum += float(it.text().replace(',', ''))
-                    except:
-                        pass
-                item = QTableWidgetItem(self._fmt(plan_sum))
-                font = item.font()
-                font.setBold(True)
-                item.setFont(font)
-                item.setBackground(green_bg)  # 订单计划总计标绿色
-                self.tbl.setItem(plan_total_row, col, item)
-            
-            # 计算即时库存总计（只统计即时库存行）
-            for col in range(base_col, headers_count):
-                stock_sum = 0
-                for r in range(0, stock_total_row):  # 从0开始，没有日期行
-                    it = self.tbl.item(r, col)
-                    row_type_it = self.tbl.item(r, 3)  # 行别列
-                    try:
-                        if it and it.text().strip() and row_type_it and row_type_it.text() == "即时库存":
-                            stock_sum += float(it.text().replace(',', ''))
-                    except:
-                        pass
-                item = QTableWidgetItem(self._fmt(stock_sum))
-                font = item.font()
-                font.setBold(True)
-                item.setFont(font)
-                item.setBackground(red_bg)  # 即时库存总计标红色
-                self.tbl.setItem(stock_total_row, col, item)
+            total_rows = [
+                {"labels": {0: "订单计划TOTAL", 3: "订单计划"}, "row_type": "订单计划", "brush": GREEN_BG},
+                {"labels": {0: "即时库存TOTAL", 3: "即时库存"}, "row_type": "即时库存", "brush": RED_BG},
+            ]
         else:
-            # 零部件MRP：一行总计行
-            total_row = len(rows)
-            self.tbl.setItem(total_row, 0, QTableWidgetItem("TOTAL"))
-            if calc_type == "综合MRP":
-                self.tbl.setItem(total_row, 1, QTableWidgetItem(""))
-                self.tbl.setItem(total_row, 2, QTableWidgetItem(""))
-                self.tbl.setItem(total_row, 3, QTableWidgetItem(""))
-                self.tbl.setItem(total_row, 4, QTableWidgetItem(""))
-                self.tbl.setItem(total_row, 5, QTableWidgetItem(""))
-            
-            # 只从周列开始统计（前5列不算）
-            for col in range(base_col, headers_count):
-                s = 0
-                for r in range(0, total_row):  # 从0开始，没有日期行
-                    it = self.tbl.item(r, col)
-                    try:
-                        if it and it.text().strip():
-                            s += float(it.text().replace(',', ''))
-                    except:
-                        pass
-                item = QTableWidgetItem(self._fmt(s))
-                font = item.font()
-                font.setBold(True)
-                item.setFont(font)
-                item.setBackground(blue_bg)  # 总计行标蓝色
-                self.tbl.setItem(total_row, col, item)
+            total_rows = [{"labels": {0: "TOTAL"}, "row_type": None, "brush": BLUE_BG}]
+
+        self.board_model.set_board(fixed_headers, fixed_values, rows, colspec,
+                                   self._week_header, total_rows,
+                                   search_fields=("ItemName", "ItemSpec"))
+        # 应用当前搜索条件
+        self.board_proxy.set_search(self.search_edit.text())
+        print(f"🎨 [render_board] 显示数据行数：{self.board_model.visible_row_count()}")
 
         # 小优化：把计划/库存两行当作一个分组阅读
         if calc_type == "零部件MRP":
@@ -857,17 +672,32 @@ class MRPViewer(QWidget):
             self.tbl.setAlternatingRowColors(True)
         
         # 手动设置TOTAL列的宽度，确保显示完整
-        total_col_index = headers_count - 1
+        total_col_index = self.board_model.columnCount() - 1
         self.tbl.setColumnWidth(total_col_index, 100)  # 设置TOTAL列宽度为100像素
-        
-        # 重新启用表格更新
-        self.tbl.setUpdatesEnabled(True)
 
-    def _set_item(self, r: int, c: int, text: str):
-        it = QTableWidgetItem(str(text))
-        it.setTextAlignment(Qt.AlignCenter)
-        self.tbl.setItem(r, c, it)
-        return it
+    @staticmethod
+    def _week_header(val: str):
+        """周列表头：第一行CW编号，第二行（UserRole）为具体订单日期"""
+        try:
+            from datetime import datetime
+            date_obj = datetime.strptime(val, "%Y-%m-%d").date()
+            return f"CW{date_obj.isocalendar()[1]:02d}", val
+        except:
+            return val, None
+
+    @staticmethod
+    def _cell_brush(row_type: str, value: float):
+        """
+        周数据着色规则：
+        1. 订单计划行（非即时库存）且数值大于0时标绿色
+        2. 即时库存行且数值小于0时标红色
+        """
+        is_stock_row = (row_type == "即时库存")
+        if not is_stock_row and value > 0:
+            return GREEN_BG
+        if is_stock_row and value < 0:
+            return RED_BG
+        return None
 
     @staticmethod
     def _fmt(v: float) -> str:
@@ -1108,7 +938,7 @@ class MRPViewer(QWidget):
             return cw
 
     def on_export(self):
-        """导出Excel文件"""
+        """导出Excel文件（后台写出）"""
         if not hasattr(self, '_current_data') or not self._current_data:
             QMessageBox.warning(self, "提示", "请先生成看板数据")
             return
@@ -1125,46 +955,35 @@ class MRPViewer(QWidget):
             return
         
         try:
-            self.export_to_excel(file_path, self._current_data)
-            QMessageBox.information(self, "导出成功", f"文件已保存到：\n{file_path}")
+            args = self._excel_export_args(self._current_data)
         except Exception as e:
             QMessageBox.critical(self, "导出失败", f"导出过程中发生错误：\n{str(e)}")
+            return
+        run_excel_export(
+            self,
+            lambda progress: self._write_board_excel(file_path, *args, progress=progress),
+            lambda _: QMessageBox.information(self, "导出成功", f"文件已保存到：\n{file_path}"),
+            lambda e: QMessageBox.critical(self, "导出失败", f"导出过程中发生错误：\n{str(e)}"),
+        )
 
-    def export_to_excel(self, file_path: str, data: dict):
+    def export_to_excel(self, file_path: str, data: dict, progress: Optional[Progress] = None):
         """导出数据到Excel文件"""
-        weeks = data.get("weeks", [])
-        rows = data.get("rows", [])
-        calc_type = self.calc_type_combo.currentText()
-        
-        # 构建年份分组和合计列
-        colspec = self._build_week_columns_with_totals(weeks)
-        
-        # 创建工作簿和工作表
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = f"MRP看板_{calc_type}"
-        
-        # 定义颜色样式
-        green_fill = PatternFill(start_color="E7F5E7", end_color="E7F5E7", fill_type="solid")
-        red_fill = PatternFill(start_color="FFEBEE", end_color="FFEBEE", fill_type="solid")
-        blue_fill = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")
-        
-        # 定义字体样式 - 统一使用Arial字体
-        header_font = Font(name="Arial", bold=True, size=12)
-        normal_font = Font(name="Arial", size=10)
-        total_font = Font(name="Arial", bold=True, size=10)
-        
-        # 定义对齐方式
-        center_alignment = Alignment(horizontal="center", vertical="center")
-        left_alignment = Alignment(horizontal="left", vertical="center")
-        
-        # 定义边框
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        self._write_board_excel(file_path, *self._excel_export_args(data), progress=progress)
+
+    def _excel_export_args(self, data: dict) -> tuple:
+        """
+        在界面线程取出导出所需的全部数据：(行, 计算类型, 列规范, 年份合计列对应的周)
+        列规范与年份分组依赖界面上的版本和日期，每个年份只查询一次
+        """
+        colspec = self._build_week_columns_with_totals(data.get("weeks", []))
+        year_weeks = {val: self._get_weeks_in_year(val) for kind, val in colspec if kind != "week"}
+        return data.get("rows", []), self.calc_type_combo.currentText(), colspec, year_weeks
+
+    @classmethod
+    def _write_board_excel(cls, file_path: str, rows: list, calc_type: str, colspec: list,
+                           year_weeks: dict, progress: Optional[Progress] = None):
+        """流式写出 MRP 看板（可在工作线程执行）"""
+        from datetime import datetime
         
         # 设置列标题
         if calc_type == "零部件MRP":
@@ -1174,178 +993,104 @@ class MRPViewer(QWidget):
         else:  # 综合MRP
             fixed_headers = ["物料名称", "物料规格", "物料类型", "行别", "期初库存", "总库存"]
         
-        headers_count = len(fixed_headers) + len(colspec) + 1  # +1 for Total column
-        
-        # 写入固定列标题
-        for col, header in enumerate(fixed_headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.alignment = center_alignment
-            cell.border = thin_border
-            cell.fill = PatternFill(start_color="F8F9FA", end_color="F8F9FA", fill_type="solid")
-        
-        # 写入周列和年份合计列标题
         base_col = len(fixed_headers)
-        for i, (kind, val) in enumerate(colspec):
-            col = base_col + i + 1
-            if kind == "week":
-                # val 现在是具体的订单日期 (YYYY-MM-DD)
-                # 转换为CW格式显示
-                try:
-                    from datetime import datetime
-                    date_obj = datetime.strptime(val, "%Y-%m-%d").date()
-                    cw_text = f"CW{date_obj.isocalendar()[1]:02d}"
-                    cell = ws.cell(row=1, column=col, value=cw_text)
-                except:
-                    cell = ws.cell(row=1, column=col, value=val)
-            else:
-                cell = ws.cell(row=1, column=col, value=f"{val}合计")
-            cell.font = header_font
-            cell.alignment = center_alignment
-            cell.border = thin_border
-            cell.fill = PatternFill(start_color="F8F9FA", end_color="F8F9FA", fill_type="solid")
-        
-        # 写入总计列标题
-        total_col = headers_count
-        cell = ws.cell(row=1, column=total_col, value="Total")
-        cell.font = header_font
-        cell.alignment = center_alignment
-        cell.border = thin_border
-        cell.fill = PatternFill(start_color="F8F9FA", end_color="F8F9FA", fill_type="solid")
-        
-        # 写入日期行（第二行）
-        row_num = 2
-        for col in range(1, base_col + 1):  # 基本信息列
-            cell = ws.cell(row=row_num, column=col, value="")
-            cell.border = thin_border
-        
-        for i, (kind, val) in enumerate(colspec):
-            col = base_col + i + 1
+        headers_count = base_col + len(colspec) + 1  # +1 for Total column
+        
+        # 第一行：固定列 + 周列（CW）/年份合计列 + Total；第二行：周列显示 MM/DD，合计列显示年份
+        header_row = list(fixed_headers)
+        date_row = [""] * base_col
+        for kind, val in colspec:
             if kind == "week":
-                # val 现在是具体的订单日期 (YYYY-MM-DD)
-                # 转换为显示格式 (MM/DD)
+                # val 是具体的订单日期 (YYYY-MM-DD)
                 try:
-                    from datetime import datetime
                     date_obj = datetime.strptime(val, "%Y-%m-%d").date()
-                    date_str = date_obj.strftime("%m/%d")
-                    cell = ws.cell(row=row_num, column=col, value=date_str)
+                    header_row.append(f"CW{date_obj.isocalendar()[1]:02d}")
+                    date_row.append(date_obj.strftime("%m/%d"))
                 except:
-                    cell = ws.cell(row=row_num, column=col, value=val)
+                    header_row.append(val)
+                    date_row.append(val)
             else:
-                # 年份合计列显示年份
-                cell = ws.cell(row=row_num, column=col, value=str(val))
-            cell.font = Font(name="Arial", size=9)
-            cell.alignment = center_alignment
-            cell.border = thin_border
-        
-        # 总计列
-        cell = ws.cell(row=row_num, column=total_col, value="")
-        cell.border = thin_border
-        
-        # 写入数据行
-        row_num = 2  # 从第2行开始，因为第1行是标题行，第2行是日期行
-        for row_data in rows:
-            row_num += 1
+                header_row.append(f"{val}合计")
+                date_row.append(str(val))
+        header_row.append("Total")
+        date_row.append("")
+        
+        # 列宽：基本信息列 15，周数据列和合计列 12
+        widths = {col: (15 if col <= base_col else 12) for col in range(1, headers_count + 1)}
+        
+        with StreamingWorkbook() as book:
+            # 统一使用Arial字体、居中、细边框
+            book.add_style("mrp_header", font=Font(name="Arial", bold=True, size=12),
+                           fill=solid_fill("F8F9FA"), border=THIN_BORDER, alignment=CENTER)
+            book.add_style("mrp_date", font=Font(name="Arial", size=9), border=THIN_BORDER, alignment=CENTER)
+            book.add_style("mrp_border", border=THIN_BORDER)
+            book.add_style("mrp_cell", font=Font(name="Arial", size=10), border=THIN_BORDER, alignment=CENTER)
+            book.add_style("mrp_plan", font=Font(name="Arial", size=10), fill=solid_fill("E7F5E7"),
+                           border=THIN_BORDER, alignment=CENTER)
+            book.add_style("mrp_short", font=Font(name="Arial", size=10), fill=solid_fill("FFEBEE"),
+                           border=THIN_BORDER, alignment=CENTER)
+            book.add_style("mrp_total", font=Font(name="Arial", bold=True, size=10), fill=solid_fill("DDEBF7"),
+                           border=THIN_BORDER, alignment=CENTER)
+            sheet = book.create_sheet(f"MRP看板_{calc_type}", column_widths=widths)
             
-            # 基本信息列
-            start_onhand = row_data.get("StartOnHand", 0)
-            if isinstance(start_onhand, str) and "+" in start_onhand:
-                # 综合MRP的"XXX+XXX"格式，直接显示
-                start_onhand_display = start_onhand
-            else:
-                # 其他类型，格式化为数字
-                start_onhand_display = self._fmt(start_onhand)
+            sheet.append(header_row, "mrp_header")
+            sheet.append(date_row, ["mrp_border"] * base_col + ["mrp_date"] * len(colspec) + ["mrp_border"])
             
-            # 根据计算类型构建基本信息
-            if calc_type == "综合MRP":
-                basic_info = [
+            # 数值列（周列、年份合计列、Total）的列合计，写入最后的 TOTAL 行
+            column_sums = [0.0] * (len(colspec) + 1)
+            for row_data in report_rows(rows, len(rows), progress):
+                # 基本信息列
+                start_onhand = row_data.get("StartOnHand", 0)
+                if isinstance(start_onhand, str) and "+" in start_onhand:
+                    # 综合MRP的"XXX+XXX"格式，直接显示
+                    start_onhand_display = start_onhand
+                else:
+                    # 其他类型，格式化为数字
+                    start_onhand_display = cls._fmt(start_onhand)
+                
+                values = [
                     row_data.get("ItemName", ""),
                     row_data.get("ItemSpec", ""),
                     row_data.get("ItemType", ""),
                     row_data.get("RowType", ""),
                     start_onhand_display,
-                    self._fmt(row_data.get("TotalStock", 0))
-                ]
-            else:
-                basic_info = [
-                    row_data.get("ItemName", ""),
-                    row_data.get("ItemSpec", ""),
-                    row_data.get("ItemType", ""),
-                    row_data.get("RowType", ""),
-                    start_onhand_display
                 ]
-            
-            for col, value in enumerate(basic_info, 1):
-                cell = ws.cell(row=row_num, column=col, value=value)
-                cell.font = normal_font
-                cell.alignment = center_alignment
-                cell.border = thin_border
+                if calc_type == "综合MRP":
+                    values.append(cls._fmt(row_data.get("TotalStock", 0)))
                 # 基本信息列不设置背景色
+                styles = ["mrp_cell"] * base_col
+                
+                # 着色规则：订单计划行（非即时库存）数值大于0标绿，即时库存行数值小于0标红
+                is_stock_row = (row_data.get("RowType") == "即时库存")
+                cells = row_data["cells"]
+                row_total = 0
+                for kind, val in colspec:
+                    if kind == "week":
+                        val_float = float(cells.get(val, 0.0))
+                        row_total += val_float
+                        values.append(val_float)
+                        if not is_stock_row and val_float > 0:
+                            styles.append("mrp_plan")
+                        elif is_stock_row and val_float < 0:
+                            styles.append("mrp_short")
+                        else:
+                            styles.append("mrp_cell")
+                    else:
+                        # 年份合计列（合计列标蓝色）
+                        year_total = sum(float(cells.get(w, 0.0)) for w in year_weeks[val])
+                        row_total += year_total
+                        values.append(year_total)
+                        styles.append("mrp_total")
+                
+                # 总计列
+                values.append(row_total)
+                styles.append("mrp_total")
+                sheet.append(values, styles)
+                
+                for j, value in enumerate(values[base_col:]):
+                    column_sums[j] += value
             
-            # 周数据列和年份合计列
-            row_total = 0
-            for i, (kind, val) in enumerate(colspec):
-                col = base_col + i + 1
-                if kind == "week":
-                    val_float = float(row_data["cells"].get(val, 0.0))
-                    row_total += val_float
-                    cell = ws.cell(row=row_num, column=col, value=val_float)
-                    cell.font = normal_font
-                    cell.alignment = center_alignment
-                    cell.border = thin_border
-                    
-                    # 新的着色规则：
-                    # 1. 订单计划行（非即时库存）且数值大于0时标绿色
-                    # 2. 即时库存行且数值小于0时标红色
-                    is_stock_row = (row_data.get("RowType") == "即时库存")
-                    if not is_stock_row and val_float > 0:
-                        cell.fill = green_fill  # 订单计划标绿
-                    elif is_stock_row and val_float < 0:
-                        cell.fill = red_fill    # 库存不足标红
-                else:
-                    # 年份合计列
-                    year_total = sum(float(row_data["cells"].get(w, 0.0)) for w in self._get_weeks_in_year(val))
-                    row_total += year_total
-                    cell = ws.cell(row=row_num, column=col, value=year_total)
-                    cell.font = total_font
-                    cell.alignment = center_alignment
-                    cell.fill = blue_fill  # 合计列标蓝色
-                    cell.border = thin_border
-            
-            # 总计列
-            cell = ws.cell(row=row_num, column=total_col, value=row_total)
-            cell.font = total_font
-            cell.alignment = center_alignment
-            cell.fill = blue_fill  # 总计列标蓝色
-            cell.border = thin_border
-        
-        # 总计行
-        total_row = row_num + 1
-        ws.cell(row=total_row, column=1, value="TOTAL")
-        
-        # 只从周列开始统计（前5列不算）
-        for col in range(base_col + 1, total_col + 1):
-            s = 0
-            for r in range(3, total_row):  # 从第3行开始，跳过标题行和日期行
-                cell = ws.cell(row=r, column=col)
-                if cell.value is not None:
-                    try:
-                        s += float(cell.value)
-                    except:
-                        pass
-            cell = ws.cell(row=total_row, column=col, value=s)
-            cell.font = total_font
-            cell.alignment = center_alignment
-            cell.fill = blue_fill  # 总计行标蓝色
-            cell.border = thin_border
-        
-        # 调整列宽
-        for col in range(1, headers_count + 1):
-            if col <= base_col:  # 基本信息列
-                ws.column_dimensions[get_column_letter(col)].width = 15
-            else:  # 周数据列和合计列
-                ws.column_dimensions[get_column_letter(col)].width = 12
-        
-        # 保存文件
-        wb.save(file_path)
-        wb.close()
+            # 总计行：只统计周列开始的数值列
+            sheet.append(["TOTAL"] + [None] * (base_col - 1) + column_sums,
+                         [None] * base_col + ["mrp_total"] * len(column_sums))
+            book.save(file_path)
@@ -11,20 +11,22 @@ from typing import Optional, List, Dict
 from datetime import datetime, timedelta
 
 from PySide6.QtCore import Qt, QDate, Signal, QTimer, QRect
-from PySide6.QtGui import QFont, QColor, QPainter, QBrush
+from PySide6.QtGui import QFont, QColor, QPainter
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
     QTableWidgetItem, QFrame, QLineEdit, QComboBox, QAbstractItemView,
     QMessageBox, QTabWidget, QGroupBox, QGridLayout, QCheckBox, QDialog,
     QHeaderView, QDateEdit, QListWidget, QListWidgetItem, QSplitter,
     QSizePolicy, QScrollArea, QFormLayout, QDialogButtonBox, QTextEdit,
-    QSpacerItem, QAbstractScrollArea, QFileDialog
+    QSpacerItem, QAbstractScrollArea, QFileDialog, QTableView
 )
 
 from app.services.scheduling_order_service import SchedulingOrderService
+from app.ui.excel_export import run_excel_export
+from app.ui.mrp_board_model import MRPBoardModel, MRPBoardSnapshot, GREEN_BG, RED_BG, BLUE_BG
+from app.utils.excel_writer import CENTER, THIN_BORDER, Progress, StreamingWorkbook, report_rows, solid_fill
 import pandas as pd
-import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.styles import Font
 from openpyxl.utils.dataframe import dataframe_to_rows
 
 
@@ -54,10 +56,11 @@ class TwoRowHeader(QHeaderView):
         # 完全自定义绘制，不使用父类方法
         painter.save()
         
-        table = self.parent()
-        item = table.horizontalHeaderItem(logicalIndex) if table else None
-        top = item.text() if item else ""
-        bottom = item.data(Qt.UserRole) if (item and item.data(Qt.UserRole) is not None) else ""
+        model = self.model()
+        top = model.headerData(logicalIndex, Qt.Horizontal, Qt.DisplayRole) if model else None
+        bottom = model.headerData(logicalIndex, Qt.Horizontal, Qt.UserRole) if model else None
+        top = top if top is not None else ""
+        bottom = bottom if bottom is not None else ""
 
         # 检查是否是周日，设置整列黄色背景
         # 对于MRP表格，bottom是日期，需要检查日期对应的周几
@@ -860,162 +863,102 @@ class SchedulingOrderManagementWidget(QWidget):
             QMessageBox.critical(self, "错误", f"保存看板数据失败: {str(e)}")
     
     def export_kanban_data(self):
-        """导出看板数据到Excel"""
+        """导出看板数据到Excel（后台查询并写出）"""
         if not hasattr(self, 'current_order_id') or not self.current_order_id:
             QMessageBox.warning(self, "警告", "请先选择一个排产订单")
             return
         
-        try:
-            # 获取文件保存路径
-            file_path, _ = QFileDialog.getSaveFileName(
-                self, 
-                "导出看板数据", 
-                f"排产看板_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                "Excel文件 (*.xlsx)"
-            )
-            
-            if not file_path:
-                return
-            
-            # 获取看板数据
-            data = SchedulingOrderService.get_scheduling_kanban_data(self.current_order_id)
-            if "error" in data:
-                QMessageBox.critical(self, "错误", data["error"])
-                return
-            
-            order_info = data["order_info"]
-            date_range = data["date_range"]
-            products = data["products"]
-            
-            # 创建Excel工作簿
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "排产看板"
-            
-            # 设置样式
-            header_fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
-            sunday_fill = PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid")
-            product_fill = PatternFill(start_color="F8F9FA", end_color="F8F9FA", fill_type="solid")
-            green_fill = PatternFill(start_color="D4EDDA", end_color="D4EDDA", fill_type="solid")  # 绿色背景，与看板一致
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            center_alignment = Alignment(horizontal='center', vertical='center')
+        # 获取文件保存路径
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, 
+            "导出看板数据", 
+            f"排产看板_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            "Excel文件 (*.xlsx)"
+        )
+        
+        if not file_path:
+            return
+        
+        order_id = self.current_order_id
+        run_excel_export(
+            self,
+            lambda progress: self._write_kanban_excel(file_path, order_id, progress),
+            lambda _: QMessageBox.information(self, "成功", f"看板数据已导出到:\n{file_path}"),
+            lambda e: QMessageBox.critical(self, "错误", f"导出看板数据失败: {str(e)}"),
+        )
+    
+    @staticmethod
+    def _write_kanban_excel(file_path: str, order_id: int, progress: Optional[Progress] = None):
+        """查询排产看板数据并流式写出（可在工作线程执行）"""
+        data = SchedulingOrderService.get_scheduling_kanban_data(order_id)
+        if "error" in data:
+            raise Exception(data["error"])
+        
+        date_range = data["date_range"]
+        products = data["products"]
+        
+        # 日期列是否为周日（日期解析失败为 None）
+        def sunday_of(date_str):
+            try:
+                return datetime.strptime(date_str, "%Y-%m-%d").date().weekday() == 6
+            except:
+                return None
+        
+        weekday_map = {0: "一", 1: "二", 2: "三", 3: "四", 4: "五", 5: "六", 6: "日"}
+        is_sunday = [sunday_of(date_str) for date_str in date_range]
+        
+        # 创建表头 - 第一行：产品信息列 + 日期；第二行：产品信息列为空，日期列显示周几
+        headers_row1 = ["产品名称", "规格", "型号", "项目名称"] + list(date_range)
+        headers_row2 = ["", "", "", ""]
+        for date_str in date_range:
+            try:
+                headers_row2.append(weekday_map[datetime.strptime(date_str, "%Y-%m-%d").date().weekday()])
+            except:
+                headers_row2.append("")
+        # 周日列表头设置黄色背景
+        row1_styles = ["skb_header"] * 4 + ["skb_sunday" if sunday else "skb_header" for sunday in is_sunday]
+        row2_styles = ["skb_header"] * 4 + ["skb_sunday" if header == "日" else "skb_header"
+                                            for header in headers_row2[4:]]
+        
+        # 列宽：产品名称 20、规格 15、型号 12、项目名称 15，日期列 10
+        widths = {1: 20, 2: 15, 3: 12, 4: 15}
+        widths.update({col: 10 for col in range(5, len(headers_row1) + 1)})
+        
+        with StreamingWorkbook() as book:
+            book.add_style("skb_header", font=Font(bold=True), fill=solid_fill("E6E6FA"),
+                           border=THIN_BORDER, alignment=CENTER)
+            book.add_style("skb_sunday", font=Font(bold=True), fill=solid_fill("FFF3CD"),
+                           border=THIN_BORDER, alignment=CENTER)
+            book.add_style("skb_product", fill=solid_fill("F8F9FA"), border=THIN_BORDER, alignment=CENTER)
+            book.add_style("skb_cell", border=THIN_BORDER, alignment=CENTER)
+            book.add_style("skb_qty", fill=solid_fill("D4EDDA"), border=THIN_BORDER, alignment=CENTER)  # 绿色背景，与看板一致
+            book.add_style("skb_sunday_cell", fill=solid_fill("FFF3CD"), border=THIN_BORDER, alignment=CENTER)
+            sheet = book.create_sheet("排产看板", column_widths=widths)
             
             # 直接从第1行开始，不显示基础信息
-            current_row = 1
-            
-            # 创建表头 - 第一行：产品信息列 + 日期
-            headers_row1 = ["产品名称", "规格", "型号", "项目名称"]
-            headers_row2 = ["", "", "", ""]  # 第二行：产品信息列为空，日期列显示周几
-            
-            for date_str in date_range:
-                headers_row1.append(date_str)
-                # 计算周几
-                try:
-                    date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                    weekday_map = {
-                        0: "一", 1: "二", 2: "三", 3: "四", 
-                        4: "五", 5: "六", 6: "日"
-                    }
-                    weekday = weekday_map[date_obj.weekday()]
-                    headers_row2.append(weekday)
-                except:
-                    headers_row2.append("")
-            
-            # 写入第一行表头（日期）
-            for col, header in enumerate(headers_row1, 1):
-                cell = ws.cell(row=current_row, column=col, value=header)
-                cell.fill = header_fill
-                cell.font = Font(bold=True)
-                cell.border = border
-                cell.alignment = center_alignment
+            sheet.append(headers_row1, row1_styles)
+            sheet.append(headers_row2, row2_styles)
+            
+            for product in report_rows(products, len(products), progress):
+                # 固定列数据（Brand字段作为型号）
+                values = [product.get("ItemName", ""), product.get("ItemSpec", ""),
+                          product.get("Brand", ""), product.get("ProjectName", "")]
+                styles = ["skb_product"] * 4
                 
-                # 如果是日期列且是周日，设置黄色背景
-                if col > 4:  # 日期列从第5列开始
-                    try:
-                        date_obj = datetime.strptime(header, "%Y-%m-%d").date()
-                        if date_obj.weekday() == 6:  # 周日
-                            cell.fill = sunday_fill
-                    except:
-                        pass
-            
-            current_row += 1
-            
-            # 写入第二行表头（周几）
-            for col, header in enumerate(headers_row2, 1):
-                cell = ws.cell(row=current_row, column=col, value=header)
-                cell.fill = header_fill
-                cell.font = Font(bold=True)
-                cell.border = border
-                cell.alignment = center_alignment
-                
-                # 如果是周日列，设置黄色背景
-                if col > 4 and header == "日":  # 周日列
-                    cell.fill = sunday_fill
-            
-            current_row += 1
-            
-            # 写入数据
-            for product in products:
-                # 固定列数据
-                ws.cell(row=current_row, column=1, value=product.get("ItemName", ""))
-                ws.cell(row=current_row, column=2, value=product.get("ItemSpec", ""))
-                ws.cell(row=current_row, column=3, value=product.get("Brand", ""))  # Brand字段作为型号
-                ws.cell(row=current_row, column=4, value=product.get("ProjectName", ""))
-                
-                # 设置固定列样式
-                for col in range(1, 5):
-                    cell = ws.cell(row=current_row, column=col)
-                    cell.fill = product_fill
-                    cell.border = border
-                    cell.alignment = center_alignment
-                
-                # 动态列数据（排产数量）
-                for col, date_str in enumerate(date_range, 5):
-                    qty = product["cells"].get(date_str, 0.0)
-                    cell = ws.cell(row=current_row, column=col, value=qty)
-                    cell.border = border
-                    cell.alignment = center_alignment
-                    
-                    # 设置背景色：优先检查数量，然后检查周日
-                    try:
-                        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                        is_sunday = date_obj.weekday() == 6
-                        
-                        if qty != 0:
-                            # 不为0的数据设置绿色背景
-                            cell.fill = green_fill
-                        elif is_sunday:
-                            # 周日且为0的数据设置黄色背景
-                            cell.fill = sunday_fill
-                        # 其他情况保持默认背景（白色）
-                    except:
-                        # 如果日期解析失败，只检查数量
-                        if qty != 0:
-                            cell.fill = green_fill
-                
-                current_row += 1
-            
-            # 调整列宽
-            ws.column_dimensions['A'].width = 20  # 产品名称
-            ws.column_dimensions['B'].width = 15  # 规格
-            ws.column_dimensions['C'].width = 12  # 型号
-            ws.column_dimensions['D'].width = 15  # 项目名称
-            
-            # 设置日期列宽度
-            for col in range(5, len(headers_row1) + 1):
-                ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 10
-            
-            # 保存文件
-            wb.save(file_path)
-            QMessageBox.information(self, "成功", f"看板数据已导出到:\n{file_path}")
+                # 动态列数据（排产数量）：不为0的数据绿色背景，周日且为0的数据黄色背景
+                cells = product["cells"]
+                for date_str, sunday in zip(date_range, is_sunday):
+                    qty = cells.get(date_str, 0.0)
+                    values.append(qty)
+                    if qty != 0:
+                        styles.append("skb_qty")
+                    elif sunday:
+                        styles.append("skb_sunday_cell")
+                    else:
+                        styles.append("skb_cell")
+                sheet.append(values, styles)
             
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"导出看板数据失败: {str(e)}")
+            book.save(file_path)
     
     def import_kanban_data(self):
         """从Excel导入看板数据"""
@@ -2385,8 +2328,11 @@ class ProductionMRPWidget(QWidget):
         """)
         result_layout = QVBoxLayout(result_group)
         
-        # 创建表格
-        self.mrp_table = QTableWidget()
+        # 创建表格（Model/View：单元格按需渲染）
+        self.mrp_model = MRPBoardModel(self._fmt, self._cell_brush, parent=self)
+        self.mrp_table = QTableView()
+        self.mrp_table.setModel(self.mrp_model)
+        self.mrp_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         # 临时注释掉样式表来测试背景色问题
         # self.mrp_table.setStyleSheet("""
         #     QTableWidget {
@@ -2517,245 +2463,144 @@ class ProductionMRPWidget(QWidget):
             QMessageBox.critical(self, "错误", f"计算MRP失败: {str(e)}")
     
     def export_mrp_to_excel(self):
-        """导出MRP计算结果到Excel"""
+        """导出MRP计算结果到Excel（后台写出）"""
         if not self.current_order_id:
             QMessageBox.warning(self, "警告", "请先选择一个排产订单")
             return
         
         # 检查是否有MRP数据
-        if self.mrp_table.rowCount() == 0:
+        if self.mrp_model.rowCount() == 0:
             QMessageBox.warning(self, "警告", "没有MRP数据可导出，请先计算MRP")
             return
         
-        try:
-            # 获取文件保存路径
-            from datetime import datetime
-            file_path, _ = QFileDialog.getSaveFileName(
-                self, 
-                "导出MRP计算结果", 
-                f"生产MRP_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                "Excel文件 (*.xlsx)"
-            )
-            
-            if not file_path:
-                return
-            
-            # 执行导出
-            self._export_mrp_excel(file_path)
-            QMessageBox.information(self, "成功", f"MRP数据已导出到:\n{file_path}")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "导出失败", f"导出过程中发生错误：\n{str(e)}")
-    
-    def _export_mrp_excel(self, file_path: str):
-        """导出MRP数据到Excel文件的具体实现 - 完全按照看板格式"""
-        try:
-            import openpyxl
-            from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-            from openpyxl.utils import get_column_letter
-        except ImportError:
-            QMessageBox.warning(self, "警告", "需要安装openpyxl库才能导出Excel文件！\n请运行: pip install openpyxl")
-            return
+        # 获取文件保存路径
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, 
+            "导出MRP计算结果", 
+            f"生产MRP_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            "Excel文件 (*.xlsx)"
+        )
         
-        # 创建工作簿和工作表
-        wb = openpyxl.Workbook()
-        ws = wb.active
+        if not file_path:
+            return
         
-        # 获取计算类型
+        # 界面线程中取快照，写出在后台执行
+        snapshot = self.mrp_model.export_snapshot()
         calc_type_text = self.calc_type_combo.currentText()
-        ws.title = f"生产MRP_{calc_type_text}"
-        
-        # 获取表格数据
-        table = self.mrp_table
-        rows_count = table.rowCount()
-        cols_count = table.columnCount()
+        run_excel_export(
+            self,
+            lambda progress: self._write_mrp_excel(file_path, snapshot, calc_type_text, progress),
+            lambda _: QMessageBox.information(self, "成功", f"MRP数据已导出到:\n{file_path}"),
+            lambda e: QMessageBox.critical(self, "导出失败", f"导出过程中发生错误：\n{str(e)}"),
+        )
+    
+    def _export_mrp_excel(self, file_path: str, progress: Optional[Progress] = None):
+        """导出MRP数据到Excel文件的具体实现 - 完全按照看板格式"""
+        self._write_mrp_excel(file_path, self.mrp_model.export_snapshot(),
+                              self.calc_type_combo.currentText(), progress)
+    
+    @staticmethod
+    def _write_mrp_excel(file_path: str, snapshot: MRPBoardSnapshot, calc_type_text: str,
+                         progress: Optional[Progress] = None):
+        """按看板快照流式写出生产MRP（可在工作线程执行）"""
+        rows_count = snapshot.row_count()
+        cols_count = snapshot.column_count()
         
         if rows_count == 0 or cols_count == 0:
             raise ValueError("MRP数据为空")
         
-        # 构建表头 - 完全按照看板格式：第一行日期，第二行周几
-        # 第一行：固定列标题 + 日期标题
-        first_row = []
-        for col in range(cols_count):
-            header_item = table.horizontalHeaderItem(col)
-            if header_item:
-                first_row.append(header_item.text())
-            else:
-                first_row.append("")
+        weekday_names = ['一', '二', '三', '四', '五', '六', '日']
         
-        # 第二行：空行 + 周几
+        def header_date(date_data):
+            """表头 UserRole 中的完整日期（YYYY-MM-DD），不是日期返回 None"""
+            if date_data and len(date_data) == 10 and date_data.count('-') == 2:
+                try:
+                    return datetime.strptime(date_data, "%Y-%m-%d").date()
+                except:
+                    return None
+            return None
+        
+        # 构建表头 - 完全按照看板格式：第一行日期，第二行周几；周日列表头标黄
+        first_row = []
         second_row = []
-        for col in range(cols_count):
-            header_item = table.horizontalHeaderItem(col)
-            if header_item:
-                # 检查是否有UserRole数据（完整日期）
-                date_data = header_item.data(Qt.UserRole)
-                if date_data and len(date_data) == 10 and date_data.count('-') == 2:  # YYYY-MM-DD格式
-                    try:
-                        from datetime import datetime
-                        date_obj = datetime.strptime(date_data, "%Y-%m-%d").date()
-                        weekday_names = ['一', '二', '三', '四', '五', '六', '日']
-                        weekday_text = weekday_names[date_obj.weekday()]
-                        second_row.append(weekday_text)
-                    except:
-                        second_row.append("")
-                else:
-                    # 如果没有UserRole数据，尝试从第一行日期解析周几
-                    first_row_text = header_item.text()
-                    if first_row_text and len(first_row_text) == 5 and first_row_text.count('-') == 1:  # MM-DD格式
-                        try:
-                            from datetime import datetime
-                            # 假设是当前年份
-                            current_year = datetime.now().year
-                            date_str = f"{current_year}-{first_row_text}"
-                            date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                            weekday_names = ['一', '二', '三', '四', '五', '六', '日']
-                            weekday_text = weekday_names[date_obj.weekday()]
-                            second_row.append(weekday_text)
-                        except:
-                            second_row.append("")
-                    else:
-                        second_row.append("")
+        header_styles = []
+        for header_text, date_data in snapshot.headers:
+            first_row.append(header_text or "")
+            date_obj = header_date(date_data)
+            header_styles.append("pmrp_sunday" if date_obj and date_obj.weekday() == 6 else "pmrp_header")
+            if header_text is None:
+                second_row.append("")
+            elif date_data and len(date_data) == 10 and date_data.count('-') == 2:  # YYYY-MM-DD格式
+                second_row.append(weekday_names[date_obj.weekday()] if date_obj else "")
+            elif len(header_text) == 5 and header_text.count('-') == 1:  # MM-DD格式
+                # 如果没有UserRole数据，从第一行日期解析周几（假设是当前年份）
+                try:
+                    date_obj = datetime.strptime(f"{datetime.now().year}-{header_text}", "%Y-%m-%d").date()
+                    second_row.append(weekday_names[date_obj.weekday()])
+                except:
+                    second_row.append("")
             else:
                 second_row.append("")
         
-        # 写入两行表头
-        ws.append(first_row)
-        ws.append(second_row)
-        
-        # 写入数据行
-        for row in range(rows_count):
-            data_row = []
-            for col in range(cols_count):
-                item = table.item(row, col)
-                if item:
-                    data_row.append(item.text())
-                else:
-                    data_row.append("")
-            ws.append(data_row)
-        
-        # 设置样式 - 完全按照看板的背景色
-        # 定义颜色样式 - 与界面着色完全一致
-        green_fill = PatternFill(start_color="EBFCEF", end_color="EBFCEF", fill_type="solid")  # 生产计划绿色
-        red_fill = PatternFill(start_color="FFEBEE", end_color="FFEBEE", fill_type="solid")   # 库存不足红色
-        blue_fill = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")   # 合计列蓝色
-        sunday_fill = PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid") # 周日黄色
-        
-        # 定义字体样式
-        header_font = Font(name="Arial", bold=True, size=10)
-        normal_font = Font(name="Arial", size=9)
-        
-        # 定义对齐方式
-        center_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # 定义边框
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        # 设置表头样式
-        for col in range(1, cols_count + 1):
-            # 第一行表头
-            cell1 = ws.cell(row=1, column=col)
-            cell1.font = header_font
-            cell1.alignment = center_alignment
-            cell1.border = thin_border
-            
-            # 第二行表头（周几）
-            cell2 = ws.cell(row=2, column=col)
-            cell2.font = header_font
-            cell2.alignment = center_alignment
-            cell2.border = thin_border
-            
-            # 检查是否是周日列，设置黄色背景
-            header_item = table.horizontalHeaderItem(col - 1)
-            if header_item:
-                # 从UserRole的日期数据解析周几
-                date_data = header_item.data(Qt.UserRole)
-                if date_data and len(date_data) == 10 and date_data.count('-') == 2:  # YYYY-MM-DD格式
-                    try:
-                        from datetime import datetime
-                        date_obj = datetime.strptime(date_data, "%Y-%m-%d").date()
-                        if date_obj.weekday() == 6:  # 周日
-                            cell1.fill = sunday_fill
-                            cell2.fill = sunday_fill
-                    except:
-                        pass
-        
-        # 设置数据行样式和着色
-        for row in range(rows_count):
-            # 获取行类型（从"行别"列获取）
-            row_type = ""
-            row_type_col = 4 if calc_type_text == "成品MRP" else 2  # 行别列的位置
-            if row_type_col < cols_count:
-                row_type_item = table.item(row, row_type_col)
-                if row_type_item:
-                    row_type = row_type_item.text()
-            
-            # 设置行样式 - 按单元格着色
-            for col in range(1, cols_count + 1):
-                cell = ws.cell(row=row + 3, column=col)  # +3因为有两行表头
-                cell.font = normal_font
-                cell.alignment = center_alignment
-                cell.border = thin_border
-                
-                # 获取单元格数据
-                table_item = table.item(row, col - 1)
-                if table_item:
-                    cell_value = table_item.text()
-                    try:
-                        val_float = float(cell_value)
-                    except:
-                        val_float = 0
-                else:
-                    cell_value = ""
-                    val_float = 0
+        # 固定列不设置背景色：成品MRP前6列，综合MRP前5列，零部件MRP前4列
+        if calc_type_text == "成品MRP":
+            fixed_cols = 6
+        elif calc_type_text == "综合MRP":
+            fixed_cols = 5
+        else:
+            fixed_cols = 4
+        row_type_col = 4 if calc_type_text == "成品MRP" else 2  # 行别列的位置
+        
+        # 前5列（固定列）宽 12，周列宽 8
+        widths = {col: (12 if col <= 5 else 8) for col in range(1, cols_count + 1)}
+        
+        with StreamingWorkbook() as book:
+            # 颜色与界面着色完全一致
+            header_font = Font(name="Arial", bold=True, size=10)
+            normal_font = Font(name="Arial", size=9)
+            book.add_style("pmrp_header", font=header_font, border=THIN_BORDER, alignment=CENTER)
+            book.add_style("pmrp_sunday", font=header_font, fill=solid_fill("FFF3CD"),
+                           border=THIN_BORDER, alignment=CENTER)  # 周日黄色
+            book.add_style("pmrp_cell", font=normal_font, border=THIN_BORDER, alignment=CENTER)
+            book.add_style("pmrp_plan", font=normal_font, fill=solid_fill("EBFCEF"),
+                           border=THIN_BORDER, alignment=CENTER)  # 生产计划绿色
+            book.add_style("pmrp_short", font=normal_font, fill=solid_fill("FFEBEE"),
+                           border=THIN_BORDER, alignment=CENTER)  # 库存不足红色
+            book.add_style("pmrp_total", font=header_font, fill=solid_fill("DDEBF7"),
+                           border=THIN_BORDER, alignment=CENTER)  # 总计行蓝色
+            sheet = book.create_sheet(f"生产MRP_{calc_type_text}", column_widths=widths)
+            
+            sheet.append(first_row, header_styles)
+            sheet.append(second_row, header_styles)
+            
+            for row in report_rows(range(rows_count), rows_count, progress):
+                texts = snapshot.row_texts(row)
+                if row == rows_count - 1:
+                    # 最后一行（总计行）使用蓝色背景
+                    sheet.append(texts, "pmrp_total")
+                    continue
                 
-                # 按单元格着色逻辑
-                if row < rows_count - 1:  # 不是最后一行（总计行）
-                    # 判断是否是数据列（非标题列、期初库存列、总库存列）
-                    is_data_col = True
-                    if calc_type_text == "成品MRP":
-                        # 成品MRP: ["产品名称", "规格", "品牌", "项目名称", "行别", "期初库存"] + 数据列
-                        if col <= 6:  # 前6列是固定列，不设置背景色
-                            is_data_col = False
-                    elif calc_type_text == "综合MRP":
-                        # 综合MRP: ["产品名称", "规格", "行别", "期初库存", "总库存"] + 数据列
-                        if col <= 5:  # 前5列是固定列，不设置背景色
-                            is_data_col = False
-                    else:  # 零部件MRP
-                        # 零部件MRP: ["产品名称", "规格", "行别", "期初库存"] + 数据列
-                        if col <= 4:  # 前4列是固定列，不设置背景色
-                            is_data_col = False
-                    
-                    # 只有数据列才设置背景色
-                    if is_data_col:
+                row_type = texts[row_type_col] if row_type_col < cols_count else ""
+                styles = []
+                for col, text in enumerate(texts):
+                    style = "pmrp_cell"
+                    # 只有数据列才按单元格着色
+                    if col >= fixed_cols and row_type in ("生产计划", "即时库存"):
+                        try:
+                            val_float = float(text)
+                        except:
+                            val_float = 0
                         if row_type == "生产计划":
                             # 生产计划行：数字列不为0时绿色
                             if val_float != 0:
-                                cell.fill = green_fill
-                        elif row_type == "即时库存":
+                                style = "pmrp_plan"
+                        elif val_float <= 0:
                             # 即时库存行：数字列小于等于0时红色
-                            if val_float <= 0:
-                                cell.fill = red_fill
-                else:
-                    # 最后一行（总计行）使用蓝色背景
-                    cell.fill = blue_fill
-                    cell.font = header_font
-        
-        # 设置列宽
-        for col in range(1, cols_count + 1):
-            col_letter = get_column_letter(col)
-            if col <= 5:  # 前5列（固定列）
-                ws.column_dimensions[col_letter].width = 12
-            else:  # 周列
-                ws.column_dimensions[col_letter].width = 8
-        
-        # 保存文件
-        wb.save(file_path)
+                            style = "pmrp_short"
+                    styles.append(style)
+                sheet.append(texts, styles)
+            
+            book.save(file_path)
     
     def display_mrp_results(self, result):
         """显示MRP计算结果 - 与订单MRP管理保持一致"""
@@ -2788,67 +2633,11 @@ class ProductionMRPWidget(QWidget):
                 # 零部件MRP不显示品牌和项目名称
                 fixed_headers = ["产品名称", "规格", "行别", "期初库存"]
             
-            # 设置列数和标题
-            headers_count = len(fixed_headers) + len(colspec) + 1  # +1 for Total column
-            self.mrp_table.setColumnCount(headers_count)
-            
-            # 设置固定列标题
-            for i, title in enumerate(fixed_headers):
-                item = QTableWidgetItem(title)
-                self.mrp_table.setHorizontalHeaderItem(i, item)
-            
-            # 设置周列和年份合计列标题
-            base_col = len(fixed_headers)
-            for i, (kind, val) in enumerate(colspec):
-                if kind == "week":
-                    # val 现在是具体的订单日期 (YYYY-MM-DD)
-                    # CW位置显示日期，日期位置显示周几
-                    try:
-                        from datetime import datetime
-                        date_obj = datetime.strptime(val, "%Y-%m-%d").date()
-                        # CW位置显示日期 (MM-DD格式)
-                        date_text = date_obj.strftime("%m-%d")
-                        it = QTableWidgetItem(date_text)
-                        it.setData(Qt.UserRole, val)  # 存储具体的订单日期
-                    except:
-                        it = QTableWidgetItem(val)
-                else:
-                    it = QTableWidgetItem(f"{val}合计")
-                self.mrp_table.setHorizontalHeaderItem(base_col + i, it)
-            
-            # 设置总计列标题
-            self.mrp_table.setHorizontalHeaderItem(headers_count - 1, QTableWidgetItem("Total"))
-            
-            # 更新表头显示
-            try:
-                hdr = self.mrp_table.horizontalHeader()
-                hdr.updateGeometry()
-                hdr.repaint()
-            except Exception as e:
-                print(f"更新表头时出错: {e}")
-            
-            # 增加行用于显示总计行
-            calc_type = self.calc_type_combo.currentText()
-            if calc_type == "成品MRP":
-                # 成品MRP：数据行 + 生产计划总计行 + 即时库存总计行
-                self.mrp_table.setRowCount(len(rows) + 2)  # +2 for total rows
-            else:
-                # 零部件MRP：数据行 + 总计行
-                self.mrp_table.setRowCount(len(rows) + 1)  # +1 for total row
-            
-            # 设置颜色 - 与订单MRP管理保持一致
-            green_bg = QBrush(QColor(235, 252, 239))  # 生产计划绿色
-            red_bg = QBrush(QColor(255, 235, 238))     # 库存不足红色
-            blue_bg = QBrush(QColor(221, 235, 247))   # 合计列蓝色
-            
-            
-            # 数据行（从第一行开始）
-            for r, row in enumerate(rows):
-                actual_row = r  # 数据行从第一行开始
-                
-                # 基本信息列 - 根据计算类型显示不同的列
-                self._set_item(actual_row, 0, row.get("ItemName", ""))
-                self._set_item(actual_row, 1, row.get("ItemSpec", ""))
+            # 基本信息列文本 - 根据计算类型显示不同的列（数值列由模型按需格式化）
+            project_names = {}  # 品牌 → 项目名称，同一品牌只查询一次
+            fixed_values = []
+            for row in rows:
+                values = [str(row.get("ItemName", "")), str(row.get("ItemSpec", ""))]
                 
                 if calc_type == "成品MRP":
                     # 成品MRP显示品牌和项目名称
@@ -2857,197 +2646,40 @@ class ProductionMRPWidget(QWidget):
                     
                     # 如果ProjectName为空，根据商品品牌字段从项目映射表获取
                     if not project_name_value and brand_value:
-                        try:
-                            from app.services.project_service import ProjectService
-                            project_code = ProjectService.get_project_by_item_brand(brand_value)
-                            if project_code:
-                                mappings = ProjectService.get_project_mappings_by_project_code(project_code)
-                                if mappings:
-                                    project_name_value = mappings[0].get('ProjectName', project_code)
-                        except Exception as e:
-                            print(f"获取项目名称失败: {e}")
+                        if brand_value not in project_names:
+                            project_names[brand_value] = self._lookup_project_name(brand_value)
+                        project_name_value = project_names[brand_value]
                     
-                    
-                    self._set_item(actual_row, 2, brand_value)  # 品牌字段
-                    self._set_item(actual_row, 3, project_name_value)
-                    self._set_item(actual_row, 4, row.get("RowType", ""))  # 行别
-                    start_onhand_col = 5  # 期初库存列索引
-                elif calc_type == "综合MRP":
-                    # 综合MRP显示总库存列
-                    self._set_item(actual_row, 2, row.get("RowType", ""))  # 行别
-                    start_onhand_col = 3  # 期初库存列索引
+                    values += [str(brand_value), str(project_name_value), str(row.get("RowType", ""))]
                 else:
-                    # 零部件MRP不显示品牌和项目名称
-                    self._set_item(actual_row, 2, row.get("RowType", ""))  # 行别
-                    start_onhand_col = 3  # 期初库存列索引
+                    values.append(str(row.get("RowType", "")))  # 行别
                 
                 # 期初库存列：综合MRP显示"XXX+XXX"格式，其他显示数字
                 start_onhand = row.get("StartOnHand", 0)
                 if isinstance(start_onhand, str) and "+" in start_onhand:
-                    # 综合MRP的"XXX+XXX"格式，直接显示
-                    self._set_item(actual_row, start_onhand_col, start_onhand)
+                    values.append(start_onhand)
                 else:
-                    # 其他类型，格式化为数字
-                    self._set_item(actual_row, start_onhand_col, self._fmt(start_onhand))
+                    values.append(self._fmt(start_onhand))
                 
                 # 总库存列：只有综合MRP显示
                 if calc_type == "综合MRP":
-                    total_stock = row.get("TotalStock", 0)
-                    self._set_item(actual_row, start_onhand_col + 1, self._fmt(total_stock))
-                
-                # 基本信息列不设置背景色
-                
-                # 周数据列和年份合计列
-                row_total = 0
-                # 根据计算类型调整数据列开始位置
-                cursor_col = base_col
-                for kind, val in colspec:
-                    if kind == "week":
-                        val_float = float(row["cells"].get(val, 0.0))
-                        row_total += val_float
-                        
-                        # 创建表格项
-                        it = QTableWidgetItem(self._fmt(val_float))
-                        it.setFlags(it.flags() & ~Qt.ItemIsEditable)
-                        
-                        # 着色规则：
-                        # 1. 生产计划行：只要不为0就设置绿色背景
-                        # 2. 即时库存行：只要小于0就设置红色背景
-                        row_type = row.get("RowType", "")
-                        is_stock_row = (row_type == "即时库存")
-                        if not is_stock_row and val_float != 0:
-                            it.setBackground(green_bg)  # 生产计划不为0标绿
-                            it.setData(Qt.BackgroundRole, green_bg)  # 双重设置确保生效
-                        elif is_stock_row and val_float <= 0:
-                            it.setBackground(red_bg)    # 即时库存小于0标红
-                            it.setData(Qt.BackgroundRole, red_bg)  # 双重设置确保生效
-                        
-                        # 设置到表格中
-                        self.mrp_table.setItem(actual_row, cursor_col, it)
-                        
-                        # 验证背景色是否设置成功
-                        actual_item = self.mrp_table.item(actual_row, cursor_col)
-                        if actual_item:
-                            bg_color = actual_item.background()
-                        
-                        
-                    else:
-                        # 年份合计列 - val 现在是年份
-                        # 需要计算该年份所有日期的总和
-                        year_total = 0.0
-                        for kind2, val2 in colspec:
-                            if kind2 == "week":
-                                # val2 是具体的订单日期
-                                try:
-                                    from datetime import datetime
-                                    date_obj = datetime.strptime(val2, "%Y-%m-%d").date()
-                                    if date_obj.isocalendar()[0] == val:  # 同一年
-                                        year_total += float(row["cells"].get(val2, 0.0))
-                                except:
-                                    continue
-                        
-                        it = QTableWidgetItem(self._fmt(year_total))
-                        it.setBackground(blue_bg)  # 合计列标蓝色
-                        font = it.font()
-                        font.setBold(True)
-                        it.setFont(font)
-                        self.mrp_table.setItem(actual_row, cursor_col, it)
-                        row_total += year_total
-                    
-                    cursor_col += 1
-                
-                # 总计列
-                total_item = QTableWidgetItem(self._fmt(row_total))
-                total_item.setBackground(blue_bg)  # 总计列标蓝色
-                font = total_item.font()
-                font.setBold(True)
-                total_item.setFont(font)
-                self.mrp_table.setItem(actual_row, headers_count - 1, total_item)
+                    values.append(self._fmt(row.get("TotalStock", 0)))
+                fixed_values.append(values)
             
             # 总计行 - 与订单MRP管理保持一致
-            calc_type = self.calc_type_combo.currentText()
             if calc_type == "成品MRP":
-                # 成品MRP：两行总计行
-                # 第一行：生产计划总计
-                plan_total_row = len(rows)
-                self.mrp_table.setItem(plan_total_row, 0, QTableWidgetItem("生产计划TOTAL"))
-                self.mrp_table.setItem(plan_total_row, 1, QTableWidgetItem(""))
-                self.mrp_table.setItem(plan_total_row, 2, QTableWidgetItem(""))
-                self.mrp_table.setItem(plan_total_row, 3, QTableWidgetItem(""))
-                self.mrp_table.setItem(plan_total_row, 4, QTableWidgetItem("生产计划"))
-                self.mrp_table.setItem(plan_total_row, 5, QTableWidgetItem(""))
-                
-                # 第二行：即时库存总计
-                stock_total_row = len(rows) + 1
-                self.mrp_table.setItem(stock_total_row, 0, QTableWidgetItem("即时库存TOTAL"))
-                self.mrp_table.setItem(stock_total_row, 1, QTableWidgetItem(""))
-                self.mrp_table.setItem(stock_total_row, 2, QTableWidgetItem(""))
-                self.mrp_table.setItem(stock_total_row, 3, QTableWidgetItem(""))
-                self.mrp_table.setItem(stock_total_row, 4, QTableWidgetItem("即时库存"))
-                self.mrp_table.setItem(stock_total_row, 5, QTableWidgetItem(""))
-                
-                # 计算生产计划总计（只统计生产计划行）
-                for col in range(base_col, headers_count):
-                    plan_sum = 0
-                    for r in range(0, plan_total_row):  # 从0开始，没有日期行
-                        it = self.mrp_table.item(r, col)
-                        row_type_it = self.mrp_table.item(r, 4)  # 行别列
-                        try:
-                            if it and it.text().strip() and row_type_it and row_type_it.text() == "生产计划":
-                                plan_sum += float(it.text().replace(',', ''))
-                        except:
-                            pass
-                    item = QTableWidgetItem(self._fmt(plan_sum))
-                    font = item.font()
-                    font.setBold(True)
-                    item.setFont(font)
-                    item.setBackground(green_bg)  # 生产计划总计标绿色
-                    self.mrp_table.setItem(plan_total_row, col, item)
-                
-                # 计算即时库存总计（只统计即时库存行）
-                for col in range(base_col, headers_count):
-                    stock_sum = 0
-                    for r in range(0, stock_total_row):  # 从0开始，没有日期行
-                        it = self.mrp_table.item(r, col)
-                        row_type_it = self.mrp_table.item(r, 4)  # 行别列
-                        try:
-                            if it and it.text().strip() and row_type_it and row_type_it.text() == "即时库存":
-                                stock_sum += float(it.text().replace(',', ''))
-                        except:
-                            pass
-                    item = QTableWidgetItem(self._fmt(stock_sum))
-                    font = item.font()
-                    font.setBold(True)
-                    item.setFont(font)
-                    item.setBackground(red_bg)  # 即时库存总计标红色
-                    self.mrp_table.setItem(stock_total_row, col, item)
+                # 成品MRP：生产计划总计行 + 即时库存总计行
+                total_rows = [
+                    {"labels": {0: "生产计划TOTAL", 4: "生产计划"}, "row_type": "生产计划", "brush": GREEN_BG},
+                    {"labels": {0: "即时库存TOTAL", 4: "即时库存"}, "row_type": "即时库存", "brush": RED_BG},
+                ]
             else:
                 # 零部件MRP：一行总计行
-                total_row = len(rows)
-                self.mrp_table.setItem(total_row, 0, QTableWidgetItem("TOTAL"))
-                self.mrp_table.setItem(total_row, 1, QTableWidgetItem(""))
-                self.mrp_table.setItem(total_row, 2, QTableWidgetItem(""))
-                self.mrp_table.setItem(total_row, 3, QTableWidgetItem(""))
-                self.mrp_table.setItem(total_row, 4, QTableWidgetItem(""))
-                self.mrp_table.setItem(total_row, 5, QTableWidgetItem(""))
-                
-                # 计算总计行的数据
-                for col in range(base_col, headers_count):
-                    col_sum = 0
-                    for r in range(len(rows)):
-                        it = self.mrp_table.item(r, col)
-                        try:
-                            if it and it.text().strip():
-                                col_sum += float(it.text().replace(',', ''))
-                        except:
-                            pass
-                    
-                    item = QTableWidgetItem(self._fmt(col_sum))
-                    font = item.font()
-                    font.setBold(True)
-                    item.setFont(font)
-                    item.setBackground(blue_bg)  # 总计行标蓝色
-                    self.mrp_table.setItem(total_row, col, item)
+                total_rows = [{"labels": {0: "TOTAL"}, "row_type": None, "brush": BLUE_BG}]
+            
+            self.mrp_model.set_board(fixed_headers, fixed_values, rows, colspec,
+                                     self._week_header, total_rows)
+            headers_count = self.mrp_model.columnCount()
             
             # 设置列宽
             header = self.mrp_table.horizontalHeader()
@@ -3069,12 +2701,43 @@ class ProductionMRPWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "错误", f"显示MRP结果失败: {str(e)}")
     
-    def _set_item(self, row, col, text):
-        """设置表格项 - 与订单MRP管理保持一致"""
-        item = QTableWidgetItem(str(text))
-        item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-        self.mrp_table.setItem(row, col, item)
-        return item
+    @staticmethod
+    def _lookup_project_name(brand_value):
+        """根据商品品牌从项目映射表获取项目名称"""
+        try:
+            from app.services.project_service import ProjectService
+            project_code = ProjectService.get_project_by_item_brand(brand_value)
+            if project_code:
+                mappings = ProjectService.get_project_mappings_by_project_code(project_code)
+                if mappings:
+                    return mappings[0].get('ProjectName', project_code)
+        except Exception as e:
+            print(f"获取项目名称失败: {e}")
+        return ""
+    
+    @staticmethod
+    def _week_header(val):
+        """周列表头：CW位置显示日期(MM-DD)，UserRole存储具体的订单日期（表头据此显示周几）"""
+        try:
+            from datetime import datetime
+            date_obj = datetime.strptime(val, "%Y-%m-%d").date()
+            return date_obj.strftime("%m-%d"), val
+        except:
+            return val, None
+    
+    @staticmethod
+    def _cell_brush(row_type, value):
+        """
+        着色规则：
+        1. 生产计划行：只要不为0就设置绿色背景
+        2. 即时库存行：小于等于0设置红色背景
+        """
+        is_stock_row = (row_type == "即时库存")
+        if not is_stock_row and value != 0:
+            return GREEN_BG
+        if is_stock_row and value <= 0:
+            return RED_BG
+        return None
     
     def _build_week_columns_with_totals(self, weeks):
         """构建周列和年份合计列 - 只有跨年时才显示年份合计"""
@@ -3137,9 +2800,7 @@ class ProductionMRPWidget(QWidget):
     
     def clear_mrp_table(self):
         """清空MRP表格"""
-        self.mrp_table.clearContents()
-        self.mrp_table.setRowCount(0)
-        self.mrp_table.setColumnCount(0)
+        self.mrp_model.clear()
     
     def refresh_data(self):
         """刷新数据"""
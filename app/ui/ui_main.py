@@ -657,6 +657,10 @@ def main():
     window = MainWindow()
     window.show()
     
+    # 退出前停止后台加载（加载线程持有数据库连接）
+    from app.ui.async_loader import shutdown_loaders
+    app.aboutToQuit.connect(shutdown_loaders)
+    
     # 注册应用程序退出时的清理函数
     import atexit
     from app.db import cleanup_database
@@ -666,4 +670,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的程序使用进程池（如多文件订单解析）时需要
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
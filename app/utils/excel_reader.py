@@ -0,0 +1,107 @@
+# app/utils/excel_reader.py
+# -*- coding: utf-8 -*-
+"""
+Excel 流式读取工具
+基于 openpyxl 只读模式 + iter_rows(values_only=True)，逐行产出单元格值，
+不创建单元格对象、不一次性加载整表，大文件读取时内存基本恒定。
+供 BOM矩阵导入、BOM导入、物料导入、库存导入共用。
+"""
+
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def is_blank(value: Any) -> bool:
+    """空单元格：None、NaN 或仅含空白的字符串"""
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    if isinstance(value, str) and not value.strip():
+        return True
+    return False
+
+
+def cell_text(value: Any) -> str:
+    """单元格值转为去除首尾空白的字符串，空单元格返回 ""，整数值的浮点数不带 .0"""
+    if is_blank(value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def iter_sheet_rows(file_path: str, min_row: int = 1) -> Iterator[Tuple]:
+    """
+    逐行读取第一个（活动）工作表，产出单元格值元组（空单元格为 None）
+    - .xlsx/.xlsm：openpyxl 只读流式读取；不依赖文件中记录的表格尺寸，各行长度可能不同
+    - .xls：openpyxl 不支持，回退为 pandas 读取（NaN 转为 None）
+    """
+    if str(file_path).lower().endswith('.xls'):
+        import pandas as pd
+        df = pd.read_excel(file_path, header=None)
+        for values in df.iloc[min_row - 1:].itertuples(index=False, name=None):
+            yield tuple(None if is_blank(v) and not isinstance(v, str) else v for v in values)
+        return
+
+    import openpyxl
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        # 部分软件导出的文件尺寸信息不准确，重置后按实际内容读取
+        ws.reset_dimensions()
+        for row in ws.iter_rows(min_row=min_row, values_only=True):
+            yield row
+    finally:
+        # 只读模式会一直占用文件句柄，读完需显式关闭
+        wb.close()
+
+
+def header_columns(header_row: Iterable[Any]) -> List[str]:
+    """
+    表头行 → 列名列表（与 pandas 一致：空表头记为 "Unnamed: n"，重复列名追加 .1、.2）
+    """
+    columns = []
+    seen: Dict[str, int] = {}
+    for i, value in enumerate(header_row):
+        name = f"Unnamed: {i}" if is_blank(value) else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def iter_sheet_records(file_path: str) -> Tuple[List[str], Iterator[Tuple[int, Tuple]]]:
+    """
+    以首个非空行为表头读取工作表
+
+    Returns:
+        (列名列表, 数据行迭代器)；数据行为 (行序号, 与列名等长的值元组)，
+        行序号从 0 开始（表头之后第一行为 0），全空行跳过但保留序号
+    """
+    rows = iter_sheet_rows(file_path)
+    header: Optional[Tuple] = None
+    for row in rows:
+        if not all(is_blank(v) for v in row):
+            header = row
+            break
+    if header is None:
+        return [], iter(())
+
+    columns = header_columns(header)
+    # 去掉表头末尾的空列
+    while columns and is_blank(header[len(columns) - 1]):
+        columns.pop()
+
+    def records() -> Iterator[Tuple[int, Tuple]]:
+        width = len(columns)
+        for index, row in enumerate(rows):
+            values = tuple(row[:width]) + (None,) * (width - len(row))
+            if all(is_blank(v) for v in values):
+                continue
+            yield index, values
+
+    return columns, records()
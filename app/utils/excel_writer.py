@@ -0,0 +1,182 @@
+# app/utils/excel_writer.py
+# -*- coding: utf-8 -*-
+"""
+Excel 流式写出工具
+基于 openpyxl 只写模式（write_only）：行在追加时即写入临时文件，不在内存中保留整表单元格；
+样式按名称注册一次（NamedStyle），之后每个单元格只引用已缓存的样式，不再逐格创建 Font/Border/Fill。
+列宽、冻结窗格需在写入第一行之前设置（创建工作表时传入），合并单元格可随时登记。
+与 excel_reader 对应，供 MRP看板、生产MRP、客户订单看板、排产看板、BOM矩阵导出共用。
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from openpyxl import Workbook
+from openpyxl.cell import Cell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fills import DEFAULT_EMPTY_FILL
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+# 导出进度回调 progress(已完成, 总数)；界面导出时由后台任务传入，可在其中检查取消
+Progress = Callable[[int, int], None]
+
+THIN_SIDE = Side(style='thin')
+THIN_BORDER = Border(left=THIN_SIDE, right=THIN_SIDE, top=THIN_SIDE, bottom=THIN_SIDE)
+CENTER = Alignment(horizontal='center', vertical='center')
+
+
+def solid_fill(color: str) -> PatternFill:
+    """纯色填充，color 为 RRGGBB"""
+    return PatternFill(fill_type='solid', start_color=color, end_color=color)
+
+
+class StreamingSheet:
+    """只写工作表：逐行追加，每个单元格可指定一个已注册的样式名"""
+
+    def __init__(self, book: "StreamingWorkbook", ws):
+        self._book = book
+        self._ws = ws
+        self.row_count = 0
+
+    def append(self, values: Sequence[Any], styles: Union[None, str, Sequence[Optional[str]]] = None):
+        """
+        追加一行
+
+        Args:
+            values: 单元格值（None 为空单元格）
+            styles: 整行统一的样式名，或与 values 对应的样式名序列（None 表示不设样式）；
+                    设了样式的空单元格也会写出（保留边框、底色）
+        """
+        if styles is None:
+            self._ws.append(list(values))
+        else:
+            if isinstance(styles, str):
+                styles = [styles] * len(values)
+            cell_styles = self._book._cell_styles
+            row = []
+            for value, style in zip(values, styles):
+                if style is None:
+                    row.append(value)
+                else:
+                    row.append(Cell(self._ws, row=1, column=1, value=value, style_array=cell_styles[style]))
+            self._ws.append(row)
+        self.row_count += 1
+
+    def merge(self, range_string: str):
+        """登记合并区域（如 "A1:C1"），保存时写出"""
+        self._ws.merged_cells.add(range_string)
+
+
+class StreamingWorkbook:
+    """
+    只写工作簿
+    用法：
+        with StreamingWorkbook() as book:
+            book.add_style("header", font=Font(bold=True), border=THIN_BORDER)
+            sheet = book.create_sheet("Sheet", column_widths={1: 15}, freeze_panes="B2")
+            sheet.append(["标题"], "header")
+            book.save(file_path)
+    with 块内出现异常（含导出取消）时丢弃已写出的临时文件，不生成目标文件
+    """
+
+    def __init__(self):
+        self._wb = Workbook(write_only=True)
+        self._cell_styles: Dict[str, Any] = {}
+        self._sheets: List[StreamingSheet] = []
+        self._saved = False
+
+    def __enter__(self) -> "StreamingWorkbook":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.discard()
+        return False
+
+    def add_style(self, name: str, font: Optional[Font] = None, fill: Optional[PatternFill] = None,
+                  border: Optional[Border] = None, alignment: Optional[Alignment] = None,
+                  number_format: Optional[str] = None):
+        """注册命名样式（同名只注册一次），之后 append 时按名称引用；未指定的部分与默认单元格一致"""
+        if name in self._cell_styles:
+            return
+        style = NamedStyle(name=name, font=font or DEFAULT_FONT, fill=fill or DEFAULT_EMPTY_FILL,
+                           border=border or DEFAULT_BORDER)
+        if alignment is not None:
+            style.alignment = alignment
+        if number_format is not None:
+            style.number_format = number_format
+        self._wb.add_named_style(style)
+        # 通过一个模板单元格解析出样式索引，后续单元格直接复用
+        template = Cell(None, row=1, column=1)
+        template.parent = _StyleHost(self._wb)
+        template.style = name
+        self._cell_styles[name] = template._style
+
+    def has_style(self, name: str) -> bool:
+        return name in self._cell_styles
+
+    def create_sheet(self, title: str, column_widths: Optional[Dict[int, float]] = None,
+                     freeze_panes: Optional[str] = None) -> StreamingSheet:
+        """
+        新建工作表
+
+        Args:
+            title: 工作表名称
+            column_widths: 列号（从1开始）→ 列宽
+            freeze_panes: 冻结窗格左上角单元格（如 "C3"）
+        """
+        ws = self._wb.create_sheet(title)
+        for col, width in (column_widths or {}).items():
+            ws.column_dimensions[get_column_letter(col)].width = width
+        if freeze_panes:
+            ws.freeze_panes = freeze_panes
+        sheet = StreamingSheet(self, ws)
+        self._sheets.append(sheet)
+        return sheet
+
+    def save(self, file_path: str):
+        if not self._sheets:
+            self.create_sheet("Sheet")
+        self._wb.save(file_path)
+        self._saved = True
+
+    def discard(self):
+        """放弃未保存的工作簿，删除已写出行的临时文件"""
+        if self._saved:
+            return
+        self._saved = True
+        for sheet in self._sheets:
+            # openpyxl 内部：_rows 为逐行写入的生成器，_writer 持有临时文件
+            writer = getattr(sheet._ws, "_writer", None)
+            if writer is None:
+                continue
+            try:
+                if sheet._ws._rows is not None:
+                    sheet._ws._rows.close()
+                writer.close()
+                writer.cleanup()
+            except Exception:
+                pass
+
+
+class _StyleHost:
+    """模板单元格的宿主：解析命名样式只需要访问所属工作簿"""
+
+    def __init__(self, wb: Workbook):
+        self.parent = wb
+
+
+def report_rows(rows: Iterable[Any], total: int, progress: Optional[Progress], step: int = 200):
+    """遍历 rows 并每 step 行报告一次进度（progress 为 None 时不报告）"""
+    if progress is None:
+        yield from rows
+        return
+    progress(0, total)
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % step == 0:
+            progress(done, total)
+    progress(done, total)
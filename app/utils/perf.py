@@ -0,0 +1,217 @@
+# app/utils/perf.py
+# -*- coding: utf-8 -*-
+"""
+服务层性能埋点与分级日志
+- 埋点开关：环境变量 NDKJ_PROFILE=1，或运行时调用 set_profiling(True)；
+  关闭时 profiled/stage 只做一次布尔判断，不计时也不统计
+- profiled(name) 装饰器 / stage(name) 上下文管理器：按名称累计调用次数、耗时、
+  数据库查询次数与读取行数（查询数由 app.db 的查询函数通过 note_query 按线程上报）
+- report() 生成按总耗时排序的报告；埋点开启时程序退出自动输出一次（NDKJ_PROFILE_REPORT 指定文件时写入文件）
+- get_logger(name)：服务模块的分级日志，级别由 NDKJ_LOG_LEVEL 设置（默认 INFO），替代无条件 print
+"""
+
+import atexit
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+_enabled = os.environ.get("NDKJ_PROFILE", "").strip().lower() in _TRUE_VALUES
+_local = threading.local()
+_lock = threading.Lock()
+_logging_configured = False
+
+
+class _Metric:
+    """单个埋点名称的累计数据"""
+
+    __slots__ = ("count", "total", "max", "queries", "rows", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.errors = 0
+
+
+_metrics: Dict[str, _Metric] = {}
+
+
+# ---------------- 开关 ----------------
+def profiling_enabled() -> bool:
+    return _enabled
+
+
+def set_profiling(enabled: bool):
+    """运行时开关埋点（不清除已有统计）"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+# ---------------- 数据库计数 ----------------
+def note_query(rows: int = 0):
+    """记录一次数据库语句执行（由 app.db 调用，仅在埋点开启时）"""
+    _local.queries = getattr(_local, "queries", 0) + 1
+    _local.rows = getattr(_local, "rows", 0) + rows
+
+
+def _db_counters():
+    return getattr(_local, "queries", 0), getattr(_local, "rows", 0)
+
+
+# ---------------- 埋点 ----------------
+@contextmanager
+def stage(name: str):
+    """记录一段代码的耗时与数据库访问量；可嵌套，外层统计包含内层"""
+    if not _enabled:
+        yield
+        return
+    queries0, rows0 = _db_counters()
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        queries1, rows1 = _db_counters()
+        with _lock:
+            metric = _metrics.get(name)
+            if metric is None:
+                metric = _metrics[name] = _Metric()
+            metric.count += 1
+            metric.total += elapsed
+            metric.max = max(metric.max, elapsed)
+            metric.queries += queries1 - queries0
+            metric.rows += rows1 - rows0
+            if failed:
+                metric.errors += 1
+
+
+def profiled(name: Optional[str] = None):
+    """服务方法埋点装饰器，name 缺省为 模块.函数名"""
+    def decorator(func: Callable) -> Callable:
+        metric_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with stage(metric_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+# ---------------- 报告 ----------------
+def snapshot() -> List[Dict]:
+    """当前统计（按总耗时降序）"""
+    with _lock:
+        items = [(name, m.count, m.total, m.max, m.queries, m.rows, m.errors)
+                 for name, m in _metrics.items()]
+    items.sort(key=lambda x: x[2], reverse=True)
+    return [{"Name": name, "Count": count, "TotalMs": total * 1000.0,
+             "AvgMs": total * 1000.0 / count if count else 0.0, "MaxMs": mx * 1000.0,
+             "Queries": queries, "Rows": rows, "Errors": errors}
+            for name, count, total, mx, queries, rows, errors in items]
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+
+
+def _display_width(text: str) -> int:
+    """按终端显示宽度计算（中文等宽字符占 2 列）"""
+    return sum(2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1 for ch in text)
+
+
+def _pad(text, width: int, right: bool = False) -> str:
+    text = str(text)
+    fill = " " * max(width - _display_width(text), 0)
+    return fill + text if right else text + fill
+
+
+def format_table(headers: List[str], rows: List[List]) -> str:
+    """按显示宽度对齐的文本表格：首列左对齐，其余列右对齐"""
+    widths = [max(_display_width(str(row[i])) for row in [headers] + rows) for i in range(len(headers))]
+    return "\n".join("  ".join(_pad(value, widths[i], right=i > 0) for i, value in enumerate(row))
+                     for row in [headers] + rows)
+
+
+def report() -> str:
+    """文本报告：每个埋点一行"""
+    stats = snapshot()
+    if not stats:
+        return "（无性能统计数据）"
+    return format_table(
+        ["名称", "次数", "总耗时ms", "平均ms", "最大ms", "查询数", "读取行数", "异常"],
+        [[s["Name"], s["Count"], f"{s['TotalMs']:.1f}", f"{s['AvgMs']:.2f}", f"{s['MaxMs']:.1f}",
+          s["Queries"], s["Rows"], s["Errors"]] for s in stats])
+
+
+def dump_report(path: Optional[str] = None):
+    """输出报告：指定路径（或 NDKJ_PROFILE_REPORT）时追加写入文件，否则输出到日志"""
+    path = path or os.environ.get("NDKJ_PROFILE_REPORT")
+    text = f"===== 性能报告 {time.strftime('%Y-%m-%d %H:%M:%S')} =====\n{report()}\n"
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        get_logger(__name__).info(text)
+
+
+def _dump_at_exit():
+    if _enabled and _metrics:
+        try:
+            dump_report()
+        except Exception as e:
+            print(f"输出性能报告失败: {e}")
+
+
+atexit.register(_dump_at_exit)
+
+
+# ---------------- 日志 ----------------
+class _StdoutHandler(logging.StreamHandler):
+    """始终写入当前的 sys.stdout（与原 print 输出位置一致，stdout 被重定向时同样生效）"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    获取模块日志器（app.* 共用一个控制台输出）
+    NDKJ_LOG_LEVEL 可设为 DEBUG/INFO/WARNING/ERROR，逐步骤的调试输出为 DEBUG 级别
+    """
+    global _logging_configured
+    if not _logging_configured:
+        with _lock:
+            if not _logging_configured:
+                app_logger = logging.getLogger("app")
+                handler = _StdoutHandler()
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                app_logger.addHandler(handler)
+                level = getattr(logging, os.environ.get("NDKJ_LOG_LEVEL", "INFO").strip().upper(), None)
+                app_logger.setLevel(level if isinstance(level, int) else logging.INFO)
+                app_logger.propagate = False
+                _logging_configured = True
+    return logging.getLogger(name)
@@ -0,0 +1,232 @@
+# app/utils/sql_trace.py
+# -*- coding: utf-8 -*-
+"""
+SQL 语句跟踪与慢查询日志
+- 开关：环境变量 NDKJ_SQL_TRACE=1，或运行时调用 set_enabled(True)（数据库管理界面“查询统计”页可切换）；
+  关闭时 app.db 的查询函数只做一次布尔判断
+- 按“规范化 SQL”（字面量替换为 ?、IN 列表折叠、空白合并）聚合：执行次数、总/平均/最大耗时、
+  返回或影响的行数、参数形态（参数个数与类型）
+- 慢查询阈值：NDKJ_SLOW_SQL_MS（默认 100ms），超过阈值的语句记入慢查询次数并输出警告日志，
+  每条语句首次变慢时附带 EXPLAIN QUERY PLAN 执行计划
+- report(top_n) 生成按总耗时排序的前 N 条报告；开启时程序退出自动输出一次（NDKJ_SQL_TRACE_REPORT 指定文件时写入文件）
+"""
+
+import atexit
+import functools
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.utils.perf import format_table, get_logger
+
+logger = get_logger(__name__)
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+_enabled = os.environ.get("NDKJ_SQL_TRACE", "").strip().lower() in _TRUE_VALUES
+_slow_ms = _env_float("NDKJ_SLOW_SQL_MS", 100.0)
+_lock = threading.Lock()
+
+MAX_STATEMENTS = 2000     # 最多聚合的不同语句数，超出后计入“其他语句”
+MAX_SHAPES = 5            # 每条语句最多保留的参数形态数
+OTHER_STATEMENTS = "（其他语句）"
+
+
+class _Statement:
+    """单条规范化语句的累计数据"""
+
+    __slots__ = ("count", "total", "max", "rows", "slow", "shapes", "plan", "last_at")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.shapes: Dict[str, int] = {}
+        self.plan = ""
+        self.last_at = 0.0
+
+
+_statements: Dict[str, _Statement] = {}
+
+
+# ---------------- 开关 ----------------
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(flag: bool):
+    """运行时开关跟踪（不清除已有统计）"""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def slow_threshold_ms() -> float:
+    return _slow_ms
+
+
+def set_slow_threshold_ms(ms: float):
+    global _slow_ms
+    _slow_ms = max(float(ms), 0.0)
+
+
+# ---------------- 规范化 ----------------
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize(sql: str) -> str:
+    """规范化 SQL：去注释、字面量替换为 ?、IN (?, ?, ...) 折叠为 IN (?...)、合并空白"""
+    text = _COMMENT_RE.sub(" ", sql)
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("IN (?...)", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def param_shape(params: Any, batch: Optional[int] = None) -> str:
+    """参数形态：如 (int,str,None)、{:id,:name}；批量执行时为 批次数×(首组形态)"""
+    if isinstance(params, dict):
+        shape = "{" + ",".join(f":{k}" for k in sorted(params)) + "}"
+    elif isinstance(params, (list, tuple)):
+        if len(params) > 8:
+            shape = f"({len(params)}个参数)"
+        else:
+            shape = "(" + ",".join("None" if p is None else type(p).__name__ for p in params) + ")"
+    else:
+        shape = "()" if params is None else f"({type(params).__name__})"
+    return f"{batch}×{shape}" if batch is not None else shape
+
+
+def format_plan(plan_rows: Sequence[Tuple[int, int, str]]) -> str:
+    """EXPLAIN QUERY PLAN 结果 (id, parent, detail) → 缩进树文本"""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, detail in plan_rows:
+        level = depth.get(parent, -1) + 1
+        depth[node_id] = level
+        lines.append("  " * level + detail)
+    return "\n".join(lines)
+
+
+# ---------------- 记录 ----------------
+def record(sql: str, params: Any, elapsed: float, rows: int,
+           explain: Optional[Callable[[], Sequence[Tuple[int, int, str]]]] = None,
+           batch: Optional[int] = None):
+    """
+    记录一次语句执行（由 app.db 调用，仅在跟踪开启时）
+
+    Args:
+        elapsed: 耗时（秒）
+        rows: 返回或影响的行数
+        explain: 慢查询时获取执行计划的回调，返回 (id, parent, detail) 列表
+        batch: 批量执行（executemany）的批次数
+    """
+    rows = max(rows, 0)
+    key = normalize(sql)
+    shape = param_shape(params, batch)
+    elapsed_ms = elapsed * 1000.0
+    is_slow = elapsed_ms >= _slow_ms
+    with _lock:
+        stmt = _statements.get(key)
+        if stmt is None:
+            if len(_statements) >= MAX_STATEMENTS:
+                key = OTHER_STATEMENTS
+                stmt = _statements.get(key)
+            if stmt is None:
+                stmt = _statements[key] = _Statement()
+        stmt.count += 1
+        stmt.total += elapsed
+        stmt.max = max(stmt.max, elapsed)
+        stmt.rows += rows
+        stmt.last_at = time.time()
+        if shape in stmt.shapes or len(stmt.shapes) < MAX_SHAPES:
+            stmt.shapes[shape] = stmt.shapes.get(shape, 0) + 1
+        if is_slow:
+            stmt.slow += 1
+        need_plan = is_slow and not stmt.plan and explain is not None and key != OTHER_STATEMENTS
+
+    if not is_slow:
+        return
+    if need_plan:
+        try:
+            plan = format_plan(explain()) or "（无执行计划）"
+        except Exception as e:
+            plan = f"（获取执行计划失败: {e}）"
+        with _lock:
+            stmt.plan = plan
+        logger.warning("慢查询 %.1fms，%d 行，参数%s：%s\n执行计划：\n%s", elapsed_ms, rows, shape, key, plan)
+    else:
+        logger.warning("慢查询 %.1fms，%d 行，参数%s：%s", elapsed_ms, rows, shape, key)
+
+
+# ---------------- 统计 ----------------
+def stats(top_n: Optional[int] = None) -> List[Dict]:
+    """按总耗时降序的语句统计"""
+    with _lock:
+        items = [(sql, s.count, s.total, s.max, s.rows, s.slow, dict(s.shapes), s.plan, s.last_at)
+                 for sql, s in _statements.items()]
+    items.sort(key=lambda x: x[2], reverse=True)
+    if top_n is not None:
+        items = items[:top_n]
+    return [{"Sql": sql, "Count": count, "TotalMs": total * 1000.0,
+             "AvgMs": total * 1000.0 / count if count else 0.0, "MaxMs": mx * 1000.0,
+             "Rows": rows, "Slow": slow,
+             "Shapes": sorted(shapes.items(), key=lambda x: x[1], reverse=True),
+             "Plan": plan, "LastAt": last_at}
+            for sql, count, total, mx, rows, slow, shapes, plan, last_at in items]
+
+
+def reset():
+    with _lock:
+        _statements.clear()
+
+
+def report(top_n: int = 20, sql_width: int = 100) -> str:
+    """文本报告：总耗时前 N 条语句"""
+    top = stats(top_n)
+    if not top:
+        return "（无SQL跟踪数据）"
+    rows = []
+    for s in top:
+        sql = s["Sql"] if len(s["Sql"]) <= sql_width else s["Sql"][:sql_width - 3] + "..."
+        rows.append([sql, s["Count"], f"{s['TotalMs']:.1f}", f"{s['AvgMs']:.2f}", f"{s['MaxMs']:.1f}",
+                     s["Rows"], s["Slow"], s["Shapes"][0][0] if s["Shapes"] else ""])
+    return format_table(["SQL", "次数", "总耗时ms", "平均ms", "最大ms", "行数", "慢查询", "参数形态"], rows)
+
+
+def dump_report(path: Optional[str] = None, top_n: int = 20):
+    """输出报告：指定路径（或 NDKJ_SQL_TRACE_REPORT）时追加写入文件，否则输出到日志"""
+    path = path or os.environ.get("NDKJ_SQL_TRACE_REPORT")
+    text = f"===== SQL跟踪报告 {time.strftime('%Y-%m-%d %H:%M:%S')}（慢查询阈值 {_slow_ms:g}ms）=====\n{report(top_n)}\n"
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        logger.info(text)
+
+
+def _dump_at_exit():
+    if _enabled and _statements:
+        try:
+            dump_report()
+        except Exception as e:
+            print(f"输出SQL跟踪报告失败: {e}")
+
+
+atexit.register(_dump_at_exit)
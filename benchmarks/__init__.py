@@ -0,0 +1,15 @@
+# benchmarks/__init__.py
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+- synthetic：按规模参数生成合成数据库（物料、多层BOM、客户订单、排产、仓库库存）及导入用文件
+- mrp_benchmark：在合成数据库上计时 MRP 计算与导入入口，结果写入 JSON 以便跨版本比较
+- import_fixtures：按规模参数生成 NDLUtil 发布 TXT、BOM 矩阵 Excel、库存盘点 CSV/Excel
+- import_benchmark：计时各导入器的解析与入库，输出吞吐量（行/秒）
+- common：计时用例、重复运行统计、结果比较
+
+用法：
+    python -m benchmarks.mrp_benchmark --items 5000 --bom-depth 4 --fan-out 8 --output bench.json
+    python -m benchmarks.mrp_benchmark --compare bench_old.json --output bench_new.json
+    python -m benchmarks.import_benchmark --suppliers 20 --inventory-rows 200000 --output import.json
+"""
@@ -0,0 +1,109 @@
+# benchmarks/common.py
+# -*- coding: utf-8 -*-
+"""
+基准测试公共部分：计时用例、重复运行统计、运行环境信息、结果比较
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class BenchmarkCase:
+    """一个计时用例：setup 不计时，size 由 run 的返回值得出结果规模（MRP 行数/导入记录数）"""
+
+    def __init__(self, name: str, run: Callable, setup: Optional[Callable] = None,
+                 size: Callable = lambda result: len(result.get("rows", []))):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.size = size
+
+
+def run_case(case: BenchmarkCase, repeat: int) -> Dict:
+    """运行一个用例 repeat 次（另加一次不计入的预热）"""
+    from app.utils import perf
+
+    timings = []
+    size = None
+    queries = rows = 0
+    for i in range(repeat + 1):
+        if case.setup:
+            case.setup()
+        perf.reset()
+        start = time.perf_counter()
+        with perf.stage(case.name):
+            result = case.run()
+        elapsed = time.perf_counter() - start
+        if isinstance(result, dict) and result.get("error"):
+            raise RuntimeError(f"{case.name} 失败: {result['error']}")
+        if i == 0:
+            continue  # 预热：模块导入、首次连接等一次性开销
+        timings.append(elapsed * 1000.0)
+        size = case.size(result)
+        stat = next((s for s in perf.snapshot() if s["Name"] == case.name), None)
+        if stat:
+            queries, rows = stat["Queries"], stat["Rows"]
+    return {
+        "name": case.name,
+        "repeat": repeat,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "result_size": size,
+        "queries": queries,
+        "rows_read": rows,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment(label: str = "") -> Dict:
+    """写入结果文件的版本与运行环境信息"""
+    return {
+        "label": label,
+        "git_revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+
+
+def write_report(report: Dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {path}")
+
+
+def compare(results: List[Dict], baseline_path: str) -> str:
+    """与旧结果文件比较中位耗时"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f).get("results", [])}
+    lines = [f"{'用例':<62} {'旧中位ms':>10} {'新中位ms':>10} {'比值':>7}"]
+    for r in results:
+        old = baseline.get(r["name"])
+        if not old:
+            lines.append(f"{r['name']:<62} {'-':>10} {r['median_ms']:>10.1f} {'-':>7}")
+            continue
+        ratio = r["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        lines.append(f"{r['name']:<62} {old['median_ms']:>10.1f} {r['median_ms']:>10.1f} {ratio:>6.2f}x")
+    return "\n".join(lines)
+
+
+def cleanup_app_database():
+    """关闭 app.db 的连接池（仅在 app.db 已被导入时）"""
+    if "app.db" in sys.modules:
+        sys.modules["app.db"].cleanup_database()
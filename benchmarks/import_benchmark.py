@@ -0,0 +1,196 @@
+# benchmarks/import_benchmark.py
+# -*- coding: utf-8 -*-
+"""
+导入器吞吐量基准
+- 按命令行规模参数生成导入文件（benchmarks.import_fixtures）：NDLUtil 发布 TXT、BOM 矩阵 Excel、
+  库存盘点 CSV（默认 GBK）与 Excel，以及含对应物料主数据的数据库（通过 NDKJ_DB_PATH 让 app.db 使用）
+- 每种文件分别计时“解析”（只读文件、不写库）和“导入”（完整入库，每次运行前恢复数据库），
+  吞吐量 = 输入数据行数 / 中位耗时
+- 结果写入 JSON；--compare 指定旧结果文件时输出中位耗时对比
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import fields
+from typing import Dict, List
+
+from benchmarks.common import BenchmarkCase, cleanup_app_database, compare, environment, run_case, write_report
+from benchmarks.import_fixtures import ImportFixtureConfig, build_database, fixture_info, write_fixtures
+
+
+def _read_inventory_csv(path: str):
+    """库存导入读取 CSV 的步骤：编码检测后按候选编码依次尝试 pandas 读取"""
+    import pandas as pd
+    from app.services.inventory_import_service import InventoryImportService
+
+    detected = InventoryImportService.detect_file_encoding(path)
+    for encoding in dict.fromkeys([detected, "utf-8-sig", "utf-8", "gbk", "gb18030"]):
+        if encoding is None:
+            continue
+        try:
+            return pd.read_csv(path, header=0, encoding=encoding)
+        except UnicodeDecodeError:
+            continue
+    raise RuntimeError(f"无法读取CSV文件: {path}")
+
+
+def _read_inventory_xlsx(path: str) -> int:
+    """库存导入读取 Excel 的步骤：流式遍历全部数据行"""
+    from app.utils.excel_reader import iter_sheet_records
+
+    _, records = iter_sheet_records(path)
+    return sum(1 for _ in records)
+
+
+def build_cases(files: Dict[str, str], pristine_db: str) -> List[BenchmarkCase]:
+    """
+    基准用例列表（导入 app 模块需在设置 NDKJ_DB_PATH 之后）
+    每个用例的 size 为结果规模；输入行数由 input_rows 单独统计
+    """
+    from app.db import restore_database
+    from app.services.bom_matrix_import_service import BomMatrixImportService
+    from app.services.customer_order_service import CustomerOrderService
+    from app.services.inventory_import_service import InventoryImportService
+
+    def restore():
+        restore_database(pristine_db)
+
+    def matrix_components(result) -> int:
+        parsed, errors = result
+        if errors:
+            raise RuntimeError(f"矩阵解析失败: {errors[:3]}")
+        return len(parsed["components"])
+
+    def inventory_details(result) -> int:
+        if not result[0]:
+            raise RuntimeError(f"库存导入失败: {result[1]}")
+        return len(result[2])
+
+    def import_releases() -> int:
+        """逐个导入按供应商拆分的发布文件，返回导入批次数"""
+        for path in releases:
+            ok, message, _ = CustomerOrderService.import_orders_from_txt(path, "benchmark")
+            if not ok:
+                raise RuntimeError(f"订单导入失败: {message}")
+        return len(releases)
+
+    txt, matrix = files["release_txt"], files["bom_matrix_xlsx"]
+    releases = release_files(files)
+    inv_csv, inv_xlsx = files["inventory_csv"], files["inventory_xlsx"]
+    return [
+        # (orders, order_lines) → 计划行数
+        BenchmarkCase("NDLUtil TXT 解析", lambda: CustomerOrderService.parse_txt_order_file(txt),
+                      size=lambda result: len(result[1])),
+        # [(文件, orders, order_lines), ...] → 计划行数
+        BenchmarkCase("NDLUtil TXT 批量解析", lambda: CustomerOrderService.parse_txt_order_files(releases),
+                      size=lambda result: sum(len(r[2]) for r in result)),
+        BenchmarkCase("NDLUtil TXT 导入", import_releases, restore, size=lambda result: result),
+        BenchmarkCase("BOM矩阵 解析", lambda: BomMatrixImportService.parse_matrix_excel(matrix),
+                      size=matrix_components),
+        # (成功数量, 错误, 警告) → 成功处理的矩阵单元格数
+        BenchmarkCase("BOM矩阵 导入", lambda: BomMatrixImportService.import_matrix_excel(matrix),
+                      restore, size=lambda result: result[0]),
+        BenchmarkCase("库存CSV 读取", lambda: _read_inventory_csv(inv_csv), size=len),
+        # (成功, 消息, 明细, 累计物资) → 明细条数
+        BenchmarkCase("库存CSV 导入", lambda: InventoryImportService.import_inventory_from_file(inv_csv),
+                      restore, size=inventory_details),
+        BenchmarkCase("库存Excel 读取", lambda: _read_inventory_xlsx(inv_xlsx), size=lambda result: result),
+        BenchmarkCase("库存Excel 导入", lambda: InventoryImportService.import_inventory_from_file(inv_xlsx),
+                      restore, size=inventory_details),
+    ]
+
+
+def release_files(files: Dict[str, str]) -> List[str]:
+    directory = files["release_dir"]
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
+
+
+def input_rows(config: ImportFixtureConfig, files: Dict[str, str]) -> Dict[str, int]:
+    """
+    各文件的输入数据行数（吞吐量的分子）：TXT 为计划行，矩阵为零部件行，盘点表为数据行（含合计行）
+    多供应商文件与按供应商拆分的文件内容相同，计划行数一致
+    """
+    from app.services.customer_order_service import CustomerOrderService
+
+    _, order_lines = CustomerOrderService.parse_txt_order_file(files["release_txt"])
+    return {
+        "NDLUtil TXT": len(order_lines),
+        "BOM矩阵": config.matrix_components,
+        "库存CSV": config.inventory_rows + 1,
+        "库存Excel": config.inventory_rows + 1,
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="导入器吞吐量基准测试")
+    defaults = ImportFixtureConfig()
+    for f in fields(ImportFixtureConfig):
+        parser.add_argument("--" + f.name.replace("_", "-"), type=type(getattr(defaults, f.name)),
+                            default=getattr(defaults, f.name))
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例的计时次数")
+    parser.add_argument("--only", default="", help="只运行名称包含该文本的用例")
+    parser.add_argument("--workdir", default="", help="数据库与导入文件目录（默认临时目录，结束后删除）")
+    parser.add_argument("--label", default="", help="写入结果的版本标签")
+    parser.add_argument("--output", default="", help="结果 JSON 文件路径")
+    parser.add_argument("--compare", default="", help="旧结果 JSON 文件，输出中位耗时对比")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    config = ImportFixtureConfig(**{f.name: getattr(args, f.name) for f in fields(ImportFixtureConfig)})
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ndkj_import_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        db_path = os.path.join(workdir, "import_bench.db")
+        pristine_db = os.path.join(workdir, "import_bench_pristine.db")
+
+        started = time.perf_counter()
+        counts = build_database(db_path, config)
+        files = write_fixtures(workdir, config)
+        shutil.copy2(db_path, pristine_db)
+        sizes = {key: os.path.getsize(path) for key, path in files.items() if os.path.isfile(path)}
+        sizes["release_dir"] = sum(os.path.getsize(path) for path in release_files(files))
+        print(f"导入文件生成完成（{time.perf_counter() - started:.1f}s）：{counts}，文件字节数 {sizes}")
+
+        # app.db 在导入时按 NDKJ_DB_PATH 打开数据库
+        os.environ["NDKJ_DB_PATH"] = db_path
+        from app.utils import perf
+        perf.set_profiling(True)
+
+        rows_by_file = input_rows(config, files)
+        results = []
+        for case in build_cases(files, pristine_db):
+            if args.only and args.only not in case.name:
+                continue
+            result = run_case(case, max(1, args.repeat))
+            result["input_rows"] = rows_by_file[case.name.rsplit(" ", 1)[0]]
+            result["rows_per_sec"] = round(result["input_rows"] / (result["median_ms"] / 1000.0), 1) \
+                if result["median_ms"] else None
+            results.append(result)
+            print(f"{result['name']:<20} 中位 {result['median_ms']:>9.1f} ms  "
+                  f"{result['input_rows']:>8} 行  {result['rows_per_sec'] or 0:>12,.0f} 行/秒  "
+                  f"查询 {result['queries']:>6}  规模 {result['result_size']}")
+        perf.set_profiling(False)
+        perf.reset()
+
+        report = dict(environment(args.label), fixtures=dict(fixture_info(config), file_bytes=sizes),
+                      results=results)
+        if args.output:
+            write_report(report, args.output)
+        if args.compare:
+            print(compare(results, args.compare))
+        return 0
+    finally:
+        if not args.workdir:
+            cleanup_app_database()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+# benchmarks/import_fixtures.py
+# -*- coding: utf-8 -*-
+"""
+导入基准的输入文件
+- write_release_txt：NDLUtil 发布文件（多供应商、每个供应商多个物料，Daily/Weekly/Monthly 计划行混合，
+  含千分位/小数数量、表头行、分页行等不匹配任何规则的噪声行），格式与 customer_order_parser_ndlutil 的 RE_* 规则一致；
+  另按供应商各写一个文件（导入时 CustomerOrders 按 导入ID+CW+年份 唯一，一次导入只能包含一个供应商）
+- write_bom_matrix_xlsx：parse_matrix_excel 布局的宽矩阵（第1-4行为成品代码/名称/规格/品牌，第5行起为零部件用量）
+- write_inventory_csv / write_inventory_xlsx：库存盘点表（物料代码/物料名称/规格型号/基本单位数量 等列，
+  含重复物料、代码写法差异、未知物料，末行为合计），CSV 默认 GBK 编码
+- build_database：新建数据库并写入矩阵成品与零部件主数据，使矩阵导入和库存导入能匹配到物料
+相同配置（含随机种子）生成的文件完全一致
+"""
+
+import csv
+import os
+import random
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from benchmarks.synthetic import QTY_PER_CHOICES, create_database
+
+INVENTORY_HEADERS = ["物料代码", "物料名称", "规格型号", "仓库", "批号", "基本单位", "基本单位数量"]
+
+
+@dataclass
+class ImportFixtureConfig:
+    """导入文件规模"""
+    suppliers: int = 8                 # 发布文件中的供应商段数
+    items_per_supplier: int = 60       # 每个供应商的物料数（Item Number 段）
+    daily_lines: int = 14              # 每个物料的 Daily 计划行数（逐日）
+    weekly_lines: int = 16             # 每个物料的 Weekly 计划行数（逐周，接在日计划之后）
+    monthly_lines: int = 6             # 每个物料的 Monthly 计划行数（逐月，接在周计划之后）
+    matrix_products: int = 80          # BOM 矩阵的成品列数
+    matrix_components: int = 1500      # BOM 矩阵的零部件行数
+    matrix_density: float = 0.05       # 矩阵中有用量的单元格比例
+    catalog_items: int = 5000          # 零部件主数据规模（矩阵零部件与库存物料取自其中）
+    inventory_rows: int = 30000        # 库存盘点表行数（不含表头与合计行）
+    duplicate_ratio: float = 0.1       # 与前面某行重复的物料比例（导入时按代码+规格累计）
+    unknown_ratio: float = 0.02        # 系统中不存在的物料比例
+    csv_encoding: str = "gbk"
+    start_date: str = "2025-01-06"
+    seed: int = 20250107
+
+
+def catalog_rows(config: ImportFixtureConfig) -> List[Tuple]:
+    """零部件主数据 (ItemCode, CnName, ItemSpec, ItemType, Brand)：K3 风格的点分代码，约一成为半成品"""
+    rows = []
+    for i in range(max(config.catalog_items, config.matrix_components)):
+        item_type = "SFG" if i % 10 == 9 else "RM"
+        prefix = "2" if item_type == "SFG" else "1"
+        rows.append((f"{prefix}.{i // 1000 + 1:02d}.{i % 1000:04d}", f"零部件{i:05d}",
+                     f"SP-{i:05d}-{i % 7}", item_type, None))
+    return rows
+
+
+def product_rows(config: ImportFixtureConfig) -> List[Tuple]:
+    """矩阵成品主数据 (ItemCode, CnName, ItemSpec, ItemType, Brand)"""
+    return [(f"3.01.{j:04d}", f"成品{j:04d}", f"FG-SP-{j:04d}", "FG", f"NB{j:04d}")
+            for j in range(config.matrix_products)]
+
+
+def build_database(path: str, config: ImportFixtureConfig = None) -> Dict[str, int]:
+    """新建数据库（已存在的文件会被覆盖）并写入成品与零部件主数据，返回各表行数"""
+    config = config or ImportFixtureConfig()
+    conn = create_database(path)
+    try:
+        with conn:
+            conn.executemany("""
+                INSERT INTO Items (ItemCode, CnName, ItemSpec, ItemType, Brand)
+                VALUES (?, ?, ?, ?, ?)
+            """, product_rows(config) + catalog_rows(config))
+        conn.execute("ANALYZE")
+        conn.commit()
+        return {"Items": conn.execute("SELECT COUNT(*) FROM Items").fetchone()[0]}
+    finally:
+        conn.close()
+
+
+def write_fixtures(directory: str, config: ImportFixtureConfig = None) -> Dict[str, str]:
+    """
+    写出全部导入文件
+    Returns:
+        {"release_txt": 多供应商文件, "release_dir": 按供应商拆分的文件目录,
+         "bom_matrix_xlsx": 路径, "inventory_csv": 路径, "inventory_xlsx": 路径}
+    """
+    config = config or ImportFixtureConfig()
+    os.makedirs(directory, exist_ok=True)
+    files = {
+        "release_txt": os.path.join(directory, "release.txt"),
+        "release_dir": os.path.join(directory, "releases"),
+        "bom_matrix_xlsx": os.path.join(directory, "bom_matrix.xlsx"),
+        "inventory_csv": os.path.join(directory, "inventory.csv"),
+        "inventory_xlsx": os.path.join(directory, "inventory.xlsx"),
+    }
+    write_release_txt(files["release_txt"], config)
+    os.makedirs(files["release_dir"], exist_ok=True)
+    for s in range(config.suppliers):
+        write_release_txt(os.path.join(files["release_dir"], f"release_SUP{s + 1:03d}.txt"), config, [s])
+    write_bom_matrix_xlsx(files["bom_matrix_xlsx"], config)
+    write_inventory_csv(files["inventory_csv"], config)
+    write_inventory_xlsx(files["inventory_xlsx"], config)
+    return files
+
+
+def fixture_info(config: ImportFixtureConfig) -> Dict:
+    """写入结果文件的规模信息"""
+    plan_lines = config.daily_lines + config.weekly_lines + config.monthly_lines
+    return {
+        "config": asdict(config),
+        "release_plan_lines": config.suppliers * config.items_per_supplier * plan_lines,
+        "matrix_cells": config.matrix_products * config.matrix_components,
+    }
+
+
+# ---------------- NDLUtil 发布文件 ----------------
+def _mmddyy(d: date) -> str:
+    return d.strftime("%m/%d/%y")
+
+
+def _release_qty(rng: random.Random) -> str:
+    """计划数量原文：多数为整数（大数带千分位），少量小数与 0"""
+    roll = rng.random()
+    if roll < 0.05:
+        return "0"
+    if roll < 0.15:
+        return f"{rng.uniform(1, 500):.2f}"
+    return f"{rng.randint(1, 60) * 120:,}"
+
+
+def _plan_dates(config: ImportFixtureConfig) -> List[Tuple[str, date]]:
+    """(Daily/Weekly/Monthly, 日期)：日计划逐日，之后周计划逐周，再之后月计划每 4 周"""
+    start = date.fromisoformat(config.start_date)
+    dates = [("Daily", start + timedelta(days=i)) for i in range(config.daily_lines)]
+    week_start = start + timedelta(days=max(config.daily_lines, 1) + 6)
+    dates += [("Weekly", week_start + timedelta(weeks=i)) for i in range(config.weekly_lines)]
+    month_start = week_start + timedelta(weeks=config.weekly_lines + 1)
+    dates += [("Monthly", month_start + timedelta(weeks=4 * i)) for i in range(config.monthly_lines)]
+    return dates
+
+
+def iter_release_lines(config: ImportFixtureConfig, suppliers: Iterable[int] = None) -> Iterator[str]:
+    """逐行产出 NDLUtil 发布文件内容（suppliers 为供应商序号，默认全部）；同一供应商的内容与所在文件无关"""
+    plan_dates = _plan_dates(config)
+    release_date = _mmddyy(date.fromisoformat(config.start_date) - timedelta(days=4))
+    page = 1
+    for s in (range(config.suppliers) if suppliers is None else suppliers):
+        rng = random.Random(config.seed * 1000 + s)
+        yield f"Supplier: SUP{s + 1:03d}"
+        yield f"   NINGBO SUPPLIER {s + 1:03d} MANUFACTURING CO LTD"
+        yield "   NO. 88 INDUSTRIAL ROAD"
+        yield f"Ship-To: PLANT {s % 3 + 1}"
+        yield f"Release ID: REL-{s + 1:04d}   Release Date: {release_date}"
+        yield f"Purchase Order: PO{10000 + s}"
+        yield f"Receipt Quantity: {rng.randint(0, 5000):,}   Cum Received: {rng.uniform(1e4, 1e6):,.1f}"
+        for i in range(config.items_per_supplier):
+            yield ""
+            yield f"Item Number: R{s + 1:02d}{i:04d}E"
+            if i % 5 == 0:
+                # 少数物料有自己的采购订单号，覆盖供应商段的默认值
+                yield f"Purchase Order: PO{10000 + s}-{i:04d}"
+            yield "   Date       F/P   Quantity   Comment"
+            for kind, d in plan_dates:
+                line = f"   {kind} {_mmddyy(d)}  {rng.choice('FFFP')}  {_release_qty(rng)}"
+                if rng.random() < 0.05:
+                    line += "   FIRM ORDER"
+                yield line
+            if i % 20 == 19:
+                page += 1
+                yield f"Page {page}"
+        yield ""
+
+
+def write_release_txt(path: str, config: ImportFixtureConfig, suppliers: Iterable[int] = None):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in iter_release_lines(config, suppliers):
+            f.write(line + "\n")
+
+
+# ---------------- BOM 矩阵 ----------------
+def write_bom_matrix_xlsx(path: str, config: ImportFixtureConfig):
+    """零部件 × 成品用量宽矩阵；有用量的单元格按 matrix_density 随机分布，每行至少一个"""
+    import openpyxl
+    rng = random.Random(config.seed + 1)
+    products = product_rows(config)
+    components = catalog_rows(config)[:config.matrix_components]
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("BOM矩阵")
+    for label, field_index in (("成品代码", 0), ("成品名称", 1), ("规格型号", 2), ("品牌", 4)):
+        ws.append([None, None, label] + [p[field_index] for p in products])
+    for code, name, spec, _, _ in components:
+        row = [code, name, spec] + [
+            rng.choice(QTY_PER_CHOICES) if rng.random() < config.matrix_density else None
+            for _ in products
+        ]
+        if products and all(q is None for q in row[3:]):
+            row[3 + rng.randrange(len(products))] = rng.choice(QTY_PER_CHOICES)
+        ws.append(row)
+    wb.save(path)
+
+
+# ---------------- 库存盘点表 ----------------
+def _code_variant(code: str, rng: random.Random) -> str:
+    """同一物料代码的不同写法（导入时按去除空格/连字符/点并大写后匹配）"""
+    roll = rng.random()
+    if roll < 0.05:
+        return code.replace(".", "-")
+    if roll < 0.08:
+        return f" {code} "
+    return code
+
+
+def iter_inventory_rows(config: ImportFixtureConfig) -> Iterator[List]:
+    """逐行产出盘点表数据行（不含表头），末行为合计"""
+    rng = random.Random(config.seed + 2)
+    catalog = catalog_rows(config)
+    warehouses = ["原材料仓", "半成品仓", "成品仓", "外协仓"]
+    emitted: List[Tuple] = []
+    total = 0.0
+    for n in range(config.inventory_rows):
+        roll = rng.random()
+        if emitted and roll < config.duplicate_ratio:
+            code, name, spec = rng.choice(emitted)
+        elif roll < config.duplicate_ratio + config.unknown_ratio:
+            code, name, spec = f"9.99.{n:06d}", f"未建档物料{n}", f"UNK-{n}"
+        else:
+            code, name, spec, _, _ = rng.choice(catalog)
+        emitted.append((code, name, spec))
+        qty = float(rng.randint(0, 5000)) if rng.random() < 0.9 else round(rng.uniform(0, 100), 3)
+        total += qty
+        yield [_code_variant(code, rng), name, spec, rng.choice(warehouses),
+               f"B{rng.randint(1, 9999):04d}", "PCS", qty]
+    yield ["合计", None, None, None, None, None, round(total, 3)]
+
+
+def write_inventory_csv(path: str, config: ImportFixtureConfig, encoding: str = None):
+    with open(path, "w", encoding=encoding or config.csv_encoding, newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(INVENTORY_HEADERS)
+        writer.writerows(["" if v is None else v for v in row] for row in iter_inventory_rows(config))
+
+
+def write_inventory_xlsx(path: str, config: ImportFixtureConfig):
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("库存")
+    ws.append(INVENTORY_HEADERS)
+    for row in iter_inventory_rows(config):
+        ws.append(row)
+    wb.save(path)
+
@@ -0,0 +1,156 @@
+# benchmarks/mrp_benchmark.py
+# -*- coding: utf-8 -*-
+"""
+MRP 与导入入口的基准测试
+- 按命令行规模参数生成合成数据库（benchmarks.synthetic），通过 NDKJ_DB_PATH 让 app.db 使用该数据库
+- MRP 用例每次运行前清空结果缓存（内存 LRU 与 MrpSnapshots），计时的是完整计算
+- 导入用例每次运行前把数据库恢复为生成时的副本，保证每次导入的工作量相同
+- 每个用例记录最小/中位/平均/最大耗时，以及一次运行的数据库查询数和读取行数（app.utils.perf）
+- 结果写入 JSON；--compare 指定旧结果文件时输出中位耗时对比
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import fields
+from typing import Dict, List
+
+from benchmarks.common import BenchmarkCase, cleanup_app_database, compare, environment, run_case, write_report
+from benchmarks.synthetic import SyntheticConfig, build_database, write_import_files
+
+
+def build_cases(dataset, files: Dict[str, str], pristine_db: str) -> List[BenchmarkCase]:
+    """基准用例列表（导入 app 模块需在设置 NDKJ_DB_PATH 之后）"""
+    from app.db import execute, query_one, restore_database
+    from app.services.bom_matrix_export_service import BomMatrixExportService
+    from app.services.bom_matrix_import_service import BomMatrixImportService
+    from app.services.customer_order_service import CustomerOrderService
+    from app.services.inventory_import_service import InventoryImportService
+    from app.services.mrp_service import MRPService
+    from app.services.mrp_snapshot_service import MRPResultCache
+    from app.services.production_scheduling_service import ProductionSchedulingService
+    from app.services.scheduling_order_service import SchedulingOrderService
+
+    def cold_cache():
+        MRPResultCache.clear()
+        execute("DELETE FROM MrpSnapshots")
+
+    def restore():
+        restore_database(pristine_db)
+
+    def mrp_results(result: Dict) -> int:
+        return len(result.get("mrp_results", []))
+
+    def order_lines(import_id: int) -> int:
+        row = query_one("SELECT COUNT(*) AS n FROM CustomerOrderLines WHERE ImportId = ?", (import_id,))
+        return row["n"] if row else 0
+
+    start, end = dataset.order_start, dataset.order_end
+    order_id = dataset.scheduling_order_id
+    s_start, s_end = dataset.schedule_start, dataset.schedule_end
+
+    return [
+        BenchmarkCase("MRPService.calculate_mrp_kanban",
+                      lambda: MRPService.calculate_mrp_kanban(start, end), cold_cache),
+        BenchmarkCase("MRPService.calculate_parent_mrp_kanban",
+                      lambda: MRPService.calculate_parent_mrp_kanban(start, end), cold_cache),
+        BenchmarkCase("MRPService.calculate_comprehensive_mrp_kanban",
+                      lambda: MRPService.calculate_comprehensive_mrp_kanban(start, end), cold_cache),
+        BenchmarkCase("SchedulingOrderService.calculate_child_mrp_for_order",
+                      lambda: SchedulingOrderService.calculate_child_mrp_for_order(order_id, s_start, s_end),
+                      cold_cache),
+        BenchmarkCase("SchedulingOrderService.calculate_parent_mrp_for_order",
+                      lambda: SchedulingOrderService.calculate_parent_mrp_for_order(order_id, s_start, s_end),
+                      cold_cache),
+        BenchmarkCase("SchedulingOrderService.calculate_comprehensive_mrp_for_order",
+                      lambda: SchedulingOrderService.calculate_comprehensive_mrp_for_order(order_id, s_start, s_end),
+                      cold_cache),
+        BenchmarkCase("SchedulingOrderService.calculate_mrp_for_order",
+                      lambda: SchedulingOrderService.calculate_mrp_for_order(order_id), cold_cache,
+                      size=mrp_results),
+        BenchmarkCase("ProductionSchedulingService.calculate_daily_mrp",
+                      lambda: ProductionSchedulingService.calculate_daily_mrp(dataset.schedule_id), cold_cache,
+                      size=mrp_results),
+        # 导入：(成功, 消息, 导入ID) → 导入的明细行数
+        BenchmarkCase("CustomerOrderService.import_orders_from_txt",
+                      lambda: CustomerOrderService.import_orders_from_txt(files["orders_txt"], "benchmark"),
+                      restore, size=lambda result: order_lines(result[2]) if result[0] else 0),
+        # (成功, 消息, 明细, 累计物资) → 明细条数
+        BenchmarkCase("InventoryImportService.import_inventory_from_file",
+                      lambda: InventoryImportService.import_inventory_from_file(files["inventory_xlsx"]),
+                      restore, size=lambda result: len(result[2])),
+        # (成功数量, 错误, 警告) → 成功处理的矩阵单元格数
+        BenchmarkCase("BomMatrixImportService.import_matrix_excel",
+                      lambda: BomMatrixImportService.import_matrix_excel(files["bom_matrix_xlsx"]),
+                      restore, size=lambda result: result[0]),
+        # 导出：只计时矩阵构建（整表写出耗时取决于 成品数 × 零部件数 个单元格）→ 非零用量数
+        BenchmarkCase("BomMatrixExportService.build_matrix",
+                      BomMatrixExportService.build_matrix,
+                      size=lambda result: sum(len(row) for row in result["quantities"].values())),
+    ]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="MRP 与导入入口的基准测试")
+    defaults = SyntheticConfig()
+    for f in fields(SyntheticConfig):
+        parser.add_argument("--" + f.name.replace("_", "-"), type=type(getattr(defaults, f.name)),
+                            default=getattr(defaults, f.name))
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例的计时次数")
+    parser.add_argument("--only", default="", help="只运行名称包含该文本的用例")
+    parser.add_argument("--workdir", default="", help="合成数据库与导入文件目录（默认临时目录，结束后删除）")
+    parser.add_argument("--label", default="", help="写入结果的版本标签")
+    parser.add_argument("--output", default="", help="结果 JSON 文件路径")
+    parser.add_argument("--compare", default="", help="旧结果 JSON 文件，输出中位耗时对比")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    config = SyntheticConfig(**{f.name: getattr(args, f.name) for f in fields(SyntheticConfig)})
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ndkj_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        db_path = os.path.join(workdir, "bench.db")
+        pristine_db = os.path.join(workdir, "bench_pristine.db")
+
+        started = time.perf_counter()
+        dataset = build_database(db_path, config)
+        files = write_import_files(dataset, workdir)
+        shutil.copy2(db_path, pristine_db)
+        print(f"合成数据生成完成（{time.perf_counter() - started:.1f}s）：{dataset.counts}")
+
+        # app.db 在导入时按 NDKJ_DB_PATH 打开数据库
+        os.environ["NDKJ_DB_PATH"] = db_path
+        from app.utils import perf
+        perf.set_profiling(True)
+
+        results = []
+        for case in build_cases(dataset, files, pristine_db):
+            if args.only and args.only not in case.name:
+                continue
+            result = run_case(case, max(1, args.repeat))
+            results.append(result)
+            print(f"{result['name']:<62} 中位 {result['median_ms']:>9.1f} ms  "
+                  f"查询 {result['queries']:>6}  规模 {result['result_size']}")
+        perf.set_profiling(False)
+        perf.reset()
+
+        report = dict(environment(args.label), dataset=dataset.to_dict(), results=results)
+        if args.output:
+            write_report(report, args.output)
+        if args.compare:
+            print(compare(results, args.compare))
+        return 0
+    finally:
+        if not args.workdir:
+            cleanup_app_database()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
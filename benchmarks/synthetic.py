@@ -0,0 +1,398 @@
+# benchmarks/synthetic.py
+# -*- coding: utf-8 -*-
+"""
+合成基准数据
+- build_database：按 SyntheticConfig 的规模生成一份完整数据库（表结构来自 app/schema.sql），
+  包括成品/半成品/原材料/包装物料、多层BOM、客户订单、仓库与库存余额、排产订单和生产排产计划
+- write_import_files：由合成数据库导出导入基准使用的 NDLUtil TXT、库存 Excel、BOM 矩阵 Excel
+相同配置（含随机种子）生成的数据完全一致，便于跨版本比较
+直接使用 sqlite3 批量写入，不经过 app.db，可在设置 NDKJ_DB_PATH 之前调用
+"""
+
+import os
+import random
+import sqlite3
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from app.utils.resource_path import get_resource_path
+
+QTY_PER_CHOICES = (0.5, 1, 1, 2, 3, 4)
+SCRAP_CHOICES = (0, 0, 0.01, 0.02)
+
+
+@dataclass
+class SyntheticConfig:
+    """合成数据规模"""
+    items: int = 2000              # 物料总数（约 5% 成品、每层 10% 半成品，其余为原材料/包装）
+    bom_depth: int = 3             # BOM 层数：1 表示成品直接由原材料构成
+    fan_out: int = 6               # 每个 BOM 的子件数
+    order_lines: int = 5000        # 客户订单明细行数（上限为 成品数 × 交货日期数）
+    order_dates: int = 26          # 交货日期数
+    date_step_days: int = 7        # 相邻交货日期间隔天数
+    warehouses: int = 3            # 仓库数
+    stock_ratio: float = 0.6       # 有库存余额的物料比例
+    schedule_products: int = 50    # 排产订单/生产排产计划的成品数
+    schedule_days: int = 30        # 排产天数
+    start_date: str = "2025-01-06"
+    seed: int = 20250106
+
+
+@dataclass
+class SyntheticDataset:
+    """生成结果：数据库路径及基准入口所需的参数"""
+    path: str
+    config: SyntheticConfig
+    import_id: int = 0
+    scheduling_order_id: int = 0
+    schedule_id: int = 0
+    order_start: str = ""
+    order_end: str = ""
+    schedule_start: str = ""
+    schedule_end: str = ""
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["config"] = asdict(self.config)
+        return data
+
+
+def _item_rows(config: SyntheticConfig) -> Tuple[List[Tuple], List[List[int]], List[int]]:
+    """
+    物料行及分层结果
+    Returns:
+        (Items 插入行, 各层父物料序号 [成品层, 半成品层1, ...], 叶子物料序号)
+    """
+    fg_count = max(1, config.items // 20)
+    depth = max(1, config.bom_depth)
+    sfg_per_level = max(1, config.items // 10) if depth > 1 else 0
+    leaf_count = max(config.fan_out, config.items - fg_count - sfg_per_level * (depth - 1))
+
+    rows: List[Tuple] = []
+    levels: List[List[int]] = []
+
+    fg = []
+    for i in range(fg_count):
+        fg.append(len(rows))
+        rows.append((f"FG-{i:05d}", f"成品{i:05d}", f"FG-SPEC-{i:05d}", "FG", f"BR{i:05d}"))
+    levels.append(fg)
+
+    for level in range(1, depth):
+        sfg = []
+        for i in range(sfg_per_level):
+            sfg.append(len(rows))
+            rows.append((f"SFG{level}-{i:05d}", f"半成品{level}-{i:05d}", f"SFG-SPEC-{level}-{i:05d}", "SFG", None))
+        levels.append(sfg)
+
+    leaves = []
+    for i in range(leaf_count):
+        leaves.append(len(rows))
+        if i % 5 == 4:
+            rows.append((f"PKG-{i:05d}", f"包装{i:05d}", f"PKG-SPEC-{i:05d}", "PKG", None))
+        else:
+            rows.append((f"RM-{i:05d}", f"原材料{i:05d}", f"RM-SPEC-{i:05d}", "RM", None))
+    return rows, levels, leaves
+
+
+def create_database(path: str) -> sqlite3.Connection:
+    """按 app/schema.sql 新建空数据库（已存在的文件会被覆盖），返回打开的连接"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    with open(get_resource_path("app/schema.sql"), "r", encoding="utf-8") as f:
+        schema_sql = f.read()
+
+    conn = sqlite3.connect(path)
+    conn.executescript(schema_sql)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS db_version (
+            version_id INTEGER PRIMARY KEY,
+            version_number TEXT NOT NULL,
+            applied_date DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("INSERT INTO db_version (version_number) VALUES ('1.0.0')")
+    conn.commit()
+    return conn
+
+
+def build_database(path: str, config: SyntheticConfig = None) -> SyntheticDataset:
+    """生成合成数据库（已存在的文件会被覆盖）"""
+    config = config or SyntheticConfig()
+    rng = random.Random(config.seed)
+    conn = create_database(path)
+    try:
+        dataset = SyntheticDataset(path=path, config=config)
+        with conn:
+            _insert_items_and_boms(conn, config, rng, dataset)
+            _insert_customer_orders(conn, config, rng, dataset)
+            _insert_inventory(conn, config, rng, dataset)
+            _insert_schedules(conn, config, rng, dataset)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    return dataset
+
+
+def _insert_items_and_boms(conn: sqlite3.Connection, config: SyntheticConfig,
+                           rng: random.Random, dataset: SyntheticDataset):
+    rows, levels, leaves = _item_rows(config)
+    conn.executemany("""
+        INSERT INTO Items (ItemCode, CnName, ItemSpec, ItemType, Brand)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
+    # 按插入顺序取回 ItemId
+    item_ids = [r[0] for r in conn.execute("SELECT ItemId FROM Items ORDER BY ItemId")]
+
+    headers = []
+    lines = []
+    depth = len(levels)
+    for level, parents in enumerate(levels):
+        for parent in parents:
+            code, _, _, _, brand = rows[parent]
+            bom_name = f"{brand}-BOM" if brand else f"{code}-BOM"
+            headers.append((bom_name, item_ids[parent], config.start_date))
+            # 非末层：约一半子件取下一层半成品，其余为原材料/包装；末层全部为原材料/包装
+            if level < depth - 1:
+                sub_count = min((config.fan_out + 1) // 2, len(levels[level + 1]))
+                children = rng.sample(levels[level + 1], sub_count)
+            else:
+                children = []
+            children += rng.sample(leaves, min(config.fan_out - len(children), len(leaves)))
+            lines.append([(item_ids[c], rng.choice(QTY_PER_CHOICES), rng.choice(SCRAP_CHOICES))
+                          for c in children])
+
+    conn.executemany("""
+        INSERT INTO BomHeaders (BomName, ParentItemId, Rev, EffectiveDate)
+        VALUES (?, ?, 'A', ?)
+    """, headers)
+    bom_ids = [r[0] for r in conn.execute("SELECT BomId FROM BomHeaders ORDER BY BomId")]
+    conn.executemany("""
+        INSERT INTO BomLines (BomId, ChildItemId, QtyPer, ScrapFactor)
+        VALUES (?, ?, ?, ?)
+    """, [(bom_id, child, qty, scrap) for bom_id, children in zip(bom_ids, lines)
+          for child, qty, scrap in children])
+
+    dataset.counts["Items"] = len(rows)
+    dataset.counts["FG"] = len(levels[0])
+    dataset.counts["BomHeaders"] = len(headers)
+    dataset.counts["BomLines"] = sum(len(c) for c in lines)
+
+
+def _fg_rows(conn: sqlite3.Connection) -> List[Tuple]:
+    return conn.execute("""
+        SELECT ItemId, ItemCode, CnName, ItemSpec, Brand FROM Items
+        WHERE ItemType = 'FG' ORDER BY ItemId
+    """).fetchall()
+
+
+def _insert_customer_orders(conn: sqlite3.Connection, config: SyntheticConfig,
+                            rng: random.Random, dataset: SyntheticDataset):
+    fg = _fg_rows(conn)
+    start = date.fromisoformat(config.start_date)
+    dates = [start + timedelta(days=i * config.date_step_days) for i in range(max(1, config.order_dates))]
+
+    import_id = conn.execute("""
+        INSERT INTO OrderImportHistory (FileName, ImportedBy) VALUES ('synthetic.txt', 'benchmark')
+    """).lastrowid
+
+    # 每个 ISO 周一张订单
+    order_ids: Dict[Tuple[int, int], int] = {}
+    for d in dates:
+        year, week, _ = d.isocalendar()
+        if (year, week) not in order_ids:
+            order_ids[(year, week)] = conn.execute("""
+                INSERT INTO CustomerOrders (OrderNumber, ImportId, CalendarWeek, OrderYear, SupplierCode)
+                VALUES (?, ?, ?, ?, 'SUP001')
+            """, (f"CW{week:02d}_{year}", import_id, f"CW{week:02d}", year)).lastrowid
+
+    pair_count = len(fg) * len(dates)
+    picks = sorted(rng.sample(range(pair_count), min(config.order_lines, pair_count)))
+    firm_until = len(dates) // 3
+    lines = []
+    for pick in picks:
+        fg_index, date_index = divmod(pick, len(dates))
+        d = dates[date_index]
+        year, week, _ = d.isocalendar()
+        qty = float(rng.randint(1, 50) * 10)
+        lines.append((order_ids[(year, week)], import_id, fg[fg_index][4], d.isoformat(), f"CW{week:02d}",
+                      "F" if date_index < firm_until else "P", qty, qty, qty))
+    conn.executemany("""
+        INSERT INTO CustomerOrderLines
+        (OrderId, ImportId, ItemNumber, DeliveryDate, CalendarWeek, OrderType,
+         RequiredQty, CumulativeQty, NetRequiredQty)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, lines)
+    conn.execute("UPDATE OrderImportHistory SET OrderCount = ?, LineCount = ? WHERE ImportId = ?",
+                 (len(order_ids), len(lines), import_id))
+
+    dataset.import_id = import_id
+    dataset.order_start = dates[0].isoformat()
+    dataset.order_end = dates[-1].isoformat()
+    dataset.counts["CustomerOrders"] = len(order_ids)
+    dataset.counts["CustomerOrderLines"] = len(lines)
+
+
+def _insert_inventory(conn: sqlite3.Connection, config: SyntheticConfig,
+                      rng: random.Random, dataset: SyntheticDataset):
+    codes = [f"WH{i + 1:02d}" for i in range(max(1, config.warehouses))]
+    conn.executemany("INSERT OR IGNORE INTO Warehouses (Code, Name) VALUES (?, ?)",
+                     [(code, f"仓库{code[2:]}") for code in codes])
+
+    balances = []
+    for (item_id,) in conn.execute("SELECT ItemId FROM Items ORDER BY ItemId").fetchall():
+        if rng.random() >= config.stock_ratio:
+            continue
+        for code in rng.sample(codes, rng.randint(1, len(codes))):
+            balances.append((item_id, code, float(rng.randint(0, 2000))))
+    conn.executemany("""
+        INSERT INTO InventoryBalance (ItemId, Warehouse, QtyOnHand) VALUES (?, ?, ?)
+    """, balances)
+
+    dataset.counts["Warehouses"] = len(codes)
+    dataset.counts["InventoryBalance"] = len(balances)
+
+
+def _insert_schedules(conn: sqlite3.Connection, config: SyntheticConfig,
+                      rng: random.Random, dataset: SyntheticDataset):
+    fg = _fg_rows(conn)[:max(1, config.schedule_products)]
+    start = date.fromisoformat(config.start_date)
+    days = [start + timedelta(days=i) for i in range(max(1, config.schedule_days))]
+    end = days[-1].isoformat()
+
+    order_id = conn.execute("""
+        INSERT INTO SchedulingOrders (OrderName, StartDate, EndDate, CreatedBy)
+        VALUES ('基准排产订单', ?, ?, 'benchmark')
+    """, (start.isoformat(), end)).lastrowid
+    conn.executemany("""
+        INSERT INTO SchedulingOrderProducts (OrderId, ItemId, ItemCode, ItemName, ItemSpec, Brand)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(order_id, *row) for row in fg])
+
+    schedule_id = conn.execute("""
+        INSERT INTO ProductionSchedules (ScheduleName, StartDate, EndDate, CreatedBy)
+        VALUES ('基准生产排产', ?, ?, 'benchmark')
+    """, (start.isoformat(), end)).lastrowid
+
+    # 每个成品约一半的天数有排产
+    plan = [(row[0], d.isoformat(), float(rng.randint(1, 20) * 5))
+            for row in fg for d in days if rng.random() < 0.5]
+    conn.executemany("""
+        INSERT INTO SchedulingOrderLines (OrderId, ItemId, ProductionDate, PlannedQty)
+        VALUES (?, ?, ?, ?)
+    """, [(order_id, *p) for p in plan])
+    conn.executemany("""
+        INSERT INTO ProductionScheduleLines (ScheduleId, ItemId, ProductionDate, PlannedQty)
+        VALUES (?, ?, ?, ?)
+    """, [(schedule_id, *p) for p in plan])
+
+    dataset.scheduling_order_id = order_id
+    dataset.schedule_id = schedule_id
+    dataset.schedule_start = start.isoformat()
+    dataset.schedule_end = end
+    dataset.counts["ScheduleLines"] = len(plan)
+
+
+# ---------------- 导入文件 ----------------
+def write_import_files(dataset: SyntheticDataset, directory: str) -> Dict[str, str]:
+    """
+    由合成数据库导出导入基准的输入文件
+    Returns:
+        {"orders_txt": 路径, "inventory_xlsx": 路径, "bom_matrix_xlsx": 路径}
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(dataset.config.seed + 1)
+    conn = sqlite3.connect(dataset.path)
+    try:
+        files = {
+            "orders_txt": os.path.join(directory, "orders.txt"),
+            "inventory_xlsx": os.path.join(directory, "inventory.xlsx"),
+            "bom_matrix_xlsx": os.path.join(directory, "bom_matrix.xlsx"),
+        }
+        _write_orders_txt(conn, files["orders_txt"])
+        _write_inventory_xlsx(conn, rng, files["inventory_xlsx"])
+        _write_bom_matrix_xlsx(conn, rng, files["bom_matrix_xlsx"])
+    finally:
+        conn.close()
+    return files
+
+
+def _write_orders_txt(conn: sqlite3.Connection, path: str):
+    """客户订单明细 → NDLUtil 发布文件（单一供应商，每个品牌一个 Item 段）"""
+    rows = conn.execute("""
+        SELECT ItemNumber, DeliveryDate, OrderType, RequiredQty FROM CustomerOrderLines
+        ORDER BY ItemNumber, DeliveryDate
+    """).fetchall()
+    out = [
+        "Supplier: SUP001",
+        "   SYNTHETIC SUPPLIER CO",
+        "Ship-To: PLANT 1",
+        "Release ID: REL-0001   Release Date: 01/02/25",
+        "Receipt Quantity: 1,200   Cum Received: 34,500",
+    ]
+    current = None
+    for item_number, delivery_date, order_type, qty in rows:
+        if item_number != current:
+            current = item_number
+            out.append("")
+            out.append(f"Item Number: {item_number}")
+            out.append("Purchase Order: PO0001")
+        d = date.fromisoformat(delivery_date)
+        out.append(f"   Weekly {d.strftime('%m/%d/%y')}  {order_type}  {qty:,.0f}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(out) + "\n")
+
+
+def _write_inventory_xlsx(conn: sqlite3.Connection, rng: random.Random, path: str):
+    """全部物料的盘点表（物料代码/物料名称/规格型号/基本单位数量），末行为合计"""
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("库存")
+    ws.append(["物料代码", "物料名称", "规格型号", "基本单位数量"])
+    total = 0.0
+    for code, name, spec in conn.execute("SELECT ItemCode, CnName, ItemSpec FROM Items ORDER BY ItemId"):
+        qty = float(rng.randint(0, 3000))
+        total += qty
+        ws.append([code, name, spec, qty])
+    ws.append(["合计", None, None, total])
+    wb.save(path)
+
+
+def _write_bom_matrix_xlsx(conn: sqlite3.Connection, rng: random.Random, path: str):
+    """成品BOM的零部件 × 成品用量矩阵（parse_matrix_excel 布局），约三成用量与库中不同，另有少量新增用量"""
+    import openpyxl
+    products = conn.execute("""
+        SELECT i.ItemId, i.ItemCode, i.CnName, i.ItemSpec, i.Brand FROM Items i
+        WHERE i.ItemType = 'FG' ORDER BY i.ItemId
+    """).fetchall()
+    # 矩阵导入只匹配 RM/SFG/FG 零部件，包装物料不进入矩阵
+    lines = conn.execute("""
+        SELECT bh.ParentItemId, bl.ChildItemId, bl.QtyPer FROM BomLines bl
+        JOIN BomHeaders bh ON bl.BomId = bh.BomId
+        JOIN Items p ON bh.ParentItemId = p.ItemId
+        JOIN Items c ON bl.ChildItemId = c.ItemId
+        WHERE p.ItemType = 'FG' AND c.ItemType IN ('RM', 'SFG')
+    """).fetchall()
+    qty = {(parent, child): q for parent, child, q in lines}
+    child_ids = sorted({child for _, child, _ in lines})
+    children = {row[0]: row[1:] for row in conn.execute(
+        f"SELECT ItemId, ItemCode, CnName, ItemSpec FROM Items WHERE ItemId IN ({','.join('?' * len(child_ids))})",
+        child_ids)} if child_ids else {}
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("BOM矩阵")
+    for field_index in range(1, 5):
+        ws.append([None, None, None] + [p[field_index] for p in products])
+    for child_id in child_ids:
+        row = list(children[child_id])
+        for p in products:
+            q = qty.get((p[0], child_id), 0)
+            if (q and rng.random() < 0.3) or (not q and rng.random() < 0.01):
+                q = rng.choice(QTY_PER_CHOICES)
+            row.append(q if q else None)
+        ws.append(row)
+    wb.save(path)
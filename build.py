@@ -65,6 +65,7 @@ def build_exe():
         # 隐藏导入
         "--hidden-import=sqlite3",
         "--hidden-import=pandas",
+        "--hidden-import=numpy",
         "--hidden-import=openpyxl",
         "--hidden-import=app",
         "--hidden-import=app.ui",